@@ -15,27 +15,57 @@ in becomes a ~15-line wrapper:
         display_name="TTD",
     )
 
+Exports are resolved on first access (PEP 562), so importing one helper
+does not drag in the rest. `from app.per_db_tool import build_app` loads
+FastAPI and `_main`, not the schema_kg planner / chat modules. Keep new heavy
+third-party imports inside the functions that need them;
+scripts/check_import_budget.py fails CI when a service's import time grows.
 """
-from ._main import build_app
-from ._httpx_client import get_httpx_client
-from ._finalize import QueryState, finalize_db_result
-from ._orchestrator import WorkerCtx, execute_db_query, make_db_result_handler
-from ._service_factory import setup_service_globals
-from ._execute_endpoint import ExecuteRequest, register_execute_endpoint
-from .schema_kg_worker import (
-    SchemaKgConfig, make_schema_kg_handler, call_orchestrator, call_web_tool,
-)
-from .schema_kg_planner import get_planner
-from .schema_kg_chat import ChatSpec, build_chat_router
-
-__all__ = [
-    "build_app",
-    "get_httpx_client",
-    "QueryState", "finalize_db_result",
-    "WorkerCtx", "execute_db_query", "make_db_result_handler",
-    "setup_service_globals",
-    "ExecuteRequest", "register_execute_endpoint",
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+_EXPORTS = {
+    "build_app": "._main",
+    "get_httpx_client": "._httpx_client",
+    "QueryState": "._finalize", "finalize_db_result": "._finalize",
+    "WorkerCtx": "._orchestrator", "execute_db_query": "._orchestrator",
+    "make_db_result_handler": "._orchestrator",
+    "setup_service_globals": "._service_factory",
+    "ExecuteRequest": "._execute_endpoint", "register_execute_endpoint": "._execute_endpoint",
     # schema_kg shared pipeline
-    "SchemaKgConfig", "make_schema_kg_handler", "call_orchestrator", "call_web_tool",
-    "get_planner", "ChatSpec", "build_chat_router",
-]
+    "SchemaKgConfig": ".schema_kg_worker", "make_schema_kg_handler": ".schema_kg_worker",
+    "call_orchestrator": ".schema_kg_worker", "call_web_tool": ".schema_kg_worker",
+    "get_planner": ".schema_kg_planner",
+    "ChatSpec": ".schema_kg_chat", "build_chat_router": ".schema_kg_chat",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if TYPE_CHECKING:
+    from ._main import build_app
+    from ._httpx_client import get_httpx_client
+    from ._finalize import QueryState, finalize_db_result
+    from ._orchestrator import WorkerCtx, execute_db_query, make_db_result_handler
+    from ._service_factory import setup_service_globals
+    from ._execute_endpoint import ExecuteRequest, register_execute_endpoint
+    from .schema_kg_worker import (
+        SchemaKgConfig, make_schema_kg_handler, call_orchestrator, call_web_tool,
+    )
+    from .schema_kg_planner import get_planner
+    from .schema_kg_chat import ChatSpec, build_chat_router
@@ -0,0 +1,186 @@
+"""Server-side cursors over published per-DB results.
+
+A client used to get either the capped preview (HEAD_VIEW_ROW_COUNT rows)
+or the whole CSV. A cursor lets it page through the full answer instead.
+
+The cursor id is the content key of the result (utils.artifact_store), so
+``DatabaseTable.cursor_id`` costs nothing to mint and stays valid as long as
+the result's files do. On first use the result is copied once into an
+uncompressed Arrow IPC file, ``artifacts/<id>.arrow``. The copy is made from
+the parquet artifact, or from the CSV for a spilled result that has no
+parquet. That file is opened memory-mapped, so
+
+* a page in result order is a zero-copy slice: O(page), whatever the offset.
+  Result order is the CSV's, which always starts with the preview rows (a
+  spilled join is rewritten that way, see rewrite_spilled_csv), so offset
+  N continues an N-row preview;
+* a sorted page costs one ``arg_sort`` of the sort column the first time.
+  The permutation is kept (CURSOR_SORT_CACHE per process) and later pages
+  are a gather of ``limit`` rows;
+* projection only touches the requested columns' buffers.
+
+Mapped frames are kept in a small per-process LRU (CURSOR_OPEN_MAX). The
+evictor may delete ``.arrow`` files at any time. A frame that is already
+mapped keeps working, and the next open rebuilds the copy.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import polars as pl
+
+from utils.artifact_store import artifact_path, cursor_path, key_for_csv
+from utils.preprocess import _csv_path
+
+CURSOR_MAX_PAGE_ROWS = int(os.getenv("CURSOR_MAX_PAGE_ROWS", "1000"))
+CURSOR_OPEN_MAX = int(os.getenv("CURSOR_OPEN_MAX", "16"))
+CURSOR_SORT_CACHE = int(os.getenv("CURSOR_SORT_CACHE", "32"))
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class CursorNotFound(LookupError):
+    """No result files left for this cursor id (never published, or evicted)."""
+
+
+class CursorError(ValueError):
+    """The page request does not fit the result (unknown or unsortable column)."""
+
+
+_FRAMES: "OrderedDict[str, pl.DataFrame]" = OrderedDict()
+_PERMS: "OrderedDict[Tuple[str, str, bool], pl.Series]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def cursor_id_for(csv_path: Optional[str]) -> Optional[str]:
+    """The cursor id of a published result CSV (None when there is none)."""
+    return key_for_csv(csv_path) if csv_path else None
+
+
+def _lru_put(cache: OrderedDict, key, value, cap: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max(cap, 1):
+        cache.popitem(last=False)
+
+
+def _build_copy(db: str, cursor_id: str) -> str:
+    target = cursor_path(cursor_id)
+    if os.path.exists(target):
+        return target
+    parquet = artifact_path(cursor_id)
+    csv = _csv_path(f"{db}_results", cursor_id)
+    if os.path.exists(parquet):
+        lf = pl.scan_parquet(parquet)
+    elif os.path.exists(csv):
+        lf = pl.scan_csv(csv, infer_schema_length=10000)
+    else:
+        raise CursorNotFound(cursor_id)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(target), f".{cursor_id}.arrow.{uuid.uuid4().hex[:8]}")
+    try:
+        lf.sink_ipc(tmp, compression=None)
+        os.replace(tmp, target)
+    except FileNotFoundError as e:
+        # source evicted between the exists() check and the scan
+        raise CursorNotFound(cursor_id) from e
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return target
+
+
+def _open(db: str, cursor_id: str) -> pl.DataFrame:
+    if not _ID_RE.match(cursor_id or ""):
+        raise CursorNotFound(cursor_id)
+    with _LOCK:
+        df = _FRAMES.get(cursor_id)
+        if df is not None:
+            _FRAMES.move_to_end(cursor_id)
+            return df
+    path = _build_copy(db, cursor_id)
+    try:
+        df = pl.read_ipc(path)  # memory-mapped: the file is uncompressed
+        os.utime(path)          # LRU clock for the evictor
+    except FileNotFoundError as e:
+        raise CursorNotFound(cursor_id) from e
+    with _LOCK:
+        _lru_put(_FRAMES, cursor_id, df, CURSOR_OPEN_MAX)
+    return df
+
+
+def _permutation(cursor_id: str, df: pl.DataFrame, col: str, descending: bool) -> pl.Series:
+    key = (cursor_id, col, descending)
+    with _LOCK:
+        perm = _PERMS.get(key)
+        if perm is not None:
+            _PERMS.move_to_end(key)
+            return perm
+    try:
+        perm = df.select(pl.col(col).arg_sort(descending=descending, nulls_last=True)).to_series()
+    except pl.exceptions.PolarsError as e:
+        raise CursorError(f"cannot sort by {col!r}: {e}") from e
+    with _LOCK:
+        _lru_put(_PERMS, key, perm, CURSOR_SORT_CACHE)
+    return perm
+
+
+def describe_cursor(db: str, cursor_id: str) -> Dict[str, Any]:
+    """Row count and column names / dtypes of a cursor's result."""
+    df = _open(db, cursor_id)
+    return {
+        "cursor_id": cursor_id,
+        "database": db,
+        "row_count": df.height,
+        "columns": [{"name": c, "dtype": str(t)} for c, t in df.schema.items()],
+    }
+
+
+def read_page(
+    db: str,
+    cursor_id: str,
+    *,
+    offset: int = 0,
+    limit: int = 100,
+    sort: Optional[str] = None,
+    descending: bool = False,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """One page of a cursor's result, optionally sorted by one column and
+    projected to *columns*. ``next_offset`` is None on the last page."""
+    df = _open(db, cursor_id)
+    cols = list(columns) if columns else df.columns
+    unknown = [c for c in cols + ([sort] if sort else []) if c not in df.schema]
+    if unknown:
+        raise CursorError(f"unknown column(s): {', '.join(unknown)}")
+    offset = max(0, int(offset))
+    limit = max(1, min(int(limit), CURSOR_MAX_PAGE_ROWS))
+    if sort:
+        idx = _permutation(cursor_id, df, sort, descending).slice(offset, limit)
+        page = df.select(cols)[idx]
+    else:
+        page = df.slice(offset, limit).select(cols)
+    end = offset + page.height
+    return {
+        "cursor_id": cursor_id,
+        "database": db,
+        "row_count": df.height,
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "descending": descending,
+        "columns": cols,
+        "rows": page.to_dicts(),
+        "next_offset": end if end < df.height else None,
+    }
+
+
+__all__ = [
+    "CURSOR_MAX_PAGE_ROWS", "CursorError", "CursorNotFound", "cursor_id_for",
+    "describe_cursor", "read_page",
+]
@@ -17,7 +17,6 @@ so each worker call site is self-documenting — no `**kwargs` magic.
 from __future__ import annotations
 
 import asyncio
-import csv
 import json
 import logging
 import os
@@ -26,12 +25,15 @@ from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import Any, Optional
 
-from openai import AsyncOpenAI
+import polars as pl
 from config import settings
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
+from utils.tracing import span
 from utils.web_evidence import fetch_web_evidence
 
+from ._cursors import cursor_id_for
 from ._httpx_client import get_httpx_client
+from ._prompt_budget import pack_prompt
 from ._worker_helpers import get_redis
 
 # Generic approval-tier regexes for the RERANK secondary sort.
@@ -45,14 +47,18 @@ _RERANK_STATUS_COL = re.compile(
 _RERANK_APPROVED_VAL = re.compile(r"\bapproved\b", re.IGNORECASE)
 _RERANK_PHASE_VAL = re.compile(r"\bphase\s*([0-9]+)\b|\bpreclinical\b", re.IGNORECASE)
 
-# Max characters allowed in the JSON-encoded summariser user-message. OpenAI
+# Token budget for the JSON-encoded summariser user-message. OpenAI
 # silently truncates input from the END when context overflows, which drops
 # `web_evidence`, `parsed_value`, and `query` — exactly the fields the
-# summariser most needs to write a faithful answer. A 24K-char cap leaves
-# ~18K tokens of headroom for system_prompt + 800-token response on a
-# 128K-context model and well under gpt-4.1-nano's effective budget for
-# fast responses. Override per-environment with SUMMARIZER_PROMPT_MAX_CHARS.
-_SUMMARIZER_PROMPT_MAX_CHARS = int(os.getenv("SUMMARIZER_PROMPT_MAX_CHARS", "24000"))
+# summariser most needs to write a faithful answer. 6K tokens leaves ample
+# headroom for system_prompt + 800-token response on a 128K-context model and
+# keeps gpt-4.1-nano inside its effective budget for fast responses. Override
+# per-environment with SUMMARIZER_PROMPT_MAX_TOKENS; a legacy
+# SUMMARIZER_PROMPT_MAX_CHARS is still honoured at ~4 chars per token.
+_SUMMARIZER_PROMPT_MAX_TOKENS = int(
+    os.getenv("SUMMARIZER_PROMPT_MAX_TOKENS")
+    or int(os.getenv("SUMMARIZER_PROMPT_MAX_CHARS", "24000")) // 4
+)
 # When relevance_score sorting is active, only the top-N rows are sent to the
 # LLM synthesizer — the rest are still visible to the user via the CSV download.
 # Set SYNTHESIZER_TABLE_CAP=0 to pass all preview rows (old behaviour).
@@ -123,81 +129,108 @@ def _disclaimer_texts() -> tuple[str, str]:
 
 
 @lru_cache(maxsize=1)
-def _load_gene_name_map() -> dict[str, str]:
-    """Load gene_symbol → gene_full_name from the first available CSV path."""
+def _gene_name_frame() -> pl.DataFrame:
+    """gene_symbol → gene_full_name from the first available HGNC CSV, read
+    once per process as a two-column frame."""
     for path in _HGNC_CSV_CANDIDATES:
         p = os.path.normpath(path)
         if os.path.isfile(p):
-            with open(p, newline="", encoding="utf-8") as fh:
-                return {row["gene_symbol"]: row["gene_full_name"] for row in csv.DictReader(fh)}
-    return {}
+            return (
+                pl.read_csv(p, columns=["gene_symbol", "gene_full_name"],
+                            schema_overrides={"gene_symbol": pl.Utf8, "gene_full_name": pl.Utf8})
+                .drop_nulls("gene_symbol")
+                .unique("gene_symbol", keep="first", maintain_order=True)
+            )
+    return pl.DataFrame(schema={"gene_symbol": pl.Utf8, "gene_full_name": pl.Utf8})
 
 
-def _inject_gene_full_names(preview: list[dict]) -> list[dict]:
-    """Enrich preview rows with HGNC full gene names.
+def add_gene_full_name_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """Enrich a result frame with HGNC full gene names.
 
-    For every column in every row, if the value is an exact HGNC symbol in
-    the lookup map, inject a sibling column ``{col}_full_name`` with the
-    official name.  No column names are hardcoded — the lookup CSV is the
-    sole authority on what counts as a gene symbol.  DB-native ``*_full_name``
-    values are never overwritten.
+    A string column gets a sibling ``{col}_full_name`` only when at least one
+    of its values is an exact HGNC symbol; rows that are not symbols carry
+    null.  No column names are hardcoded — the lookup CSV is the sole
+    authority on what counts as a gene symbol.  DB-native ``*_full_name``
+    columns are never overwritten.
+
+    One ``is_in`` pass finds the columns with a hit, then each of those is
+    mapped in one vectorised lookup against the cached frame, so the cost no
+    longer grows with rows × columns of Python dict work.
     """
-    if not preview:
-        return preview
-    gene_map = _load_gene_name_map()
-    if not gene_map:
-        return preview
-    enriched = []
-    for row in preview:
-        extra: dict[str, str] = {}
-        for col, val in row.items():
-            if not isinstance(val, str) or not val:
-                continue
-            full_name_col = f"{col}_full_name"
-            if full_name_col in row:
-                continue
-            name = gene_map.get(val)
-            if name:
-                extra[full_name_col] = name
-        enriched.append({**row, **extra} if extra else row)
-    return enriched
+    names = _gene_name_frame()
+    if df.is_empty() or names.is_empty():
+        return df
+    symbols, full_names = names["gene_symbol"], names["gene_full_name"]
+    candidates = [
+        col for col, dtype in df.schema.items()
+        if dtype in (pl.Utf8, pl.Categorical) or isinstance(dtype, pl.Enum)
+        if f"{col}_full_name" not in df.columns
+    ]
+    if not candidates:
+        return df
+    has_hit = df.select(pl.col(c).cast(pl.Utf8).is_in(symbols).any() for c in candidates).row(0)
+    hits = [c for c, hit in zip(candidates, has_hit) if hit]
+    if not hits:
+        return df
+    return df.with_columns(
+        pl.col(c).cast(pl.Utf8)
+        .replace_strict(symbols, full_names, default=None, return_dtype=pl.Utf8)
+        .alias(f"{c}_full_name")
+        for c in hits
+    )
 
 
 def _build_prompt_with_budget(
     payload: dict,
     *,
-    max_chars: int,
+    max_tokens: int,
     db: str,
     log: logging.Logger,
 ) -> str:
-    """Serialise `payload` to JSON, iteratively halving `payload['table']`
-    (the preview rows) until the result fits in `max_chars`.
+    """Serialise `payload` to JSON, keeping as many `payload['db_rows']`
+    (the preview rows, already relevance-ranked) as fit in `max_tokens`.
+
+    The preview is the only safely-trimmable field — the question, counts,
+    instructions, answer-column hints and `web_rows` all feed directly into
+    the summariser's reasoning and must reach it intact. The preview rows
+    are illustrative; even 1 row is enough for the LLM to describe the
+    result shape. Always keeps ≥1 row. Each row is serialised and measured
+    once (see _prompt_budget); `_COUNT_INSTRUCTION` is rewritten to the
+    number of rows actually sent.
+
+    Logs tokens used vs dropped, as a warning whenever trimming fires so the
+    rate is observable.
+    """
+    def _recount(skeleton: dict, kept: int) -> dict:
+        total = skeleton.get("db_row_count")
+        if "_COUNT_INSTRUCTION" in skeleton and total is not None:
+            skeleton = dict(skeleton)
+            skeleton["_COUNT_INSTRUCTION"] = _count_instruction(total, kept)
+        return skeleton
+
+    packed = pack_prompt(payload, rows_key="db_rows", max_tokens=max_tokens, annotate=_recount)
+    if packed.trimmed:
+        log.warning(
+            "[%s] summariser prompt trimmed: %d → %d preview rows "
+            "(%d tokens used, %d dropped, budget %d)",
+            db, packed.rows_in, packed.rows_kept,
+            packed.tokens_used, packed.tokens_dropped, packed.budget,
+        )
+    else:
+        log.info(
+            "[%s] summariser prompt: %d preview rows, %d tokens (budget %d)",
+            db, packed.rows_kept, packed.tokens_used, packed.budget,
+        )
+    return packed.prompt
 
-    The preview is the only safely-trimmable field — `filter_stats`, `plan`,
-    `filter_value`, `parsed_value`, `query`, and `web_evidence` all feed
-    directly into the summariser's reasoning and must reach it intact. The
-    preview rows are illustrative; even 1 row is enough for the LLM to
-    describe the result shape. Always keeps ≥1 row.
 
-    Logs a warning whenever trimming fires so the rate is observable.
-    """
-    prompt = json.dumps(payload, default=str, ensure_ascii=False)
-    if len(prompt) <= max_chars:
-        return prompt
-    original_rows = len(payload.get("table") or [])
-    rows = original_rows
-    while len(prompt) > max_chars and rows > 1:
-        rows = max(1, rows // 2)
-        payload = dict(payload)  # shallow copy so we don't mutate caller's dict
-        payload["table"] = (payload.get("table") or [])[:rows]
-        prompt = json.dumps(payload, default=str, ensure_ascii=False)
-    log.warning(
-        "[%s] summariser prompt trimmed: %d → %d preview rows (size %d → %d chars, cap %d)",
-        db, original_rows, len(payload.get("table") or []),
-        # Approx the original size from the original-rows count for the log.
-        len(prompt) + max(0, original_rows - rows) * 200, len(prompt), max_chars,
+def _count_instruction(total: int, preview_rows: int) -> str:
+    return (
+        f"db_row_count={total} is the TRUE total rows matching the query. "
+        f"db_rows is a PREVIEW of only {preview_rows} rows. "
+        f"ALWAYS use db_row_count={total} when stating the count in your answer. "
+        f"NEVER count the items in db_rows to get the total."
     )
-    return prompt
 
 
 @dataclass
@@ -220,6 +253,8 @@ class QueryState:
     error_msg: Optional[str] = None
     csv_path: str = ""
     preview: list = field(default_factory=list)
+    # Full row count when the join spilled to disk and `df` is only its top-K.
+    total_rows: Optional[int] = None
     # When non-None and `error_msg` is None, this exact string is used as
     # the response message — the LLM summarizer call is skipped entirely.
     # Used by workers that opt out of the per-DB LLM summary via
@@ -245,7 +280,8 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
     log = logging.getLogger("uvicorn.error")
     db = state.db
 
-    _fallback = f"Retrieved {state.df.height} rows from {db.upper()}."
+    _rows = state.total_rows if state.total_rows is not None else state.df.height
+    _fallback = f"Retrieved {_rows} rows from {db.upper()}."
 
     # Re-rank state.preview so rows that exactly match the queried entity
     # (drug/gene/disease name from parsed_value) float to the top.
@@ -337,13 +373,6 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
         except Exception as _re:
             log.warning("[%s] entity rerank failed: %s", db, _re)
 
-    # Inject gene_full_name from static HGNC lookup so the summarizer can
-    # quote full names verbatim from the table (no pretraining needed).
-    try:
-        state.preview = _inject_gene_full_names(state.preview)
-    except Exception as _ge:
-        log.warning("[%s] gene_full_name injection failed: %s", db, _ge)
-
     if state.error_msg:
         message = state.error_msg
     elif state.pre_computed_message is not None:
@@ -399,8 +428,8 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
         # values all degrade smaller models (gpt-4.1-nano, qwen3.5-nothink)
         # disproportionately. `default=str` covers pydantic models /
         # numpy / polars types that aren't natively JSON-serializable. The
-        # helper trims preview rows iteratively if the JSON exceeds the
-        # SUMMARIZER_PROMPT_MAX_CHARS budget (logs a warning when it does).
+        # helper packs preview rows into the SUMMARIZER_PROMPT_MAX_TOKENS
+        # budget in rank order (logs a warning when it has to drop any).
         _llm_rows = (
             state.preview[:_SYNTHESIZER_TABLE_CAP]
             if _SYNTHESIZER_TABLE_CAP > 0
@@ -490,14 +519,9 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
             }
             for i, w in enumerate(web_evidence or [])
         ]
-        _true_total = state.df.height
+        _true_total = _rows
         _payload = {
-            "_COUNT_INSTRUCTION": (
-                f"db_row_count={_true_total} is the TRUE total rows matching the query. "
-                f"db_rows is a PREVIEW of only {len(_db_rows)} rows. "
-                f"ALWAYS use db_row_count={_true_total} when stating the count in your answer. "
-                f"NEVER count the items in db_rows to get the total."
-            ),
+            "_COUNT_INSTRUCTION": _count_instruction(_true_total, len(_db_rows)),
             "question": state.input.cleaned_query,
             "database": db,
             "db_row_count": _true_total,
@@ -547,7 +571,7 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
             )
         else:
             _prompt = _build_prompt_with_budget(
-                _payload, max_chars=_SUMMARIZER_PROMPT_MAX_CHARS, db=db, log=log)
+                _payload, max_tokens=_SUMMARIZER_PROMPT_MAX_TOKENS, db=db, log=log)
 
             try:
                 _http_timeout = float(os.getenv("OPENAI_HTTP_TIMEOUT", "45"))
@@ -566,23 +590,25 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
                     else settings.get_groq_key(state.db)
                 )
                 _synth_system = _load_synthesizer_prompt() or state.prompt_md
+                from openai import AsyncOpenAI
                 _client = AsyncOpenAI(
                     base_url=_summ_base,
                     api_key=_summ_key,
                     max_retries=int(os.getenv("SUMMARIZER_MAX_RETRIES", "2")),
                     timeout=_http_timeout,
                 )
-                _resp = await asyncio.wait_for(
-                    _client.chat.completions.create(
-                        model=state.summarizer_model,
-                        messages=[
-                            {"role": "system", "content": _synth_system},
-                            {"role": "user", "content": _prompt},
-                        ],
-                        max_tokens=int(os.getenv("BIOCHIRP_SYNTH_MAX_TOKENS", "2000")),
-                    ),
-                    timeout=_http_timeout + 10,
-                )
+                with span("summarizer", kind="llm", db=db, model=state.summarizer_model):
+                    _resp = await asyncio.wait_for(
+                        _client.chat.completions.create(
+                            model=state.summarizer_model,
+                            messages=[
+                                {"role": "system", "content": _synth_system},
+                                {"role": "user", "content": _prompt},
+                            ],
+                            max_tokens=int(os.getenv("BIOCHIRP_SYNTH_MAX_TOKENS", "2000")),
+                        ),
+                        timeout=_http_timeout + 10,
+                    )
                 message = (_resp.choices[0].message.content or "").strip() or _fallback
             except Exception as _e:
                 log.error("[%s] Summarizer failed: %s", db, _e)
@@ -627,9 +653,10 @@ async def finalize_db_result(state: QueryState) -> DatabaseTable:
         database=db,
         table=state.preview if not state.error_msg else None,
         csv_path=state.csv_path if not state.error_msg else None,
-        row_count=state.df.height if not state.error_msg else None,
+        row_count=_rows if not state.error_msg else None,
         tool=state.tool,
         message=message,
         filter_trace=_trace,
         filter_val=dict(state.filter_val or {}),
+        cursor_id=cursor_id_for(state.csv_path) if not state.error_msg else None,
     )
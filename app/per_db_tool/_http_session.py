@@ -14,11 +14,27 @@ identical behaviour, zero diff in connection-pool semantics.
 
 Services that intentionally use a different HTTP client (ttd uses
 `httpx.AsyncClient`) keep their own setup and do not import this.
+
+The session (and `requests` itself) is built on first use via
+`get_http_session()`; `HTTP_SESSION` still resolves, lazily, for older
+imports. Nothing on a per-DB service's request path uses it any more, so a
+service that never calls `post_with_retry` never imports `requests`.
 """
-import requests
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+_SESSION: "requests.Session | None" = None
+_LOCK = threading.Lock()
 
 
-def _build_session() -> requests.Session:
+def _build_session() -> "requests.Session":
+    import requests
+
     s = requests.Session()
     try:
         from requests.adapters import HTTPAdapter
@@ -31,4 +47,16 @@ def _build_session() -> requests.Session:
     return s
 
 
-HTTP_SESSION: requests.Session = _build_session()
+def get_http_session() -> "requests.Session":
+    global _SESSION
+    if _SESSION is None:
+        with _LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+def __getattr__(name: str):
+    if name == "HTTP_SESSION":
+        return get_http_session()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -18,16 +18,24 @@ Comment from the original TTD worker:
      POSTs from an async FastAPI route blocked the uvicorn worker event
      loop, capping per-worker concurrency at 1."
 
-This shared client is paired with `post_async()` in `_worker_helpers.py`.
+This shared client is paired with `post_async()` in `_worker_helpers.py`
+and `post_service()` in `_service_client.py`.
 """
 from __future__ import annotations
 
+import importlib.util
 import logging
+import os
 from typing import Optional
 
 import httpx
 
+from utils.tracing import httpx_event_hooks
+
 _HTTPX_CLIENT: Optional[httpx.AsyncClient] = None
+# Internal services are HTTP/1.1-only uvicorn; opt in for HTTP/2 upstreams.
+_HTTP2 = (os.getenv("SERVICE_HTTP2", "0").lower() in ("1", "true", "yes")
+          and importlib.util.find_spec("h2") is not None)
 
 
 def get_httpx_client() -> httpx.AsyncClient:
@@ -52,6 +60,9 @@ def get_httpx_client() -> httpx.AsyncClient:
                 max_connections=128,
                 keepalive_expiry=300.0,
             ),
+            http2=_HTTP2,
+            # X-Request-ID propagation + per-host latency histograms
+            event_hooks=httpx_event_hooks(),
         )
     return _HTTPX_CLIENT
 
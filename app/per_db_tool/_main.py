@@ -25,16 +25,16 @@ import logging
 import os
 import time
 import uuid
-from pathlib import Path
 from typing import Awaitable, Callable, Optional
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
 from config.provenance import get_db_provenance
-from utils.service_setup import add_download_endpoint
+from utils.service_setup import add_download_endpoint, add_tracing
+from utils.tracing import current_request_id
 
 ReturnResultFn = Callable[..., Awaitable[DatabaseTable]]
 GetDbFn = Callable[[], object]
@@ -54,51 +54,28 @@ class _FeedbackPayload(BaseModel):
 
 
 async def _sweep_old_results(display_name: str, logger: logging.Logger) -> None:
-    """Delete result-CSVs older than RESULTS_TTL_DAYS (default 14) from
-    RESULTS_ROOT. Runs once on service startup as a fire-and-forget task.
+    """Keep RESULTS_ROOT bounded for the life of the service.
 
-    CSVs are written unconditionally by _orchestrator._csv_path() even when
-    no connection_id is supplied (deliberate — agentic-surface LLMs sometimes
+    CSVs are written unconditionally by _orchestrator even when no
+    connection_id is supplied (deliberate — agentic-surface LLMs sometimes
     drop the connection_id, and the frontend still needs a stable
-    /download path). Without this sweep the directory grows monotonically.
-
-    Idempotent: multiple services may all start at once, multiple `os.unlink`
-    calls on the same stale file all succeed-or-ENOENT. Disabled by setting
-    RESULTS_TTL_DAYS=0.
+    /download path), along with their parquet artifacts. Every
+    RESULTS_EVICT_INTERVAL_S (default 300s) this deletes files older than
+    RESULTS_TTL_DAYS (default 14; 0 disables the age limit), then the least
+    recently used ones until the directory fits RESULTS_MAX_BYTES. See
+    utils.artifact_store.evict_results.
+
+    Idempotent: every service sharing RESULTS_ROOT runs one of these, and
+    concurrent `os.unlink` calls on the same file all succeed-or-ENOENT.
     """
+    from utils.artifact_store import run_evictor
+
     try:
-        ttl_days = int(os.environ.get("RESULTS_TTL_DAYS", "14"))
-    except ValueError:
-        ttl_days = 14
-    if ttl_days <= 0:
-        return
-    root = Path(os.environ.get("RESULTS_ROOT", "/app/results"))
-    if not root.exists():
-        return
-    cutoff = time.time() - (ttl_days * 86400)
-    removed = 0
-    errors = 0
-    # Only sweep CSVs we authored — never recurse into unknown subdirs.
-    try:
-        for entry in root.iterdir():
-            if not entry.is_file() or entry.suffix.lower() != ".csv":
-                continue
-            try:
-                if entry.stat().st_mtime < cutoff:
-                    entry.unlink()
-                    removed += 1
-            except FileNotFoundError:
-                pass  # Another service got there first; harmless.
-            except Exception:
-                errors += 1
+        await run_evictor(display_name)
+    except asyncio.CancelledError:
+        pass
     except Exception as e:
-        logger.warning("[startup-sweep] %s: iter failed: %s", display_name, e)
-        return
-    if removed or errors:
-        logger.info(
-            "[startup-sweep] %s: removed %d CSV(s) older than %dd (errors=%d, root=%s)",
-            display_name, removed, ttl_days, errors, root,
-        )
+        logger.warning("[results-evictor] %s: stopped: %s", display_name, e)
 
 
 def build_app(
@@ -149,6 +126,7 @@ def build_app(
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    add_tracing(app, SERVICE_NAME)
 
     @app.on_event("startup")
     async def _preload():
@@ -171,9 +149,12 @@ def build_app(
         if loaded_ok:
             from ._schema_guard import assert_db_schema
             assert_db_schema(db_short, get_db_fn)
-        # Best-effort: sweep orphan CSVs older than RESULTS_TTL_DAYS (default
-        # 14d). Fire-and-forget; never blocks startup or fails the service.
-        asyncio.create_task(_sweep_old_results(display_name, logger))
+        # bge row-relevance model: loads in a background thread (per worker)
+        from utils._row_relevance import start_prewarm
+        start_prewarm()
+        # Best-effort: evict result files by age (RESULTS_TTL_DAYS) and size
+        # (RESULTS_MAX_BYTES) in a background loop; never blocks startup.
+        app.state.results_evictor = asyncio.create_task(_sweep_old_results(display_name, logger))
         if extra_startup is not None:
             asyncio.create_task(extra_startup())
 
@@ -181,6 +162,9 @@ def build_app(
     async def _shutdown():
         # Drain the keep-alive pool on graceful stop so we don't leak sockets.
         from ._httpx_client import aclose_httpx_client
+        evictor = getattr(app.state, "results_evictor", None)
+        if evictor is not None:
+            evictor.cancel()
         await aclose_httpx_client()
 
     add_download_endpoint(app)
@@ -198,7 +182,7 @@ def build_app(
         payload: QueryInterpreterOutputGuardrail,
         connection_id: str | None = None,
     ):
-        request_id = str(uuid.uuid4())
+        request_id = current_request_id() or str(uuid.uuid4())
         log_prefix = f"[{SERVICE_NAME} API][{request_id}]"
         logger.info("%s START | connection_id=%s", log_prefix, connection_id)
         try:
@@ -226,7 +210,64 @@ def build_app(
                 db_snapshot_date=_DB_SNAPSHOT_DATE,
             )
 
+    def _prefork_preload() -> None:
+        """Warm the pure-Python state in the pre-fork master (see _prefork.py).
+        No polars IO here: the DB is loaded per worker by _preload above."""
+        from utils.summarizer_prompt_builder import preload_summarizer_prompts
+        from ._finalize import _disclaimer_texts, _load_synthesizer_prompt
+        from .db_llm_rules import load_db_llm_rules
+        from .schema_kg_planner import get_graph
+
+        for name, warm in (
+            ("schema graph", lambda: get_graph(db_short)),
+            ("llm rules", lambda: load_db_llm_rules(db_short)),
+            ("summarizer prompts", preload_summarizer_prompts),
+            ("synthesizer prompt", _load_synthesizer_prompt),
+            ("disclaimers", _disclaimer_texts),
+        ):
+            try:
+                warm()
+            except Exception as e:
+                logger.warning("[prefork] %s preload skipped for %s: %s", name, display_name, e)
+
+    @app.get("/cursor/{cursor_id}")
+    async def cursor_info(cursor_id: str):
+        """Row count and columns of a result cursor (DatabaseTable.cursor_id)."""
+        from ._cursors import CursorNotFound, describe_cursor
+        try:
+            return await asyncio.to_thread(describe_cursor, db_short, cursor_id)
+        except CursorNotFound:
+            raise HTTPException(status_code=404, detail="Unknown or expired cursor")
+
+    @app.get("/cursor/{cursor_id}/page")
+    async def cursor_page(
+        cursor_id: str,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1),
+        sort: Optional[str] = Query(None, description="Column to sort by"),
+        descending: bool = False,
+        columns: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    ):
+        """One page of a result cursor, optionally sorted and projected."""
+        from ._cursors import CursorError, CursorNotFound, read_page
+        cols = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+        try:
+            return await asyncio.to_thread(
+                read_page, db_short, cursor_id, offset=offset, limit=limit,
+                sort=sort, descending=descending, columns=cols)
+        except CursorNotFound:
+            raise HTTPException(status_code=404, detail="Unknown or expired cursor")
+        except CursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/memory")
+    async def memory():
+        """This worker's RSS / PSS and shared vs private pages, in kB."""
+        from ._prefork import memory_report
+        return {"pid": os.getpid(), **memory_report()}
+
     # Expose so tests / introspection can poke at the wired values.
+    app.state.prefork_preload = _prefork_preload
     app.state.service_name = SERVICE_NAME
     app.state.display_name = display_name
     app.state.db_version = _DB_VERSION
@@ -15,14 +15,18 @@ four optional hooks that mutate a shared `WorkerCtx`:
   pre_expand    — after parsed_value canonicalization, before expand POST
   post_expand   — after expand response is parsed, before planner POST
   post_planner  — after planner response is parsed, before join
-  pre_join      — last chance to mutate filter_val / out_cols / plan
+  pre_join      — last chance to mutate filter_val / out_cols / plan, or to
+                  hand the join a narrowed copy of the data
+                  (`ctx.narrow_for_join`)
 
 Each hook is `async def hook(ctx: WorkerCtx) -> None`. A hook may set
 `ctx.error_msg` to short-circuit the rest of the pipeline (the same way
 inline `if not error_msg:` chains worked in the legacy workers).
 
-Async-post workers (ttd / ctd / hcdt) opt in via
-`use_async_post=True`; the rest use the sync `post_with_retry` shim.
+Every expand / planner POST is async (`post_async` → `_service_client`:
+circuit breakers, deadline propagation). Only the planner POST is hedged:
+the planner is a deterministic graph search, while expand_and_match_db
+makes LLM calls that a backup request would pay for twice.
 """
 from __future__ import annotations
 
@@ -30,27 +34,38 @@ import asyncio
 import logging
 import os
 import re
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass, field
-from typing import Any, Awaitable, Callable, Optional, Union
+from typing import Any, Awaitable, Callable, Iterator, Optional, Union
 
 import polars as pl
 
 from config import settings  # repo-wide model SSOT (reads .env); never os.environ for models
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
+from config.provenance import get_db_provenance
 from config.schema import database_schemas
-from utils.dataframe_filtering import join_and_filter_database, NoFilterTermsError
-from utils.preprocess import _csv_path
+from utils.artifact_store import publish_result
+from utils.dataframe_filtering import (
+    NoFilterTermsError,
+    SpilledResult,
+    join_and_filter_database,
+    null_drop_columns,
+    rewrite_spilled_csv,
+    take_spilled_result,
+)
+from utils.tracing import span
 
-from ._finalize import QueryState, finalize_db_result
+from ._cursors import cursor_id_for
+from ._finalize import QueryState, add_gene_full_name_columns, finalize_db_result
+from ._result_cache import get_result_cache, result_cache_key
 from ._worker_helpers import (
-    post_with_retry,
     post_async,
     publish_planner_step,
     publish_ws,
     valid_columns,
 )
-from .schema_kg_chat import _llm_summarize_step, _build_step_data_text
-from utils._row_relevance import score_and_sort as _score_and_sort  # noqa: F401 — imported here so the module-level pre-warm thread fires at startup
+from .schema_kg_chat import send_step_card
+from utils._row_relevance import score_and_sort as _score_and_sort
 
 
 Hook = Callable[["WorkerCtx"], Union[None, Awaitable[None]]]
@@ -86,6 +101,9 @@ class WorkerCtx:
 
     # Populated by orchestrator stages in order:
     data: Any = None
+    # Set by a pre_join hook (narrow_for_join) to serve the join from an
+    # index-narrowed copy of `data`; `data` itself stays the full snapshot.
+    join_data: Any = None
     inp: dict = field(default_factory=dict)              # input.model_dump() copy
     expand_response: Optional[dict] = None               # raw JSON from expand_and_match_db
     expand_for_planner: Optional[dict] = None            # override payload sent to planner
@@ -95,6 +113,10 @@ class WorkerCtx:
     df: Optional[pl.DataFrame] = None
     filter_stats: list = field(default_factory=list)
     csv_path: str = ""
+    # Set when the join spilled to disk: `df` then holds only the top-K rows,
+    # the full result is already at `csv_path` and this is its row count.
+    total_rows: Optional[int] = None
+    spilled: Optional[SpilledResult] = None
     preview: list = field(default_factory=list)
     error_msg: Optional[str] = None
 
@@ -114,6 +136,12 @@ class WorkerCtx:
     # a Redis/orchestrator relay. No-op when None (headless / test callers).
     ws_send: Optional[Callable] = None
 
+    def narrow_for_join(self, data: Any) -> None:
+        """Run the next join on `data` (e.g. tables narrowed to their index
+        candidate rows) instead of ``self.data``. Only that join sees it:
+        later stages and retries read the full snapshot."""
+        self.join_data = data
+
     def strip_unsupported_fields(self) -> None:
         """Null out filter fields that aren't columns in this DB's schema, then
         recompute ``out_cols``.
@@ -173,15 +201,14 @@ async def _call_hook(hook: Optional[Hook], ctx: WorkerCtx) -> None:
         await res
 
 
-async def _post_either(url: str, *, use_async: bool, json: dict,
-                       logger: logging.Logger):
-    """Single POST that handles both the sync (requests) and async (httpx)
-    helpers. Returns the Response on success or None on failure."""
-    if use_async:
-        return await post_async(url, json=json, logger=logger)
-    # Sync helper blocks the event loop. Wrap in to_thread so the orchestrator
-    # stays cooperative when an async hook is awaiting other work.
-    return await asyncio.to_thread(post_with_retry, url, json=json, logger=logger)
+@contextmanager
+def _join_data(ctx: WorkerCtx) -> Iterator[Any]:
+    """The data the join runs on: a pre_join hook's narrowed copy, else the
+    snapshot. The narrowed copy is released however the join exits."""
+    try:
+        yield ctx.join_data if ctx.join_data is not None else ctx.data
+    finally:
+        ctx.join_data = None
 
 
 def _apply_sort_order(df, sort_order):
@@ -246,7 +273,6 @@ async def execute_db_query(
     prompt_md: str,
     summarizer_model: Optional[str] = None,
     head_view_rows: Optional[int] = None,
-    use_async_post: bool = False,
     pre_expand: Optional[Hook] = None,
     post_expand: Optional[Hook] = None,
     post_planner: Optional[Hook] = None,
@@ -313,7 +339,8 @@ async def execute_db_query(
 
     # 1. Load DB.
     try:
-        ctx.data = get_db()
+        with span("load_db", kind="scan", db=db):
+            ctx.data = get_db()
     except Exception as e:
         ctx.error_msg = f"Failed to load {display_name} DB: {e}"
 
@@ -341,10 +368,10 @@ async def execute_db_query(
 
     # 4. POST expand_and_match_db (skipped if intercept produced a plan).
     if not ctx.error_msg and ctx.plan is None:
-        expand_resp = await _post_either(
-            f"{expand_url}?database={db}", use_async=use_async_post,
-            json=ctx.inp, logger=log,
-        )
+        with span("expand_and_match", kind="service", db=db):
+            expand_resp = await post_async(
+                f"{expand_url}?database={db}", json=ctx.inp, logger=log,
+            )
         _parsed_value = (ctx.inp or {}).get("parsed_value", {}) or {}
         if expand_resp is None:
             # Expand SERVICE unreachable / timed out. Do NOT abort — floor to the
@@ -402,26 +429,18 @@ async def execute_db_query(
         _exp_id = f"expand-{_uuid.uuid4().hex[:6]}"
         _canon = {k: v for k, v in ctx.filter_val.items()
                   if v and v != "requested"}
-        # Card body goes through the LLM step-summarizer (plain English)
-        # instead of a raw "canonical terms: k=[...]" dump; falls back to
-        # the raw dump on any failure — this is a cosmetic card and must
-        # NEVER be able to abort the actual query (see 2026-08-03 incident:
-        # an unguarded 'FilterStat' AttributeError here silently killed the
-        # whole request and fell through to the web/AI-knowledge fallback).
-        _exp_summary = {"canonical_pv": _canon,
-                        "filter_trace": [asdict(ft) for ft in ctx.filter_stats]}
-        try:
-            _exp_text = await _llm_summarize_step(
-                "expand_and_match", _exp_summary, (ctx.inp or {}).get("cleaned_query", ""))
-        except Exception as _summ_exc:
-            log.debug("[%s] expand_and_match step-summarizer failed: %s", db, _summ_exc)
-            _exp_text = _build_step_data_text("expand_and_match", _exp_summary)
+        # Card body is the deterministic template, sent at once; the LLM
+        # step-summarizer's plain-English sentence (if any) follows as a
+        # `tool_update` off the critical path (STEP_SUMMARIZER_MODE). Guarded:
+        # this is a cosmetic card and must NEVER be able to abort the actual
+        # query (see 2026-08-03 incident: an unguarded 'FilterStat'
+        # AttributeError here silently killed the whole request and fell
+        # through to the web/AI-knowledge fallback).
         try:
-            await ctx.ws_send({"type": "tool_called", "tool_id": _exp_id, "name": "Entity Expander"})
-            await ctx.ws_send({"type": "delta", "tool_id": _exp_id, "name": "Entity Expander",
-                               "text": _exp_text, "seq": 1, "offset": 0, "final": False})
-            await ctx.ws_send({"type": "tool_result", "tool_id": _exp_id,
-                               "name": "Entity Expander", "ok": True})
+            _exp_summary = {"canonical_pv": _canon,
+                            "filter_trace": [asdict(ft) for ft in ctx.filter_stats]}
+            await send_step_card(ctx.ws_send, _exp_id, "Entity Expander", "expand_and_match",
+                                 _exp_summary, (ctx.inp or {}).get("cleaned_query", ""))
         except Exception as _ws_exc:
             log.debug("[%s] ws_send expand event failed: %s", db, _ws_exc)
 
@@ -430,10 +449,11 @@ async def execute_db_query(
     #    expand response.
     if not ctx.error_msg and ctx.expand_response is not None and ctx.plan is None:
         planner_payload = ctx.expand_for_planner or ctx.expand_response
-        plan_resp = await _post_either(
-            f"{planner_url}?database={db}", use_async=use_async_post,
-            json=planner_payload, logger=log,
-        )
+        with span("planner", kind="service", db=db):
+            plan_resp = await post_async(
+                f"{planner_url}?database={db}", json=planner_payload,
+                hedge=True, logger=log,
+            )
         if not plan_resp:
             ctx.error_msg = "Planner unreachable."
         else:
@@ -524,12 +544,45 @@ async def execute_db_query(
         except Exception as _ie:
             log.debug("[%s] intersection-intent detection skipped: %s", db, _ie)
 
-    # 9. join_and_filter_database.
+    # 9. join_and_filter_database — or its cached result when the same
+    #    (snapshot, plan, out_cols, filter values) was joined before.
     if not ctx.error_msg:
+        _result_cache = get_result_cache()
+        _rkey = None
+        if _result_cache is not None:
+            try:
+                _rkey = result_cache_key(db, get_db_provenance(db), ctx.plan,
+                                         ctx.out_cols, ctx.filter_val)
+            except Exception as _rk_exc:
+                log.debug("[%s] result-cache key skipped: %s", db, _rk_exc)
         try:
-            ctx.df, ctx.filter_stats = join_and_filter_database(
-                ctx.data, ctx.plan, db, ctx.out_cols, ctx.filter_val,
-            )
+            _cached = None
+            if _rkey is not None:
+                with span("result_cache", kind="cache", db=db) as _cs:
+                    _cached = _result_cache.get(_rkey)
+                    _cs["hit"] = _cached is not None
+            if _cached is not None:
+                ctx.join_data = None
+                ctx.df, ctx.filter_stats = _cached
+                log.info("[%s] result cache hit %s (%d rows)", db, _rkey[:12], ctx.df.height)
+            else:
+                with span("join_and_filter", kind="join", db=db) as _js, \
+                        _join_data(ctx) as _data:
+                    ctx.df, ctx.filter_stats = join_and_filter_database(
+                        _data, ctx.plan, db, ctx.out_cols, ctx.filter_val,
+                    )
+                    _spilled = take_spilled_result()
+                    if _spilled is not None:
+                        ctx.spilled = _spilled
+                        ctx.csv_path, ctx.total_rows = _spilled.csv_path, _spilled.total_rows
+                    _js["rows"] = ctx.df.height if _spilled is None else _spilled.total_rows
+                if _spilled is not None:
+                    log.info("[%s] join spilled %d rows to %s (top %d in memory)",
+                             db, _spilled.total_rows, ctx.csv_path, ctx.df.height)
+                elif _rkey is not None and not ctx.df.is_empty():
+                    # off the request path; polars frames are immutable, and the
+                    # steps below rebind ctx.df rather than mutate it
+                    _result_cache.put_later(_rkey, ctx.df, ctx.filter_stats)
         except NoFilterTermsError:
             # Entity expansion understood the query but couldn't match it to a
             # specific DB entity — degrade to the same "no rows matched" path
@@ -544,6 +597,10 @@ async def execute_db_query(
             # an alternate source before we declare "no rows".
             if on_empty_result is not None:
                 await _call_hook(on_empty_result, ctx)
+                _spilled = take_spilled_result()
+                if _spilled is not None:
+                    ctx.spilled = _spilled
+                    ctx.csv_path, ctx.total_rows = _spilled.csv_path, _spilled.total_rows
             if ctx.df is None or ctx.df.is_empty():
                 ctx.error_msg = "No rows matched."
 
@@ -553,37 +610,40 @@ async def execute_db_query(
         _exec_id = f"exec-{_uuid2.uuid4().hex[:6]}"
         _exec_ok = not ctx.error_msg
         _rc = ctx.df.height if (_exec_ok and ctx.df is not None) else 0
-        # Card body goes through the LLM step-summarizer on success (plain
-        # English instead of "row_count=N"); the error case stays a raw,
-        # deterministic status line — no need to dress up a failure message,
-        # and it must never be silently reworded by an LLM. The summarizer
-        # call is guarded: this is a cosmetic card and must NEVER be able
-        # to abort the actual query (see 2026-08-03 incident: an unguarded
-        # 'FilterStat' AttributeError here silently killed the whole
-        # request and fell through to the web/AI-knowledge fallback).
-        if _exec_ok:
-            _exec_summary = {"row_count": _rc,
-                             "filter_trace": [asdict(ft) for ft in ctx.filter_stats]}
-            try:
-                _exec_text = await _llm_summarize_step(
-                    "execute", _exec_summary, (ctx.inp or {}).get("cleaned_query", ""))
-            except Exception as _summ_exc:
-                log.debug("[%s] execute step-summarizer failed: %s", db, _summ_exc)
-                _exec_text = _build_step_data_text("execute", _exec_summary)
-        else:
-            _exec_text = f"0 rows — {ctx.error_msg or 'no match'}"
+        # Card body is the deterministic template on success, with the LLM
+        # step-summarizer's sentence following off the critical path (see
+        # send_step_card); the error case stays a raw status line — no need
+        # to dress up a failure message, and it must never be silently
+        # reworded by an LLM. Guarded: this is a cosmetic card and must
+        # NEVER be able to abort the actual query (see 2026-08-03 incident:
+        # an unguarded 'FilterStat' AttributeError here silently killed the
+        # whole request and fell through to the web/AI-knowledge fallback).
         try:
-            await ctx.ws_send({"type": "tool_called", "tool_id": _exec_id, "name": "DB Execute"})
-            await ctx.ws_send({"type": "delta", "tool_id": _exec_id, "name": "DB Execute",
-                               "text": _exec_text, "seq": 1, "offset": 0, "final": False})
-            await ctx.ws_send({"type": "tool_result", "tool_id": _exec_id,
-                               "name": "DB Execute", "ok": _exec_ok})
+            if _exec_ok:
+                _exec_summary = {"row_count": _rc,
+                                 "filter_trace": [asdict(ft) for ft in ctx.filter_stats]}
+                await send_step_card(ctx.ws_send, _exec_id, "DB Execute", "execute",
+                                     _exec_summary, (ctx.inp or {}).get("cleaned_query", ""))
+            else:
+                await send_step_card(ctx.ws_send, _exec_id, "DB Execute", "execute", {}, "",
+                                     ok=False, text=f"0 rows — {ctx.error_msg or 'no match'}")
         except Exception as _ws_exc2:
             log.debug("[%s] ws_send execute event failed: %s", db, _ws_exc2)
 
     # 9c. post_join hook — for pre_computed_message / column projection.
     if not ctx.error_msg:
         await _call_hook(post_join, ctx)
+    # A hook that swapped in a frame of its own (columns the spilled join
+    # never had, e.g. MSigDB's enrichment table) owns the result: the spill
+    # no longer describes it, so that frame is published like any other.
+    if (ctx.spilled is not None and not ctx.error_msg and ctx.df is not None
+            and not set(ctx.df.columns) <= set(ctx.spilled.columns) | {"relevance_score"}):
+        log.info("[%s] post_join replaced the spilled result; dropping %s", db, ctx.csv_path)
+        try:
+            os.unlink(ctx.spilled.csv_path)
+        except OSError:
+            pass
+        ctx.spilled, ctx.csv_path, ctx.total_rows = None, "", None
 
     # NOTE: text2sql (the generic analytical DuckDB step) runs LATER — after the
     # null-drop/dedup at 9d — so its COUNT/AVG/MAX are computed over the SAME final
@@ -623,13 +683,10 @@ async def execute_db_query(
     #     kegg_hsa_xref (SMPDB-only pathway) or omim_xref (no OMIM entry) means
     #     "no ID assigned", NOT a missing row — dropping on them silently kills
     #     valid results (e.g. all 4 HTR2A pathways are SMPDB-sourced, kegg_hsa_xref=null).
-    _NULLABLE_SUFFIXES = ("_xref", "xref_id", "xref_source", "icd11")
+    #     A spilled join had the same rule applied in its sink (the CSV), so
+    #     here it only touches the in-memory top-K.
     if not ctx.error_msg and ctx.df is not None and not ctx.df.is_empty():
-        _data_cols = [
-            c for c in ctx.df.columns
-            if c != "relevance_score"
-            and not any(c.endswith(s) or c == s for s in _NULLABLE_SUFFIXES)
-        ]
+        _data_cols = null_drop_columns(ctx.df.columns)
         if _data_cols:
             _dropped = ctx.df.drop_nulls(subset=_data_cols)
             # Only apply the null-drop if it LEAVES rows. If it would empty an
@@ -664,9 +721,12 @@ async def execute_db_query(
     # entity stem (e.g. gene_symbol/gene_id/gene_organism for a gene ∩), then
     # de-duplicate — so the count is distinct sets, not member rows. Generic
     # across DBs; no per-DB hardcoding.
+    # Neither this summary nor text2sql runs on a spilled join: `df` is then
+    # only its top-K rows, and a count or aggregate over them would misreport
+    # the full result (ctx.total_rows rows, in the CSV).
     _is_intersection = bool(isinstance(ctx.plan, dict)
                             and ctx.plan.get("require_all_fields"))
-    if (_is_intersection and not ctx.error_msg
+    if (_is_intersection and not ctx.error_msg and ctx.total_rows is None
             and ctx.pre_computed_message is None
             and ctx.df is not None and not ctx.df.is_empty()):
         try:
@@ -700,7 +760,7 @@ async def execute_db_query(
             log.debug("[%s] intersection summary skipped: %s", db, _ie2)
 
     if (not ctx.error_msg and ctx.pre_computed_message is None
-            and not _is_intersection
+            and not _is_intersection and ctx.total_rows is None
             and not (getattr(ctx, "extras", None) or {}).get("skip_text2sql")):
         try:
             from ._text2sql import maybe_answer_with_sql
@@ -709,7 +769,19 @@ async def execute_db_query(
             log.debug("[%s] text2sql error (ignored): %s", db, _t2exc)
 
     # 10. Build preview + write CSV + publish WS event.
-    ctx.preview = [] if ctx.error_msg else ctx.df.head(head_view_rows).to_dicts()
+    # The preview carries `{col}_full_name` siblings from the static HGNC
+    # lookup so the summarizer can quote full gene names verbatim from the
+    # table (no pretraining needed). Joined on the head slice, then turned
+    # into dicts once.
+    if ctx.error_msg:
+        ctx.preview = []
+    else:
+        _head = ctx.df.head(head_view_rows)
+        try:
+            _head = add_gene_full_name_columns(_head)
+        except Exception as _ge:
+            log.warning("[%s] gene_full_name enrichment failed: %s", db, _ge)
+        ctx.preview = _head.to_dicts()
     # 2026-05-21 fix: write the CSV WHENEVER there are rows, regardless of
     # whether the caller passed a connection_id. Previously this was gated
     # on `connection_id` so that purely-headless callers wouldn't write
@@ -723,21 +795,38 @@ async def execute_db_query(
     # even without a live WS subscriber. The WS publish below remains
     # gated on connection_id (publish_ws() itself no-ops on None, but
     # we keep the explicit check for clarity).
-    if not ctx.error_msg:
-        ctx.csv_path = _csv_path(f"{db}_results")
+    # The path is content-addressed (utils.artifact_store): the CSV exists
+    # once publish_result returns, its parquet twin is written in the
+    # background.
+    # A spilled join already streamed the full result to ctx.csv_path in
+    # rank order. Its top-K rows are rewritten there in the in-memory order
+    # (relevance sort, post_join projection) so the preview is the CSV's
+    # first rows and a cursor offset past the preview continues it.
+    if not ctx.error_msg and ctx.spilled is not None:
+        try:
+            await asyncio.to_thread(
+                rewrite_spilled_csv, ctx.spilled,
+                ctx.df.select([c for c in ctx.df.columns if c != "relevance_score"]))
+            ctx.total_rows = ctx.spilled.total_rows
+        except Exception as e:
+            ctx.error_msg = f"CSV write failed: {e}"
+            ctx.csv_path = ""
+    if not ctx.error_msg and ctx.total_rows is None:
         try:
-            os.makedirs(os.path.dirname(ctx.csv_path), exist_ok=True)
-            ctx.df.write_csv(ctx.csv_path)
+            ctx.csv_path = await publish_result(ctx.df, f"{db}_results")
         except Exception as e:
             ctx.error_msg = f"CSV write failed: {e}"
             ctx.csv_path = ""
+    if not ctx.error_msg:
         # Best-effort WS publish — no-op if connection_id is None (the
         # LLM dropped it). The download/filter UI relies on csv_path
         # being in the tool's RETURN value, not on the WS event; the
         # agent_chat handler will build the <db>_table event from the
         # tool's return value regardless.
         if connection_id:
-            await publish_ws(connection_id, ctx.csv_path, ctx.df.height)
+            await publish_ws(connection_id, ctx.csv_path,
+                             ctx.total_rows if ctx.total_rows is not None else ctx.df.height,
+                             cursor_id=cursor_id_for(ctx.csv_path))
 
     # 11. Build QueryState + finalize.
     state = QueryState(
@@ -747,9 +836,11 @@ async def execute_db_query(
         schema_cols={c for tbl in (database_schemas.get(db) or {}).values() for c in tbl},
         prompt_md=prompt_md, summarizer_model=summarizer_model,
         error_msg=ctx.error_msg, csv_path=ctx.csv_path, preview=ctx.preview,
+        total_rows=ctx.total_rows,
         pre_computed_message=ctx.pre_computed_message,
     )
-    return await finalize_db_result(state)
+    with span("finalize", kind="stage", db=db):
+        return await finalize_db_result(state)
 
 
 def make_db_result_handler(
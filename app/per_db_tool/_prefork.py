@@ -0,0 +1,244 @@
+"""Fork-after-load serving mode for the per-DB tool services.
+
+`uvicorn --workers N` starts N fresh interpreters, and each one imports
+FastAPI, pydantic, the agents SDK, polars, networkx and the schema modules,
+then builds its own schema graph, rule tables and prompt caches. For a
+per-DB container that import-and-warm heap is most of the RSS, paid N times.
+
+This runner does the import and the warm-up once in a master process, then
+forks N workers that share those pages copy-on-write:
+
+    python -m app.per_db_tool._prefork app.main:app \
+        --host 0.0.0.0 --port 8071 --workers 0        # 0 = one per core
+
+* The master disables the cyclic GC while it loads and calls
+  ``gc.freeze()`` right before forking. The frozen objects are then never
+  visited by a worker's collector, so a collection does not write to
+  (and un-share) every page of the inherited heap. Refcount writes on
+  objects a worker actually uses still dirty those pages, so the
+  fraction of the heap that stays shared depends on the workload.
+* ``app.state.prefork_preload`` (set by ``build_app``) warms the
+  pure-Python state: the schema FK graph + schema_rules, the per-DB LLM
+  rules, and the summariser / synthesiser prompts and disclaimers.
+* The DB itself is NOT loaded in the master. Polars' IO runtime does not
+  survive ``fork()``: once the parent has read a parquet footer, a child's
+  first ``collect()`` blocks forever. The per-DB loaders only build
+  LazyFrame plans (kilobytes), so each worker still builds its own in the
+  usual startup hook. The bge / ONNX relevance model is loaded per worker
+  for the same reason (its intra-op thread pool is not fork-safe).
+* Guard: if anything in the master started a native thread beyond the
+  ones ``import polars`` leaves behind, forking is unsafe. The runner then
+  logs the thread names and execs plain ``uvicorn --workers N`` instead.
+
+The master holds the listening socket, restarts a worker that dies
+(with back-off), and forwards SIGTERM / SIGINT. Each worker reports its own
+RSS / PSS / shared / private split on ``GET /memory``. The master logs the
+same split for every worker once they are up (PREFORK_MEMORY_REPORT_S), so
+the per-worker saving is visible in the service log.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+log = logging.getLogger("uvicorn.error")
+
+# Seconds after the last fork before the master logs each worker's memory split.
+PREFORK_MEMORY_REPORT_S = float(os.getenv("PREFORK_MEMORY_REPORT_S", "60"))
+# Set while the master imports the app and runs prefork_preload; code that
+# would start a thread or load a native runtime there must defer it.
+PREFORK_MASTER_ENV = "BIOCHIRP_PREFORK_MASTER"
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_kb", "Pss": "pss_kb",
+    "Shared_Clean": "shared_clean_kb", "Shared_Dirty": "shared_dirty_kb",
+    "Private_Clean": "private_clean_kb", "Private_Dirty": "private_dirty_kb",
+}
+
+
+def memory_report(pid: int | str = "self") -> Dict[str, int]:
+    """RSS / PSS and the shared vs private split for *pid*, in kB, from
+    /proc/<pid>/smaps_rollup ({} where that file is unavailable)."""
+    out: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as fh:
+            for line in fh:
+                key, _, rest = line.partition(":")
+                name = _SMAPS_FIELDS.get(key.strip())
+                if name:
+                    out[name] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        return {}
+    if out:
+        out["shared_kb"] = out.get("shared_clean_kb", 0) + out.get("shared_dirty_kb", 0)
+        out["private_kb"] = out.get("private_clean_kb", 0) + out.get("private_dirty_kb", 0)
+    return out
+
+
+def _native_threads() -> List[str]:
+    """Names of every OS thread in this process (Python and native)."""
+    try:
+        tids = os.listdir("/proc/self/task")
+    except OSError:
+        return []
+    names = []
+    for tid in tids:
+        try:
+            with open(f"/proc/self/task/{tid}/comm", encoding="utf-8") as fh:
+                names.append(fh.read().strip())
+        except OSError:
+            names.append("?")
+    return names
+
+
+def _import_app(ref: str):
+    module_name, _, attr = ref.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or "app")
+
+
+def _exec_uvicorn(args: argparse.Namespace, workers: int) -> None:
+    argv = [sys.executable, "-m", "uvicorn", args.app, "--host", args.host,
+            "--port", str(args.port), "--workers", str(workers)]
+    log.warning("[prefork] falling back to: %s", " ".join(argv[2:]))
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, argv)
+
+
+def _run_worker(app, sock: socket.socket, args: argparse.Namespace) -> None:
+    import uvicorn
+
+    gc.enable()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)  # uvicorn installs its own
+    config = uvicorn.Config(app, host=args.host, port=args.port, lifespan="on",
+                            log_config=None, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(args: argparse.Namespace) -> int:
+    workers = args.workers or os.cpu_count() or 1
+
+    # `import polars` leaves a couple of idle native threads that are
+    # harmless across fork; anything beyond them appears after this point.
+    import polars  # noqa: F401
+    baseline = set(_native_threads())
+
+    gc.disable()
+    os.environ[PREFORK_MASTER_ENV] = "1"
+    try:
+        app = _import_app(args.app)
+        preload = getattr(getattr(app, "state", None), "prefork_preload", None)
+        if preload is not None:
+            t0 = time.perf_counter()
+            preload()
+            log.info("[prefork] master preload done in %.2fs", time.perf_counter() - t0)
+    finally:
+        os.environ.pop(PREFORK_MASTER_ENV, None)
+
+    extra = [n for n in _native_threads() if n not in baseline]
+    if extra:
+        log.warning("[prefork] %d thread(s) started before fork (%s); forked workers "
+                    "could deadlock", len(extra), ", ".join(sorted(set(extra))))
+        gc.enable()
+        _exec_uvicorn(args, workers)
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    gc.collect()
+    gc.freeze()
+    master_mem = memory_report()
+    log.info("[prefork] master ready: %d objects frozen, rss=%s kB; forking %d worker(s)",
+             gc.get_freeze_count(), master_mem.get("rss_kb", "?"), workers)
+
+    children: Dict[int, int] = {}   # pid → slot
+    stopping = False
+
+    def _spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(app, sock, args)
+            except BaseException:  # noqa: BLE001 — never fall back into the master loop
+                log.exception("[prefork] worker %d crashed", slot)
+                os._exit(1)
+            os._exit(0)
+        children[pid] = slot
+
+    def _stop(signum, _frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for slot in range(workers):
+        _spawn(slot)
+
+    report_at: Optional[float] = time.monotonic() + PREFORK_MEMORY_REPORT_S
+    restarts: Dict[int, float] = {}
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if report_at is not None and time.monotonic() >= report_at:
+                report_at = None
+                for cpid, slot in sorted(children.items(), key=lambda kv: kv[1]):
+                    m = memory_report(cpid)
+                    log.info("[prefork] worker %d (pid %d): rss=%s pss=%s shared=%s private=%s kB",
+                             slot, cpid, m.get("rss_kb"), m.get("pss_kb"),
+                             m.get("shared_kb"), m.get("private_kb"))
+            time.sleep(0.5)
+            continue
+        slot = children.pop(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        # back off a worker that keeps dying instead of fork-looping
+        delay = 1.0 if time.monotonic() - restarts.get(slot, 0.0) > 30 else 5.0
+        log.warning("[prefork] worker %d (pid %d) exited with %s; restarting in %.0fs",
+                    slot, pid, code, delay)
+        time.sleep(delay)
+        restarts[slot] = time.monotonic()
+        _spawn(slot)
+    sock.close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    p.add_argument("app", help="ASGI app as module:attr, e.g. app.main:app")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8000")))
+    p.add_argument("--workers", type=int, default=int(os.getenv("SERVICE_WORKERS", "0")),
+                   help="0 = one per CPU core")
+    p.add_argument("--backlog", type=int, default=2048)
+    p.add_argument("--keep-alive", type=int, default=5)
+    args = p.parse_args(argv)
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    return serve(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""Token-budgeted packing of the summariser prompt.
+
+`finalize_db_result` sends the summariser one JSON document: question,
+counts, instructions, web evidence and a preview of the result rows. Only the
+row list is safely trimmable. The packer serialises each row once, measures it
+in tokens, and greedily keeps rows in rank order until the budget is full. It
+then splices the kept rows into the serialised skeleton. The output is
+byte-identical to ``json.dumps`` of the packed payload, without serialising
+the whole payload again for every trim step.
+
+Tokens are counted with tiktoken when it is installed
+(SUMMARIZER_TOKENIZER, default ``o200k_base``, the gpt-oss / gpt-4.1
+vocabulary). Otherwise a word/digit/punctuation estimate is used, which runs
+a little high on JSON, so the budget errs on the safe side.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional
+
+_TOKENIZER = os.getenv("SUMMARIZER_TOKENIZER", "o200k_base")
+_SPLICE = "\x00__packed_rows__\x00"
+_APPROX_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(_TOKENIZER)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # BPE vocabularies keep common words whole and split long identifiers
+    # and numbers into a few pieces; punctuation is one token each.
+    n = 0
+    for piece in _APPROX_RE.findall(text):
+        if piece[0].isalpha():
+            n += 1 + (len(piece) - 1) // 6
+        elif piece[0].isdigit():
+            n += 1 + (len(piece) - 1) // 3
+        else:
+            n += 1
+    return n
+
+
+@dataclass
+class PackedPrompt:
+    prompt: str
+    rows_in: int
+    rows_kept: int
+    tokens_used: int       # whole prompt, as sent
+    tokens_dropped: int    # rows left out
+    budget: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.rows_kept < self.rows_in
+
+
+def pack_prompt(
+    payload: dict,
+    *,
+    rows_key: str,
+    max_tokens: int,
+    rank_col: Optional[str] = None,
+    annotate: Optional[Callable[[dict, int], dict]] = None,
+) -> PackedPrompt:
+    """Serialise *payload* with as many of ``payload[rows_key]`` as fit in
+    *max_tokens*; every other field is kept verbatim.
+
+    Rows are taken in list order (callers pass them already ranked), or by
+    descending *rank_col* when given. A row that does not fit is skipped and
+    smaller, lower-ranked rows may still fill the space. The best-ranked row
+    is always kept. *annotate(skeleton, rows_kept)* may rewrite fields that
+    mention the row count once the selection is known.
+    """
+    rows = list(payload.get(rows_key) or [])
+    dumps = lambda o: json.dumps(o, default=str, ensure_ascii=False)  # noqa: E731
+
+    order = list(range(len(rows)))
+    if rank_col:
+        def _score(i: int) -> float:
+            try:
+                return -float(rows[i].get(rank_col))
+            except (TypeError, ValueError):
+                return float("inf")
+        order.sort(key=_score)
+
+    row_json = [dumps(r) for r in rows]
+    row_tokens = [count_tokens(s) + 1 for s in row_json]  # + the ", " separator
+    skeleton = {**payload, rows_key: _SPLICE}
+    skeleton_json = dumps(skeleton)
+    base_tokens = count_tokens(skeleton_json)
+    budget_rows = max_tokens - base_tokens
+
+    keep: list[int] = []
+    used = 0
+    for i in order:
+        if used + row_tokens[i] <= budget_rows or not keep:
+            keep.append(i)
+            used += row_tokens[i]
+
+    if annotate is not None and len(keep) < len(rows):
+        skeleton_json = dumps(annotate(skeleton, len(keep)))
+        base_tokens = count_tokens(skeleton_json)
+    prompt = skeleton_json.replace(dumps(_SPLICE), "[" + ", ".join(row_json[i] for i in keep) + "]", 1)
+    return PackedPrompt(
+        prompt=prompt,
+        rows_in=len(rows),
+        rows_kept=len(keep),
+        tokens_used=base_tokens + used,
+        tokens_dropped=sum(row_tokens) - used,
+        budget=max_tokens,
+    )
+
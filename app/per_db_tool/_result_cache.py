@@ -0,0 +1,249 @@
+"""On-disk cache of joined per-DB results.
+
+`execute_db_query` spends most of its time in `join_and_filter_database` when
+the question hits a popular entity, and benchmarks ask the same resolved
+question over and over. Once expand_and_match and the planner have run, the
+join is a pure function of
+
+  (DB snapshot, plan, output columns, filter values)
+
+so its collected frame (plus the FilterStat trace) is kept here as a
+zstd-compressed parquet under RESULT_CACHE_DIR. A repeat question is then
+answered from that file without scanning the source parquet at all. Relevance
+sort, preview, CSV write and the summariser still run downstream as usual.
+
+The snapshot is the (version, snapshot_date) pair from
+``config.provenance.get_db_provenance``, so bumping SOURCE.md for a DB
+refresh invalidates its entries. RESULT_CACHE_TTL_S additionally bounds
+entry age (from the write) for refreshes that forget to. The directory is
+LRU-evicted, oldest hit first (a hit stamps the file's atime), down to
+RESULT_CACHE_MAX_BYTES. Several workers
+may share it: writes are tmp-file + ``os.replace``, and a half-evicted entry
+reads as a miss.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, List, Optional, Set, Tuple
+
+import polars as pl
+
+from utils.dataframe_filtering import FilterStat
+
+log = logging.getLogger("uvicorn.error")
+
+RESULT_CACHE = os.getenv("RESULT_CACHE", "1").lower() in ("1", "true", "yes")
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or os.path.join(
+    os.environ.get("RESULTS_ROOT", "/app/results").rstrip("/"), ".result_cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# one entry may use at most this share of the budget; bigger frames are not cached
+RESULT_CACHE_MAX_ENTRY_FRACTION = float(os.getenv("RESULT_CACHE_MAX_ENTRY_FRACTION", "0.1"))
+RESULT_CACHE_TTL_S = int(os.getenv("RESULT_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+# bump when the key layout or the join semantics change
+_KEY_VERSION = 2
+
+# background writes in flight; the event loop only keeps weak references
+_PUTS: Set["asyncio.Task"] = set()
+
+
+def _canon(obj: Any) -> Any:
+    """JSON form with sets sorted (dict keys are sorted by json.dumps). Lists
+    keep their order: in a plan it can matter (join steps, column order)."""
+    if isinstance(obj, dict):
+        return {str(k): _canon(v) for k, v in obj.items()}
+    if isinstance(obj, (set, frozenset)):
+        return sorted((_canon(v) for v in obj), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(obj, (list, tuple)):
+        return [_canon(v) for v in obj]
+    return obj
+
+
+def _canon_filter(filter_val: dict) -> dict:
+    """Filter values are sets of accepted values per column (the join matches
+    any of them), so each column's scalar list is sorted and de-duplicated:
+    synonym order from expand_and_match doesn't split the cache."""
+    out = {}
+    for col, vals in filter_val.items():
+        if isinstance(vals, (list, tuple, set, frozenset)) and all(
+                not isinstance(v, (dict, list, tuple, set, frozenset)) for v in vals):
+            # ["TP53", "TP53"] filters the same as ["TP53"]
+            vals = sorted({json.dumps(v, default=str): v for v in vals}.values(),
+                          key=lambda v: json.dumps(v, default=str))
+        out[str(col)] = _canon(vals)
+    return out
+
+
+def result_cache_key(
+    db: str,
+    snapshot: Any,
+    plan: Optional[dict],
+    out_cols: Optional[List[str]],
+    filter_val: Optional[dict],
+) -> str:
+    """Stable hex key for one join. Each column's filter values are sorted and
+    de-duplicated, as are the output columns; everything in the plan keeps
+    its order."""
+    doc = {
+        "v": _KEY_VERSION,
+        "db": db,
+        "snapshot": _canon(snapshot),
+        "plan": _canon(plan or {}),
+        "out_cols": sorted(set(out_cols or [])),
+        "filter": _canon_filter(filter_val or {}),
+    }
+    blob = json.dumps(doc, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Directory of ``<key>.parquet`` + ``<key>.json`` (FilterStat trace) pairs."""
+
+    def __init__(
+        self,
+        root: str = RESULT_CACHE_DIR,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        ttl_s: int = RESULT_CACHE_TTL_S,
+        max_entry_fraction: float = RESULT_CACHE_MAX_ENTRY_FRACTION,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._evict_lock = threading.Lock()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.root / f"{key}.parquet", self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[pl.DataFrame, List[FilterStat]]]:
+        """The cached (frame, filter_stats), or None."""
+        data, meta = self._paths(key)
+        try:
+            st = data.stat()
+            if self.ttl_s > 0 and time.time() - st.st_mtime > self.ttl_s:
+                self._drop(key)
+                self.misses += 1
+                return None
+            stats = [FilterStat(**s) for s in json.loads(meta.read_text(encoding="utf-8"))]
+            df = pl.read_parquet(data)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:  # noqa: BLE001 — a corrupt entry is a miss
+            log.warning("[result_cache] unreadable entry %s: %s", key[:12], e)
+            self._drop(key)
+            self.misses += 1
+            return None
+        try:
+            # atime is often mounted noatime, so the LRU clock is set explicitly;
+            # mtime keeps the write time for the TTL
+            os.utime(data, (time.time(), st.st_mtime))
+        except OSError:
+            pass
+        self.hits += 1
+        return df, stats
+
+    def put(self, key: str, df: pl.DataFrame, stats: List[FilterStat]) -> bool:
+        """Store a non-empty join result; returns whether it was written."""
+        if df is None or df.is_empty() or self.max_bytes <= 0:
+            return False
+        data, meta = self._paths(key)
+        tmp = uuid.uuid4().hex[:8]
+        tmp_data = data.with_name(f".{data.name}.{tmp}")
+        tmp_meta = meta.with_name(f".{meta.name}.{tmp}")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            df.write_parquet(tmp_data, compression="zstd", statistics=False)
+            size = tmp_data.stat().st_size
+            if size > self.max_entry_bytes:
+                tmp_data.unlink(missing_ok=True)
+                log.debug("[result_cache] %s not cached: %d bytes > per-entry cap", key[:12], size)
+                return False
+            tmp_meta.write_text(json.dumps([asdict(s) for s in stats], default=str), encoding="utf-8")
+            # sidecar first: a visible parquet always has its trace next to it
+            os.replace(tmp_meta, meta)
+            os.replace(tmp_data, data)
+        except Exception as e:  # noqa: BLE001 — caching must never fail the query
+            log.warning("[result_cache] write failed for %s: %s", key[:12], e)
+            tmp_data.unlink(missing_ok=True)
+            tmp_meta.unlink(missing_ok=True)
+            return False
+        self.writes += 1
+        self.evict()
+        return True
+
+    def put_later(self, key: str, df: pl.DataFrame, stats: List[FilterStat]) -> "asyncio.Task":
+        """Run `put` in a worker thread, off the request path (needs a running
+        loop). The task is held in a module-level set until it finishes."""
+        task = asyncio.get_running_loop().create_task(
+            asyncio.to_thread(self.put, key, df, list(stats)))
+        _PUTS.add(task)
+        task.add_done_callback(_PUTS.discard)
+        return task
+
+    def _drop(self, key: str) -> None:
+        for p in self._paths(key):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+    def evict(self) -> None:
+        """Delete least-recently-used entries until the directory fits the budget."""
+        if not self._evict_lock.acquire(blocking=False):
+            return  # another thread is already evicting
+        try:
+            entries = []
+            total = 0
+            for p in self.root.glob("*.parquet"):
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                meta = p.with_suffix(".json")
+                size = st.st_size + (meta.stat().st_size if meta.exists() else 0)
+                entries.append((max(st.st_atime, st.st_mtime), size, p.stem))
+                total += size
+            if total <= self.max_bytes:
+                return
+            for _, size, key in sorted(entries):
+                self._drop(key)
+                self.evictions += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        finally:
+            self._evict_lock.release()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes,
+                "evictions": self.evictions, "dir": str(self.root), "max_bytes": self.max_bytes}
+
+
+_CACHE: Optional[ResultCache] = None
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """The process-wide cache, or None when RESULT_CACHE is off."""
+    global _CACHE
+    if not RESULT_CACHE:
+        return None
+    if _CACHE is None:
+        _CACHE = ResultCache()
+    return _CACHE
+
+
+__all__ = ["ResultCache", "get_result_cache", "result_cache_key"]
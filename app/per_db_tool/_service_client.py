@@ -0,0 +1,271 @@
+"""Async service-to-service POSTs: circuit breakers, hedging, deadlines.
+
+Every internal call a per-DB worker makes (expand_and_match_db, planner,
+schema_mapper, orchestrator) goes through ``post_service`` on the shared
+keep-alive client from ``_httpx_client``. There is no thread-pool
+``requests`` hop on the request path any more.
+
+Per upstream (scheme://host:port) the module keeps
+
+* a circuit breaker: after BREAKER_FAILURES consecutive failures
+  (transport error, timeout or 5xx) calls fail fast with
+  ``CircuitOpenError`` for BREAKER_COOLDOWN_S. After that one probe is let
+  through; its outcome closes or re-opens the breaker. 4xx answers count as
+  success, since expand_and_match answers 400 for an unknown database on
+  purpose.
+* a latency window. Once HEDGE_MIN_SAMPLES calls have completed, a call
+  made with ``hedge=True`` that has not answered by the upstream's p95
+  fires one identical backup request, and whichever answers first wins.
+  Only idempotent calls that are cheap to repeat may opt in: of the per-DB
+  worker's calls that is the planner (a graph search). expand_and_match_db,
+  schema_mapper and the orchestrator call LLMs, so a backup would double
+  their cost.
+
+The request deadline (utils.tracing: ``X-Request-Deadline``) caps every
+call's timeout and is forwarded downstream. A call with no time left fails
+with ``DeadlineExceeded`` before it is sent.
+
+Breaker state, hedge counts, per-upstream p95 and the pool's connection
+counts are appended to ``GET /metrics``.
+
+HTTP/2 is used when SERVICE_HTTP2=1 and ``h2`` is installed. The internal
+services are plain uvicorn, which speaks HTTP/1.1 only, so the default stays
+HTTP/1.1 keep-alive.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from utils.tracing import add_metrics_renderer, remaining_s, trace_headers
+
+from ._httpx_client import get_httpx_client
+
+log = logging.getLogger("uvicorn.error")
+
+SERVICE_HEDGE = os.getenv("SERVICE_HEDGE", "1").lower() in ("1", "true", "yes")
+HEDGE_MIN_SAMPLES = int(os.getenv("SERVICE_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_S = float(os.getenv("SERVICE_HEDGE_MIN_DELAY_S", "0.05"))
+# at most this many backup requests in flight per process
+HEDGE_MAX_INFLIGHT = int(os.getenv("SERVICE_HEDGE_MAX_INFLIGHT", "8"))
+BREAKER_FAILURES = int(os.getenv("SERVICE_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.getenv("SERVICE_BREAKER_COOLDOWN_S", "15"))
+_DEFAULT_TIMEOUT = float(os.getenv("POST_TIMEOUT_SECONDS", "120"))
+_WINDOW = 256
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The upstream's breaker is open; the request was not sent."""
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The request deadline had already passed; the request was not sent."""
+
+
+class _Upstream:
+    __slots__ = ("name", "latencies", "failures", "state", "opened_at", "probing",
+                 "ok", "errors", "rejected", "hedged", "hedge_wins")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latencies: deque = deque(maxlen=_WINDOW)
+        self.failures = 0
+        self.state = "closed"          # closed | open | half_open
+        self.opened_at = 0.0
+        self.probing = False
+        self.ok = self.errors = self.rejected = self.hedged = self.hedge_wins = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN_S:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self, seconds: float) -> None:
+        self.ok += 1
+        self.latencies.append(seconds)
+        self.failures = 0
+        self.probing = False
+        if self.state != "closed":
+            log.info("[service_client] %s recovered — breaker closed", self.name)
+        self.state = "closed"
+
+    def failure(self) -> None:
+        self.errors += 1
+        self.failures += 1
+        self.probing = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= BREAKER_FAILURES):
+            log.warning("[service_client] %s failing (%d in a row) — breaker open for %.0fs",
+                        self.name, self.failures, BREAKER_COOLDOWN_S)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def p95(self) -> Optional[float]:
+        n = len(self.latencies)
+        if n < HEDGE_MIN_SAMPLES:
+            return None
+        return sorted(self.latencies)[int(0.95 * (n - 1))]
+
+
+_UPSTREAMS: Dict[str, _Upstream] = {}
+_UPSTREAMS_LOCK = threading.Lock()
+_hedges_inflight = 0
+
+
+def _upstream(url: str) -> _Upstream:
+    parts = urlsplit(url)
+    name = f"{parts.scheme}://{parts.netloc}"
+    up = _UPSTREAMS.get(name)
+    if up is None:
+        with _UPSTREAMS_LOCK:
+            up = _UPSTREAMS.setdefault(name, _Upstream(name))
+    return up
+
+
+async def _first_success(primary: asyncio.Task, make, delay: float, up: _Upstream):
+    """Await *primary*; if it is still running after *delay*, race a backup."""
+    global _hedges_inflight
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done or _hedges_inflight >= HEDGE_MAX_INFLIGHT:
+        return await primary
+    up.hedged += 1
+    _hedges_inflight += 1
+    backup = asyncio.ensure_future(make())
+    pending = {primary, backup}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    if t is backup:
+                        up.hedge_wins += 1
+                    return t.result()
+                error = error or t.exception()
+        raise error  # both attempts failed
+    finally:
+        _hedges_inflight -= 1
+        for t in pending:
+            t.cancel()
+
+
+async def post_service(
+    url: str,
+    *,
+    json: Any = None,
+    timeout: Optional[float] = None,
+    hedge: bool = False,
+    headers: Optional[dict] = None,
+    **kw: Any,
+) -> httpx.Response:
+    """POST to an internal service. Returns the response whatever its
+    status; raises ``httpx.HTTPError`` (incl. ``CircuitOpenError`` /
+    ``DeadlineExceeded``) when there is none. A connection that could not be
+    opened is retried once; a timeout is not here (``post_async`` retries
+    it once)."""
+    up = _upstream(url)
+    if not up.allow():
+        raise CircuitOpenError(f"circuit open for {up.name}")
+    budget = timeout if timeout is not None else _DEFAULT_TIMEOUT
+    left = remaining_s()
+    if left is not None:
+        if left <= 0:
+            up.probing = False
+            raise DeadlineExceeded(f"request deadline passed before POST {url}")
+        budget = min(budget, left)
+    client = get_httpx_client()
+    hdrs = {**trace_headers(), **(headers or {})}
+
+    def make():
+        return client.post(url, json=json, headers=hdrs, timeout=budget, **kw)
+
+    t0 = time.perf_counter()
+    try:
+        try:
+            primary = asyncio.ensure_future(make())
+            delay = up.p95() if (hedge and SERVICE_HEDGE) else None
+            if delay is None or max(delay, HEDGE_MIN_DELAY_S) >= budget:
+                resp = await primary
+            else:
+                resp = await _first_success(primary, make, max(delay, HEDGE_MIN_DELAY_S), up)
+        except httpx.ConnectError as e:
+            log.warning("POST %s could not connect (%s), retrying once", url, e)
+            resp = await make()
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            up.probing = False
+        else:
+            up.failure()
+        raise
+    if resp.status_code >= 500:
+        up.failure()
+    else:
+        up.success(time.perf_counter() - t0)
+    return resp
+
+
+# ── /metrics ──────────────────────────────────────────────────────────────────
+
+_STATE_VALUE = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _render_metrics() -> str:
+    lines = [
+        "# HELP biochirp_upstream_requests_total Internal service calls by outcome.",
+        "# TYPE biochirp_upstream_requests_total counter",
+    ]
+    ups = sorted(_UPSTREAMS.values(), key=lambda u: u.name)
+    for u in ups:
+        for outcome, n in (("ok", u.ok), ("error", u.errors), ("rejected", u.rejected)):
+            lines.append(f'biochirp_upstream_requests_total{{upstream="{u.name}",outcome="{outcome}"}} {n}')
+    lines += ["# HELP biochirp_upstream_hedges_total Backup requests fired / won.",
+              "# TYPE biochirp_upstream_hedges_total counter"]
+    for u in ups:
+        lines.append(f'biochirp_upstream_hedges_total{{upstream="{u.name}",won="false"}} {u.hedged - u.hedge_wins}')
+        lines.append(f'biochirp_upstream_hedges_total{{upstream="{u.name}",won="true"}} {u.hedge_wins}')
+    lines += ["# HELP biochirp_upstream_breaker_state 0 closed, 1 half-open, 2 open.",
+              "# TYPE biochirp_upstream_breaker_state gauge"]
+    for u in ups:
+        lines.append(f'biochirp_upstream_breaker_state{{upstream="{u.name}"}} {_STATE_VALUE[u.state]}')
+    lines += ["# HELP biochirp_upstream_p95_seconds Rolling p95 latency (hedge delay).",
+              "# TYPE biochirp_upstream_p95_seconds gauge"]
+    for u in ups:
+        p95 = u.p95()
+        if p95 is not None:
+            lines.append(f'biochirp_upstream_p95_seconds{{upstream="{u.name}"}} {p95:.6f}')
+    pool = _pool_counts()
+    if pool:
+        lines += ["# HELP biochirp_http_pool_connections Shared client connections.",
+                  "# TYPE biochirp_http_pool_connections gauge"]
+        for state, n in pool.items():
+            lines.append(f'biochirp_http_pool_connections{{state="{state}"}} {n}')
+    return "\n".join(lines)
+
+
+def _pool_counts() -> Dict[str, int]:
+    # httpcore's pool is not public API; report nothing rather than fail
+    try:
+        conns = get_httpx_client()._transport._pool.connections
+        idle = sum(1 for c in conns if c.is_idle())
+        return {"active": len(conns) - idle, "idle": idle}
+    except Exception:  # noqa: BLE001
+        return {}
+
+
+add_metrics_renderer(_render_metrics)
+
+
+__all__ = ["CircuitOpenError", "DeadlineExceeded", "post_service"]
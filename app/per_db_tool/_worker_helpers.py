@@ -25,14 +25,17 @@ Log prefix:
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
-from typing import Any, Iterable, Optional
+from typing import TYPE_CHECKING, Any, Iterable, Optional
 
-import redis.asyncio as redis
+from utils.event_publisher import EventPublisher
+from utils.tracing import trace_headers
 
-from ._http_session import HTTP_SESSION
+from ._http_session import get_http_session
+
+if TYPE_CHECKING:
+    import redis.asyncio as redis
 
 # ----- Logging (one-time setup, applied on first import) --------------------
 # Every per-DB worker used to repeat this block byte-for-byte. basicConfig is
@@ -77,6 +80,7 @@ async def get_redis(
         if _REDIS_SINGLETON["client"] is not None:
             return _REDIS_SINGLETON["client"]
         try:
+            import redis.asyncio as redis
             client = redis.Redis(host=host, port=port, decode_responses=True)
             await client.ping()
             _REDIS_SINGLETON["client"] = client
@@ -86,6 +90,11 @@ async def get_redis(
     return _REDIS_SINGLETON["client"]
 
 
+# Table and planner-card events go out through one batched, pipelined
+# publisher per process (see utils.event_publisher).
+_EVENTS = EventPublisher(get_redis, name="per_db")
+
+
 # ----- HTTP POST with retry -------------------------------------------------
 # 60s was tight for the expand_and_match_db / planner POSTs under load — a
 # moderately-slow call (70-90s) would fail here, burn a retry, and often fail
@@ -109,11 +118,15 @@ def post_with_retry(
     Replaces the per-worker `_post(url, **kw)` that did the same thing
     against its own `_HTTP_SESSION`. Returns the `Response` on success or
     `None` on failure (callers tolerate this).
+
+    Kept for scripts and sync callers only; the request path uses
+    `post_async` (breakers, hedging, deadlines — see _service_client).
     """
     log = logger or logging.getLogger("uvicorn.error")
     timeout = timeout or _POST_TIMEOUT
+    kw["headers"] = {**trace_headers(), **(kw.get("headers") or {})}
     try:
-        return HTTP_SESSION.post(url, timeout=timeout, **kw)
+        return get_http_session().post(url, timeout=timeout, **kw)
     except Exception as e:
         # The original code retries once specifically on timeout. We treat
         # any exception the same way the original did: retry once, then
@@ -125,7 +138,7 @@ def post_with_retry(
         else:
             log.warning("POST %s failed (%s), retrying once: %s", url, e_name, e)
         try:
-            return HTTP_SESSION.post(url, timeout=timeout, **kw)
+            return get_http_session().post(url, timeout=timeout, **kw)
         except Exception as e2:
             log.error("POST %s failed after retry: %s", url, e2)
             return None
@@ -153,6 +166,7 @@ async def publish_ws(
     csv_path: str,
     rows: int,
     *,
+    cursor_id: str | None = None,
     service_name: str | None = None,
     logger: logging.Logger | None = None,
 ) -> None:
@@ -162,26 +176,27 @@ async def publish_ws(
     The original per-worker `_publish_ws` constructed the event_type as
     f"{SERVICE_NAME}_table"; we preserve that exact key so the chat-side
     frontend listeners continue to match. The `service_name` arg defaults
-    to the `SERVICE_NAME` env var.
+    to the `SERVICE_NAME` env var. `cursor_id`, when given, lets the client
+    page the full result via `GET /cursor/{cursor_id}/page`.
     """
     if not conn_id:
         return
     service_name = service_name or os.getenv("SERVICE_NAME", "")
     log = logger or logging.getLogger("uvicorn.error")
-    try:
-        r = await get_redis(logger=log)
-        if r is None:
-            return
-        await r.publish(
-            conn_id,
-            json.dumps({
-                "type": f"{service_name}_table",
-                "csv_path": csv_path,
-                "row_count": rows,
-            }),
-        )
-    except Exception as e:
-        log.error("[%s][ws] Publish failed: %s", service_name, e)
+    # wait=True: the table event must be on the channel before the worker's
+    # HTTP response lets the chat side send `final`
+    sent = await _EVENTS.publish(
+        conn_id,
+        {
+            "type": f"{service_name}_table",
+            "csv_path": csv_path,
+            "row_count": rows,
+            **({"cursor_id": cursor_id} if cursor_id else {}),
+        },
+        wait=True,
+    )
+    if not sent:
+        log.error("[%s][ws] Publish failed", service_name)
 
 
 # ----- async HTTP POST (for workers that use httpx.AsyncClient) -------------
@@ -189,30 +204,34 @@ async def post_async(
     url: str,
     *,
     timeout: float | None = None,
+    hedge: bool = False,
     logger: logging.Logger | None = None,
     **kw: Any,
 ):
-    """Async keep-alive POST with one retry on timeout.
+    """Async keep-alive POST through `post_service` (per-upstream circuit
+    breaker, optional p95 hedging, deadline-capped timeout), with one retry
+    on timeout.
 
     Replaces the per-worker `async def _post(url, **kw)` that did the same
     thing against its own `_HTTPX_CLIENT`. Returns the httpx `Response`
     on success or `None` on failure.
-
-    Used by the async-style workers (ttd, ctd, hcdt); the
-    sync workers use `post_with_retry()` instead.
     """
-    from ._httpx_client import get_httpx_client
+    from ._service_client import CircuitOpenError, DeadlineExceeded, post_service
     import httpx as _httpx
 
     log = logger or logging.getLogger("uvicorn.error")
     timeout_val = timeout if timeout is not None else _POST_TIMEOUT
-    client = get_httpx_client()
     for attempt in (1, 2):
         try:
-            r = await client.post(url, timeout=timeout_val, **kw)
             # Return the response regardless of status so callers can inspect
             # non-2xx codes (e.g. expand tool returns 400 for unknown databases).
-            return r
+            return await post_service(url, timeout=timeout_val, hedge=hedge, **kw)
+        except CircuitOpenError as e:
+            log.warning("POST %s skipped: %s", url, e)
+            return None
+        except DeadlineExceeded as e:
+            log.error("POST %s failed: %s", url, e)
+            return None
         except _httpx.TimeoutException as e:
             if attempt == 1:
                 log.warning("POST %s timed out, retrying once", url)
@@ -220,7 +239,7 @@ async def post_async(
             log.error("POST %s failed after retry: %s", url, e)
             return None
         except _httpx.HTTPError as e:
-            log.error("POST %s failed: %s", url, e)
+            log.error("POST %s failed (%s): %s", url, type(e).__name__, e)
             return None
         except Exception as e:  # noqa: BLE001 - mirror sync post_with_retry: never raise to caller
             # Non-httpx failures (InvalidURL, transport RuntimeError, OSError, …)
@@ -253,40 +272,27 @@ async def publish_planner_step(
     """
     if not conn_id:
         return
-    log = logger or logging.getLogger("uvicorn.error")
-    try:
-        r = await get_redis(logger=log)
-        if r is None:
-            return
-        tool_id = f"planner-{db}"
-        # 2026-05-21: explicit `name` field added. Previously this event
-        # carried only `tool_id` — the frontend chip renderer
-        # (assets/chat-main.min.js) falls back to literal "Tool" when
-        # `name` is missing, producing an unnamed 3 ms chip in the chat
-        # UI between the per-DB tool card and the synthesizer card. The
-        # decomp_tree.min.js DAG panel keys on `tool_id`, so adding the
-        # human-readable `name` here is additive — DAG rendering keeps
-        # working AND the chip now displays a meaningful label.
-        await r.publish(
-            conn_id,
-            json.dumps({
-                "type": "tool_called",
-                "tool_id": tool_id,
-                "name": f"planner ({db})",
-            }),
-        )
-        await r.publish(
-            conn_id,
-            json.dumps({
-                "type": "tool_result",
-                "tool_id": tool_id,
-                "name": f"planner ({db})",
-                "ok": True,
-                "plan": plan,
-            }),
-        )
-    except Exception as e:
-        log.warning("[%s][planner-card] publish failed: %s", db, e)
+    tool_id = f"planner-{db}"
+    # 2026-05-21: explicit `name` field added. Previously this event
+    # carried only `tool_id` — the frontend chip renderer
+    # (assets/chat-main.min.js) falls back to literal "Tool" when
+    # `name` is missing, producing an unnamed 3 ms chip in the chat
+    # UI between the per-DB tool card and the synthesizer card. The
+    # decomp_tree.min.js DAG panel keys on `tool_id`, so adding the
+    # human-readable `name` here is additive — DAG rendering keeps
+    # working AND the chip now displays a meaningful label.
+    await _EVENTS.publish(conn_id, {
+        "type": "tool_called",
+        "tool_id": tool_id,
+        "name": f"planner ({db})",
+    })
+    await _EVENTS.publish(conn_id, {
+        "type": "tool_result",
+        "tool_id": tool_id,
+        "name": f"planner ({db})",
+        "ok": True,
+        "plan": plan,
+    })
 
 
 __all__ = [
@@ -24,15 +24,19 @@ import time
 import uuid
 from types import SimpleNamespace
 from dataclasses import dataclass, field
-from typing import Awaitable, Callable, Optional
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional
 
 import httpx
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from openai import AsyncOpenAI
+
+if TYPE_CHECKING:  # openai is imported on first LLM call, not at service start
+    from openai import AsyncOpenAI
 
 from config import settings  # repo-wide model SSOT (reads .env); never os.environ for models
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
 from config.attributions import attribution_footer as _attribution_footer
+from utils.tracing import httpx_event_hooks, reset_request_id, set_request_id, span
+from ._service_client import post_service
 from ._worker_helpers import get_redis
 
 logger = logging.getLogger("uvicorn.error")
@@ -506,10 +510,12 @@ def _get_synth_client() -> AsyncOpenAI:
     global _synth_client
     if _synth_client is None:
         import httpx
+        from openai import AsyncOpenAI
         _synth_client = AsyncOpenAI(
             api_key=_API_KEY,
             base_url=_BASE_URL or None,
-            http_client=httpx.AsyncClient(timeout=httpx.Timeout(120.0)),
+            http_client=httpx.AsyncClient(timeout=httpx.Timeout(120.0),
+                                          event_hooks=httpx_event_hooks()),
         )
     return _synth_client
 
@@ -517,7 +523,9 @@ def _get_synth_client() -> AsyncOpenAI:
 def _get_orch_client() -> AsyncOpenAI:
     global _orch_client
     if _orch_client is None:
-        _orch_client = AsyncOpenAI(api_key=_ORCH_API_KEY, base_url=_ORCH_BASE_URL)
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _orch_client = AsyncOpenAI(api_key=_ORCH_API_KEY, base_url=_ORCH_BASE_URL,
+                                   http_client=DefaultAsyncHttpxClient(event_hooks=httpx_event_hooks()))
     return _orch_client
 
 
@@ -594,9 +602,14 @@ async def _tool_query_db(query: str, connection_id: str, return_result_fn,
 
 
 async def _tool_web_search(query: str) -> dict:
+    from utils.web_evidence import cached_web_answer
     from .schema_kg_worker import web_search_ex
     try:
-        res = await web_search_ex(query)
+        try:
+            _redis = await get_redis(logger=logger)
+        except Exception:
+            _redis = None
+        res = await cached_web_answer(query, web_search_ex, redis_client=_redis)
         return {"answer": res["answer"] or "No answer found.",
                 "searched": bool(res["searched"])}
     except Exception as exc:
@@ -604,6 +617,91 @@ async def _tool_web_search(query: str) -> dict:
         return {"answer": f"Web search failed: {exc}", "searched": False}
 
 
+# Speculative web fallback (opt-in). A question that ends on the web fallback
+# used to pay for the whole DB pipeline and then the web search in series.
+# With CHAT_SPECULATIVE_WEB=1 the web search for the turn starts alongside the
+# DB query; its answer is only read if the DB comes back empty, and the task
+# is cancelled as soon as the DB returns rows. CHAT_SPECULATIVE_WEB_DELAY_S
+# holds the speculation back so fast DB hits never spend a Groq call;
+# CHAT_SPECULATIVE_WEB_BUDGET_S caps how long a speculative search may run
+# before it is cancelled (the fallback then searches again itself).
+_SPEC_WEB_ENABLED  = os.getenv("CHAT_SPECULATIVE_WEB", "0").lower() in ("1", "true", "yes")
+_SPEC_WEB_DELAY_S  = float(os.getenv("CHAT_SPECULATIVE_WEB_DELAY_S", "1.5"))
+_SPEC_WEB_BUDGET_S = float(os.getenv("CHAT_SPECULATIVE_WEB_BUDGET_S", "45"))
+
+_SPEC_WEB_STATS = {
+    "turns": 0,        # DB queries that armed a speculation
+    "launched": 0,     # searches actually sent (DB outlived the delay)
+    "used": 0,         # DB empty, speculative answer consumed
+    "wasted": 0,       # DB had rows, search already sent and cancelled
+    "timeouts": 0,     # cancelled by the budget, or failed
+    "saved_s": 0.0,    # fallback latency hidden behind the DB query
+}
+
+
+def speculative_web_stats() -> dict:
+    """Counters for how often the speculative web search pays off."""
+    out = dict(_SPEC_WEB_STATS)
+    launched = out["launched"]
+    out["hit_rate"] = round(out["used"] / launched, 3) if launched else 0.0
+    out["saved_s"] = round(out["saved_s"], 2)
+    return out
+
+
+class _SpeculativeWeb:
+    """A web search for *query* running alongside the turn's DB query."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.launched_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._settled = False
+        _SPEC_WEB_STATS["turns"] += 1
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> Optional[dict]:
+        if _SPEC_WEB_DELAY_S > 0:
+            await asyncio.sleep(_SPEC_WEB_DELAY_S)
+        self.launched_at = time.monotonic()
+        _SPEC_WEB_STATS["launched"] += 1
+        try:
+            res = await asyncio.wait_for(_tool_web_search(self.query), _SPEC_WEB_BUDGET_S)
+        except asyncio.TimeoutError:
+            _SPEC_WEB_STATS["timeouts"] += 1
+            return None
+        self.finished_at = time.monotonic()
+        return res
+
+    def cancel(self) -> None:
+        """The DB answered — drop the speculation."""
+        if self._settled:
+            return
+        self._settled = True
+        if self.launched_at is not None:
+            _SPEC_WEB_STATS["wasted"] += 1
+        self._task.cancel()
+
+    async def result(self) -> Optional[dict]:
+        """The speculative answer, or None when the caller should search itself."""
+        if self._settled:
+            return None
+        self._settled = True
+        needed_at = time.monotonic()
+        try:
+            res = await self._task
+        except (asyncio.CancelledError, Exception) as exc:  # noqa: BLE001
+            logger.debug("[schema_kg_chat] speculative web search failed: %r", exc)
+            _SPEC_WEB_STATS["timeouts"] += 1
+            return None
+        if res is None:
+            return None
+        _SPEC_WEB_STATS["used"] += 1
+        # launched_at is set whenever _run returned a result
+        _SPEC_WEB_STATS["saved_s"] += min(self.finished_at, needed_at) - self.launched_at
+        logger.info("[schema_kg_chat] speculative web answer used | %s", speculative_web_stats())
+        return res
+
+
 def _web_provenance_header(display_name: str, searched: bool) -> str:
     """Header above a web-fallback answer, stating its TRUE provenance.
 
@@ -637,7 +735,8 @@ _ORCH_STEP_NAME: dict[str, str] = {
 
 
 def _build_step_data_text(tool_name: str, summary: dict) -> str:
-    """Build a compact data string for the LLM step summarizer prompt."""
+    """Build a compact data string: the step card's templated body, and the
+    step output fed to the LLM step summarizer prompt."""
     if tool_name == "schema_mapper":
         pv = summary.get("parsed_value") or {}
         parts = []
@@ -725,7 +824,9 @@ _step_summ_client: Optional[AsyncOpenAI] = None
 def _get_step_summ_client() -> AsyncOpenAI:
     global _step_summ_client
     if _step_summ_client is None:
-        _step_summ_client = AsyncOpenAI(api_key=_STEP_SUMM_API_KEY, base_url=_STEP_SUMM_BASE_URL or None)
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _step_summ_client = AsyncOpenAI(api_key=_STEP_SUMM_API_KEY, base_url=_STEP_SUMM_BASE_URL or None,
+                                        http_client=DefaultAsyncHttpxClient(event_hooks=httpx_event_hooks()))
     return _step_summ_client
 
 
@@ -772,6 +873,70 @@ async def _llm_summarize_step(tool_name: str, summary: dict, query: str) -> str:
         return _build_step_data_text(tool_name, summary)
 
 
+# ── Step cards: templated fast path, LLM upgrade off the critical path ────────
+# Step cards (Schema Mapper, Entity Expander, DB Execute, the orchestrator's
+# relayed steps) are cosmetic, yet each used to await _llm_summarize_step
+# before it was sent, i.e. one LLM round-trip per card in front of the join
+# and the answer. STEP_SUMMARIZER_MODE:
+#   async    (default) send the _build_step_data_text body at once; the LLM
+#            sentence follows as a `tool_update` event that replaces it
+#   template never call the LLM
+#   inline   the old behaviour (await the LLM before sending the card)
+# Each off-path summary is timed as a `step_summary.<tool>` span of kind
+# `llm_offpath`: its duration is latency no longer on the request path, so
+# sum / count of those spans on /metrics (or per request_id in
+# BIOCHIRP_TRACE_FILE) is what the fast path saves per query.
+STEP_SUMMARIZER_MODE = os.getenv("STEP_SUMMARIZER_MODE", "async").strip().lower()
+STEP_SUMMARIZER_TIMEOUT_S = float(os.getenv("STEP_SUMMARIZER_TIMEOUT_S", "20"))
+_STEP_UPGRADES: set = set()  # strong refs so pending upgrades aren't GC'd
+
+
+async def _step_card_text(tool_name: str, summary: dict, query: str) -> str:
+    """Card body to send now: the LLM sentence only in inline mode."""
+    if STEP_SUMMARIZER_MODE == "inline" and summary:
+        return await _llm_summarize_step(tool_name, summary, query)
+    return _build_step_data_text(tool_name, summary)
+
+
+async def _upgrade_step_card(send: Callable, tool_id: str, name: str,
+                             tool_name: str, summary: dict, query: str) -> None:
+    try:
+        with span(f"step_summary.{tool_name}", kind="llm_offpath"):
+            text = await asyncio.wait_for(_llm_summarize_step(tool_name, summary, query),
+                                          STEP_SUMMARIZER_TIMEOUT_S)
+        # _llm_summarize_step falls back to the template: nothing to upgrade
+        if text and text != _build_step_data_text(tool_name, summary):
+            await send({"type": "tool_update", "tool_id": tool_id, "name": name, "text": text})
+    except Exception as exc:  # noqa: BLE001 — socket gone, timeout: the template stays
+        logger.debug("[schema_kg_chat] step card upgrade skipped for %s: %s", tool_name, exc)
+
+
+def _schedule_step_upgrade(send: Callable, tool_id: str, name: str,
+                           tool_name: str, summary: dict, query: str) -> None:
+    """In async mode, fetch the LLM sentence in the background and send it
+    as a `tool_update` for the card once it arrives."""
+    if STEP_SUMMARIZER_MODE != "async" or not summary:
+        return
+    task = asyncio.create_task(_upgrade_step_card(send, tool_id, name, tool_name, summary, query))
+    _STEP_UPGRADES.add(task)
+    task.add_done_callback(_STEP_UPGRADES.discard)
+
+
+async def send_step_card(send: Callable, tool_id: str, name: str, tool_name: str,
+                         summary: dict, query: str, *, ok: bool = True,
+                         text: Optional[str] = None) -> None:
+    """Send one step card (tool_called → delta → tool_result). The body is
+    *text* when given (sent as is, never upgraded), else the step template;
+    see STEP_SUMMARIZER_MODE."""
+    body = text if text is not None else await _step_card_text(tool_name, summary, query)
+    await send({"type": "tool_called", "tool_id": tool_id, "name": name})
+    await send({"type": "delta", "tool_id": tool_id, "name": name,
+                "text": body, "seq": 1, "offset": 0, "final": False})
+    await send({"type": "tool_result", "tool_id": tool_id, "name": name, "ok": ok})
+    if text is None and ok:
+        _schedule_step_upgrade(send, tool_id, name, tool_name, summary, query)
+
+
 async def _relay_orch_progress(connection_id: str, send: Callable,
                                ready: asyncio.Event, stop: asyncio.Event,
                                query: str = "") -> None:
@@ -784,8 +949,8 @@ async def _relay_orch_progress(connection_id: str, send: Callable,
     when the query finishes.
 
     `query` is used to give the LLM step-summarizer (`_llm_summarize_step`)
-    user-question context for its plain-English card body; without it, cards
-    fall back to the raw parsed_value/canonical_pv/row_count dump.
+    user-question context for the plain-English `tool_update` that follows
+    each templated card body (see STEP_SUMMARIZER_MODE).
     """
     try:
         r = await get_redis(logger=logger)
@@ -826,20 +991,19 @@ async def _relay_orch_progress(connection_id: str, send: Callable,
                             "ok": evt.get("ok", True),
                             "elapsed_seconds": round(float(evt.get("elapsed", 0) or 0), 2)})
         elif etype == "orch_step_summary":
-            # Plain-English card body via the LLM step-summarizer (same as the
-            # batched/no-Redis fallback path) — sent BEFORE the result so the
-            # frontend has it buffered when it renders the card. Falls back to
-            # the raw parsed_value/canonical_pv/row_count dump internally if
-            # the LLM call fails or returns empty (see _llm_summarize_step).
+            # Templated card body (same as the batched/no-Redis fallback
+            # path) — sent BEFORE the result so the frontend has it buffered
+            # when it renders the card. The LLM step-summarizer's sentence
+            # follows as a `tool_update` without holding up this relay.
             summary = evt.get("summary") or {}
-            text = await _llm_summarize_step(tool, summary, query) if summary \
-                else _build_step_data_text(tool, summary)
+            text = await _step_card_text(tool, summary, query)
             if text:
                 await send({"type": "delta", "tool_id": tool_id, "name": display,
                             "text": text, "seq": 1, "offset": 0, "final": False})
             res = pending_result.pop(tool, None)
             if res is not None:
                 await _send_result(tool, res)
+            _schedule_step_upgrade(send, tool_id, display, tool, summary, query)
 
     try:
         await pubsub.subscribe(f"orch_progress:{connection_id}")
@@ -927,22 +1091,22 @@ async def _tool_query_db_orchestrator(
             q_lower = query.lower()
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(
-                spec.orchestrator_url,
-                json={
-                    "query": query,
-                    "connection_id": connection_id,
-                    "display_name": spec.display_name,
-                    "capabilities": spec.capabilities,
-                    "limitations": spec.limitations,
-                    "db_llm_rules": spec.db_llm_rules,
-                },
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            if not isinstance(data, dict):
-                raise ValueError(f"orchestrator returned non-dict: {data!r}")
+        resp = await post_service(
+            spec.orchestrator_url,
+            json={
+                "query": query,
+                "connection_id": connection_id,
+                "display_name": spec.display_name,
+                "capabilities": spec.capabilities,
+                "limitations": spec.limitations,
+                "db_llm_rules": spec.db_llm_rules,
+            },
+            timeout=120.0,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        if not isinstance(data, dict):
+            raise ValueError(f"orchestrator returned non-dict: {data!r}")
         _relayed_live = _relay_task is not None
     except Exception as exc:
         logger.error("[schema_kg_chat] orchestrator call failed: %s", exc)
@@ -962,8 +1126,7 @@ async def _tool_query_db_orchestrator(
     # Relay orchestrator intermediate events as WS tool progress cards.
     # If the live relay already streamed them in real time, skip this batch
     # replay (iterate empty) to avoid duplicate cards; otherwise (no
-    # connection_id / Redis down) fall back to the post-hoc batch with rich
-    # LLM-generated summaries.
+    # connection_id / Redis down) fall back to the post-hoc batch.
     _batched = data.pop("_orch_events", [])
     for evt in (_batched if not _relayed_live else []):
         evt_type = evt.get("type", "")
@@ -975,21 +1138,19 @@ async def _tool_query_db_orchestrator(
         if evt_type == "tool_called":
             await send({"type": "tool_called", "tool_id": tool_id, "name": display})
         elif evt_type == "tool_result":
-            # LLM-generated 1-2 sentence summary sent as delta BEFORE tool_result
-            # so renderToolOutput uses it as the card body content.
+            # Card body sent as delta BEFORE tool_result so renderToolOutput
+            # uses it; the LLM 1-2 sentence summary may replace it later.
             step_summary = tool_summaries.get(tool_name, {})
-            if step_summary:
-                llm_text = await _llm_summarize_step(tool_name, step_summary, query)
-            else:
-                llm_text = _build_step_data_text(tool_name, {})
-            if llm_text:
+            step_text = await _step_card_text(tool_name, step_summary, query)
+            if step_text:
                 await send({"type": "delta", "tool_id": tool_id, "name": display,
-                            "text": llm_text, "seq": 1, "offset": 0, "final": False})
+                            "text": step_text, "seq": 1, "offset": 0, "final": False})
             await send({
                 "type": "tool_result", "tool_id": tool_id, "name": display,
                 "ok": evt.get("ok", True),
                 "elapsed_seconds": round(float(evt.get("elapsed", 0)), 2),
             })
+            _schedule_step_upgrade(send, tool_id, display, tool_name, step_summary, query)
 
     action = data.get("action", "query_db")
     if action in ("direct_answer", "web_search"):
@@ -1017,7 +1178,8 @@ async def _tool_query_db_orchestrator(
 async def _web_fallback_stream(spec: ChatSpec, user_question: str,
                                on_delta: Callable[[str], Awaitable[None]],
                                send: Callable[[dict], Awaitable[None]],
-                               t0: float) -> str:
+                               t0: float,
+                               speculative: Optional[_SpeculativeWeb] = None) -> str:
     """In-scope question, but the curated DB returned zero rows.
 
     Policy: tell the user the curated DB found nothing, emit the mandatory
@@ -1030,10 +1192,15 @@ async def _web_fallback_stream(spec: ChatSpec, user_question: str,
     Branch D can emit an explicit "Yes"/"No" verdict.  This covers both
     gold=no cases (drug failed its trial → web says "No") and gold=yes cases
     (drug IS approved but not yet in the DB → web says "Yes").
+
+    `speculative`, when given, is the same search already started alongside
+    the DB query; its answer is reused instead of searching again.
     """
     web_id = f"web-{uuid.uuid4().hex[:6]}"
     await send({"type": "tool_called", "tool_id": web_id, "name": "web_search"})
-    web = await _tool_web_search(user_question)
+    web = await speculative.result() if speculative is not None else None
+    if web is None:
+        web = await _tool_web_search(user_question)
     await send({"type": "tool_result", "tool_id": web_id, "name": "web_search",
                 "ok": True, "elapsed_seconds": round(time.monotonic() - t0, 2)})
 
@@ -2049,6 +2216,10 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
 
     router = APIRouter()
 
+    @router.get(f"/{db}_chat/speculation")
+    async def chat_speculation_stats() -> dict:
+        return {"enabled": _SPEC_WEB_ENABLED, **speculative_web_stats()}
+
     @router.websocket(f"/{db}_chat/")
     async def chat_ws(websocket: WebSocket):
         await websocket.accept()
@@ -2070,6 +2241,10 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                 pass
 
         hb_task = asyncio.create_task(_heartbeat())
+        # the connection's slot for the current turn's speculative web search;
+        # cancelled and cleared at the end of every turn and in `finally`, so a
+        # disconnect or error mid-turn never leaves it running or referenced
+        spec_web: Optional[_SpeculativeWeb] = None
         try:
             while True:
                 try:
@@ -2097,6 +2272,9 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                 if not user_input:
                     continue
 
+                # One request id per turn: every service this question touches
+                # logs and traces under it (X-Request-ID, see utils.tracing).
+                _rid_token = set_request_id()
                 await send({"type": "user_ack"})
                 t0 = time.monotonic()
                 _seq = 0
@@ -2125,6 +2303,7 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                 web_searched = False        # True if a live browser_search actually ran
                 orch_text: Optional[str] = None
                 orch_decision = "direct_answer"
+                spec_web = None
 
                 # DETERMINISTIC ROUTER (2026-06-23): for any non-greeting question,
                 # bypass the orchestrator LLM on the FIRST turn and issue a query_db
@@ -2203,6 +2382,9 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                         if tcname == tool_name:
                             db_attempted = True
                             await send({"type": "tool_called", "tool_id": tc.id, "name": display})
+                            if _SPEC_WEB_ENABLED and spec_web is None:
+                                # the fallback searches the user's own words
+                                spec_web = _SpeculativeWeb(user_input)
                             if spec.orchestrator_url:
                                 tool_result, db_result = await _tool_query_db_orchestrator(
                                     query_arg, connection_id, spec, send)
@@ -2211,6 +2393,8 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                                     query_arg, connection_id, spec.return_result_fn, send)
                             rc = tool_result.get("row_count", 0)
                             has_rows = rc > 0
+                            if has_rows and spec_web is not None:
+                                spec_web.cancel()
                             if has_rows and db_result:
                                 await send({"type": "delta", "tool_id": tc.id, "name": db,
                                             "text": _build_filter_trace_text(db_result)})
@@ -2222,6 +2406,7 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                                 await send({"type": table_event, "tool": db,
                                             "connection_id": connection_id,
                                             "csv_path": db_result.csv_path or "",
+                                            "cursor_id": db_result.cursor_id,
                                             "row_count": rc,
                                             "output": {**db_result.model_dump(),
                                                        "table": (db_result.table or [])[:_MAX_ROWS_TO_DISPLAY]}})
@@ -2290,7 +2475,8 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                 elif db_attempted:
                     # In-scope question, but the curated DB had zero rows:
                     # disclaim provenance, then answer from a general web search.
-                    final_text = await _web_fallback_stream(spec, user_input, on_delta, send, t0)
+                    final_text = await _web_fallback_stream(spec, user_input, on_delta, send, t0,
+                                                            speculative=spec_web)
                 elif orch_text is not None:
                     await send({"type": "tool_called", "tool_id": "synthesizer", "name": "synthesizer"})
                     if web_search_called:
@@ -2304,9 +2490,13 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
                     await send({"type": "tool_called", "tool_id": "synthesizer", "name": "synthesizer"})
                     final_text = "I wasn't able to answer that. Please try again."
                     await on_delta(final_text)
+                if spec_web is not None:
+                    spec_web.cancel()  # no-op once consumed
+                    spec_web = None
 
                 await send({"type": "tool_result", "tool_id": "synthesizer", "ok": True})
                 await send({"type": "final", "text": final_text})
+                reset_request_id(_rid_token)
 
         except WebSocketDisconnect:
             pass
@@ -2314,6 +2504,9 @@ def build_chat_router(spec: ChatSpec) -> APIRouter:
             logger.error("[%s_chat] unexpected error: %s", db, exc, exc_info=True)
         finally:
             hb_task.cancel()
+            if spec_web is not None:
+                spec_web.cancel()  # no-op once consumed or already cancelled
+                spec_web = None
             logger.info("[%s_chat] WS closed | conn=%s", db, connection_id)
 
     return router
@@ -27,9 +27,10 @@ import re
 import threading
 from collections import defaultdict
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import networkx as nx
+if TYPE_CHECKING:
+    import networkx as nx
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -167,6 +168,8 @@ def _ensure_enumerated_output(parsed_value: dict, question: str, kept: list,
 # ── Steiner tree ────────────────────────────────────────────────────────────────
 
 def _steiner_tree_with_jk(needed_tables: set, G: nx.Graph, join_key: dict) -> tuple:
+    import networkx as nx  # ~0.2s import; only needed once a question is planned
+
     """Greedy nearest-fragment Steiner tree, deterministic and FK-identity-aware.
 
     Tie-break history (2026-08-01): when a table is EQUIDISTANT from multiple
@@ -238,6 +241,8 @@ def _steiner_tree_with_jk(needed_tables: set, G: nx.Graph, join_key: dict) -> tu
 # ── Pruned subgraph ──────────────────────────────────────────────────────────────
 
 def _build_pruned_subgraph(kept: list, parsed_value: dict, graph, db: str) -> dict:
+    import networkx as nx
+
     """Build a query-specific FK subgraph.
 
     needed_tables is derived from parsed_value (not raw ANN hits) so columns
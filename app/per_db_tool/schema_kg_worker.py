@@ -34,10 +34,12 @@ import httpx
 
 from config import settings  # repo-wide model SSOT (reads .env); never os.environ for models
 from config.schema import database_schemas
+from utils.tracing import httpx_event_hooks
 
 from ._orchestrator import WorkerCtx, make_db_result_handler, _call_hook
+from ._service_client import post_service
 from ._worker_helpers import valid_columns
-from .schema_kg_chat import _llm_summarize_step, _build_step_data_text
+from .schema_kg_chat import send_step_card
 # to_production_plan is a pure networkx transform (no torch) → runs locally in the
 # lean per-DB worker. The heavy planning (bge embeddings + ANN + value-mapping)
 # is delegated to the shared schema_mapper HTTP service (see _remote_schema_map).
@@ -176,10 +178,9 @@ async def _remote_schema_map(db: str, query: str,
     if tiebreaker:
         payload["tiebreaker_note"] = tiebreaker
     url = f"{_schema_mapper_url()}?database={db}"
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(url, json=payload)
-        resp.raise_for_status()
-        body = resp.json()
+    resp = await post_service(url, json=payload, timeout=120.0)
+    resp.raise_for_status()
+    body = resp.json()
     if not body.get("matched") or not body.get("plan"):
         return None
     return _rehydrate_sk_plan(body["plan"])
@@ -240,7 +241,6 @@ class SchemaKgConfig:
     # rewritten query; on a second miss the web tool is used as before.
     # Inert on all DBs that don't supply it (default None).
     on_schema_map_empty: Optional[SynonymFallback] = None
-    use_async_post: bool = True
     # Optional per-DB result ordering: list of {"col", "dir"|"order"}. Applied
     # as a stable re-sort after relevance scoring (see _orchestrator
     # _apply_sort_order). Lets a DB rank curated columns (e.g. evidence tier)
@@ -375,7 +375,7 @@ async def call_orchestrator(model: str, system_prompt: str, user_content: str) -
 
     for url, key, extra_headers in endpoints:
         try:
-            async with httpx.AsyncClient(timeout=15.0) as client:
+            async with httpx.AsyncClient(timeout=15.0, event_hooks=httpx_event_hooks()) as client:
                 resp = await client.post(
                     url,
                     headers={"Authorization": f"Bearer {key}", **extra_headers},
@@ -507,10 +507,9 @@ async def _call_orchestrator_http(db: str, query: str,
     body: dict = {"query": query, "capabilities": capabilities, "limitations": limitations}
     if db_llm_rules:
         body["db_llm_rules"] = db_llm_rules
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(url, json=body)
-        resp.raise_for_status()
-        return resp.json()
+    resp = await post_service(url, json=body, timeout=120.0)
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def _intercept_via_orchestrator(cfg: SchemaKgConfig, ctx: "WorkerCtx",
@@ -716,11 +715,11 @@ def _build_intercept(cfg: SchemaKgConfig) -> Hook:
         ctx.log.info("[%s] schema_kg: plan_tables=%s filter_cols=%s", cfg.db,
                      sorted(plan["plan_tables"]), list(plan["filter_plan"].keys()))
 
-        # Emit Schema Mapper step event if a ws_send callback is wired.
-        # Card body goes through the LLM step-summarizer (same prompt/model
-        # the batched fallback path uses) so it reads as plain English
-        # instead of a raw "parsed_value: k=v, ..." dump. Guarded: this is a
-        # cosmetic card and must NEVER be able to abort the actual query
+        # Emit Schema Mapper step event if a ws_send callback is wired. The
+        # card body is the deterministic template, sent at once; the LLM
+        # step-summarizer's plain-English sentence follows off the critical
+        # path (see send_step_card / STEP_SUMMARIZER_MODE). Guarded: this is
+        # a cosmetic card and must NEVER be able to abort the actual query
         # (see 2026-08-03 incident where an unguarded step-summarizer call
         # elsewhere killed the whole request on an unrelated data-shape bug).
         if ctx.ws_send:
@@ -728,17 +727,8 @@ def _build_intercept(cfg: SchemaKgConfig) -> Hook:
             _sm_id = f"sm-{_uuid.uuid4().hex[:6]}"
             pv = plan.get("parsed_value") or {}
             try:
-                _sm_text = await _llm_summarize_step(
-                    "schema_mapper", {"parsed_value": pv}, rephrased_query)
-            except Exception as _summ_exc:
-                ctx.log.debug("[%s] schema_mapper step-summarizer failed: %s", cfg.db, _summ_exc)
-                _sm_text = _build_step_data_text("schema_mapper", {"parsed_value": pv})
-            try:
-                await ctx.ws_send({"type": "tool_called", "tool_id": _sm_id, "name": "Schema Mapper"})
-                await ctx.ws_send({"type": "delta", "tool_id": _sm_id, "name": "Schema Mapper",
-                                   "text": _sm_text, "seq": 1, "offset": 0, "final": False})
-                await ctx.ws_send({"type": "tool_result", "tool_id": _sm_id,
-                                   "name": "Schema Mapper", "ok": True})
+                await send_step_card(ctx.ws_send, _sm_id, "Schema Mapper", "schema_mapper",
+                                     {"parsed_value": pv}, rephrased_query)
             except Exception as _ws_exc:
                 ctx.log.debug("[%s] ws_send schema_mapper event failed: %s", cfg.db, _ws_exc)
 
@@ -881,10 +871,10 @@ async def _retry_with_corrective_hint(cfg: SchemaKgConfig, ctx: "WorkerCtx",
         f"http://{os.getenv('EXPAND_AND_MATCH_DB_HOST', 'biochirp_expand_and_match_db_tool')}"
         f":{os.getenv('EXPAND_AND_MATCH_DB_PORT', '8009')}/expand_and_match_db"
     )
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(f"{expand_url}?database={cfg.db}", json=ctx.inp)
-        resp.raise_for_status()
-        expand_json = resp.json()
+    resp = await post_service(f"{expand_url}?database={cfg.db}", json=ctx.inp,
+                              timeout=120.0)
+    resp.raise_for_status()
+    expand_json = resp.json()
     ctx.expand_response = expand_json
     ctx.filter_val = expand_json.get("value", {}) or {}
     ctx.out_cols = valid_columns(ctx.filter_val, cfg.db)
@@ -970,7 +960,6 @@ def make_schema_kg_handler(cfg: SchemaKgConfig) -> Callable:
         prompt_md=cfg.prompt_md,
         summarizer_model=cfg.summarizer_model
         or settings.SUMMARIZER_MODEL_NAME,
-        use_async_post=cfg.use_async_post,
         intercept=_build_intercept(cfg),
         post_expand=_build_post_expand(cfg),
         pre_join=cfg.pre_join,
@@ -0,0 +1,142 @@
+"""Local, Docker-free test for the token-budgeted summariser prompt.
+
+Loads _prompt_budget.py directly (stdlib only) and checks count_tokens both
+ways: the word/digit/punctuation estimate used when tiktoken is absent,
+against counts worked out by hand, and the tiktoken path through a stand-in
+encoder (one token per character, so budgets can be set exactly). Then
+pack_prompt: a payload that already fits comes back as plain ``json.dumps``;
+a tight budget keeps rows by descending rank score (unscorable rows last),
+skips a row that does not fit in favour of smaller lower-ranked ones, keeps
+the best row even over budget, and calls ``annotate`` only when it trims.
+
+Run:  python app/per_db_tool/test_prompt_budget.py
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import types
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("prompt_budget_under_test",
+                                                  HERE / "_prompt_budget.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _use_tiktoken(pb, module) -> None:
+    """Install *module* as ``tiktoken`` (None: not installed) and drop the
+    cached encoder so the next count picks it up."""
+    sys.modules["tiktoken"] = module
+    pb._encoder.cache_clear()
+
+
+def _char_tiktoken() -> types.ModuleType:
+    class _Enc:
+        def encode(self, text, disallowed_special=()):
+            assert disallowed_special == (), "special-token text must not raise"
+            return list(text)
+
+    mod = types.ModuleType("tiktoken")
+    mod.requested = []
+    mod.get_encoding = lambda name: mod.requested.append(name) or _Enc()
+    return mod
+
+
+def _check_count_tokens(pb) -> None:
+    _use_tiktoken(pb, None)
+    assert pb._encoder() is None
+    assert pb.count_tokens("") == 0
+    # { " gene " : " TP 53 " }  — ten pieces, none long enough to split
+    assert pb.count_tokens('{"gene": "TP53"}') == 10
+    # 15 letters → 1 + 14 // 6; 7 digits → 1 + 6 // 3; "." is one more
+    assert pb.count_tokens("phosphorylation 1234567.") == 3 + 3 + 1
+    print("[ok] without tiktoken: word / digit / punctuation estimate")
+
+    fake = _char_tiktoken()
+    _use_tiktoken(pb, fake)
+    assert pb.count_tokens('{"gene": "TP53"}') == 16 and pb.count_tokens("<|endoftext|>") == 13
+    assert fake.requested == [pb._TOKENIZER], "one encoder, built once"
+    print(f"[ok] with tiktoken: the {pb._TOKENIZER} encoder counts the text")
+
+
+def _check_fits(pb) -> None:
+    payload = {"question": "targets of aspirin", "row_count": 2,
+               "rows": [{"target": "PTGS1", "score": 0.9}, {"target": "PTGS2", "score": 0.8}]}
+    calls = []
+    packed = pb.pack_prompt(payload, rows_key="rows", max_tokens=10_000, rank_col="score",
+                            annotate=lambda s, n: calls.append(n) or s)
+    assert packed.prompt == json.dumps(payload, ensure_ascii=False)
+    assert (packed.rows_in, packed.rows_kept, packed.tokens_dropped) == (2, 2, 0)
+    assert not packed.trimmed and not calls, "annotate only runs when rows are dropped"
+    assert packed.tokens_used <= packed.budget == 10_000
+    print("[ok] a prompt that fits is json.dumps of the payload, untouched")
+
+
+def _check_truncation(pb) -> None:
+    rows = [
+        {"id": "A", "score": 0.9},
+        {"id": "B", "score": 0.5, "note": "x" * 200},   # too big once A and C are in
+        {"id": "C", "score": 0.7},
+        {"id": "D", "score": "n/a"},                    # unscorable: ranked last
+    ]
+    payload = {"question": "q", "note": "all rows", "rows": rows}
+
+    def tok(row) -> int:  # one token per character, plus the ", " separator
+        return len(json.dumps(row, ensure_ascii=False)) + 1
+
+    base = len(json.dumps({**payload, "rows": pb._SPLICE}, ensure_ascii=False))
+    budget = base + tok(rows[0]) + tok(rows[2]) + tok(rows[3])
+
+    packed = pb.pack_prompt(payload, rows_key="rows", max_tokens=budget, rank_col="score",
+                            annotate=lambda s, n: {**s, "note": f"top {n} rows"})
+    kept = [rows[0], rows[2], rows[3]]
+    assert packed.prompt == json.dumps({**payload, "note": "top 3 rows", "rows": kept},
+                                       ensure_ascii=False)
+    assert (packed.rows_in, packed.rows_kept, packed.trimmed) == (4, 3, True)
+    assert packed.tokens_dropped == tok(rows[1])
+    assert packed.tokens_used == len(json.dumps({**payload, "note": "top 3 rows",
+                                                 "rows": pb._SPLICE}, ensure_ascii=False)) \
+        + tok(rows[0]) + tok(rows[2]) + tok(rows[3])
+    print("[ok] rank order A > C > B > D; B does not fit, the smaller D fills in; "
+          "annotate rewrites the count")
+
+    packed = pb.pack_prompt(payload, rows_key="rows", max_tokens=budget)
+    assert [r["id"] for r in json.loads(packed.prompt)["rows"]] == ["A", "C", "D"]
+    packed = pb.pack_prompt(payload, rows_key="rows", max_tokens=base + tok(rows[0]) + tok(rows[1]))
+    assert [r["id"] for r in json.loads(packed.prompt)["rows"]] == ["A", "B"], \
+        "without rank_col, list order"
+    packed = pb.pack_prompt(payload, rows_key="rows", max_tokens=1, rank_col="score")
+    assert [r["id"] for r in json.loads(packed.prompt)["rows"]] == ["A"]
+    assert packed.tokens_used > packed.budget, "the best row is kept even over budget"
+    empty = pb.pack_prompt({"question": "q", "rows": []}, rows_key="rows", max_tokens=1)
+    assert json.loads(empty.prompt) == {"question": "q", "rows": []} and empty.rows_kept == 0
+    print("[ok] list order without rank_col; best row always kept; empty row list")
+
+
+def main() -> int:
+    pb = _load_module()
+    saved = sys.modules.get("tiktoken")
+    try:
+        _check_count_tokens(pb)
+        _check_fits(pb)
+        _check_truncation(pb)
+    finally:
+        if saved is None:
+            sys.modules.pop("tiktoken", None)
+        else:
+            sys.modules["tiktoken"] = saved
+        pb._encoder.cache_clear()
+    print("\nPASS ✓  prompt budget")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""Local, Docker-free test for the on-disk join result cache.
+
+Loads _result_cache.py directly (polars + utils.dataframe_filtering only — no
+FastAPI, httpx or DB parquet needed) and checks the cache key (filter values
+are order- and duplicate-insensitive, plan lists are not), a put / get round
+trip with the FilterStat trace, the TTL, LRU eviction to the byte budget, the
+per-entry cap, and that a background ``put_later`` is held until it lands.
+
+Run:  python app/per_db_tool/test_result_cache.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # `utils` as the service image mounts it
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("result_cache_under_test",
+                                                  HERE / "_result_cache.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _check_keys(rc) -> None:
+    snap = ("v3", "2026-09-01")
+    plan = {"tables": ["drug", "target"], "joins": [{"l": "drug", "r": "target"}]}
+    key = rc.result_cache_key("ttd", snap, plan, ["drug_name", "target"],
+                              {"target": ["EGFR", "HER2"]})
+    assert key == rc.result_cache_key("ttd", snap, plan, ["target", "drug_name"],
+                                      {"target": ["HER2", "EGFR", "HER2"]})
+    print("[ok] filter values and output columns: order and duplicates ignored")
+
+    swapped = {"tables": ["target", "drug"], "joins": plan["joins"]}
+    assert key != rc.result_cache_key("ttd", snap, swapped, ["drug_name", "target"],
+                                      {"target": ["EGFR", "HER2"]})
+    assert key != rc.result_cache_key("ttd", ("v4", "2026-10-01"), plan, ["drug_name", "target"],
+                                      {"target": ["EGFR", "HER2"]})
+    assert key != rc.result_cache_key("ttd", snap, plan, ["drug_name", "target"],
+                                      {"target": ["EGFR"]})
+    print("[ok] plan list order, snapshot and filter membership change the key")
+
+
+def _frame(n: int) -> pl.DataFrame:
+    return pl.DataFrame({"drug_name": [f"drug-{i}" for i in range(n)],
+                         "target": ["EGFR"] * n})
+
+
+def _check_store(rc, root: Path) -> None:
+    from utils.dataframe_filtering import FilterStat
+
+    stats = [FilterStat(column="target", input_values=["EGFR"], rows_before=900,
+                        rows_after=50, table="target")]
+    cache = rc.ResultCache(root=str(root / "a"), max_bytes=10 ** 8, ttl_s=60)
+    assert cache.get("k1") is None
+    assert not cache.put("k1", pl.DataFrame(), stats), "empty results are not cached"
+    assert cache.put("k1", _frame(50), stats)
+    df, got = cache.get("k1")
+    assert df.equals(_frame(50)) and got == stats
+    assert (cache.hits, cache.misses, cache.writes) == (1, 1, 1)
+    print("[ok] put / get round trip keeps the frame and the FilterStat trace")
+
+    data = root / "a" / "k1.parquet"
+    old = time.time() - 120
+    os.utime(data, (old, old))
+    assert cache.get("k1") is None and not data.exists(), "expired entries are dropped"
+    print("[ok] TTL counts from the write")
+
+    one = _frame(2000)
+    probe = rc.ResultCache(root=str(root / "probe"), max_bytes=10 ** 8)
+    probe.put("p", one, stats)
+    size = sum(p.stat().st_size for p in (root / "probe").iterdir())
+    lru = rc.ResultCache(root=str(root / "b"), max_bytes=int(size * 2.5),
+                         max_entry_fraction=1.0)
+    for i, key in enumerate(("e0", "e1")):
+        lru.put(key, one, stats)
+        t = time.time() - 100 + i
+        os.utime(root / "b" / f"{key}.parquet", (t, t))
+    assert lru.get("e0") is not None  # e0 is now the most recently used
+    lru.put("e2", one, stats)
+    assert sorted(p.stem for p in (root / "b").glob("*.parquet")) == ["e0", "e2"]
+    assert lru.evictions == 1
+    print("[ok] eviction drops the least recently hit entry to fit the budget")
+
+    tiny = rc.ResultCache(root=str(root / "c"), max_bytes=int(size * 2.5),
+                          max_entry_fraction=0.1)
+    assert not tiny.put("big", one, stats) and not list((root / "c").iterdir())
+    print("[ok] entries over the per-entry share are not cached")
+
+
+async def _check_put_later(rc, root: Path) -> None:
+    cache = rc.ResultCache(root=str(root / "d"), max_bytes=10 ** 8)
+    task = cache.put_later("bg", _frame(10), [])
+    assert task in rc._PUTS, "a background write is referenced until it finishes"
+    assert await task is True
+    await asyncio.sleep(0)
+    assert task not in rc._PUTS and cache.get("bg") is not None
+    print("[ok] put_later writes off the loop and releases its task")
+
+
+def main() -> int:
+    rc = _load_module()
+    _check_keys(rc)
+    with tempfile.TemporaryDirectory() as tmp:
+        _check_store(rc, Path(tmp))
+        asyncio.run(_check_put_later(rc, Path(tmp)))
+    print("\nPASS ✓  result cache")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
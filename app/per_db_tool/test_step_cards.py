@@ -0,0 +1,162 @@
+"""Local, Docker-free test for step cards sent ahead of their LLM summary.
+
+schema_kg_chat.py needs FastAPI, the agents SDK and the model settings to
+import, so this pulls only the step-card functions (send_step_card and the
+helpers it calls) out of its source with ``ast`` and runs them against a
+stand-in LLM summariser and template builder, plus the real utils.tracing.
+Checks that template mode never calls the LLM, that async mode sends the
+whole card before the LLM answers and upgrades it with one ``tool_update``
+afterwards, that an upgrade returning the template text sends nothing, that
+explicit card text (the error card) is never upgraded, and that inline mode
+awaits the LLM before sending.
+
+Run:  python app/per_db_tool/test_step_cards.py
+"""
+from __future__ import annotations
+
+import ast
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # `utils` as the service image mounts it
+
+from utils import tracing  # noqa: E402
+
+_NAMES = {"STEP_SUMMARIZER_MODE", "STEP_SUMMARIZER_TIMEOUT_S", "_STEP_UPGRADES",
+          "_step_card_text", "_upgrade_step_card", "_schedule_step_upgrade", "send_step_card"}
+
+
+def _load_step_cards(llm: Callable) -> dict:
+    tree = ast.parse((HERE / "schema_kg_chat.py").read_text(encoding="utf-8"))
+    body, found = [], set()
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names = {node.name}
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = {t.id for t in targets if isinstance(t, ast.Name)}
+        else:
+            continue
+        if names & _NAMES:
+            body.append(node)
+            found |= names & _NAMES
+    assert found == _NAMES, f"step-card code moved: missing {_NAMES - found}"
+    ns = {
+        "asyncio": asyncio, "os": os, "Callable": Callable, "Optional": Optional,
+        "logger": logging.getLogger("test_step_cards"), "span": tracing.span,
+        "_build_step_data_text": lambda tool_name, summary: f"{tool_name}: {summary.get('row_count')} rows",
+        "_llm_summarize_step": llm,
+    }
+    exec(compile(ast.Module(body=body, type_ignores=[]), "schema_kg_chat.py", "exec"), ns)
+    return ns
+
+
+class _FakeLLM:
+    def __init__(self, delay: float = 0.0, text: Optional[str] = None):
+        self.delay = delay
+        self.text = text
+        self.calls = 0
+
+    async def __call__(self, tool_name: str, summary: dict, query: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.text if self.text is not None else f"{tool_name}: {summary.get('row_count')} rows"
+
+
+def _recorder():
+    events = []
+
+    async def send(ev: dict) -> None:
+        events.append((time.perf_counter(), ev))
+    return events, send
+
+
+async def _settle(ns: dict) -> None:
+    while ns["_STEP_UPGRADES"]:
+        await asyncio.gather(*list(ns["_STEP_UPGRADES"]))
+    await asyncio.sleep(0)
+
+
+async def _template_mode() -> None:
+    llm = _FakeLLM(text="Matched 12 rows for EGFR.")
+    ns = _load_step_cards(llm)
+    ns["STEP_SUMMARIZER_MODE"] = "template"
+    events, send = _recorder()
+    await ns["send_step_card"](send, "exec-1", "DB Execute", "execute", {"row_count": 12}, "egfr drugs")
+    await _settle(ns)
+    assert llm.calls == 0, "template mode never calls the LLM"
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result"]
+    assert events[1][1]["text"] == "execute: 12 rows"
+    print("[ok] template mode: card sent from the template, no LLM call")
+
+
+async def _async_mode() -> None:
+    llm = _FakeLLM(delay=0.3, text="Matched 12 rows for EGFR.")
+    ns = _load_step_cards(llm)
+    ns["STEP_SUMMARIZER_MODE"] = "async"
+    events, send = _recorder()
+    t0 = time.perf_counter()
+    await ns["send_step_card"](send, "exec-2", "DB Execute", "execute", {"row_count": 12}, "egfr drugs")
+    assert time.perf_counter() - t0 < 0.1, "the card does not wait for the LLM"
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result"]
+    assert events[1][1]["text"] == "execute: 12 rows"
+    await _settle(ns)
+    assert llm.calls == 1
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result", "tool_update"]
+    upd = events[-1][1]
+    assert upd == {"type": "tool_update", "tool_id": "exec-2", "name": "DB Execute",
+                   "text": "Matched 12 rows for EGFR."}
+    assert events[-1][0] - events[2][0] >= 0.25, "the upgrade arrives after the LLM answers"
+    assert 'kind="llm_offpath",stage="step_summary.execute"' in tracing.render_prometheus()
+    print("[ok] async mode: card sent before the LLM returns, upgraded by one tool_update")
+
+    events, send = _recorder()
+    ns["_llm_summarize_step"] = _FakeLLM(delay=0.05)  # falls back to the template text
+    await ns["send_step_card"](send, "exec-3", "DB Execute", "execute", {"row_count": 3}, "q")
+    await _settle(ns)
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result"]
+    print("[ok] an upgrade that returns the template text sends no tool_update")
+
+    events, send = _recorder()
+    calls = llm.calls
+    await ns["send_step_card"](send, "exec-4", "DB Execute", "execute", {}, "",
+                               ok=False, text="0 rows — No rows matched.")
+    await _settle(ns)
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result"]
+    assert events[1][1]["text"] == "0 rows — No rows matched." and events[2][1]["ok"] is False
+    assert llm.calls == calls
+    print("[ok] explicit card text (error card) is sent as is and never upgraded")
+
+
+async def _inline_mode() -> None:
+    llm = _FakeLLM(delay=0.05, text="Mapped the question to 2 tables.")
+    ns = _load_step_cards(llm)
+    ns["STEP_SUMMARIZER_MODE"] = "inline"
+    events, send = _recorder()
+    await ns["send_step_card"](send, "map-1", "Schema Mapper", "schema_mapper", {"row_count": 2}, "q")
+    await _settle(ns)
+    assert llm.calls == 1 and events[1][1]["text"] == "Mapped the question to 2 tables."
+    assert [e["type"] for _, e in events] == ["tool_called", "delta", "tool_result"]
+    print("[ok] inline mode: the LLM sentence is the card body, no upgrade")
+
+
+async def _run() -> None:
+    await _template_mode()
+    await _async_mode()
+    await _inline_mode()
+
+
+def main() -> int:
+    asyncio.run(_run())
+    print("\nPASS ✓  step cards")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
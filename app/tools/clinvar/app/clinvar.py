@@ -5,10 +5,16 @@ retry) is provided by the shared `app.per_db_tool.schema_kg_worker`. This module
 only injects ClinVar's identity + capability blurb. The original HTTP-pipeline
 worker is preserved at `clinvar.py.pre_schema_kg`.
 """
+import asyncio
 import re
+import threading
 from typing import Optional
 
 from config.schema import database_schemas
+from utils.genomic_index import (
+    DEFAULT_ASSEMBLY, GENOMIC_REGION_KEY, GenomicRegion, find_regions,
+    narrow_genomic_tables, normalise_assembly, normalise_chrom,
+)
 
 from app.per_db_tool import (
     setup_service_globals, SchemaKgConfig, make_schema_kg_handler,
@@ -686,6 +692,124 @@ def _sync_out_cols(ctx, sk_plan) -> None:
     ctx.out_cols = sorted(out_cols_set) + sorted(filter_only)
 
 
+# Genomic-region queries ("pathogenic variants in chr17:43,044,295-43,125,483",
+# "variants within the BRCA1 locus"). The mapper has no column for a range, so it
+# either drops the coordinates or binds the literal "17" / "43044295" to
+# chrom / pos. Deterministic backstop: parse the region(s) out of the question,
+# add variant_genomic_coords to the plan (joined on variant_id) and filter it
+# through the `genomic_region` overlap operator (utils.genomic_index), which the
+# pre_join hook answers from the interval index instead of a full scan.
+_GENE_LOCUS_RE = re.compile(
+    r"\b(?:within|inside|in|across|overlapping|spanning|at)\s+(?:the\s+)?"
+    r"(?P<gene>[A-Z][A-Z0-9-]{1,15})\s+(?:locus|gene\s+locus|region|gene\s+region|"
+    r"gene\s+body|interval|genomic\s+region)\b"
+)
+_ASSEMBLY_IN_QUERY_RE = re.compile(r"\b(GRCh3[78]|hg19|hg38)\b", re.IGNORECASE)
+_GENE_SPANS: dict = {}
+_GENE_SPANS_LOCK = threading.Lock()
+
+
+def _gene_spans(lf) -> dict:
+    """{gene symbol (lower): [(assembly, chrom, start, end)]} — the span of the
+    variants ClinVar annotates to exactly one gene, per assembly. Built once per
+    snapshot from variant_genomic_coords.gene_info ("BRCA1:672")."""
+    cached = _GENE_SPANS.get("spans")
+    if cached is not None and cached[0] is lf:
+        return cached[1]
+    with _GENE_SPANS_LOCK:
+        cached = _GENE_SPANS.get("spans")
+        if cached is not None and cached[0] is lf:
+            return cached[1]
+        import polars as pl
+        start = pl.col("pos").cast(pl.Int64, strict=False)
+        df = (lf.filter(pl.col("gene_info").is_not_null() & ~pl.col("gene_info").str.contains("|", literal=True))
+                .select(pl.col("assembly"), pl.col("chrom"),
+                        pl.col("gene_info").str.split(":").list.first().str.to_lowercase().alias("gene"),
+                        start.alias("start"),
+                        (start + pl.col("ref").str.len_chars().fill_null(1) - 1).alias("end"))
+                .drop_nulls()
+                .group_by(["gene", "assembly", "chrom"])
+                .agg(pl.col("start").min(), pl.col("end").max())
+                .collect())
+        spans: dict = {}
+        for gene, asm, chrom, lo, hi in df.iter_rows():
+            spans.setdefault(gene, []).append(
+                (normalise_assembly(asm) or asm, normalise_chrom(chrom), int(lo), int(hi)))
+        _GENE_SPANS["spans"] = (lf, spans)
+        return spans
+
+
+async def _query_regions(ctx, q: str) -> list:
+    regions = find_regions(q)
+    if regions:
+        return regions
+    m = _GENE_LOCUS_RE.search(q)
+    lf = ((ctx.data or {}).get("clinvar") or {}).get(_VGC)
+    if not m or lf is None:
+        return []
+    try:
+        spans = await asyncio.to_thread(_gene_spans, lf)
+    except Exception as e:
+        ctx.log.warning("[clinvar] gene span lookup failed: %s", e)
+        return []
+    build = _ASSEMBLY_IN_QUERY_RE.search(q)
+    assembly = normalise_assembly(build.group(1)) if build else DEFAULT_ASSEMBLY
+    return [GenomicRegion(asm, chrom, lo, hi)
+            for asm, chrom, lo, hi in spans.get(m.group("gene").lower(), [])
+            if asm == assembly]
+
+
+async def _apply_genomic_region(ctx, sk_plan) -> None:
+    q = (getattr(ctx.input, "cleaned_query", "") or "").strip()
+    regions = await _query_regions(ctx, q) if q else []
+    if not regions:
+        return
+    values = [str(r) for r in regions]
+    plan_tables = set(sk_plan.get("plan_tables") or set())
+    join_path = list(sk_plan.get("join_path") or [])
+    if _VGC not in plan_tables and plan_tables:
+        anchor = _VGA if _VGA in plan_tables else next(
+            (t for t in sorted(plan_tables) if t in _VARIANT_KEYED_TABLES), None)
+        if anchor is None:  # gene_master only — route through the variant hub
+            plan_tables.add(_VGA)
+            join_path.append((_GMT, _VGA, "gene_id"))
+            anchor = _VGA
+        join_path.append((anchor, _VGC, "variant_id"))
+    plan_tables.add(_VGC)
+    sk_plan["plan_tables"] = plan_tables
+    sk_plan["join_path"] = join_path
+    # The region replaces whatever literal chrom / pos the mapper lifted out of it.
+    for col_map in (sk_plan.get("filter_plan") or {}).values():
+        if isinstance(col_map, dict):
+            col_map.pop("chrom", None)
+            col_map.pop("pos", None)
+    for col in ("chrom", "pos"):
+        (sk_plan.get("parsed_value") or {}).pop(col, None)
+        if ctx.filter_val.get(col) and ctx.filter_val[col] != "requested":
+            ctx.filter_val[col] = None
+    out = sk_plan.setdefault("output_plan", {}).setdefault(_VGC, [])
+    out.extend(c for c in ("assembly", "chrom", "pos", "ref", "alt") if c not in out)
+    ctx.filter_val[GENOMIC_REGION_KEY] = values
+    ctx.log.info("[clinvar] genomic region filter: %s", values)
+
+
+async def _clinvar_pre_join(ctx) -> None:
+    """Answer a genomic_region filter from the interval index: swap the coords
+    table for its candidate rows (the overlap predicate still runs on them)."""
+    if not ctx.filter_val.get(GENOMIC_REGION_KEY):
+        return
+    try:
+        narrowed, sizes = await asyncio.to_thread(
+            narrow_genomic_tables, ctx.data, "clinvar", [_VGC], ctx.filter_val)
+    except Exception as e:
+        ctx.log.warning("[clinvar] genomic index narrowing skipped: %s", e)
+        return
+    if sizes:
+        ctx.narrow_for_join(narrowed)
+        for table, (total, kept) in sizes.items():
+            ctx.log.info("[clinvar] genomic index %s: %d → %d candidate rows", table, total, kept)
+
+
 async def _clinvar_narrow(ctx) -> None:
     sk_plan = (ctx.extras or {}).get("sk_plan")
     if not sk_plan:
@@ -698,6 +822,7 @@ async def _clinvar_narrow(ctx) -> None:
         # produced it (plain mapper filter, literal floor, or an override
         # above).
         _relax_unmatched_disease_terms(ctx, sk_plan)
+        await _apply_genomic_region(ctx, sk_plan)
         # Repair join connectivity BEFORE re-deriving out_cols: any hook above
         # (e.g. molecular_consequence pruning) may have orphaned a plan table by
         # dropping the only join edge that reached it. Restore FK-based edges so
@@ -787,6 +912,7 @@ _CLINVAR_CONFIG = SchemaKgConfig(
     capabilities=_CLINVAR_CAPABILITIES,
     limitations=_CLINVAR_LIMITATIONS,
     narrow=_clinvar_narrow,
+    pre_join=_clinvar_pre_join,
 )
 
 return_clinvar_result = make_schema_kg_handler(_CLINVAR_CONFIG)
@@ -0,0 +1,216 @@
+"""Local, Docker-free test for the genomic index.
+
+Builds a hand-placed variant_genomic_coords table (two assemblies, "chr"-
+prefixed, bare and aliased contigs, an indel and a 30 kb CNV, Utf8 columns
+exactly as the loader serves them) and checks region parsing and overlap /
+range / nearest queries against the rows worked out by hand, including a
+nearest query whose closest short interval starts far left of the region.
+A generated table then checks the same queries and index narrowing against
+the region predicate over the full table. Finally the ClinVar hooks run on a
+WorkerCtx: the narrow hook turns "variants in chr17:1,000-1,010" into a
+genomic_region filter, the pre_join hook hands the join the index-narrowed
+coords table (ctx.data stays the full snapshot) and join_and_filter_database
+returns the overlapping variants.
+
+The service part imports clinvar.py the way the image does (config,
+app.per_db_tool), so it needs the service requirements installed.
+
+Run:  python app/tools/clinvar/test_genomic_index.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import random
+import re
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[2]                                   # repo root
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]            # `config`, `utils` as in the image
+TABLE = "variant_genomic_coords_clinvar"
+
+#  id  assembly chrom  pos    ref          interval
+_ROWS = [
+    ("1", "GRCh38", "17", 1000, 1),       # [1000, 1000]
+    ("2", "GRCh38", "chr17", 1005, 5),    # [1005, 1009]
+    ("3", "GRCh38", "17", 1020, 1),       # [1020, 1020]
+    ("4", "GRCh38", "17", 500, 30000),    # [500, 30499]   long bin
+    ("5", "GRCh37", "17", 1003, 1),       # other assembly
+    ("6", "GRCh38", "X", 800, 3998),      # [800, 4797]    starts far left, ends close
+    ("7", "GRCh38", "X", 900, 1),
+    ("8", "GRCh38", "X", 950, 1),
+    ("9", "hg38", "chrX", 1000, 3999),    # [1000, 4998]
+]
+
+
+def _coords(rows) -> pl.LazyFrame:
+    return pl.DataFrame({
+        "variant_id": [r[0] for r in rows], "assembly": [r[1] for r in rows],
+        "chrom": [r[2] for r in rows], "pos": [str(r[3]) for r in rows],
+        "ref": ["A" * r[4] for r in rows], "alt": ["G"] * len(rows),
+    }).lazy()
+
+
+def _load_clinvar():
+    """clinvar.py as the image imports it, under its own package name."""
+    settings = (ROOT / "config" / "settings.py").read_text(encoding="utf-8")
+    for env_var in re.findall(r'"\w+":\s*\("(\w+)",\s*None\)', settings):
+        os.environ.setdefault(env_var, "test/model")  # required model settings
+    pkg = types.ModuleType("clinvar_app")
+    pkg.__path__ = [str(HERE / "app")]
+    sys.modules[pkg.__name__] = pkg
+    return importlib.import_module(f"{pkg.__name__}.clinvar")
+
+
+def _check_parsing(g) -> None:
+    R = g.GenomicRegion
+    assert g.parse_region("GRCh38:17:43044295-43125483") == R("GRCh38", "17", 43044295, 43125483)
+    assert g.parse_region("chr17:43,044,295") == R(None, "17", 43044295, 43044295)
+    assert g.parse_region("chrM:100-50") is None and g.parse_region("BRCA1") is None
+    assert g.find_regions("pathogenic variants in chr17:43,044,295–43,125,483") == \
+        [R("GRCh38", "17", 43044295, 43125483)]
+    assert g.find_regions("variants at hg19 chrX:100000 or 2:5000-6000") == \
+        [R("GRCh37", "X", 100000, 100000), R("GRCh37", "2", 5000, 6000)]
+    assert g.find_regions("a 1:2 ratio at 10:30") == []
+    assert str(R("GRCh38", "17", 5, 5)) == "GRCh38:17:5"
+    print("[ok] region parsing from structured values and free text")
+
+
+def _check_fixture(g) -> None:
+    served = _coords(_ROWS)
+    index = g.get_genomic_index(TABLE, served)
+    assert index is g.get_genomic_index(TABLE, served), "one build per snapshot"
+    assert index.n_rows == 9 and len(index._long_rows) == 1
+
+    R = g.GenomicRegion
+    ids = index.frame["variant_id"].to_numpy()
+
+    def got(rows) -> list:
+        return sorted(ids[rows].tolist())
+
+    assert got(index.overlap_rows(R("GRCh38", "17", 1008, 1010))) == ["2", "4"]
+    assert got(index.overlap_rows(R(None, "17", 1003, 1003))) == ["4", "5"]
+    assert got(index.overlap_rows(R("GRCh37", "17", 1, 900))) == []
+    assert got(index.range_rows(R("GRCh38", "17", 1000, 1020))) == ["1", "2", "3"]
+    print("[ok] overlap and range rows match the hand-placed intervals")
+
+    assert ids[index.nearest_rows(R("GRCh38", "17", 1012, 1012), k=4)].tolist() == \
+        ["4", "2", "3", "1"]                      # distances 0, 3, 8, 12
+    # The closest short intervals to X:5000 are 9 (2 bp) and 6 (203 bp); 6 starts
+    # left of 7 and 8 (4050 / 4100 bp away), outside the first k-wide window.
+    assert ids[index.nearest_rows(R("GRCh38", "X", 5000, 5000), k=2)].tolist() == ["9", "6"]
+    assert not len(index.nearest_rows(R("GRCh38", "22", 1, 1)))
+    print("[ok] nearest rows by distance, widened past the first window when needed")
+
+
+def _random_coords(n_rows: int, seed: int) -> pl.LazyFrame:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        kind = rng.random()
+        ref_len = 1 if kind < 0.8 else rng.randint(2, 40) if kind < 0.99 else rng.randint(200, 40000)
+        chrom = rng.choice(["1", "17", "X"])
+        rows.append((str(i), rng.choice(["GRCh38", "GRCh37"]),
+                     f"chr{chrom}" if rng.random() < 0.1 else chrom,
+                     rng.randint(1, 200_000), ref_len))
+    return _coords(rows)
+
+
+def _check_equivalence(g) -> None:
+    served = _random_coords(20_000, seed=0)
+    full = served.collect()
+    index = g.get_genomic_index(TABLE, served)
+    ids = index.frame["variant_id"].to_numpy()
+    fr = full.with_columns(pl.col("pos").cast(pl.Int64).alias("s"),
+                           (pl.col("pos").cast(pl.Int64) + pl.col("ref").str.len_chars() - 1).alias("e"))
+    R = g.GenomicRegion
+    rng = random.Random(1)
+    probes = []
+    for _ in range(30):
+        start = rng.randint(1, 200_000)
+        probes.append(R(rng.choice(["GRCh38", "GRCh37", None]), rng.choice(["1", "17", "X"]),
+                        start, start + rng.choice([0, 50, 5000])))
+    for region in probes:
+        want = set(full.filter(g.region_predicate(region, full.columns))["variant_id"].to_list())
+        assert set(ids[index.overlap_rows(region)]) == want, region
+        in_range = full.filter(g.region_predicate(region, ["assembly", "chrom", "pos"]))
+        assert set(ids[index.range_rows(region)]) == set(in_range["variant_id"].to_list()), region
+        contig = fr.filter(g.region_predicate(R(region.assembly, region.chrom, 1, 10**9), full.columns))
+        dist = np.maximum(0, np.maximum(contig["s"].to_numpy() - region.end,
+                                        region.start - contig["e"].to_numpy()))
+        near = index.nearest_rows(region, k=5)
+        assert np.array_equal(np.sort(index._distance(near, region)), np.sort(dist)[:5]), region
+    print(f"[ok] {len(probes)} generated regions: overlap / range / nearest == the predicate")
+
+    data = {"clinvar": {TABLE: served}}
+    for fv in ({g.GENOMIC_REGION_KEY: ["GRCh38:17:10000-12000"]},
+               {g.GENOMIC_REGION_KEY: ["1:5000", "GRCh37:X:10-40000"]},
+               {g.GENOMIC_REGION_KEY: ["not a region"]}):
+        narrowed, sizes = g.narrow_genomic_tables(data, "clinvar", [TABLE], fv)
+        regions = [r for r in map(g.parse_region, fv[g.GENOMIC_REGION_KEY]) if r]
+        if not regions:
+            assert narrowed is data and not sizes
+            continue
+        pred = pl.any_horizontal([g.region_predicate(r, full.columns) for r in regions])
+        assert narrowed["clinvar"][TABLE].filter(pred).collect().sort("variant_id").equals(
+            served.filter(pred).collect().sort("variant_id")), fv
+    assert data["clinvar"][TABLE] is served, "input snapshot must not be mutated"
+    print("[ok] index-narrowed table + predicate == full-table predicate")
+
+
+async def _check_service(clinvar) -> None:
+    from app.per_db_tool._orchestrator import WorkerCtx, _join_data
+    from config.guardrail import QueryInterpreterOutputGuardrail
+    from utils.dataframe_filtering import join_and_filter_database
+
+    served = _coords(_ROWS)
+    ctx = WorkerCtx(db="clinvar", display_name="ClinVar", connection_id=None,
+                    input=QueryInterpreterOutputGuardrail(
+                        cleaned_query="variants in chr17:1,000-1,010"),
+                    log=logging.getLogger("test_genomic_index"))
+    ctx.data = {"clinvar": {TABLE: served}}
+    ctx.filter_val = {"chrom": ["17"], "variant_id": "requested"}
+    sk_plan = {"plan_tables": {TABLE}, "join_path": [], "filter_plan": {TABLE: {"chrom": ["17"]}},
+               "parsed_value": {}, "output_plan": {}}
+    await clinvar._apply_genomic_region(ctx, sk_plan)
+    assert ctx.filter_val["genomic_region"] == ["GRCh38:17:1000-1010"]
+    assert ctx.filter_val["chrom"] is None and sk_plan["filter_plan"][TABLE] == {}
+    print("[ok] narrow hook: the region in the question becomes a genomic_region filter")
+
+    fq = "clinvar.variant_genomic_coords"
+    ctx.plan = {"tables": [fq], "parents": {fq: None}, "join_pairs": {},
+                "table_columns": {fq: ["variant_id", "assembly", "chrom", "pos", "ref"]}}
+    ctx.out_cols = ["variant_id", "chrom", "pos"]
+    ctx.filter_val = {k: v for k, v in ctx.filter_val.items() if v is not None}
+    await clinvar._clinvar_pre_join(ctx)
+    assert ctx.data["clinvar"][TABLE] is served, "ctx.data stays the full snapshot"
+    assert sorted(ctx.join_data["clinvar"][TABLE].collect()["variant_id"].to_list()) == \
+        ["1", "2", "4"]
+    with _join_data(ctx) as data:
+        ctx.df, ctx.filter_stats = join_and_filter_database(
+            data, ctx.plan, "clinvar", ctx.out_cols, ctx.filter_val)
+    assert ctx.join_data is None
+    assert sorted(ctx.df["variant_id"].to_list()) == ["1", "2", "4"]
+    print("[ok] pre_join: the join runs on the 3 overlapping rows, ctx.data untouched")
+
+
+def main() -> int:
+    g = importlib.import_module("utils.genomic_index")
+    _check_parsing(g)
+    _check_fixture(g)
+    _check_equivalence(g)
+    asyncio.run(_check_service(_load_clinvar()))
+    print("\nPASS ✓  genomic index")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,7 +3,6 @@ import logging
 import re
 
 import polars as pl
-import duckdb
 
 from utils.dataframe_loader import read_parquet_polars, strip_all_whitespace
 
@@ -102,6 +101,7 @@ def return_preprocessed_ctd() -> dict:
     # carries a `pubmed_count` column (window-aggregated per drug-gene pair).
     # The downstream rank machinery auto-picks it up.
     logger.info("[%s] loading chemical_gene_association via DuckDB view (pubmed_count)", tool)
+    import duckdb  # only the loader needs it; keeps it off the import path
     _con = duckdb.connect(":memory:")
     try:
         chemical_gene_association = _con.sql(_CTD_CHEM_GENE_VIEW_SQL).pl()
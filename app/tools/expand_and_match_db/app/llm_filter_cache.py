@@ -0,0 +1,221 @@
+"""
+Result cache for the unified LLM candidate filter.
+
+The same (db, field, term, candidate set) combinations recur constantly
+across users — "breast cancer" against the TTD disease pool, "EGFR" against
+the gene pool — and each one costs an LLM round-trip. The filter runs at
+temperature 0 on a closed whitelist, so its answer is treated as a pure
+function of its inputs and cached under
+
+    sha1(prompt fingerprint, model, db, field, normalised term, sorted candidates)
+
+The prompt fingerprint hashes the system prompt text plus
+LLM_FILTER_PROMPT_VERSION, so editing semantic_match_agent.md (or bumping
+the version after a prompt-format change in main.py) invalidates every entry
+without a manual flush. The term is NFKC-normalised and whitespace-collapsed
+but keeps its case, as the prompt does ("CAT" the gene and "cat" are judged
+differently); candidates are sorted, so the order the pre-screen emitted
+them in does not matter.
+
+Two tiers, like the semantic service's query cache:
+  * an in-process LRU (LLM_FILTER_CACHE_MAX_ENTRIES) per worker;
+  * Redis, shared by every worker and replica, TTL-bounded. Redis is
+    best-effort: any failure degrades to the local tier, never to an error.
+
+Each entry stores the kept candidates and the tokens the call that produced
+them spent, so a hit can report the tokens it saved. Failed LLM calls are
+never cached.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LLM_FILTER_CACHE = os.getenv("LLM_FILTER_CACHE", "1").lower() in {"1", "true", "yes"}
+LLM_FILTER_CACHE_MAX_ENTRIES = int(os.getenv("LLM_FILTER_CACHE_MAX_ENTRIES", "50000"))
+LLM_FILTER_CACHE_TTL = int(os.getenv("LLM_FILTER_CACHE_TTL", str(7 * 86400)))
+LLM_FILTER_CACHE_REDIS = os.getenv("LLM_FILTER_CACHE_REDIS", "1").lower() in {"1", "true", "yes"}
+LLM_FILTER_CACHE_REDIS_TIMEOUT = float(os.getenv("LLM_FILTER_CACHE_REDIS_TIMEOUT", "0.25"))
+# Bump when the way main.py phrases the filter request changes (the system
+# prompt file is already part of the fingerprint).
+LLM_FILTER_PROMPT_VERSION = "unified-filter-v1"
+
+
+def prompt_fingerprint(system_prompt: str) -> str:
+    raw = f"{LLM_FILTER_PROMPT_VERSION}\x00{system_prompt}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def normalise_term(term: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(term)).split())
+
+
+def filter_key(fingerprint: str, model: str, db: str, field: str, term: str,
+               candidates: Sequence[str]) -> str:
+    cands = sorted({c for c in candidates if isinstance(c, str)})
+    payload = json.dumps(
+        [fingerprint, model, (db or "").lower(), field, normalise_term(term), cands],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return f"biochirp:llmfilter:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+class LLMFilterCache:
+    """Two-tier (local LRU + Redis) cache of unified-LLM-filter results."""
+
+    def __init__(
+        self,
+        max_entries: int = LLM_FILTER_CACHE_MAX_ENTRIES,
+        ttl: int = LLM_FILTER_CACHE_TTL,
+        redis_client: Any = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._redis = redis_client
+        self._local: "OrderedDict[str, Tuple[List[str], int]]" = OrderedDict()
+        self._stats = {
+            "hits_local": 0, "hits_redis": 0, "misses": 0,
+            "saved_tokens": 0, "spent_tokens": 0,
+            "llm_calls": 0, "batched_calls": 0, "batched_jobs": 0,
+            "batch_fallbacks": 0, "redis_errors": 0,
+        }
+
+    # ── local tier ───────────────────────────────────────────────────────
+    def _local_get(self, key: str) -> Optional[Tuple[List[str], int]]:
+        item = self._local.get(key)
+        if item is not None:
+            self._local.move_to_end(key)
+        return item
+
+    def _local_put(self, key: str, value: Tuple[List[str], int]) -> None:
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    # ── lookups ──────────────────────────────────────────────────────────
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[List[str]]]:
+        """Kept candidates per key, or None on a miss (counts saved tokens on hits)."""
+        found: List[Optional[Tuple[List[str], int]]] = [self._local_get(k) for k in keys]
+        self._stats["hits_local"] += sum(v is not None for v in found)
+        missing = [i for i, v in enumerate(found) if v is None]
+        if missing and self._redis is not None:
+            try:
+                raws = await self._redis.mget([keys[i] for i in missing])
+            except Exception as e:
+                self._stats["redis_errors"] += 1
+                logger.warning("[llm filter cache] Redis MGET failed: %s", e)
+                raws = [None] * len(missing)
+            for i, raw in zip(missing, raws):
+                if not raw:
+                    continue
+                try:
+                    kept, tokens = json.loads(raw)
+                except Exception:
+                    continue
+                found[i] = (list(kept), int(tokens))
+                self._local_put(keys[i], found[i])
+                self._stats["hits_redis"] += 1
+        out: List[Optional[List[str]]] = []
+        for item in found:
+            if item is None:
+                self._stats["misses"] += 1
+                out.append(None)
+            else:
+                self._stats["saved_tokens"] += item[1]
+                out.append(list(item[0]))
+        return out
+
+    async def put_many(self, items: Sequence[Tuple[str, List[str], int]]) -> None:
+        """Store (key, kept, tokens_spent) results of successful LLM calls."""
+        if not items:
+            return
+        for key, kept, tokens in items:
+            self._local_put(key, (list(kept), int(tokens)))
+        if self._redis is None or self.ttl <= 0:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, kept, tokens in items:
+                pipe.setex(key, self.ttl, json.dumps([list(kept), int(tokens)], ensure_ascii=False))
+            await pipe.execute()
+        except Exception as e:
+            self._stats["redis_errors"] += 1
+            logger.warning("[llm filter cache] Redis SETEX failed: %s", e)
+
+    # ── accounting ───────────────────────────────────────────────────────
+    def record_call(self, tokens: int, jobs: int = 1) -> None:
+        self._stats["llm_calls"] += 1
+        self._stats["spent_tokens"] += int(tokens)
+        if jobs > 1:
+            self._stats["batched_calls"] += 1
+            self._stats["batched_jobs"] += jobs
+
+    def record_batch_fallback(self, jobs: int) -> None:
+        self._stats["batch_fallbacks"] += jobs
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        hits = s["hits_local"] + s["hits_redis"]
+        total = hits + s["misses"]
+        s["hit_ratio"] = round(hits / total, 4) if total else 0.0
+        s["local_entries"] = len(self._local)
+        s["redis"] = self._redis is not None
+        s["ttl"] = self.ttl
+        return s
+
+
+_llm_filter_cache: Optional[LLMFilterCache] = None
+
+
+async def _connect_redis() -> Any:
+    if not LLM_FILTER_CACHE_REDIS:
+        return None
+    try:
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis(
+            host=os.getenv("REDIS_HOST", "biochirp_redis_tool"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            socket_timeout=LLM_FILTER_CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=LLM_FILTER_CACHE_REDIS_TIMEOUT,
+        )
+        await client.ping()
+        return client
+    except Exception as e:
+        logger.warning("[llm filter cache] Redis unavailable (%s) — local tier only", e)
+        return None
+
+
+async def init_llm_filter_cache() -> Optional[LLMFilterCache]:
+    """Create the process-wide cache. Call from startup; None when disabled."""
+    global _llm_filter_cache
+    if not LLM_FILTER_CACHE:
+        logger.info("[llm filter cache] disabled (LLM_FILTER_CACHE=0)")
+        return None
+    _llm_filter_cache = LLMFilterCache(redis_client=await _connect_redis())
+    logger.info(
+        "[llm filter cache] ready: %d local entries, TTL %ds, redis=%s",
+        LLM_FILTER_CACHE_MAX_ENTRIES, LLM_FILTER_CACHE_TTL, _llm_filter_cache._redis is not None,
+    )
+    return _llm_filter_cache
+
+
+async def close_llm_filter_cache() -> None:
+    cache = _llm_filter_cache
+    if cache is not None and cache._redis is not None:
+        try:
+            await cache._redis.aclose()
+        except Exception:
+            pass
+
+
+def get_llm_filter_cache() -> Optional[LLMFilterCache]:
+    return _llm_filter_cache
@@ -12,7 +12,8 @@ from typing import Any, List, Optional, Union, Dict
 
 import httpx
 from fastapi import FastAPI, Query, HTTPException
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
+from utils.tracing import current_request_id, httpx_event_hooks, span, traced
 
 from config import settings  # repo-wide model SSOT (reads .env); never os.environ for models
 from config.settings import get_openrouter_key
@@ -21,6 +22,15 @@ from config.guardrail import (
     QueryInterpreterOutputGuardrail,
 )
 
+from .prescreen import rank_candidates
+from .llm_filter_cache import (
+    close_llm_filter_cache,
+    filter_key,
+    get_llm_filter_cache,
+    init_llm_filter_cache,
+    prompt_fingerprint,
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -58,8 +68,18 @@ UNIFIED_LLM_PROMPT_PATH = os.getenv(
 # Pre-screen cap. qwen2.5-coder:7b is ~2s on 30 candidates, ~5s on 60,
 # but jumps to ~57s on 100+ (context-attention cliff). Keep the per-(field,
 # user_term) candidate list at most this many items before sending to the
-# LLM; ranking is by difflib quick-ratio similarity to the user term.
+# LLM; ranking is by quick-ratio similarity to the user term, computed for the
+# whole pool at once on arrays (prescreen.py).
 UNIFIED_LLM_PRESCREEN_TOPK = int(os.getenv("UNIFIED_LLM_PRESCREEN_TOPK", "50"))
+# Batched filter: the (field, term, population) jobs of one request that miss
+# the result cache are packed into one structured prompt instead of one call
+# each. A batch is closed once it holds UNIFIED_LLM_BATCH_MAX_JOBS jobs or
+# UNIFIED_LLM_BATCH_MAX_CANDIDATES candidates in total — the same
+# context-attention cliff as above applies to the whole prompt. Jobs the
+# batched answer does not cover are retried one call each.
+UNIFIED_LLM_BATCH = os.getenv("UNIFIED_LLM_BATCH", "1") == "1"
+UNIFIED_LLM_BATCH_MAX_JOBS = int(os.getenv("UNIFIED_LLM_BATCH_MAX_JOBS", "8"))
+UNIFIED_LLM_BATCH_MAX_CANDIDATES = int(os.getenv("UNIFIED_LLM_BATCH_MAX_CANDIDATES", "120"))
 _UNIFIED_LLM_PROMPT: Optional[str] = None
 
 
@@ -159,7 +179,8 @@ async def get_http_client() -> httpx.AsyncClient:
     if _http_client is None or _http_client.is_closed:
         _http_client = httpx.AsyncClient(
             timeout=httpx.Timeout(SERVICE_TIMEOUT_SEC),
-            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            event_hooks=httpx_event_hooks(),
         )
         logger.info("Created shared HTTP client")
     
@@ -177,8 +198,9 @@ app = FastAPI(
 add_open_cors(app)
 @app.on_event("startup")
 async def startup_event():
-    """Pre-create HTTP client on startup."""
+    """Pre-create HTTP client and the LLM-filter result cache on startup."""
     await get_http_client()
+    await init_llm_filter_cache()
     logger.info("Expand and Match Database service started")
 
 
@@ -189,6 +211,7 @@ async def shutdown_event():
     if _http_client and not _http_client.is_closed:
         await _http_client.aclose()
         logger.info("Closed HTTP client")
+    await close_llm_filter_cache()
 
 
 def union_of_lists(
@@ -375,36 +398,11 @@ def _prescreen_candidates(
     term: str, candidates: List[str], top_k: int
 ) -> List[str]:
     """Rank candidates by character-level similarity to the user term and
-    return the top_k. Cheap stdlib-only pre-screen so the LLM only sees a
-    short, plausible list. Always includes any candidate that contains the
-    term as a substring (case-insensitive)."""
-    if not term or not candidates or top_k <= 0:
-        return list(candidates)[:top_k] if top_k > 0 else []
-    if len(candidates) <= top_k:
-        return list(candidates)
-    from difflib import SequenceMatcher
-    t = term.strip().lower()
-    t_tokens = set(t.split())
-    scored: List[tuple] = []
-    for c in candidates:
-        if not isinstance(c, str):
-            continue
-        c_lc = c.lower()
-        # Boost: substring containment in either direction
-        contains = 1.0 if (t in c_lc or c_lc in t) else 0.0
-        # Cheap quick_ratio (upper bound on real ratio, very fast)
-        sm = SequenceMatcher(None, t, c_lc)
-        qr = sm.quick_ratio()
-        # Token overlap as a secondary signal (cheap)
-        c_tokens = set(c_lc.split())
-        tok = (
-            len(t_tokens & c_tokens) / max(1, len(t_tokens | c_tokens))
-            if t_tokens else 0.0
-        )
-        score = contains * 2.0 + qr + 0.5 * tok
-        scored.append((score, c))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [c for _, c in scored[:top_k]]
+    return the top_k, so the LLM only sees a short, plausible list. Any
+    candidate that contains the term as a substring (case-insensitive) is
+    boosted above the rest. Scored for the whole pool in one vectorised call
+    (prescreen.rank_candidates) — thousands of candidates per term are cheap."""
+    return rank_candidates(term, candidates, top_k)
 
 
 def _parse_llm_list_output(text: str) -> List[str]:
@@ -451,6 +449,44 @@ def _filter_and_dedup_against_candidates(parsed: List[str], candidates: List[str
     return out
 
 
+@traced("llm_filter", kind="llm")
+async def _llm_filter_completion(
+    client: httpx.AsyncClient,
+    user_prompt: str,
+    model_override: Optional[str] = None,
+    db_name: str = "",
+    max_tokens: int = 2000,
+) -> tuple:
+    """POST one filter prompt to the chat-completions endpoint.
+
+    Returns (content, total_tokens); raises on transport/HTTP errors so the
+    caller decides how a failure is reported (and that it is not cached).
+    """
+    body = {
+        "model": model_override or UNIFIED_LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": _load_unified_llm_prompt()},
+            {"role": "user", "content": user_prompt},
+        ],
+        "temperature": 0,
+        "max_tokens": max_tokens,
+    }
+    resp = await client.post(
+        f"{OPENROUTER_BASE_URL}/chat/completions",
+        json=body,
+        headers={"Authorization": f"Bearer {get_openrouter_key(db_name)}"},
+        timeout=LLM_FILTER_TIMEOUT,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    content = (data.get("choices") or [{}])[0].get("message", {}).get("content", "")
+    usage = data.get("usage") or {}
+    tokens = usage.get("total_tokens") or (
+        (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+    )
+    return content, int(tokens or 0)
+
+
 async def _call_unified_llm_filter_direct(
     client: httpx.AsyncClient,
     field_name: str,
@@ -459,53 +495,226 @@ async def _call_unified_llm_filter_direct(
     request_id: str,
     model_override: Optional[str] = None,
     db_name: str = "",
-) -> List[str]:
+) -> Optional[tuple]:
     """Call LiteLLM directly with the local filter model, bypassing the
     `llm_member_filter` ensemble service (Grok + Semantic + paid fallback).
     For the unified path the candidate list is already a deduped union of
     fuzzy + semantic + synonyms — a single local-model pass is enough.
 
+    Returns (kept_candidates, total_tokens), or None when the call failed —
+    the caller treats that as "nothing kept" and does not cache it.
+
     No per-DB LLM rule is injected here: this unified candidate filter judges
     semantic/fuzzy/synonym candidates and is deliberately left rule-free. The
     per-DB `tiebreaker` rule belongs to the dual-mapper disagreement resolver in
     the schema_mapper service, not this filter.
     """
     if not candidates:
-        return []
-    system_prompt = _load_unified_llm_prompt()
+        return [], 0
     user_prompt = (
         f"Category: {field_name}, Term: {single_term}, "
         f"List of Strings: {list(candidates)}"
     )
-    body = {
-        "model": model_override or UNIFIED_LLM_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        "temperature": 0,
-        "max_tokens": 2000,
-    }
     try:
-        resp = await client.post(
-            f"{OPENROUTER_BASE_URL}/chat/completions",
-            json=body,
-            headers={"Authorization": f"Bearer {get_openrouter_key(db_name)}"},
-            timeout=LLM_FILTER_TIMEOUT,
+        content, tokens = await _llm_filter_completion(
+            client, user_prompt, model_override=model_override, db_name=db_name,
         )
-        resp.raise_for_status()
-        data = resp.json()
-        content = (data.get("choices") or [{}])[0].get("message", {}).get("content", "")
         parsed = _parse_llm_list_output(content)
         # Post-filter: keep only items that exist in the original candidate list
         # (case-insensitive). Prevents the model from inventing strings.
-        return _filter_and_dedup_against_candidates(parsed, candidates)
+        return _filter_and_dedup_against_candidates(parsed, candidates), tokens
     except Exception as e:
         logger.warning(
             f"[{request_id}] [UNIFIED-LLM-DIRECT] field={field_name} "
             f"term='{single_term}' failed: {e!r}"
         )
-        return []
+        return None
+
+
+def _parse_llm_dict_output(text: str) -> Dict[str, Any]:
+    """Parse a batched LLM response ({"t0": [...], ...}). Tolerates code
+    fences, <think> blocks and prose around the outermost JSON object."""
+    import re as _re
+    if not text:
+        return {}
+    cleaned = _re.sub(r"<think>.*?</think>", "", text, flags=_re.DOTALL).strip()
+    cleaned = _re.sub(r"^```(?:json|python)?\s*", "", cleaned)
+    cleaned = _re.sub(r"\s*```$", "", cleaned).strip()
+    lo, hi = cleaned.find("{"), cleaned.rfind("}")
+    if lo < 0 or hi <= lo:
+        return {}
+    try:
+        out = json.loads(cleaned[lo:hi + 1])
+    except Exception:
+        return {}
+    return out if isinstance(out, dict) else {}
+
+
+async def _call_unified_llm_filter_batch(
+    client: httpx.AsyncClient,
+    batch: List[tuple],
+    request_id: str,
+    model_override: Optional[str] = None,
+    db_name: str = "",
+) -> tuple:
+    """Filter several (field, term, candidates) jobs with ONE LLM call.
+
+    Each job becomes an independent task of a structured prompt under the
+    same system prompt; the model answers with a JSON object keyed by task
+    id. Returns ([kept | None per job], total_tokens); None marks a job the
+    answer did not cover (missing id, non-list value, or the whole call
+    failed) — the caller retries those one call each.
+    """
+    tasks = [
+        {"id": f"t{i}", "Category": field, "Term": term, "List of Strings": list(cands)}
+        for i, (field, term, cands) in enumerate(batch)
+    ]
+    user_prompt = (
+        f"BATCH MODE: {len(tasks)} independent tasks follow. Apply the rules "
+        f"above to each task on its own — its Category, its Term and only its "
+        f"List of Strings. Return ONLY one JSON object mapping every task id "
+        f"to that task's JSON list of matches (use [] when nothing matches), "
+        f'e.g. {{"t0": ["..."], "t1": []}}.\n'
+        f"Tasks: {json.dumps(tasks, ensure_ascii=False)}"
+    )
+    max_tokens = min(8000, 2000 + 500 * (len(batch) - 1))
+    try:
+        content, tokens = await _llm_filter_completion(
+            client, user_prompt, model_override=model_override, db_name=db_name,
+            max_tokens=max_tokens,
+        )
+    except Exception as e:
+        logger.warning(
+            f"[{request_id}] [UNIFIED-LLM-BATCH] {len(batch)} jobs failed: {e!r}"
+        )
+        return [None] * len(batch), 0
+    answer = _parse_llm_dict_output(content)
+    out: List[Optional[List[str]]] = []
+    for i, (_, _, cands) in enumerate(batch):
+        items = answer.get(f"t{i}")
+        if isinstance(items, list):
+            out.append(_filter_and_dedup_against_candidates(items, cands))
+        else:
+            out.append(None)
+    return out, tokens
+
+
+def _pack_filter_batches(jobs: List[tuple]) -> List[List[int]]:
+    """Greedy first-fit of job indices into batches bounded by
+    UNIFIED_LLM_BATCH_MAX_JOBS and UNIFIED_LLM_BATCH_MAX_CANDIDATES."""
+    batches: List[List[int]] = []
+    sizes: List[int] = []
+    max_jobs = max(1, UNIFIED_LLM_BATCH_MAX_JOBS)
+    for i in sorted(range(len(jobs)), key=lambda j: -len(jobs[j][2])):
+        n = len(jobs[i][2])
+        for b, members in enumerate(batches):
+            if len(members) < max_jobs and sizes[b] + n <= UNIFIED_LLM_BATCH_MAX_CANDIDATES:
+                members.append(i)
+                sizes[b] += n
+                break
+        else:
+            batches.append([i])
+            sizes.append(n)
+    return [sorted(b) for b in batches]
+
+
+async def _run_unified_llm_filter_jobs(
+    client: httpx.AsyncClient,
+    jobs: List[tuple],
+    request_id: str,
+    db_name: str = "",
+) -> List[List[str]]:
+    """Kept candidates for every (field, term, candidates) job.
+
+    Cache hits are answered without an LLM call; identical jobs within the
+    request share one answer; the remaining misses are packed into batched
+    prompts (UNIFIED_LLM_BATCH) with per-job retries for anything a batch
+    left unanswered. Successful answers are written back to the cache.
+    """
+    cache = get_llm_filter_cache()
+    fingerprint = prompt_fingerprint(_load_unified_llm_prompt())
+    keys = [filter_key(fingerprint, UNIFIED_LLM_MODEL, db_name, f, t, c) for f, t, c in jobs]
+
+    unique: Dict[str, int] = {}
+    for i, k in enumerate(keys):
+        unique.setdefault(k, i)
+    uniq_keys = list(unique)
+    cached = await cache.get_many(uniq_keys) if cache else [None] * len(uniq_keys)
+    answers: Dict[str, List[str]] = {
+        k: v for k, v in zip(uniq_keys, cached) if v is not None
+    }
+    todo = [unique[k] for k in uniq_keys if k not in answers]
+    if answers:
+        logger.info(
+            f"[{request_id}] [UNIFIED-LLM] cache: {len(answers)}/{len(uniq_keys)} "
+            f"jobs answered without an LLM call"
+        )
+
+    sem = asyncio.Semaphore(max(1, LLM_FILTER_MAX_CONCURRENCY))
+    fresh: List[tuple] = []
+
+    async def _single(i: int) -> None:
+        field, term, cands = jobs[i]
+        async with sem:
+            res = await _call_unified_llm_filter_direct(
+                client, field, term, cands, request_id, db_name=db_name,
+            )
+        if res is None:
+            answers[keys[i]] = []
+            return
+        kept, tokens = res
+        answers[keys[i]] = kept
+        fresh.append((keys[i], kept, tokens))
+        if cache:
+            cache.record_call(tokens)
+
+    async def _batched(members: List[int]) -> None:
+        async with sem:
+            outs, tokens = await _call_unified_llm_filter_batch(
+                client, [jobs[i] for i in members], request_id, db_name=db_name,
+            )
+        # Attribute the call's tokens to its jobs by candidate share, so a
+        # later single-job hit reports a sensible saving.
+        weights = [len(jobs[i][2]) + 1 for i in members]
+        total_w = sum(weights)
+        retry = []
+        for i, kept, w in zip(members, outs, weights):
+            if kept is None:
+                retry.append(i)
+                continue
+            answers[keys[i]] = kept
+            fresh.append((keys[i], kept, round(tokens * w / total_w)))
+        if cache:
+            cache.record_call(tokens, jobs=len(members))
+            if retry:
+                cache.record_batch_fallback(len(retry))
+        if retry:
+            logger.info(
+                f"[{request_id}] [UNIFIED-LLM-BATCH] {len(retry)}/{len(members)} "
+                f"jobs unanswered — retrying one call each"
+            )
+            await asyncio.gather(*(_single(i) for i in retry))
+
+    if todo:
+        if UNIFIED_LLM_BATCH and len(todo) > 1:
+            groups = [[todo[j] for j in b] for b in _pack_filter_batches([jobs[i] for i in todo])]
+        else:
+            groups = [[i] for i in todo]
+        logger.info(
+            f"[{request_id}] [UNIFIED-LLM] running {len(groups)} LLM filter calls "
+            f"for {len(todo)} jobs across {len({jobs[i][0] for i in todo})} fields"
+        )
+        results = await asyncio.gather(
+            *(_single(g[0]) if len(g) == 1 else _batched(g) for g in groups),
+            return_exceptions=True,
+        )
+        for res in results:
+            if isinstance(res, Exception):
+                logger.warning(f"[{request_id}] [UNIFIED-LLM] filter task exception: {res!r}")
+        if cache:
+            await cache.put_many(fresh)
+
+    return [answers.get(k, []) for k in keys]
 
 
 async def _apply_unified_llm_filter(
@@ -525,23 +734,17 @@ async def _apply_unified_llm_filter(
                      not pass the fuzzy threshold). Conceptually similar; LLM
                      checks for true synonymy.
 
-    Both populations run concurrently inside one asyncio.gather. Results for
-    the same field are merged into a single bucket — the caller sees one list.
-    When fuzzy_outputs is absent or empty (e.g. KB-only queries), all candidates
-    land in Population B and a single job per (field, term) is created.
+    Jobs for both populations go through _run_unified_llm_filter_jobs: cache
+    hits skip the LLM, and the misses of every field are packed into batched
+    prompts that run concurrently. Results for the same field are merged into
+    a single bucket — the caller sees one list. When fuzzy_outputs is absent
+    or empty (e.g. KB-only queries), all candidates land in Population B and a
+    single job per (field, term) is created.
 
     KB_ONLY_FIELDS (drug/gene) are never present in combined_member at this
     point — they were separated into kb_direct before this call.
     Structured fields (IDs, enums) are skipped as before.
     """
-    sem = asyncio.Semaphore(max(1, LLM_FILTER_MAX_CONCURRENCY))
-
-    async def _filtered_call(field: str, term: str, candidates: List[str]) -> List[str]:
-        async with sem:
-            return await _call_unified_llm_filter_direct(
-                client, field, term, candidates, request_id, db_name=db_name,
-            )
-
     # Pre-build lowercase fuzzy candidate sets per field for O(1) membership checks.
     fuzzy_sets: Dict[str, set] = {}
     if fuzzy_outputs:
@@ -609,28 +812,13 @@ async def _apply_unified_llm_filter(
         logger.info(f"[{request_id}] [UNIFIED-LLM] no fields to filter")
         return combined_member
 
-    logger.info(
-        f"[{request_id}] [UNIFIED-LLM] running {len(jobs)} LLM filter calls "
-        f"across {len({f for f, _, _ in jobs})} fields"
-    )
-
-    results = await asyncio.gather(
-        *(_filtered_call(f, t, c) for (f, t, c) in jobs),
-        return_exceptions=True,
-    )
+    results = await _run_unified_llm_filter_jobs(client, jobs, request_id, db_name=db_name)
 
     # Bucket results per field, dedupe (case-insensitive, preserving lower-case form).
     per_field: Dict[str, set] = {}
+    # _run_unified_llm_filter_jobs never raises per job: a failed call comes
+    # back as [], and exact-match recovery below still runs for it.
     for (field, term, candidates_for_job), res in zip(jobs, results):
-        if isinstance(res, Exception):
-            logger.warning(
-                f"[{request_id}] [UNIFIED-LLM] field={field} term='{term}' "
-                f"exception: {res}"
-            )
-            # Don't skip exact-match recovery just because the LLM call failed.
-            res = []
-        if not isinstance(res, list):
-            res = []
         bucket = per_field.setdefault(field, set())
         for item in res:
             if isinstance(item, str) and item.strip():
@@ -683,8 +871,9 @@ async def call_service(
         logger.info(f"[{request_id}] [{label.upper()}] POST {url} params={params}")
 
         call_timeout = httpx.Timeout(timeout) if timeout is not None else None
-        resp = await client.post(url, params=params, json=body, timeout=call_timeout)
-        resp.raise_for_status()
+        with span(label.lower(), kind="service"):
+            resp = await client.post(url, params=params, json=body, timeout=call_timeout)
+            resp.raise_for_status()
         
         data = resp.json()
         
@@ -748,7 +937,15 @@ def root():
     return {"message": "Expand and Match Database service tool is running"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit ratio, saved tokens and batching counters of the LLM-filter cache."""
+    cache = get_llm_filter_cache()
+    return {"enabled": cache is not None, **(cache.stats() if cache else {})}
+
+
 add_health_endpoint(app)
+add_tracing(app, "expand_and_match_db")
 @app.post("/expand_and_match_db", response_model=ExpandMemberOutput)
 async def expand_and_match_db(
     input: QueryInterpreterOutputGuardrail,
@@ -772,7 +969,7 @@ async def expand_and_match_db(
         ExpandMemberOutput with combined results from all services
     """
     tool = "expand_and_match_db"
-    request_id = str(uuid.uuid4())
+    request_id = current_request_id() or str(uuid.uuid4())
     overall_start = time.perf_counter()
 
     logger.info(f"[{tool}][{request_id}] [START] database={database}")
@@ -0,0 +1,87 @@
+"""
+Vectorised candidate pre-screen for the unified LLM filter.
+
+Ranks every candidate of one (field, user_term) pool in a single call and
+returns the top_k the LLM gets to see. The score is the one the original
+per-candidate loop computed with a `difflib.SequenceMatcher` each:
+
+    score = 2.0 * contains + quick_ratio + 0.5 * token_jaccard
+
+  contains      — term ⊂ candidate or candidate ⊂ term (case-insensitive)
+  quick_ratio   — difflib's quick_ratio: 2·Σ_ch min(cnt_term, cnt_cand) / (|t|+|c|)
+  token_jaccard — |T ∩ C| / |T ∪ C| over whitespace tokens
+
+computed on arrays instead: the candidates are laid out as one flat
+code-point array with a segment id per character, so each of the term's
+distinct characters costs one `bincount` over all candidates, and each term
+token one membership pass over the candidates' token sets. Scores are
+bit-identical to the difflib loop and ties keep input order (stable sort), so
+the top-k set is unchanged — see test_prescreen.py for the equivalence check.
+"""
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Any, List, Sequence
+
+import numpy as np
+
+
+def _codepoints(s: str) -> np.ndarray:
+    return np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32)
+
+
+def prescreen_scores(term: str, candidates_lc: Sequence[str]) -> np.ndarray:
+    """Legacy prescreen score for every (already lower-cased) candidate."""
+    n = len(candidates_lc)
+    t = term.strip().lower()
+
+    # ── containment: term ⊂ candidate | candidate ⊂ term (C-level map) ───
+    contains = (
+        np.fromiter(map(str.__contains__, candidates_lc, repeat(t)), dtype=bool, count=n)
+        | np.fromiter(map(t.__contains__, candidates_lc), dtype=bool, count=n)
+    )
+
+    # ── quick_ratio: per-character multiset intersection ─────────────────
+    lengths = np.fromiter(map(len, candidates_lc), dtype=np.int64, count=n)
+    codes = _codepoints("".join(candidates_lc))
+    seg = np.repeat(np.arange(n, dtype=np.int64), lengths)
+    matches = np.zeros(n, dtype=np.int64)
+    if t:
+        t_chars, t_counts = np.unique(_codepoints(t), return_counts=True)
+        for ch, cnt in zip(t_chars, t_counts):
+            per_cand = np.bincount(seg[codes == ch], minlength=n)
+            matches += np.minimum(per_cand, cnt)
+    total = lengths + len(t)
+    quick = np.where(total > 0, 2.0 * matches / np.maximum(total, 1), 1.0)
+
+    # ── token Jaccard over distinct whitespace tokens ─────────────────────
+    t_tokens = set(t.split())
+    tok = np.zeros(n, dtype=np.float64)
+    if t_tokens:
+        c_sets = list(map(set, map(str.split, candidates_lc)))
+        c_size = np.fromiter(map(len, c_sets), dtype=np.int64, count=n)
+        inter = np.zeros(n, dtype=np.int64)
+        for w in t_tokens:
+            inter += np.fromiter(map(set.__contains__, c_sets, repeat(w)), dtype=bool, count=n)
+        union = len(t_tokens) + c_size - inter
+        tok = inter / np.maximum(1, union)
+
+    return contains * 2.0 + quick + 0.5 * tok
+
+
+def rank_candidates(term: str, candidates: Sequence[Any], top_k: int) -> List[str]:
+    """Top_k candidates by prescreen score (ties keep input order).
+
+    Non-string candidates are dropped, as in the original loop; pools that
+    already fit in top_k are returned untouched.
+    """
+    if not term or not candidates or top_k <= 0:
+        return list(candidates)[:top_k] if top_k > 0 else []
+    if len(candidates) <= top_k:
+        return list(candidates)
+    pool = [c for c in candidates if isinstance(c, str)]
+    if not pool:
+        return []
+    scores = prescreen_scores(term, [c.lower() for c in pool])
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [pool[i] for i in order]
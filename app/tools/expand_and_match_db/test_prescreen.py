@@ -0,0 +1,180 @@
+"""Local, Docker-free test for the LLM prescreen.
+
+Loads prescreen.py directly and checks prescreen_scores() / rank_candidates()
+against hand-computed scores on a small pool (containment, character overlap,
+token Jaccard, ties, non-string junk), then against the original
+per-candidate difflib loop it replaced on larger generated pools. Finally
+drives the service entry point, main._apply_unified_llm_filter, with the LLM
+call replaced by a recorder: the LLM sees each population cut to the
+prescreen's top_k in score order, and an exact match it drops is recovered.
+
+The entry-point part imports the service (FastAPI, httpx, config) the way
+the image does, so it needs requirements.txt installed.
+
+Run:  python app/tools/expand_and_match_db/test_prescreen.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import random
+import sys
+import types
+from difflib import SequenceMatcher
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[2]                      # repo root
+
+
+def _load_prescreen_module():
+    spec = importlib.util.spec_from_file_location("prescreen_under_test",
+                                                  HERE / "app" / "prescreen.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _load_service():
+    """Import app/main.py as the service image does (`config`, `utils` on the path)."""
+    sys.path[:0] = [str(ROOT), str(ROOT / "app")]
+    os.environ.setdefault("UNIFIED_LLM_MODEL", "test/unified-llm")
+    # `app` would resolve to the repo's app/ package; load this service's
+    # app/ under its own name so the relative imports in main.py still work
+    pkg = types.ModuleType("expand_and_match_db_app")
+    pkg.__path__ = [str(HERE / "app")]
+    sys.modules[pkg.__name__] = pkg
+    return importlib.import_module(f"{pkg.__name__}.main")
+
+
+def legacy_prescreen(term, candidates, top_k):
+    """The difflib loop _prescreen_candidates() ran before vectorisation."""
+    if not term or not candidates or top_k <= 0:
+        return list(candidates)[:top_k] if top_k > 0 else []
+    if len(candidates) <= top_k:
+        return list(candidates)
+    t = term.strip().lower()
+    t_tokens = set(t.split())
+    scored = []
+    for c in candidates:
+        if not isinstance(c, str):
+            continue
+        c_lc = c.lower()
+        contains = 1.0 if (t in c_lc or c_lc in t) else 0.0
+        qr = SequenceMatcher(None, t, c_lc).quick_ratio()
+        c_tokens = set(c_lc.split())
+        tok = (len(t_tokens & c_tokens) / max(1, len(t_tokens | c_tokens))
+               if t_tokens else 0.0)
+        scored.append((contains * 2.0 + qr + 0.5 * tok, c))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [c for _, c in scored[:top_k]]
+
+
+# "breast cancer" (13 chars) against each candidate:
+#   score = 2·contains + 2·matched_chars / (13 + len) + 0.5·token_jaccard
+_POOL = ["lung cancer", "EGFR", "Breast Cancer", 42, "breast carcinoma", "cancer",
+         None, "metastatic breast cancer", "Cancer of the breast"]
+_SCORES = {
+    "lung cancer": 14 / 24 + 0.5 * 1 / 3,
+    "egfr": 4 / 17,                                    # shares e and r only
+    "breast cancer": 2.0 + 1.0 + 0.5,
+    "breast carcinoma": 24 / 29 + 0.5 * 1 / 3,
+    "cancer": 2.0 + 12 / 19 + 0.5 * 1 / 2,
+    "metastatic breast cancer": 2.0 + 26 / 37 + 0.5 * 2 / 3,
+    "cancer of the breast": 26 / 33 + 0.5 * 2 / 4,
+}
+_RANKED = ["Breast Cancer", "metastatic breast cancer", "cancer", "Cancer of the breast",
+           "breast carcinoma", "lung cancer", "EGFR"]
+
+
+def _check_fixture(ps) -> None:
+    strings = [c for c in _POOL if isinstance(c, str)]
+    got = ps.prescreen_scores("breast cancer", [c.lower() for c in strings])
+    for c, s in zip(strings, got):
+        assert abs(s - _SCORES[c.lower()]) < 1e-12, (c, s, _SCORES[c.lower()])
+    print("[ok] scores match the hand-computed containment + overlap + Jaccard values")
+
+    assert ps.rank_candidates("breast cancer", _POOL, 3) == _RANKED[:3]
+    assert ps.rank_candidates("  Breast CANCER ", _POOL, 7) == _RANKED
+    print("[ok] top_k in score order, term case and padding ignored, non-strings dropped")
+
+    assert ps.rank_candidates("breast cancer", _POOL, len(_POOL)) == _POOL
+    assert ps.rank_candidates("", _POOL, 2) == _POOL[:2]
+    assert ps.rank_candidates("breast cancer", _POOL, 0) == []
+    print("[ok] pools that fit, an empty term and top_k=0 bypass scoring")
+
+    tied = ["ab", "ba", "xx", "ab"]
+    assert ps.rank_candidates("ab", tied, 3) == ["ab", "ab", "ba"]
+    print("[ok] ties keep input order")
+
+
+_WORDS = ["breast", "cancer", "carcinoma", "lung", "non-small", "cell", "EGFR",
+          "receptor", "kinase", "inhibitor", "imatinib", "mesylate", "type", "2",
+          "diabetes", "mellitus", "Alzheimer", "disease", "familial", "HER2",
+          "positive", "metastatic", "Müllerian", "β-thalassemia", "α1"]
+
+
+def _pool(rng, n):
+    pool = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 5))) for _ in range(n)]
+    pool += ["Breast Cancer", "breast cancer", "", "  ", "cancer", None, 42, "EGFR"]
+    rng.shuffle(pool)
+    return pool
+
+
+def _check_equivalence(ps) -> None:
+    rng = random.Random(0)
+    terms = ["breast cancer", "EGFR", "Imatinib", "type 2 diabetes", "β-thalassemia",
+             "  lung  ", "x", "metastatic HER2-positive breast carcinoma"]
+    cases = 0
+    for term in terms:
+        for n in (5, 60, 400):
+            pool = _pool(rng, n)
+            for k in (1, 10, 50):
+                want = legacy_prescreen(term, pool, k)
+                got = ps.rank_candidates(term, pool, k)
+                assert got == want, (term, n, k, got[:5], want[:5])
+                cases += 1
+    print(f"[ok] {cases} generated (term, pool, k) cases: same top-k as the difflib loop")
+
+
+async def _check_service(main) -> None:
+    seen = []
+
+    async def fake_jobs(client, jobs, request_id, db_name=""):
+        seen.extend(jobs)
+        # the LLM keeps the fuzzy candidate and drops the exact match
+        return [["metastatic breast cancer"] if cands and "metastatic breast cancer" in cands
+                else [] for _, _, cands in jobs]
+
+    main._run_unified_llm_filter_jobs = fake_jobs
+    main.UNIFIED_LLM_PRESCREEN_TOPK = 3
+    combined = {"disease_name": [c for c in _POOL if isinstance(c, str)] + ["Breast Cancer"],
+                "gene_id": ["1956", "2064"]}
+    out = await main._apply_unified_llm_filter(
+        None, combined, {"disease_name": ["breast cancer"], "gene_id": ["1956"]}, "req-1",
+        fuzzy_outputs={"disease_name": ["Metastatic Breast Cancer", "lung cancer"]},
+    )
+    assert [(f, t, c) for f, t, c in seen] == [
+        ("disease_name", "breast cancer", ["lung cancer", "metastatic breast cancer"]),
+        ("disease_name", "breast cancer", ["Breast Cancer", "Breast Cancer", "cancer"]),
+    ], seen
+    print("[ok] entry point: a pool within top_k goes through as is, a larger one is "
+          "cut to its top_k in score order")
+    assert out["disease_name"] == ["breast cancer", "metastatic breast cancer"], out
+    assert out["gene_id"] == ["1956", "2064"], "*_id fields bypass the LLM filter"
+    print("[ok] entry point: the dropped exact match is recovered, *_id fields untouched")
+
+
+def main() -> int:
+    ps = _load_prescreen_module()
+    _check_fixture(ps)
+    _check_equivalence(ps)
+    asyncio.run(_check_service(_load_service()))
+    print("\nPASS ✓  vectorised prescreen")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
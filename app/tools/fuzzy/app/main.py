@@ -8,7 +8,7 @@ import time
 import asyncio
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 
 from config.guardrail import (
     FuzzyFilteredOutputs,
@@ -65,6 +65,7 @@ def root():
 
 
 add_health_endpoint(app)
+add_tracing(app, "fuzzy")
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to catch any unhandled exceptions."""
@@ -22,7 +22,7 @@ from app.hcdt import (
     SUMMARIZER_MODEL_NAME, prompt_md, _hcdt_negative_binding_note,
 )
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
-from utils.service_setup import add_open_cors, add_health_endpoint, add_download_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_download_endpoint, add_tracing
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -37,6 +37,7 @@ app = FastAPI(
 )
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "hcdt")
 add_download_endpoint(app)
 
 
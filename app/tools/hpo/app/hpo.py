@@ -2,12 +2,15 @@
 
 Orchestration (LLM router, in-process schema_kg planner, web fallback, on-empty
 retry) is provided by the shared `app.per_db_tool.schema_kg_worker`. This module
-only injects HPO's identity + capability blurb.
+only injects HPO's identity + capability blurb and the descendant expansion
+of phenotype filters (utils.hierarchy_index).
 """
 from app.per_db_tool import (
     setup_service_globals, SchemaKgConfig, make_schema_kg_handler,
 )
 
+from utils.hierarchy_index import expand_filter_values, get_hierarchy_index
+
 from .database_loader import return_preprocessed_hpo
 
 
@@ -61,6 +64,37 @@ _HPO_TERM_REWRITE = {
     "phenotypes associated with heterozygous mutations of the": "diseases caused by mutations in the",
 }
 
+# "Genes annotated to any descendant of HP:0001250" — the mapper binds the named
+# term to phenotype_id / phenotype_name; when the question asks for the term's
+# subtree, that filter is widened to the term plus every is_a descendant so the
+# join keeps annotations made to the more specific terms (one is_in, no joins).
+_HPO_DESCENDANT_KW = (
+    "descendant", "subterm", "sub-term", "child term", "children term", "subclass",
+    "sub-class", "more specific", "narrower term", "any subtype", "all subtypes",
+    "or its children", "and its children", "including children", "any child",
+    "subtree", "sub-tree", "is_a", "is-a")
+
+
+def _phenotype_descendant_expand(ctx) -> None:
+    """pre_join: expand phenotype filters to the term's descendants on request."""
+    q = (getattr(getattr(ctx, "input", None), "cleaned_query", None) or "").lower()
+    fv = getattr(ctx, "filter_val", None)
+    if not isinstance(fv, dict) or not any(k in q for k in _HPO_DESCENDANT_KW):
+        return
+    data = getattr(ctx, "data", None) or {}
+    tables = data.get(ctx.db) if isinstance(data.get(ctx.db), dict) else data
+    index = get_hierarchy_index("phenotype_hierarchy_hpo", tables or {})
+    if index is None:
+        return
+    for col, output in (("phenotype_id", "ids"), ("phenotype_name", "names")):
+        vals = fv.get(col)
+        vals = vals if isinstance(vals, (list, tuple)) else [vals]
+        expanded = expand_filter_values(index, vals, output=output)  # None: keep as is
+        if expanded:
+            ctx.log.info("[hpo] %s %s → %d terms incl. descendants", col, vals[:3], len(expanded))
+            fv[col] = expanded
+
+
 _HPO_CONFIG = SchemaKgConfig(
     db=SERVICE_NAME,
     display_name=DB_NAME,
@@ -70,6 +104,7 @@ _HPO_CONFIG = SchemaKgConfig(
     capabilities=_HPO_CAPABILITIES,
     limitations=_HPO_LIMITATIONS,
     term_rewrite=_HPO_TERM_REWRITE,
+    pre_join=_phenotype_descendant_expand,
     # Router LLM nondeterministically skips query_db for well-curated named
     # diseases/genes (confirmed via BioASQ eval — same bug class as CTD's
     # 2026-06-23 decline fix). Opt-in only for HPO; every other DB is unaffected.
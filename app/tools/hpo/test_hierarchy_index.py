@@ -0,0 +1,235 @@
+"""Local, Docker-free test for the hierarchy index.
+
+Builds a hand-drawn six-term DAG (one term with two parents) in both shapes
+the index serves — HPO's (phenotype_id, parent_id) edges plus a phenotype
+master, and Reactome's denormalised (parent_id, child_id, names) edges — and
+checks descendants / ancestors, max_depth, shortest depths through the
+multi-parent term, id / name resolution and expand() against the answers
+worked out by hand. A generated DAG then checks the closure against a
+brute-force BFS. Finally the service hooks run on a WorkerCtx:
+
+  HPO pre_join       "genes annotated to any descendant of A" widens
+                     the phenotype filter, and join_and_filter_database keeps
+                     the annotations made to the more specific terms
+  Reactome pre_join  "genes in the sub-pathways of X" reads one level of
+                     children, "genes in ALL sub-pathways of X" every level;
+                     pure "all sub-pathways of X" filters the closure ids
+
+The service part imports hpo.py / reactome.py the way the image does
+(config, app.per_db_tool), so it needs the service requirements installed.
+
+Run:  python app/tools/hpo/test_hierarchy_index.py
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import random
+import re
+import sys
+import types
+from collections import deque
+from pathlib import Path
+
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[2]                                   # repo root
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]            # `config`, `utils` as in the image
+
+HPO_TABLE = "phenotype_hierarchy_hpo"
+REACTOME_TABLE = "pathway_hierarchy_reactome"
+
+#   1 Root ─┬─ 2 A ─┬─ 4 C ── 6 E
+#           │       └─ 5 D
+#           └─ 3 B ─── 5 D          (D has two parents)
+_TERMS = {1: "Root", 2: "A", 3: "B", 4: "C", 5: "D", 6: "E"}
+_EDGES = [(2, 1), (3, 1), (4, 2), (5, 2), (5, 3), (6, 4)]  # (child, parent)
+
+
+def _hp(i: int) -> str:
+    return f"HP:{i:07d}"
+
+
+def _rx(i: int) -> str:
+    return f"R-HSA-{i}"
+
+
+def _hpo_tables(names: dict, edges: list) -> dict:
+    return {
+        HPO_TABLE: pl.DataFrame({"phenotype_id": [_hp(c) for c, _ in edges],
+                                 "parent_id": [_hp(p) for _, p in edges]}).lazy(),
+        "phenotype_master_table_hpo": pl.DataFrame({
+            "phenotype_id": [_hp(i) for i in names],
+            "phenotype_name": list(names.values())}).lazy(),
+    }
+
+
+def _reactome_tables() -> dict:
+    return {REACTOME_TABLE: pl.DataFrame({
+        "parent_id": [_rx(p) for _, p in _EDGES],
+        "parent_pathway_name": [_TERMS[p] for _, p in _EDGES],
+        "child_id": [_rx(c) for c, _ in _EDGES],
+        "child_pathway_name": [_TERMS[c] for c, _ in _EDGES],
+    }).lazy()}
+
+
+def _load_services():
+    """hpo.py and reactome.py as the image imports them; each service's app/ is
+    loaded under its own package name since both would otherwise be `app`."""
+    settings = (ROOT / "config" / "settings.py").read_text(encoding="utf-8")
+    for env_var in re.findall(r'"\w+":\s*\("(\w+)",\s*None\)', settings):
+        os.environ.setdefault(env_var, "test/model")  # required model settings
+    mods = []
+    for svc, module in (("hpo", "hpo"), ("reactome", "reactome")):
+        pkg = types.ModuleType(f"{svc}_app")
+        pkg.__path__ = [str(ROOT / "app" / "tools" / svc / "app")]
+        sys.modules[pkg.__name__] = pkg
+        mods.append(importlib.import_module(f"{pkg.__name__}.{module}"))
+    return mods
+
+
+def _check_fixture(h) -> None:
+    tables = _hpo_tables(_TERMS, _EDGES)
+    index = h.get_hierarchy_index(HPO_TABLE, tables)
+    assert index is h.get_hierarchy_index(HPO_TABLE, tables), "one build per snapshot"
+    assert (index.n_nodes, index.n_edges) == (6, 6)
+
+    def names(nodes) -> list:
+        return sorted(index.names(nodes))
+
+    root, d = index.resolve(["root"]), index.resolve([_hp(5)])
+    assert names(index.descendants(root)) == ["A", "B", "C", "D", "E"]
+    assert names(index.descendants(root, max_depth=1)) == ["A", "B"]
+    assert names(index.descendants(root, max_depth=2)) == ["A", "B", "C", "D"]
+    assert names(index.ancestors(d)) == ["A", "B", "Root"]
+    assert names(index.ancestors(d, max_depth=1)) == ["A", "B"]
+    assert names(index.descendants(index.resolve(["B"]), include_self=True)) == ["B", "D"]
+    assert index.is_descendant(index.resolve(["E"])[0], root[0])
+    assert not index.is_descendant(index.resolve(["E"])[0], index.resolve(["B"])[0])
+    print("[ok] descendants / ancestors and max_depth match the hand-drawn DAG; "
+          "D is 2 levels below Root by either parent")
+
+    assert sorted(index.expand(["hp:0000002"])) == [_hp(2), _hp(4), _hp(5), _hp(6)]
+    assert sorted(index.expand(["c"], output="names")) == ["C", "E"]
+    assert sorted(index.expand(["E"], direction="ancestors", include_self=False,
+                               output="names")) == ["A", "C", "Root"]
+    assert index.expand(["requested", "not a term"]) == []
+    assert h.expand_filter_values(index, ["not a term"]) is None
+    print("[ok] ids and names resolve case-insensitively; expand() in both directions")
+
+    rx = h.get_hierarchy_index(REACTOME_TABLE, _reactome_tables())
+    assert sorted(rx.ids(rx.descendants(rx.resolve(["A"])))) == [_rx(4), _rx(5), _rx(6)]
+    assert rx.names(rx.resolve([_rx(3)])) == ["B"], "names come from the edge table itself"
+    print("[ok] the Reactome edge table resolves its own denormalised names")
+
+
+def _bfs(adj: dict, start: str) -> set:
+    seen, q = {start}, deque([start])
+    while q:
+        for v in adj.get(q.popleft(), ()):
+            if v not in seen:
+                seen.add(v)
+                q.append(v)
+    return seen - {start}
+
+
+def _check_equivalence(h) -> None:
+    rng = random.Random(0)
+    n = 600
+    edges = set()
+    for child in range(2, n + 1):
+        parent = child // 3 + 1
+        edges.add((child, parent))
+        if rng.random() < 0.2 and parent > 4:
+            edges.add((child, parent - rng.randint(1, 3)))
+    index = h.get_hierarchy_index(HPO_TABLE, _hpo_tables({i: f"T{i}" for i in range(1, n + 1)},
+                                                         sorted(edges)))
+    down, up = {}, {}
+    for c, p in edges:
+        down.setdefault(_hp(p), []).append(_hp(c))
+        up.setdefault(_hp(c), []).append(_hp(p))
+    probes = [_hp(i) for i in (1, 2, 5, n)] + [_hp(rng.randint(1, n)) for _ in range(20)]
+    for term in probes:
+        node = index.resolve([term])
+        assert set(index.ids(index.descendants(node))) == _bfs(down, term), term
+        assert set(index.ids(index.ancestors(node))) == _bfs(up, term), term
+    print(f"[ok] {len(probes)} terms of a generated {n}-term DAG: closure == BFS both ways")
+
+
+def _ctx(orch, db: str, query: str, data: dict, filter_val: dict, out_cols: list):
+    from config.guardrail import QueryInterpreterOutputGuardrail
+    ctx = orch.WorkerCtx(db=db, display_name=db, connection_id=None,
+                         input=QueryInterpreterOutputGuardrail(cleaned_query=query),
+                         log=logging.getLogger("test_hierarchy_index"))
+    ctx.data, ctx.filter_val, ctx.out_cols = {db: data}, filter_val, out_cols
+    return ctx
+
+
+def _check_hpo_service(hpo, orch) -> None:
+    from utils.dataframe_filtering import join_and_filter_database
+
+    assoc = "gene_phenotype_association_hpo"
+    data = _hpo_tables(_TERMS, _EDGES)
+    data[assoc] = pl.DataFrame({
+        "gene_symbol": ["SCN1A", "KCNQ2", "CDKL5", "TP53"],
+        "phenotype_id": [_hp(2), _hp(4), _hp(6), _hp(3)],
+    }).lazy()
+    ctx = _ctx(orch, "hpo", "genes annotated to any descendant of A", data,
+               {"phenotype_id": [_hp(2)], "gene_symbol": "requested"},
+               ["gene_symbol", "phenotype_id"])
+    fq = "hpo.gene_phenotype_association"           # plan names drop the _hpo suffix
+    ctx.plan = {"tables": [fq], "parents": {fq: None},
+                "join_pairs": {}, "table_columns": {fq: ["gene_symbol", "phenotype_id"]}}
+    hpo._phenotype_descendant_expand(ctx)
+    assert sorted(ctx.filter_val["phenotype_id"]) == [_hp(2), _hp(4), _hp(5), _hp(6)]
+    df, _ = join_and_filter_database(ctx.data, ctx.plan, "hpo", ctx.out_cols, ctx.filter_val)
+    assert sorted(df["gene_symbol"].to_list()) == ["CDKL5", "KCNQ2", "SCN1A"]
+
+    ctx = _ctx(orch, "hpo", "genes annotated to A", data, {"phenotype_id": [_hp(2)]}, [])
+    hpo._phenotype_descendant_expand(ctx)
+    assert ctx.filter_val["phenotype_id"] == [_hp(2)], "no subtree wording, no expansion"
+    print("[ok] HPO pre_join: the subtree filter keeps annotations to C and E, "
+          "plain wording keeps the term")
+
+
+def _check_reactome_service(reactome, orch) -> None:
+    def run(query: str, out_cols: list) -> orch.WorkerCtx:
+        ctx = _ctx(orch, "reactome", query, _reactome_tables(),
+                   {"parent_pathway_name": "Root"}, out_cols)
+        reactome._hierarchy_disambiguate(ctx)
+        return ctx
+
+    ctx = run("genes in the sub-pathways of Root", ["gene_symbol"])
+    assert sorted(ctx.filter_val["pathway_id"]) == [_rx(2), _rx(3)]
+    assert ctx.plan["tables"] == ["reactome.gene_pathway_association",
+                                  "reactome.gene_master_table"]
+    ctx = run("genes in all sub-pathways of Root", ["gene_symbol"])
+    assert sorted(ctx.filter_val["pathway_id"]) == [_rx(i) for i in (2, 3, 4, 5, 6)]
+    print("[ok] Reactome compound: one level of children by default, every level for "
+          "'all sub-pathways'")
+
+    ctx = run("sub-pathways of Root", [])
+    assert ctx.filter_val == {"parent_pathway_name": ["Root"]}
+    ctx = run("all sub-pathways of Root", [])
+    assert sorted(ctx.filter_val["child_id"]) == [_rx(i) for i in (2, 3, 4, 5, 6)]
+    assert ctx.out_cols == ["child_pathway_name"]
+    print("[ok] Reactome pure hierarchy: the named parent by default, the closure ids "
+          "for 'all sub-pathways'")
+
+
+def main() -> int:
+    h = importlib.import_module("utils.hierarchy_index")
+    _check_fixture(h)
+    _check_equivalence(h)
+    hpo, reactome = _load_services()
+    from app.per_db_tool import _orchestrator as orch
+    _check_hpo_service(hpo, orch)
+    _check_reactome_service(reactome, orch)
+    print("\nPASS ✓  hierarchy index")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+"""Compiled gene ↔ gene-set membership index + over-representation analysis.
+
+MSigDB membership is a long FK table (gene_geneset_association: geneset_id,
+gene_id — millions of rows), so "which sets contain these 40 genes" or "is my
+list enriched in HALLMARK sets" used to be a join over the whole table followed
+by Python-side counting per set. `GenesetIndex` collects the three membership
+tables ONCE per snapshot and compiles them into integer arrays:
+
+  gene_ptr[g] : gene_ptr[g + 1]   sets containing gene g (CSR, gene → set ids)
+  set_size[s]                     members of set s (from the association rows)
+  set_org[s], gene_org[g]         organism codes
+
+A query gene list becomes one `bincount` over the concatenated CSR slices of its
+genes, i.e. the overlap with EVERY set in a single pass — the same numbers a
+packed per-set bitset would give by AND + popcount, without materialising a
+~35k × ~40k bit matrix on every worker. The one-sided hypergeometric tail
+(= Fisher's exact test, "greater") is then evaluated for all sets with a
+non-zero overlap at once from a log-factorial table, and Benjamini–Hochberg
+FDR is applied across every set tested.
+
+The universe is all genes of the query organism that belong to at least one
+MSigDB set; input symbols outside it are reported as unmapped.
+
+Set MSIGDB_ENRICHMENT=0 to disable the planner-path integration.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from utils.index_cache import SnapshotCache, ranges
+
+logger = logging.getLogger("uvicorn.error")
+
+MSIGDB_ENRICHMENT = os.getenv("MSIGDB_ENRICHMENT", "1") == "1"
+MSIGDB_ENRICHMENT_MIN_GENES = int(os.getenv("MSIGDB_ENRICHMENT_MIN_GENES", "3"))
+MSIGDB_ENRICHMENT_MAX_ROWS = int(os.getenv("MSIGDB_ENRICHMENT_MAX_ROWS", "500"))
+
+ASSOC_TABLE = "gene_geneset_association_msigdb"
+GENE_TABLE = "gene_master_table_msigdb"
+SET_TABLE = "geneset_master_table_msigdb"
+DEFAULT_ORGANISM = "Homo sapiens"
+
+# Cap on the (sets × tail terms) matrix evaluated per chunk in hypergeom_sf.
+_SF_CHUNK_CELLS = 4_000_000
+
+
+def _collect(lf: Any) -> pl.DataFrame:
+    return lf.collect() if isinstance(lf, pl.LazyFrame) else lf
+
+
+def _log_factorials(n: int) -> np.ndarray:
+    out = np.zeros(n + 1, dtype=np.float64)
+    if n:
+        out[1:] = np.cumsum(np.log(np.arange(1, n + 1, dtype=np.float64)))
+    return out
+
+
+def hypergeom_sf(k: np.ndarray, K: np.ndarray, n: int, N: int,
+                 log_fact: Optional[np.ndarray] = None) -> np.ndarray:
+    """P(X >= k) for X ~ Hypergeometric(N universe, K successes, n draws),
+    vectorised over (k, K). Equals the one-sided Fisher's exact p-value."""
+    k = np.asarray(k, dtype=np.int64)
+    K = np.asarray(K, dtype=np.int64)
+    out = np.ones(len(k), dtype=np.float64)
+    if not len(k) or n <= 0:
+        return out
+    lf = log_fact if log_fact is not None and len(log_fact) > N else _log_factorials(N)
+    hi = np.minimum(K, n)
+    live = k <= hi
+    out[~live] = 0.0
+    idx = np.flatnonzero(live & (k > 0))  # k <= 0 → tail is the whole mass
+    if not len(idx):
+        return out
+    width = int((hi[idx] - k[idx]).max()) + 1
+    step = max(1, _SF_CHUNK_CELLS // width)
+    # log pmf(x) = log C(K, x) + log C(N-K, n-x) - log C(N, n); the x-free part
+    # is a per-row constant, leaving four table lookups per tail term.
+    const = lf[K] + lf[N - K] - (lf[N] - lf[n] - lf[N - n])
+    offs = np.arange(width, dtype=np.int64)
+    for c in range(0, len(idx), step):
+        rows = idx[c:c + step]
+        x = k[rows, None] + offs[None, :]
+        valid = x <= hi[rows, None]
+        xs = np.where(valid, x, k[rows, None])
+        Kr = K[rows, None]
+        terms = const[rows, None] - lf[xs] - lf[Kr - xs] - lf[n - xs] - lf[N - Kr - n + xs]
+        terms = np.where(valid, terms, -np.inf)
+        top = terms.max(axis=1)
+        out[rows] = np.minimum(1.0, np.exp(top) * np.exp(terms - top[:, None]).sum(axis=1))
+    return out
+
+
+def bh_fdr(p: np.ndarray) -> np.ndarray:
+    """Benjamini–Hochberg adjusted p-values (same order as `p`)."""
+    p = np.asarray(p, dtype=np.float64)
+    m = len(p)
+    if not m:
+        return p
+    order = np.argsort(p, kind="stable")
+    ranked = p[order] * m / np.arange(1, m + 1)
+    ranked = np.minimum.accumulate(ranked[::-1])[::-1]
+    out = np.empty(m, dtype=np.float64)
+    out[order] = np.minimum(ranked, 1.0)
+    return out
+
+
+class GenesetIndex:
+    """Membership arrays for one MSigDB snapshot."""
+
+    def __init__(self, tables: Dict[str, Any]) -> None:
+        sets = (_collect(tables[SET_TABLE])
+                .select("geneset_id", "geneset_name", "collection", "geneset_organism")
+                .unique("geneset_id", keep="first", maintain_order=True)
+                .with_row_index("__s"))
+        genes = (_collect(tables[GENE_TABLE])
+                 .select("gene_id", "gene_symbol", "gene_organism")
+                 .unique("gene_id", keep="first", maintain_order=True)
+                 .with_row_index("__g"))
+        pairs = (_collect(tables[ASSOC_TABLE]).select("geneset_id", "gene_id")
+                 .join(sets.select("geneset_id", "__s"), on="geneset_id")
+                 .join(genes.select("gene_id", "__g"), on="gene_id")
+                 .select("__g", "__s").unique()
+                 .sort(["__g", "__s"]))
+
+        self.n_sets = sets.height
+        self.n_genes = genes.height
+        self.sets = sets.drop("__s")
+        self.gene_symbols = genes["gene_symbol"]
+        g = pairs["__g"].to_numpy().astype(np.int64)
+        self.gene_sets = pairs["__s"].to_numpy().astype(np.int32)
+        self.gene_ptr = np.zeros(self.n_genes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(g, minlength=self.n_genes), out=self.gene_ptr[1:])
+        self.set_size = np.bincount(self.gene_sets, minlength=self.n_sets).astype(np.int64)
+        self.n_pairs = len(g)
+
+        organisms = sorted(set(sets["geneset_organism"].drop_nulls().to_list())
+                           | set(genes["gene_organism"].drop_nulls().to_list()))
+        self.organisms = {o: i for i, o in enumerate(organisms)}
+        self._org_lc = {o.lower(): o for o in organisms}
+        self.set_org = np.array([self.organisms.get(o, -1) for o in sets["geneset_organism"].to_list()],
+                                dtype=np.int32)
+        self.gene_org = np.array([self.organisms.get(o, -1) for o in genes["gene_organism"].to_list()],
+                                 dtype=np.int32)
+        # Universe per organism: genes in ≥ 1 set.
+        in_any = np.diff(self.gene_ptr) > 0
+        self.universe = {o: int((in_any & (self.gene_org == i)).sum()) for o, i in self.organisms.items()}
+        self._log_fact = _log_factorials(max(self.universe.values(), default=0))
+        self._symbols: Dict[Tuple[int, str], int] = {
+            (int(o), str(s).upper()): int(i)
+            for i, (s, o) in enumerate(zip(self.gene_symbols.to_list(), self.gene_org)) if s is not None
+        }
+        self._collections = self.sets["collection"].fill_null("").str.to_lowercase().to_numpy()
+        self._names = self.sets["geneset_name"].fill_null("").str.to_uppercase().to_numpy()
+
+    def organism(self, value: Any) -> Optional[str]:
+        if value is None:
+            return DEFAULT_ORGANISM if DEFAULT_ORGANISM in self.organisms else None
+        return self._org_lc.get(str(value).strip().lower())
+
+    def resolve(self, symbols: Iterable[Any], organism: str) -> Tuple[np.ndarray, List[str]]:
+        """(gene indices in the organism's universe, unmapped input symbols)."""
+        org = self.organisms.get(organism, -1)
+        hit, missing, seen = [], [], set()
+        for s in symbols:
+            if s is None:
+                continue
+            key = str(s).strip().upper()
+            if not key or key in seen or key == "REQUESTED":
+                continue
+            seen.add(key)
+            g = self._symbols.get((org, key))
+            if g is None or self.gene_ptr[g + 1] == self.gene_ptr[g]:
+                missing.append(str(s).strip())
+            else:
+                hit.append(g)
+        return np.array(sorted(hit), dtype=np.int64), missing
+
+    def overlap_pairs(self, genes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(gene, set) membership pairs of the given genes."""
+        starts, ends = self.gene_ptr[genes], self.gene_ptr[genes + 1]
+        rows = ranges(starts, ends)
+        return np.repeat(genes, ends - starts), self.gene_sets[rows].astype(np.int64)
+
+    def overlap_counts(self, genes: np.ndarray) -> np.ndarray:
+        """Overlap of the gene list with every set (length n_sets)."""
+        _, s = self.overlap_pairs(genes)
+        return np.bincount(s, minlength=self.n_sets)
+
+    def set_mask(self, organism: str, collections: Sequence[str] = (),
+                 name_contains: Sequence[str] = ()) -> np.ndarray:
+        mask = self.set_org == self.organisms.get(organism, -2)
+        if collections:
+            wanted = {str(c).strip().lower() for c in collections}
+            mask &= np.isin(self._collections, list(wanted))
+        if name_contains:
+            subs = [str(t).strip().upper() for t in name_contains if str(t).strip()]
+            if subs:
+                mask &= np.array([any(t in n for t in subs) for n in self._names], dtype=bool)
+        return mask
+
+    def enrichment(self, symbols: Iterable[Any], organism: Optional[str] = None,
+                   collections: Sequence[str] = (), name_contains: Sequence[str] = (),
+                   min_overlap: int = 1, max_rows: Optional[int] = None) -> Tuple[pl.DataFrame, dict]:
+        """Over-representation of `symbols` in every matching set.
+
+        Returns (one row per set with overlap ≥ min_overlap sorted by p-value,
+        summary dict with query/universe sizes, sets tested and unmapped symbols).
+        """
+        org = self.organism(organism)
+        summary = {"organism": org, "query_size": 0, "universe_size": 0,
+                   "sets_tested": 0, "unmapped": []}
+        if org is None:
+            return _empty_result(), summary
+        genes, unmapped = self.resolve(symbols, org)
+        mask = self.set_mask(org, collections, name_contains)
+        N, n = self.universe.get(org, 0), len(genes)
+        summary.update(query_size=n, universe_size=N, sets_tested=int(mask.sum()), unmapped=unmapped)
+        if not n or not mask.any():
+            return _empty_result(), summary
+
+        g, s = self.overlap_pairs(genes)
+        k = np.bincount(s, minlength=self.n_sets)
+        tested = np.flatnonzero(mask)
+        p = hypergeom_sf(k[tested], self.set_size[tested], n, N, self._log_fact)
+        fdr = bh_fdr(p)
+        keep = k[tested] >= max(1, min_overlap)
+        tested, p, fdr = tested[keep], p[keep], fdr[keep]
+        order = np.lexsort((-k[tested], p))
+        if max_rows:
+            order = order[:max_rows]
+        tested, p, fdr = tested[order], p[order], fdr[order]
+
+        in_out = np.isin(s, tested)
+        members = (pl.DataFrame({"__s": s[in_out], "gene_symbol": self.gene_symbols.gather(g[in_out])})
+                   .group_by("__s")
+                   .agg(pl.col("gene_symbol").sort().str.join(", ").alias("overlap_genes")))
+        K = self.set_size[tested]
+        result = (self.sets[tested]
+                  .with_columns(pl.Series("__s", tested),
+                                pl.Series("overlap", k[tested]),
+                                pl.Series("set_size", K),
+                                pl.lit(n).alias("query_size"),
+                                pl.lit(N).alias("universe_size"),
+                                pl.Series("fold_enrichment", (k[tested] * N) / (K * n).astype(np.float64)),
+                                pl.Series("p_value", p),
+                                pl.Series("fdr", fdr))
+                  .join(members, on="__s", how="left", maintain_order="left")
+                  .drop("__s"))
+        return result, summary
+
+
+def _empty_result() -> pl.DataFrame:
+    return pl.DataFrame(schema={
+        "geneset_id": pl.Utf8, "geneset_name": pl.Utf8, "collection": pl.Utf8,
+        "geneset_organism": pl.Utf8, "overlap": pl.Int64, "set_size": pl.Int64,
+        "query_size": pl.Int64, "universe_size": pl.Int64, "fold_enrichment": pl.Float64,
+        "p_value": pl.Float64, "fdr": pl.Float64, "overlap_genes": pl.Utf8,
+    })
+
+
+_INDEX: SnapshotCache[GenesetIndex] = SnapshotCache()
+
+
+def get_geneset_index(tables: Dict[str, Any]) -> Optional[GenesetIndex]:
+    """The index for the snapshot `tables` belongs to (built once)."""
+    lf = (tables or {}).get(ASSOC_TABLE)
+    if lf is None or any((tables or {}).get(t) is None for t in (GENE_TABLE, SET_TABLE)):
+        return None
+
+    def build() -> GenesetIndex:
+        index = GenesetIndex(tables)
+        logger.info("[msigdb index] %d sets, %d genes, %d memberships, universes %s",
+                    index.n_sets, index.n_genes, index.n_pairs, index.universe)
+        return index
+
+    return _INDEX.get(ASSOC_TABLE, lf, build)
@@ -1,6 +1,12 @@
 """MSigDB data-tool service — REST query endpoint + WebSocket chat (schema_kg)."""
+import asyncio
+from typing import List, Optional
+
+from pydantic import BaseModel
+
 from app.per_db_tool import build_app, ChatSpec, build_chat_router
 from app.msigdb import return_msigdb_result, get_msigdb_db, _MSIGDB_CAPABILITIES, _MSIGDB_LIMITATIONS
+from app.geneset_index import MSIGDB_ENRICHMENT_MAX_ROWS, get_geneset_index
 
 app = build_app(
     db_short="msigdb",
@@ -17,3 +23,28 @@ app.include_router(build_chat_router(ChatSpec(
     capabilities=_MSIGDB_CAPABILITIES,
     limitations=_MSIGDB_LIMITATIONS,
 )))
+
+
+class _EnrichmentPayload(BaseModel):
+    genes:         List[str]
+    organism:      Optional[str] = None       # default Homo sapiens
+    collections:   List[str] = []             # e.g. ["Hallmark"]
+    name_contains: List[str] = []             # e.g. ["KEGG_"]
+    min_overlap:   int = 1
+    max_rows:      int = MSIGDB_ENRICHMENT_MAX_ROWS
+
+
+@app.post("/msigdb/enrichment")
+async def enrichment(req: _EnrichmentPayload):
+    """Over-representation of a gene list across every MSigDB gene set
+    (hypergeometric p-value + BH FDR), answered from the compiled membership
+    index — no NL pipeline, no LLM."""
+    tables = (get_msigdb_db() or {}).get("msigdb") or {}
+    index = await asyncio.to_thread(get_geneset_index, tables)
+    if index is None:
+        return {"status": "error", "reason": "msigdb_not_loaded"}
+    res, summary = await asyncio.to_thread(
+        index.enrichment, req.genes, req.organism, req.collections,
+        req.name_contains, req.min_overlap, req.max_rows,
+    )
+    return {"status": "ok", **summary, "rows": res.to_dicts()}
@@ -1,4 +1,5 @@
 """BioChirp MSigDB data tool — schema_kg variant."""
+import asyncio
 import re
 import threading
 from typing import Optional
@@ -8,6 +9,10 @@ from app.per_db_tool import (
 )
 
 from .database_loader import return_preprocessed_msigdb
+from .geneset_index import (
+    MSIGDB_ENRICHMENT, MSIGDB_ENRICHMENT_MAX_ROWS, MSIGDB_ENRICHMENT_MIN_GENES,
+    get_geneset_index,
+)
 
 
 SERVICE_NAME, DB_NAME, SUMMARIZER_MODEL_NAME, prompt_md, get_msigdb_db = \
@@ -20,7 +25,8 @@ _MSIGDB_CAPABILITIES = (
     "- Gene registry: distinct gene symbols across all gene sets, per organism (gene_master_table)\n"
     "- Gene set metadata: PMID, GEO ID, contributor, sub-collection, brief/full descriptions (geneset_metadata)\n"
     "- Collections (friendly names, same vocabulary for human and mouse sets): Hallmark, Positional, Curated, Regulatory, Computational, Ontology, Oncogenic, Immunologic, CellType, CellLineage (no legacy codes like H/C1-C9/MH/M1 on disk)\n"
-    "- Organisms: Homo sapiens (~34k sets), Mus musculus (~18k sets), Rattus norvegicus (~31 sets)"
+    "- Organisms: Homo sapiens (~34k sets), Mus musculus (~18k sets), Rattus norvegicus (~31 sets)\n"
+    "- Over-representation / enrichment of a gene list across all gene sets (hypergeometric p-value + BH FDR)"
 )
 _MSIGDB_LIMITATIONS = (
     "drug-target associations, drug indications, variant pathogenicity, protein 3D structures, "
@@ -327,6 +333,91 @@ def _source_db_prefix_filter(ctx) -> None:
                 fv["gene_organism"] = [inj_org]
 
 
+# ── Over-representation analysis ─────────────────────────────────────────────
+# "Is my list (TP53, MDM2, CDKN1A, …) enriched in HALLMARK sets?" — the join can
+# only list member rows; the statistic needs the overlap with EVERY set plus
+# set / universe sizes. geneset_index.GenesetIndex computes that from compiled
+# membership arrays in one pass. The pre_join hook runs it and restricts the
+# join to the reported sets (so the join stays small and non-empty); post_join
+# swaps the joined member rows for the enrichment table.
+_ENRICHMENT_RX = re.compile(
+    r"\b(enrich(?:ed|ment)?|over-?represent(?:ed|ation)?|hypergeometric|"
+    r"fisher'?s? exact|ORA)\b",
+    re.I,
+)
+
+
+def _fv_list(v) -> list:
+    if v is None or v == "requested":
+        return []
+    if isinstance(v, str):
+        return [v]
+    return [x for x in v if isinstance(x, str) and x.strip() and x.strip().lower() != "requested"]
+
+
+def _enrichment_summary(res, summary: dict, n_input: int) -> str:
+    sig = int((res["fdr"] < 0.05).sum()) if res.height else 0
+    lines = [
+        f"MSIGDB over-representation analysis: {summary['query_size']} of {n_input} input genes "
+        f"map to the {summary['organism']} universe ({summary['universe_size']} genes); "
+        f"{summary['sets_tested']} gene sets tested, {res.height} overlap the list, "
+        f"{sig} at FDR < 0.05 (one-sided hypergeometric, Benjamini–Hochberg)."
+    ]
+    for r in res.head(10).iter_rows(named=True):
+        lines.append(f"- {r['geneset_name']} ({r['collection']}): {r['overlap']}/{r['set_size']} genes, "
+                     f"p={r['p_value']:.3g}, FDR={r['fdr']:.3g} — {r['overlap_genes']}")
+    if summary["unmapped"]:
+        lines.append("Not in the universe: " + ", ".join(summary["unmapped"][:20]))
+    return "\n".join(lines) + "\n\nSource: MSIGDB."
+
+
+async def _msigdb_enrichment_pre_join(ctx) -> None:
+    q = (getattr(getattr(ctx, "input", None), "cleaned_query", None) or "")
+    if not MSIGDB_ENRICHMENT or not _ENRICHMENT_RX.search(q):
+        return
+    fv = ctx.filter_val
+    genes = _fv_list(fv.get("gene_symbol")) or \
+        _fv_list(((ctx.inp or {}).get("parsed_value") or {}).get("gene_symbol"))
+    if len(genes) < MSIGDB_ENRICHMENT_MIN_GENES:
+        return
+    organism = next(iter(_fv_list(fv.get("geneset_organism")) or _fv_list(fv.get("gene_organism"))), None)
+    if organism is None:
+        organism = "Mus musculus" if _MSIGDB_MOUSE_RX.search(q) else None
+    tables = (ctx.data or {}).get("msigdb") or {}
+    try:
+        index = await asyncio.to_thread(get_geneset_index, tables)
+        if index is None:
+            return
+        res, summary = await asyncio.to_thread(
+            index.enrichment, genes, organism,
+            _fv_list(fv.get("collection")), _fv_list(fv.get("geneset_name")),
+            1, MSIGDB_ENRICHMENT_MAX_ROWS,
+        )
+    except Exception as e:
+        ctx.log.warning("[msigdb] enrichment skipped: %s", e)
+        return
+    if res.is_empty():
+        return
+    ctx.extras["msigdb_enrichment"] = (res, _enrichment_summary(res, summary, len(genes)))
+    fv["geneset_id"] = res["geneset_id"].to_list()
+    ctx.log.info("[msigdb] enrichment: %d genes, %d sets tested, %d overlapping",
+                 summary["query_size"], summary["sets_tested"], res.height)
+
+
+async def _msigdb_pre_join(ctx) -> None:
+    _source_db_prefix_filter(ctx)
+    await _msigdb_enrichment_pre_join(ctx)
+
+
+def _msigdb_enrichment_post_join(ctx) -> None:
+    computed = ctx.extras.pop("msigdb_enrichment", None)
+    if computed is None:
+        return
+    ctx.df, ctx.pre_computed_message = computed
+    ctx.out_cols = list(ctx.df.columns)
+    ctx.extras["skip_text2sql"] = True
+
+
 _MSIGDB_CONFIG = SchemaKgConfig(
     db=SERVICE_NAME,
     display_name=DB_NAME,
@@ -336,7 +427,12 @@ _MSIGDB_CONFIG = SchemaKgConfig(
     capabilities=_MSIGDB_CAPABILITIES,
     limitations=_MSIGDB_LIMITATIONS,
     pre_expand=_msigdb_organism_inject,
-    pre_join=_source_db_prefix_filter,
+    pre_join=_msigdb_pre_join,
+    post_join=_msigdb_enrichment_post_join,
+    # Enrichment tables (post_join) rank by significance, not row relevance.
+    sort_order=[
+        {"col": "p_value", "dir": "asc"},
+    ],
     # Brand-name → canonical geneset_name rewrites applied to the query BEFORE
     # the schema_mapper sees it (term_rewrite, like CTD's MeSH synonym handling).
     # MammaPrint is the 70-gene van't Veer poor-prognosis signature; the mapper
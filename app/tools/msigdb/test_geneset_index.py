@@ -0,0 +1,212 @@
+"""Local, Docker-free test for the MSigDB gene-set index.
+
+Builds a hand-made snapshot (three human sets over a ten-gene universe, one
+mouse set, an unassociated gene) shaped like the served geneset_master /
+gene_master / association tables (composite "<symbol>|<organism>" gene_id)
+and checks overlaps, hypergeometric p-values, BH FDR, fold enrichment and
+the collection / name / organism restrictions against values worked out by
+hand. hypergeom_sf and bh_fdr are then checked against exact integer
+arithmetic and a textbook loop, and overlap counts on a generated snapshot
+against a polars join + group_by. Finally the service hooks run on a
+WorkerCtx: pre_join restricts the join to the overlapping sets (honouring a
+"KEGG" source prefix), post_join swaps in the enrichment table and summary,
+and a query without enrichment wording is left alone.
+
+The service part imports msigdb.py the way the image does (config,
+app.per_db_tool), so it needs the service requirements installed.
+
+Run:  python app/tools/msigdb/test_geneset_index.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import os
+import random
+import re
+import sys
+import types
+from fractions import Fraction
+from math import comb
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[2]                                   # repo root
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]            # `config`, `utils` as in the image
+
+HS, MM = "Homo sapiens", "Mus musculus"
+_SETS = [
+    ("H1", "HALLMARK_P53_PATHWAY", "Hallmark", HS, ["TP53", "MDM2", "CDKN1A", "BAX"]),
+    ("H2", "KEGG_CELL_CYCLE", "Curated", HS, ["CDKN1A", "CCND1", "CDK4", "RB1", "E2F1"]),
+    ("H3", "HALLMARK_APOPTOSIS", "Hallmark", HS, ["BAX", "BCL2", "CASP3"]),
+    ("M1", "MOUSE_P53_TARGETS", "Curated", MM, ["Trp53", "Mdm2"]),
+]
+_QUERY = ["TP53", "mdm2", "CDKN1A", "ALB", "NOT_A_GENE"]  # ALB: in gene_master, in no set
+
+
+def _snapshot(sets: list, extra_genes: list = ()) -> dict:
+    genes = list(dict.fromkeys([(g, org) for _, _, _, org, members in sets for g in members]
+                               + list(extra_genes)))
+    return {
+        "geneset_master_table_msigdb": pl.DataFrame(
+            [s[:4] for s in sets], orient="row",
+            schema=["geneset_id", "geneset_name", "collection", "geneset_organism"]).lazy(),
+        "gene_master_table_msigdb": pl.DataFrame({
+            "gene_id": [f"{g}|{o}" for g, o in genes],
+            "gene_symbol": [g for g, _ in genes],
+            "gene_organism": [o for _, o in genes]}).lazy(),
+        "gene_geneset_association_msigdb": pl.DataFrame(
+            [(sid, f"{g}|{org}") for sid, _, _, org, members in sets for g in members],
+            schema=["geneset_id", "gene_id"], orient="row").lazy(),
+    }
+
+
+def _load_msigdb():
+    """msigdb.py as the image imports it, under its own package name."""
+    settings = (ROOT / "config" / "settings.py").read_text(encoding="utf-8")
+    for env_var in re.findall(r'"\w+":\s*\("(\w+)",\s*None\)', settings):
+        os.environ.setdefault(env_var, "test/model")  # required model settings
+    pkg = types.ModuleType("msigdb_app")
+    pkg.__path__ = [str(HERE / "app")]
+    sys.modules[pkg.__name__] = pkg
+    return (importlib.import_module(f"{pkg.__name__}.msigdb"),
+            importlib.import_module(f"{pkg.__name__}.geneset_index"))
+
+
+def _close(a: float, b: float) -> bool:
+    return abs(a - b) <= 1e-12
+
+
+def _check_fixture(gi) -> None:
+    t = _snapshot(_SETS, [("ALB", HS)])
+    index = gi.get_geneset_index(t)
+    assert index is gi.get_geneset_index(t), "one build per snapshot"
+    assert index.universe == {HS: 10, MM: 2}, index.universe
+
+    res, summary = index.enrichment(_QUERY, "homo sapiens")
+    assert summary == {"organism": HS, "query_size": 3, "universe_size": 10,
+                       "sets_tested": 3, "unmapped": ["ALB", "NOT_A_GENE"]}, summary
+    rows = {r["geneset_id"]: r for r in res.iter_rows(named=True)}
+    assert res["geneset_id"].to_list() == ["H1", "H2"], "H3 has no overlap"
+    h1, h2 = rows["H1"], rows["H2"]
+    assert (h1["overlap"], h1["set_size"], h2["overlap"], h2["set_size"]) == (3, 4, 1, 5)
+    # P(X >= 3 | N=10, K=4, n=3) = C(4,3)/C(10,3); P(X >= 1 | K=5) = 1 - C(5,3)/C(10,3)
+    assert _close(h1["p_value"], 4 / 120) and _close(h2["p_value"], 110 / 120)
+    # BH over the 3 tested sets (p = 1/30, 11/12, 1): 1/30·3, min(11/12·3/2, 1)
+    assert _close(h1["fdr"], 0.1) and _close(h2["fdr"], 1.0)
+    assert _close(h1["fold_enrichment"], 2.5) and _close(h2["fold_enrichment"], 10 / 15)
+    assert h1["overlap_genes"] == "CDKN1A, MDM2, TP53"
+    print("[ok] overlaps, p-values, BH FDR and fold enrichment match the hand-worked values")
+
+    hall, s = index.enrichment(_QUERY, None, collections=["hallmark"])
+    assert hall["geneset_id"].to_list() == ["H1"] and s["sets_tested"] == 2
+    assert _close(hall["fdr"][0], 4 / 120 * 2)
+    kegg, s = index.enrichment(_QUERY, None, name_contains=["kegg_"])
+    assert kegg["geneset_id"].to_list() == ["H2"] and s["sets_tested"] == 1
+    mouse, s = index.enrichment(["trp53", "Mdm2", "TP53"], "Mus musculus")
+    assert mouse["geneset_id"].to_list() == ["M1"] and s["unmapped"] == ["TP53"]
+    assert _close(mouse["p_value"][0], 1.0), "the whole mouse universe is the set"
+    empty, s = index.enrichment(["NOPE"], None)
+    assert empty.is_empty() and "fdr" in empty.columns and s["query_size"] == 0
+    print("[ok] collection / name / organism restrictions and empty input")
+
+
+def _exact_sf(k: int, K: int, n: int, N: int) -> float:
+    tail = sum(comb(K, x) * comb(N - K, n - x) for x in range(k, min(K, n) + 1))
+    return float(Fraction(tail, comb(N, n)))
+
+
+def _check_statistics(gi) -> None:
+    rng = random.Random(0)
+    N, n = 20000, 60
+    K = np.array([rng.randint(5, 500) for _ in range(200)])
+    k = np.array([rng.randint(0, min(int(x), n)) for x in K])
+    got = gi.hypergeom_sf(k, K, n, N)
+    for ki, Ki, p in zip(k.tolist(), K.tolist(), got.tolist()):
+        exact = _exact_sf(ki, Ki, n, N)
+        assert abs(p - exact) <= 1e-9 * max(exact, 1e-300) + 1e-300, (ki, Ki, p, exact)
+
+    p = np.array([rng.random() ** 3 for _ in range(300)])
+    naive = np.empty_like(p)
+    order = np.argsort(p)
+    prev = 1.0
+    for rank in range(len(p), 0, -1):
+        i = order[rank - 1]
+        prev = min(prev, p[i] * len(p) / rank)
+        naive[i] = prev
+    assert np.allclose(gi.bh_fdr(p), naive)
+    print("[ok] hypergeometric tail == exact integer arithmetic; BH FDR == textbook loop")
+
+
+def _check_equivalence(gi) -> None:
+    rng = random.Random(1)
+    sets = []
+    for s in range(500):
+        org = HS if rng.random() < 0.7 else MM
+        members = [f"G{g}" for g in rng.sample(range(2000 if org == HS else 800), rng.randint(5, 80))]
+        sets.append((f"M{s}", f"SET_{s}", rng.choice(["Hallmark", "Curated"]), org, members))
+    t = _snapshot(sets)
+    query = [f"G{i}" for i in rng.sample(range(2000), 40)]
+    res, _ = gi.get_geneset_index(t).enrichment(query, HS)
+    want = (t["gene_geneset_association_msigdb"]
+            .filter(pl.col("gene_id").is_in([f"{g}|{HS}" for g in query]))
+            .group_by("geneset_id").agg(pl.len().alias("overlap"))
+            .join(t["geneset_master_table_msigdb"], on="geneset_id")
+            .filter(pl.col("geneset_organism") == HS).collect())
+    assert dict(zip(res["geneset_id"].to_list(), res["overlap"].to_list())) == \
+        dict(zip(want["geneset_id"].to_list(), want["overlap"].to_list()))
+    print(f"[ok] overlap counts for {res.height} generated sets == join + group_by")
+
+
+async def _check_service(msigdb) -> None:
+    from app.per_db_tool._orchestrator import WorkerCtx
+    from config.guardrail import QueryInterpreterOutputGuardrail
+
+    def ctx_for(query: str):
+        ctx = WorkerCtx(db="msigdb", display_name="MSigDB", connection_id=None,
+                        input=QueryInterpreterOutputGuardrail(cleaned_query=query),
+                        log=logging.getLogger("test_geneset_index"))
+        ctx.data = {"msigdb": _snapshot(_SETS, [("ALB", HS)])}
+        ctx.filter_val = {"gene_symbol": list(_QUERY), "geneset_name": "requested"}
+        ctx.out_cols = ["geneset_name", "gene_symbol"]
+        return ctx
+
+    ctx = ctx_for("Is TP53, MDM2, CDKN1A, ALB enriched in any gene set?")
+    await msigdb._msigdb_pre_join(ctx)
+    assert ctx.filter_val["geneset_id"] == ["H1", "H2"], "the join is restricted to the hits"
+    msigdb._msigdb_enrichment_post_join(ctx)
+    assert ctx.df["geneset_id"].to_list() == ["H1", "H2"] and ctx.out_cols == list(ctx.df.columns)
+    assert ctx.pre_computed_message.startswith(
+        "MSIGDB over-representation analysis: 3 of 5 input genes map to the Homo sapiens "
+        "universe (10 genes); 3 gene sets tested, 2 overlap the list, 0 at FDR < 0.05")
+    assert "Not in the universe: ALB, NOT_A_GENE" in ctx.pre_computed_message
+    assert ctx.extras["skip_text2sql"] is True and "msigdb_enrichment" not in ctx.extras
+    print("[ok] pre_join restricts the join to H1, H2; post_join swaps in the enrichment table")
+
+    ctx = ctx_for("Is TP53, MDM2, CDKN1A enriched in KEGG gene sets?")
+    await msigdb._msigdb_pre_join(ctx)
+    assert ctx.filter_val["geneset_name"] == ["KEGG_"] and ctx.filter_val["geneset_id"] == ["H2"]
+
+    ctx = ctx_for("Which gene sets contain TP53, MDM2 and CDKN1A?")
+    await msigdb._msigdb_pre_join(ctx)
+    msigdb._msigdb_enrichment_post_join(ctx)
+    assert "geneset_id" not in ctx.filter_val and ctx.df is None
+    print("[ok] a KEGG source prefix narrows the tested sets; no enrichment wording, no-op")
+
+
+def main() -> int:
+    msigdb, gi = _load_msigdb()
+    _check_fixture(gi)
+    _check_statistics(gi)
+    _check_equivalence(gi)
+    asyncio.run(_check_service(msigdb))
+    print("\nPASS ✓  MSigDB gene-set index")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -79,10 +79,13 @@ class GenericTool:
                           "db": db, "request_id": request_id})
         t0 = time.perf_counter()
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                resp = await client.post(url, json=payload)
-                resp.raise_for_status()
-                body = resp.json()
+            from utils.tracing import REQUEST_ID_HEADER, span
+            headers = {REQUEST_ID_HEADER: request_id} if request_id else {}
+            with span(self.name, kind="service", db=db):
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    resp = await client.post(url, json=payload, headers=headers)
+                    resp.raise_for_status()
+                    body = resp.json()
             elapsed = time.perf_counter() - t0
             logger.info("[orchestrator] %s ok db=%s (%.3fs)", self.name, db, elapsed)
             await self._emit({"type": "tool_result", "tool": self.name, "db": db,
@@ -26,7 +26,6 @@ router/planner wrappers and this flow stay unchanged.
 """
 from __future__ import annotations
 
-import json
 import logging
 import os
 import uuid
@@ -35,7 +34,9 @@ import redis.asyncio as _aioredis
 from fastapi import FastAPI
 from pydantic import BaseModel
 
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.event_publisher import EventPublisher
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
+from utils.tracing import current_request_id
 
 from .execute_tool import ExecuteTool
 from .expand_and_match_tool import ExpandAndMatchTool
@@ -124,6 +125,15 @@ def _get_progress_redis():
     return _PROGRESS_REDIS
 
 
+async def _progress_redis_async():
+    return _get_progress_redis()
+
+
+# Step events are coalesced across concurrent queries and sent as one
+# pipelined batch (utils.event_publisher) instead of one PUBLISH each.
+_PROGRESS = EventPublisher(_progress_redis_async, name="orchestrator")
+
+
 class OrchestrateRequest(BaseModel):
     query: str
     display_name: str = "BioChirp"
@@ -140,6 +150,7 @@ app = FastAPI(title="BioChirp Orchestrator Service", version="1.0.0",
               description="Single orchestrator over the schema_kg tool fleet")
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "orchestrator")
 
 
 @app.get("/")
@@ -149,35 +160,38 @@ def root():
 
 @app.post("/orchestrate")
 async def orchestrate(input_value: OrchestrateRequest, database: str = ""):
+    try:
+        return await _orchestrate(input_value, database)
+    finally:
+        # The chat relay stops listening shortly after this response lands,
+        # so the last step events must be on the channel first.
+        conn_id = (input_value.connection_id or "").strip()
+        if conn_id:
+            await _PROGRESS.flush(f"orch_progress:{conn_id}")
+
+
+async def _orchestrate(input_value: OrchestrateRequest, database: str = ""):
     db = (database or DEFAULT_DB).strip()
-    request_id = str(uuid.uuid4())
+    request_id = current_request_id() or str(uuid.uuid4())
     query = (input_value.query or "").strip()
     events: list = []
 
     conn_id = (input_value.connection_id or "").strip()
-    _progress_redis = _get_progress_redis() if conn_id else None
     _progress_chan = f"orch_progress:{conn_id}" if conn_id else None
 
     async def sink(evt: dict) -> None:
         events.append(evt)
-        # Fire-and-forget live publish so the frontend sees each step as it runs.
-        if _progress_redis is not None and _progress_chan:
-            try:
-                await _progress_redis.publish(_progress_chan, json.dumps(evt, default=str))
-            except Exception as _pub_err:
-                logger.debug("[orchestrator] progress publish failed: %s", _pub_err)
+        # Queued for the next batch so the frontend sees each step as it runs.
+        if _progress_chan:
+            await _PROGRESS.publish(_progress_chan, evt)
 
     async def publish_step_summary(tool: str, summary: dict) -> None:
         """Publish a step's DATA (parsed_value / tables / canonical_pv / row_count)
         live, so the chat relay can render a rich card body in real time instead
         of an empty placeholder."""
-        if _progress_redis is not None and _progress_chan:
-            try:
-                await _progress_redis.publish(_progress_chan, json.dumps(
-                    {"type": "orch_step_summary", "tool": tool, "summary": summary},
-                    default=str))
-            except Exception:
-                pass
+        if _progress_chan:
+            await _PROGRESS.publish(
+                _progress_chan, {"type": "orch_step_summary", "tool": tool, "summary": summary})
 
     router = RouterTool()
     mapper = SchemaMapperTool(event_sink=sink)
@@ -4,7 +4,7 @@ import os
 import uuid
 import time
 import asyncio
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 from config.guardrail import PlanGenerator, FuzzyFilteredOutputs
 from .planner import generate_plan
 
@@ -33,6 +33,7 @@ def root():
     return {"message": "Planner service tool is running"}
 
 add_health_endpoint(app)
+add_tracing(app, "planner")
 @app.post("/planner", response_model=PlanGenerator)
 async def plan(input_value: FuzzyFilteredOutputs, database: str):
     tool = "planner"
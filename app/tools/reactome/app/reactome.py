@@ -11,6 +11,8 @@ from app.per_db_tool import (
     setup_service_globals, SchemaKgConfig, make_schema_kg_handler,
 )
 
+from utils.hierarchy_index import get_hierarchy_index
+
 from .database_loader import return_preprocessed_reactome
 
 
@@ -81,13 +83,24 @@ def _two_table_plan(db: str, root: str, leaf: str, join_col: str,
             "join_pairs": {f"{rfq},{lfq}": {"left_on": [join_col], "right_on": [join_col]}}}
 
 
-def _hierarchy_pathway_ids(ctx, filter_col: str, names, id_col: str) -> list:
+def _reactome_tables(ctx) -> dict:
+    data = getattr(ctx, "data", None) or {}
+    return data.get(ctx.db) if isinstance(data.get(ctx.db), dict) else data
+
+
+def _hierarchy_pathway_ids(ctx, filter_col: str, names, id_col: str, deep: bool) -> list:
     """Decomposition hop 1: pathway stable IDs of the (sub)pathways named by
-    ``names``, read straight from the in-memory pathway_hierarchy table. ``[]`` on
-    any problem (caller then leaves the query for the planner/decomposer)."""
+    ``names``, one level away, or every level when ``deep`` (the query asked for
+    ALL sub-pathways / ancestors). Read from the hierarchy index; falls back to a
+    one-level read of the in-memory pathway_hierarchy table when the index is
+    unavailable. ``[]`` on any problem (caller then leaves the query for the
+    planner/decomposer)."""
     try:
-        data = getattr(ctx, "data", None) or {}
-        tbls = data.get(ctx.db) if isinstance(data.get(ctx.db), dict) else data
+        tbls = _reactome_tables(ctx)
+        index = get_hierarchy_index("pathway_hierarchy_reactome", tbls or {})
+        if index is not None:
+            walk = index.descendants if id_col == "child_id" else index.ancestors
+            return index.ids(walk(index.resolve(names), max_depth=None if deep else 1))
         hkey = next((k for k in (tbls or {}) if "pathway_hierarchy" in k), None)
         if hkey is None:
             return []
@@ -115,6 +128,13 @@ _HIER_PARENT_KW = (
     "subprocess of", "sub-process of", "part of", "ancestor pathway",
     "encompassing pathway", "broader pathway", "umbrella pathway", "supercategory",
     "belongs to", "belong to", "above")
+# Transitive read ("ALL sub-pathways", "every descendant") rather than one level.
+# Answered from the hierarchy index as one is_in over the descendant / ancestor IDs.
+_HIER_DEEP_KW = (
+    "all sub", "all of the sub", "every sub", "all child", "all nested", "descendant",
+    "ancestor", "all levels", "any level", "every level", "recursive", "transitive",
+    "entire hierarchy", "whole hierarchy", "full hierarchy", "all the way", "all parent",
+    "all super", "lineage")
 
 
 def _hierarchy_disambiguate(ctx) -> None:
@@ -128,10 +148,14 @@ def _hierarchy_disambiguate(ctx) -> None:
 
     • PURE  "sub-pathways / parent of X"        → pin single hierarchy table,
                                                    filter the OPPOSITE name column.
+      … "ALL sub-pathways / ancestors of X"     → same table, one is_in over the
+                                                   closure IDs (utils.hierarchy_index).
     • COMPOUND "genes/proteins/... of sub-paths of X"
                                                  → hop 1: child pathway IDs from the
-                                                   hierarchy; hop 2: filter the
-                                                   association table by those IDs.
+                                                   hierarchy index (every descendant
+                                                   for "ALL sub-pathways"); hop 2:
+                                                   filter the association table by
+                                                   those IDs.
 
     Intent is LLM-driven: the mapper's column binding (which of parent/child carries
     the filter) is the PRIMARY signal — generalises to any phrasing via db_llm_rules.
@@ -206,10 +230,24 @@ def _hierarchy_disambiguate(ctx) -> None:
         elif "entrez" in q or "ncbi gene" in q:
             target = "ncbi_gene_id"
 
+    deep = any(k in q for k in _HIER_DEEP_KW)
     if target is None:
         # ── PURE hierarchy: filter keep=name, output the opposite name, single table.
         for k in ("parent_pathway_name", "child_pathway_name", "pathway_name", "pathway_id"):
             fv.pop(k, None)
+        if deep:
+            # Transitive: every descendant (ancestor) of the named pathway, read as
+            # the hierarchy rows whose child (parent) ID is in the closure.
+            index = get_hierarchy_index("pathway_hierarchy_reactome", _reactome_tables(ctx) or {})
+            reached = []
+            if index is not None:
+                walk = index.descendants if wants_children else index.ancestors
+                reached = index.ids(walk(index.resolve(ent_list)))
+            if reached:
+                fv[id_col] = reached
+                ctx.out_cols = [out]
+                ctx.plan = _one_table_plan(ctx.db, "pathway_hierarchy_reactome", [id_col, out])
+                return
         fv[keep] = list(ent_list)
         ctx.out_cols = [out]
         ctx.plan = _one_table_plan(ctx.db, "pathway_hierarchy_reactome",
@@ -217,7 +255,7 @@ def _hierarchy_disambiguate(ctx) -> None:
         return
 
     # ── COMPOUND: <target> associated with the (sub)pathways of the named pathway.
-    pathway_ids = _hierarchy_pathway_ids(ctx, keep, ent_list, id_col)  # hop 1
+    pathway_ids = _hierarchy_pathway_ids(ctx, keep, ent_list, id_col, deep)  # hop 1
     if not pathway_ids:
         return  # couldn't resolve → leave for the planner/decomposer
     assoc, master, jcol = _COMPOUND_TARGETS[target]
@@ -9,7 +9,7 @@ import time
 import asyncio
 from app.readme import run_readme
 from config.guardrail import ReadmeInput, ReadmeOutput
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 
 from utils.logging_setup import setup_logging
 setup_logging(stream=sys.stdout)
@@ -35,6 +35,7 @@ def root():
 
 
 add_health_endpoint(app)
+add_tracing(app, "readme")
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to catch any unhandled exceptions."""
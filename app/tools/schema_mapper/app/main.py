@@ -26,7 +26,7 @@ import uuid
 from fastapi import FastAPI
 from pydantic import BaseModel
 
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 from app.per_db_tool.schema_kg_planner import get_planner
 
 logging.basicConfig(
@@ -83,6 +83,7 @@ app = FastAPI(title="BioChirp Schema Mapper Service", version="1.0.0",
               description="Shared schema_kg planner/mapper as an HTTP tool")
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "schema_mapper")
 
 
 @app.get("/")
@@ -44,7 +44,7 @@ from typing import Optional
 from fastapi import FastAPI
 from pydantic import BaseModel
 
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 from app.per_db_tool.schema_kg_planner import (
     get_graph, assemble_pruned_plan, to_production_plan,
 )
@@ -165,6 +165,7 @@ app = FastAPI(title="BioChirp Schema Planner Service", version="1.0.0",
               description="Deterministic prune+Steiner schema_kg planner as an HTTP tool")
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "schema_planner")
 
 
 @app.get("/")
@@ -0,0 +1,247 @@
+"""
+Embedded in-process ANN index — an alternative to the bioc_qdrant server.
+
+`EmbeddedValueIndex` implements the subset of the QdrantClient surface that
+`search_reference_terms_BATCH` uses (`collection_exists`, `search_batch` with
+`SearchRequest`s filtered on model / field / db), so the semantic filter keeps
+the exact same contract and post-processing (knee cutoff, payload columns)
+whichever backend is configured.
+
+On-disk layout, written by scripts/build_embedded_value_index.py from the same
+Qdrant collections that scripts/build_qdrant_collection_manifests.py describes:
+
+  <SEMANTIC_EMBEDDED_INDEX_DIR>/<collection>/<db>/
+      index.json        dim, count, per-field [start, end) row ranges, hnsw files
+      vectors.f32       N × dim float32, L2-normalised, rows grouped by field
+      payloads.jsonl    one Qdrant payload per row, same order
+      hnsw_<field>.bin  optional hnswlib index over that field's rows
+  <SEMANTIC_EMBEDDED_INDEX_DIR>/build.json
+                        build stamp, rewritten when a (re)build finishes
+
+Rows are grouped by field, so the payload filter on `field` is a contiguous
+slice of a memory-mapped matrix. Small fields (< SEMANTIC_EMBEDDED_EXACT_MAX
+rows) are searched exactly with one matrix product per (db, field) batch —
+faster than a graph walk at that size and perfect recall. Larger fields use
+the prebuilt HNSW graph when hnswlib is installed, else fall back to exact.
+
+Each (collection, db) is loaded lazily on first search, so a per-DB request
+only pays for the DB it asks about. When the build stamp changes the loaded
+shards are dropped and re-opened on the next search, and the query cache
+(which hashes the stamp into its generation) stops serving the old hits.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    hnswlib = None
+    HNSWLIB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_EMBEDDED_EXACT_MAX = int(os.getenv("SEMANTIC_EMBEDDED_EXACT_MAX", "50000"))
+
+INDEX_MANIFEST = "index.json"
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.jsonl"
+BUILD_STAMP = "build.json"
+
+
+def default_index_dir() -> Path:
+    env = os.getenv("SEMANTIC_EMBEDDED_INDEX_DIR")
+    if env:
+        return Path(env)
+    here = Path(__file__).resolve()
+    if len(here.parents) > 4:
+        candidate = here.parents[4] / "resources" / "ann"
+        if candidate.exists():
+            return candidate
+    return Path("/app/resources/ann")
+
+
+def _must_conditions(flt: Any) -> Dict[str, Any]:
+    """Extract {key: value} from a qm.Filter(must=[FieldCondition(MatchValue)])."""
+    out: Dict[str, Any] = {}
+    for cond in (getattr(flt, "must", None) or []):
+        key = getattr(cond, "key", None)
+        match = getattr(cond, "match", None)
+        if key is not None and match is not None and hasattr(match, "value"):
+            out[key] = match.value
+    return out
+
+
+class _DbShard:
+    """Vectors + payloads of one (collection, db) — memory-mapped, read-only."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.meta = json.loads((root / INDEX_MANIFEST).read_text(encoding="utf-8"))
+        self.dim = int(self.meta["dim"])
+        self.count = int(self.meta["count"])
+        self.model = self.meta.get("model")
+        self.fields: Dict[str, Tuple[int, int]] = {
+            f: (int(r[0]), int(r[1])) for f, r in self.meta["fields"].items()
+        }
+        self.vectors = np.memmap(root / VECTORS_FILE, dtype=np.float32, mode="r",
+                                 shape=(self.count, self.dim))
+        with open(root / PAYLOADS_FILE, encoding="utf-8") as f:
+            self.payloads: List[dict] = [json.loads(line) for line in f]
+        if len(self.payloads) != self.count:
+            raise ValueError(f"{root}: {len(self.payloads)} payloads for {self.count} vectors")
+        self._hnsw: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _hnsw_for(self, field: str) -> Any:
+        spec = (self.meta.get("hnsw") or {}).get(field)
+        if not spec or not HNSWLIB_AVAILABLE:
+            return None
+        with self._lock:
+            idx = self._hnsw.get(field)
+            if idx is None:
+                start, end = self.fields[field]
+                idx = hnswlib.Index(space="cosine", dim=self.dim)
+                idx.load_index(str(self.root / spec["file"]), max_elements=end - start)
+                self._hnsw[field] = idx
+            return idx
+
+    def search(self, field: str, queries: np.ndarray, limit: int,
+               hnsw_ef: int) -> List[List[Tuple[int, float]]]:
+        """Top-`limit` (row, cosine) per query within one field's slice."""
+        if field not in self.fields:
+            return [[] for _ in range(len(queries))]
+        start, end = self.fields[field]
+        n = end - start
+        k = min(limit, n)
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        idx = self._hnsw_for(field) if n > SEMANTIC_EMBEDDED_EXACT_MAX else None
+        if idx is not None:
+            idx.set_ef(max(hnsw_ef, k))
+            labels, dists = idx.knn_query(queries, k=k)
+            return [
+                [(start + int(l), 1.0 - float(d)) for l, d in zip(lrow, drow)]
+                for lrow, drow in zip(labels, dists)
+            ]
+
+        scores = queries @ np.asarray(self.vectors[start:end]).T          # (q, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(n), (len(queries), 1))
+        out = []
+        for qi in range(len(queries)):
+            cand = top[qi]
+            order = cand[np.argsort(-scores[qi, cand])]
+            out.append([(start + int(j), float(scores[qi, j])) for j in order])
+        return out
+
+
+class EmbeddedValueIndex:
+    """Drop-in for the QdrantClient calls made by search_reference_terms_BATCH."""
+
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = Path(root) if root else default_index_dir()
+        self._shards: Dict[Tuple[str, str], Optional[_DbShard]] = {}
+        self._lock = threading.Lock()
+        self._stamp = self._stamp_sig()
+
+    @property
+    def stamp_path(self) -> Path:
+        return self.root / BUILD_STAMP
+
+    def _stamp_sig(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.stamp_path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _check_rebuild(self) -> None:
+        sig = self._stamp_sig()
+        if sig == self._stamp:
+            return
+        with self._lock:
+            if sig != self._stamp:
+                logger.info("[embedded index] %s changed — reopening shards", self.stamp_path)
+                self._shards = {}
+                self._stamp = sig
+
+    def collections(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return (self.root / collection_name).is_dir()
+
+    def _shard(self, collection: str, db: str) -> Optional[_DbShard]:
+        key = (collection, db)
+        if key in self._shards:
+            return self._shards[key]
+        with self._lock:
+            if key not in self._shards:
+                path = self.root / collection / db
+                shard = None
+                if (path / INDEX_MANIFEST).is_file():
+                    try:
+                        shard = _DbShard(path)
+                        logger.info(
+                            "[embedded index] loaded %s/%s: %d vectors × %d dims, %d fields",
+                            collection, db, shard.count, shard.dim, len(shard.fields),
+                        )
+                    except Exception as e:
+                        logger.error("[embedded index] failed to load %s: %s", path, e)
+                self._shards[key] = shard
+        return self._shards[key]
+
+    def search_batch(self, collection_name: str, requests: List[Any],
+                     timeout: Any = None) -> List[List[Any]]:
+        """Answer qm.SearchRequest objects; filters must pin `db` and `field`."""
+        self._check_rebuild()
+        results: List[List[Any]] = [[] for _ in requests]
+        groups: Dict[Tuple[str, str, int, int, float], List[int]] = {}
+        for i, req in enumerate(requests):
+            cond = _must_conditions(req.filter)
+            db, field = cond.get("db"), cond.get("field")
+            if not db or not field:
+                raise ValueError("embedded index requires `db` and `field` filter conditions")
+            ef = int(getattr(getattr(req, "params", None), "hnsw_ef", None) or 64)
+            thr = float(req.score_threshold) if req.score_threshold is not None else float("-inf")
+            groups.setdefault((db, field, int(req.limit), ef, thr), []).append(i)
+
+        for (db, field, limit, ef, thr), idxs in groups.items():
+            shard = self._shard(collection_name, db)
+            if shard is None:
+                continue
+            queries = np.asarray([requests[i].vector for i in idxs], dtype=np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12
+            for i, hits in zip(idxs, shard.search(field, queries, limit, ef)):
+                results[i] = [
+                    SimpleNamespace(id=row, score=score, payload=shard.payloads[row])
+                    for row, score in hits if score >= thr
+                ]
+        return results
+
+
+def create_embedded_index() -> EmbeddedValueIndex:
+    index = EmbeddedValueIndex()
+    cols = index.collections()
+    if not cols:
+        raise RuntimeError(
+            f"No embedded value index under {index.root}. "
+            f"Run scripts/build_embedded_value_index.py first."
+        )
+    logger.info("[embedded index] %d collection(s) under %s: %s", len(cols), index.root, cols)
+    return index
@@ -15,6 +15,8 @@ from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qm
 
+from utils.tracing import bind_context, span, traced
+
 # External libraries
 try:
     from kneed import KneeLocator
@@ -72,12 +74,17 @@ def search_reference_terms_BATCH(
     hnsw_ef: int = 64,
     search_timeout: float = 60.0,
     score_threshold: float = 0.0,
+    query_cache: Optional[Any] = None,
 ) -> pd.DataFrame:
     """Batched multi-term Qdrant search.
 
     Replaces N round-trips (one per term) with ONE round-trip per (model, db)
     using qdrant-client.search_batch. Encoding is also batched on the GPU.
 
+    When a `query_cache` (query_cache.QueryCache) is given, terms whose
+    vectors / hits are already cached skip the encode and the search_batch
+    payload respectively; only the misses go to the model and to Qdrant.
+
     Returns a DataFrame with columns: reference_term, model, db, field, score,
     cutoff_used, text, and any additional payload fields.
     """
@@ -107,7 +114,47 @@ def search_reference_terms_BATCH(
     import time as _time
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
+    def _collection_exists(coll):
+        if query_cache is not None:
+            return query_cache.collection_exists(client, coll)
+        return client.collection_exists(coll)
+
+    @traced("encode", kind="embed")
+    def _encode(model_name, model):
+        if query_cache is None:
+            return model.encode(
+                reference_terms,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        tag = query_cache.model_tag(model_name)
+        vecs = query_cache.get_vectors(tag, reference_terms)
+        miss = [i for i, v in enumerate(vecs) if v is None]
+        if miss:
+            miss_terms = [reference_terms[i] for i in miss]
+            fresh = model.encode(
+                miss_terms,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            query_cache.put_vectors(tag, miss_terms, fresh)
+            for j, i in enumerate(miss):
+                vecs[i] = fresh[j]
+        return np.vstack(vecs)
+
     def _do_search(model_name, coll, q_vecs, db_name):
+        if query_cache is not None:
+            results = query_cache.get_searches(
+                query_cache.model_tag(model_name), coll, db_name, target_field, reference_terms,
+                score_threshold, limit_per_model, hnsw_ef,
+            )
+        else:
+            results = [None] * len(reference_terms)
+        miss = [i for i, r in enumerate(results) if r is None]
+        if not miss:
+            return (model_name, coll, db_name, results, None)
         must = [qm.FieldCondition(key="model", match=qm.MatchValue(value=model_name)),
                 qm.FieldCondition(key="field", match=qm.MatchValue(value=target_field))]
         if db_name:
@@ -122,15 +169,26 @@ def search_reference_terms_BATCH(
                 with_payload=True,
                 params=qm.SearchParams(hnsw_ef=hnsw_ef, exact=False),
             )
-            for i in range(len(reference_terms))
+            for i in miss
         ]
         try:
-            results = client.search_batch(
-                collection_name=coll, requests=requests_batch, timeout=search_timeout
-            )
-            return (model_name, coll, db_name, results, None)
+            with span("search_batch", kind="qdrant", collection=coll, n=len(requests_batch)):
+                fetched = client.search_batch(
+                    collection_name=coll, requests=requests_batch, timeout=search_timeout
+                )
         except Exception as e:
             return (model_name, coll, db_name, None, e)
+        if query_cache is not None:
+            query_cache.put_searches(
+                query_cache.model_tag(model_name), coll, db_name, target_field, [reference_terms[i] for i in miss],
+                fetched, score_threshold, limit_per_model, hnsw_ef,
+            )
+        for i, hits in zip(miss, fetched):
+            results[i] = hits
+        return (model_name, coll, db_name, results, None)
+
+    # Both run on pool threads; carry the request id / parent span over.
+    _encode, _do_search = bind_context(_encode), bind_context(_do_search)
 
     # Encode+search pipelining. When enabled, each model's Qdrant search starts
     # as soon as that model's encode finishes, overlapping network I/O with
@@ -146,7 +204,7 @@ def search_reference_terms_BATCH(
         for model_name, model in model_cache.items():
             coll = model_to_collection(model_name)
             try:
-                if not client.collection_exists(coll):
+                if not _collection_exists(coll):
                     logger.warning("Collection '%s' does not exist, skipping model '%s'", coll, model_name)
                     continue
             except Exception as e:
@@ -173,13 +231,7 @@ def search_reference_terms_BATCH(
                 encode_futures = {}
                 for (model_name, model, coll) in eligible:
                     encode_futures[
-                        pool.submit(
-                            model.encode,
-                            reference_terms,
-                            convert_to_numpy=True,
-                            normalize_embeddings=True,
-                            show_progress_bar=False,
-                        )
+                        pool.submit(_encode, model_name, model)
                     ] = (model_name, coll)
 
                 for enc_fut in as_completed(encode_futures):
@@ -209,19 +261,14 @@ def search_reference_terms_BATCH(
         for model_name, model in model_cache.items():
             coll = model_to_collection(model_name)
             try:
-                if not client.collection_exists(coll):
+                if not _collection_exists(coll):
                     logger.warning("Collection '%s' does not exist, skipping model '%s'", coll, model_name)
                     continue
             except Exception as e:
                 logger.error("Error checking collection '%s': %s", coll, e)
                 continue
             try:
-                q_vecs = model.encode(
-                    reference_terms,
-                    convert_to_numpy=True,
-                    normalize_embeddings=True,
-                    show_progress_bar=False,
-                )
+                q_vecs = _encode(model_name, model)
                 encoded_models.append((model_name, coll, q_vecs))
             except Exception as e:
                 logger.error("Failed to encode batch with model '%s': %s", model_name, e)
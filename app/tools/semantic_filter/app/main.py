@@ -7,7 +7,7 @@ import time
 import uuid
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
-from utils.service_setup import add_open_cors
+from utils.service_setup import add_open_cors, add_tracing
 
 import torch
 
@@ -17,9 +17,12 @@ from config.guardrail import (
     QueryInterpreterOutputGuardrail
 )
 from .similarity_filtered import (
+    SEMANTIC_EMBED_BACKEND,
+    SEMANTIC_VALUE_BACKEND,
     compute_similarity_filtered_outputs,
     initialize_resources,
 )
+from .query_cache import get_query_cache
 
 # Check GPU availability (log for debugging)
 device = "cuda" if torch.cuda.is_available() else "cpu"
@@ -56,6 +59,7 @@ app = FastAPI(
 
 # Add CORS middleware
 add_open_cors(app)
+add_tracing(app, "semantic_filter")
 
 
 @app.on_event("startup")
@@ -76,6 +80,8 @@ async def startup_event():
     logger.info(f"PyTorch device: {device}")
     if device == "cuda":
         logger.info(f"CUDA GPUs available: {torch.cuda.device_count()}")
+    logger.info(f"Embedding backend: {SEMANTIC_EMBED_BACKEND}")
+    logger.info(f"Value backend: {SEMANTIC_VALUE_BACKEND}")
     logger.info("=" * 70)
     
     try:
@@ -107,6 +113,8 @@ def root():
         "message": "Semantic Similarity Service is running",
         "device": device,
         "cuda_available": torch.cuda.is_available(),
+        "embed_backend": SEMANTIC_EMBED_BACKEND,
+        "value_backend": SEMANTIC_VALUE_BACKEND,
         "service": "semantic"
     }
 
@@ -117,10 +125,19 @@ async def health():
     return {
         "status": "OK",
         "device": device,
+        "embed_backend": SEMANTIC_EMBED_BACKEND,
+        "value_backend": SEMANTIC_VALUE_BACKEND,
         "service": "semantic"
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit ratios and local-tier footprint of the query-term cache."""
+    cache = get_query_cache()
+    return {"enabled": cache is not None, **(cache.stats() if cache else {})}
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to catch any unhandled exceptions."""
@@ -0,0 +1,362 @@
+"""
+Query-term embedding + Qdrant search-result cache for the semantic service.
+
+Entity terms ("breast cancer", "EGFR", "imatinib") recur constantly, and
+without a cache every request re-encodes them with every model and re-issues
+`client.search_batch` against Qdrant. Two namespaces:
+
+  vectors  — (model, revision, backend, normalised term)            → float32 vector
+  searches — (collection, db, field, term, score_threshold, limit,
+              hnsw_ef)                                               → [(score, payload)]
+
+Two tiers:
+  * an in-process LRU bounded by bytes (SEMANTIC_CACHE_MAX_BYTES), so a hot
+    term costs neither a model call nor a network hop;
+  * Redis (shared by every replica/worker), TTL-bounded. Redis is best-effort:
+    any failure degrades to the local tier, never to an error.
+
+Invalidation: every key carries a generation derived from the content of
+qdrant_manifests/collections_manifest.json. Re-ingesting Qdrant rewrites the
+manifest (scripts/build_qdrant_collection_manifests.py), which changes the
+generation — old Redis keys become unreachable (and expire via TTL) and the
+local tier is dropped on the next poll. With SEMANTIC_VALUE_BACKEND=embedded
+the embedded index's build stamp (written by
+scripts/build_embedded_value_index.py when a rebuild finishes) is hashed into
+the generation too, so a rebuild invalidates cached hits the same way.
+
+Term normalisation is NFKC + whitespace collapse only. Case is preserved: the
+encoder sees the raw string, and cased tokenizers embed "EGFR" and "egfr"
+differently, so folding case would change results.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_QUERY_CACHE = os.getenv("SEMANTIC_QUERY_CACHE", "1").lower() in {"1", "true", "yes"}
+SEMANTIC_CACHE_MAX_BYTES = int(os.getenv("SEMANTIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_REDIS = os.getenv("SEMANTIC_CACHE_REDIS", "1").lower() in {"1", "true", "yes"}
+# Sub-second socket timeout: a slow Redis must never cost more than the
+# encode it is meant to save.
+SEMANTIC_CACHE_REDIS_TIMEOUT = float(os.getenv("SEMANTIC_CACHE_REDIS_TIMEOUT", "0.25"))
+SEMANTIC_CACHE_MANIFEST_POLL_SEC = float(os.getenv("SEMANTIC_CACHE_MANIFEST_POLL_SEC", "30"))
+
+
+def _default_manifest_path() -> Path:
+    env = os.getenv("QDRANT_COLLECTIONS_MANIFEST")
+    if env:
+        return Path(env)
+    here = Path(__file__).resolve()
+    if len(here.parents) > 4:
+        candidate = here.parents[4] / "qdrant_manifests" / "collections_manifest.json"
+        if candidate.exists():
+            return candidate
+    return Path("/app/qdrant_manifests/collections_manifest.json")
+
+
+def normalise_term(term: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(term)).split())
+
+
+def _file_sig(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha1("\x00".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+
+
+class _ByteLRU:
+    """Thread-safe LRU bounded by the approximate byte size of its values."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def put(self, key: str, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._data:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+
+class QueryCache:
+    """Two-tier (local LRU + Redis) cache for query vectors and Qdrant hits."""
+
+    def __init__(
+        self,
+        max_bytes: int = SEMANTIC_CACHE_MAX_BYTES,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        redis_client: Any = None,
+        manifest_path: Optional[Path] = None,
+        extra_paths: Sequence[Path] = (),
+    ) -> None:
+        self.ttl = ttl
+        self._local = _ByteLRU(max_bytes)
+        self._redis = redis_client
+        self._manifest_path = manifest_path or _default_manifest_path()
+        self._paths = [self._manifest_path, *extra_paths]
+        self._generation = ""
+        self._manifest_sig: Optional[tuple] = None
+        self._next_poll = 0.0
+        self._collections: set = set()
+        self._model_tags: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "vector_hits_local": 0, "vector_hits_redis": 0, "vector_misses": 0,
+            "search_hits_local": 0, "search_hits_redis": 0, "search_misses": 0,
+            "redis_errors": 0, "invalidations": 0,
+        }
+        self._refresh_generation(force=True)
+
+    # ── generation / invalidation ────────────────────────────────────────
+    def _refresh_generation(self, force: bool = False) -> str:
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return self._generation
+        with self._lock:
+            self._next_poll = now + SEMANTIC_CACHE_MANIFEST_POLL_SEC
+            sig = tuple(_file_sig(p) for p in self._paths)
+            if sig == self._manifest_sig and self._generation:
+                return self._generation
+            h, found = hashlib.sha1(), False
+            for p in self._paths:
+                try:
+                    h.update(p.read_bytes())
+                    found = True
+                except OSError:
+                    pass
+                h.update(b"\x00")
+            gen = h.hexdigest()[:12] if found else "nomanifest"
+            if self._generation and gen != self._generation:
+                logger.info(
+                    "[query cache] %s changed (generation %s → %s) — dropping local tier",
+                    " / ".join(p.name for p in self._paths), self._generation, gen,
+                )
+                self._local.clear()
+                self._collections.clear()
+                self._stats["invalidations"] += 1
+            self._manifest_sig = sig
+            self._generation = gen
+            return gen
+
+    @property
+    def generation(self) -> str:
+        return self._refresh_generation()
+
+    # ── Redis helpers (best-effort) ──────────────────────────────────────
+    def _redis_mget(self, keys: List[str]) -> List[Optional[bytes]]:
+        if self._redis is None or not keys:
+            return [None] * len(keys)
+        try:
+            return self._redis.mget(keys)
+        except Exception as e:
+            self._stats["redis_errors"] += 1
+            logger.warning("[query cache] Redis MGET failed: %s", e)
+            return [None] * len(keys)
+
+    def _redis_setex_many(self, items: List[Tuple[str, bytes]]) -> None:
+        if self._redis is None or not items or self.ttl <= 0:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, raw in items:
+                pipe.setex(key, self.ttl, raw)
+            pipe.execute()
+        except Exception as e:
+            self._stats["redis_errors"] += 1
+            logger.warning("[query cache] Redis SETEX failed: %s", e)
+
+    # ── vectors ──────────────────────────────────────────────────────────
+    def register_model(self, model_name: str, tag: str) -> None:
+        """Record the (revision, backend) identity a model's vectors are keyed by."""
+        self._model_tags[model_name] = tag
+
+    def model_tag(self, model_name: str) -> str:
+        return self._model_tags.get(model_name, model_name)
+
+    def _vector_key(self, model_tag: str, term: str) -> str:
+        return f"biochirp:semvec:{self.generation}:{_digest(model_tag, normalise_term(term))}"
+
+    def get_vectors(self, model_tag: str, terms: Sequence[str]) -> List[Optional[np.ndarray]]:
+        keys = [self._vector_key(model_tag, t) for t in terms]
+        out: List[Optional[np.ndarray]] = [self._local.get(k) for k in keys]
+        self._stats["vector_hits_local"] += sum(v is not None for v in out)
+        missing = [i for i, v in enumerate(out) if v is None]
+        for i, raw in zip(missing, self._redis_mget([keys[i] for i in missing])):
+            if raw:
+                vec = np.frombuffer(raw, dtype=np.float32)
+                self._local.put(keys[i], vec, vec.nbytes)
+                out[i] = vec
+                self._stats["vector_hits_redis"] += 1
+            else:
+                self._stats["vector_misses"] += 1
+        return out
+
+    def put_vectors(self, model_tag: str, terms: Sequence[str], vectors: np.ndarray) -> None:
+        items = []
+        for term, vec in zip(terms, np.asarray(vectors, dtype=np.float32)):
+            key = self._vector_key(model_tag, term)
+            vec = np.ascontiguousarray(vec)
+            self._local.put(key, vec, vec.nbytes)
+            items.append((key, vec.tobytes()))
+        self._redis_setex_many(items)
+
+    # ── Qdrant search results ────────────────────────────────────────────
+    def _search_key(self, model_tag: str, collection: str, db: Optional[str], field: str,
+                    term: str, score_threshold: float, limit: int, hnsw_ef: int) -> str:
+        # the model tag is part of the key: the query vector (and so the
+        # neighbours) changes with the model revision even in the same collection
+        sig = _digest(model_tag, collection, db or "", field, normalise_term(term),
+                      f"{float(score_threshold):.6f}", int(limit), int(hnsw_ef))
+        return f"biochirp:semhit:{self.generation}:{sig}"
+
+    def get_searches(self, model_tag: str, collection: str, db: Optional[str], field: str,
+                     terms: Sequence[str], score_threshold: float, limit: int,
+                     hnsw_ef: int) -> List[Optional[list]]:
+        keys = [self._search_key(model_tag, collection, db, field, t, score_threshold, limit,
+                                 hnsw_ef)
+                for t in terms]
+        out: List[Optional[list]] = [self._local.get(k) for k in keys]
+        self._stats["search_hits_local"] += sum(v is not None for v in out)
+        missing = [i for i, v in enumerate(out) if v is None]
+        for i, raw in zip(missing, self._redis_mget([keys[i] for i in missing])):
+            if raw:
+                try:
+                    hits = [SimpleNamespace(score=s, payload=p) for s, p in json.loads(raw)]
+                except Exception:
+                    self._stats["search_misses"] += 1
+                    continue
+                self._local.put(keys[i], hits, len(raw))
+                out[i] = hits
+                self._stats["search_hits_redis"] += 1
+            else:
+                self._stats["search_misses"] += 1
+        return out
+
+    def put_searches(self, model_tag: str, collection: str, db: Optional[str], field: str,
+                     terms: Sequence[str], results: Sequence[Sequence[Any]],
+                     score_threshold: float, limit: int, hnsw_ef: int) -> None:
+        items = []
+        for term, hits in zip(terms, results):
+            key = self._search_key(model_tag, collection, db, field, term, score_threshold,
+                                   limit, hnsw_ef)
+            compact = [[float(h.score), dict(h.payload or {})] for h in (hits or [])]
+            raw = json.dumps(compact, default=str).encode("utf-8")
+            self._local.put(key, [SimpleNamespace(score=s, payload=p) for s, p in compact], len(raw))
+            items.append((key, raw))
+        self._redis_setex_many(items)
+
+    # ── collection existence (one network hop per model per request) ─────
+    def collection_exists(self, client: Any, collection: str) -> bool:
+        self._refresh_generation()
+        if collection in self._collections:
+            return True
+        exists = bool(client.collection_exists(collection))
+        if exists:
+            self._collections.add(collection)
+        return exists
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        v_total = s["vector_hits_local"] + s["vector_hits_redis"] + s["vector_misses"]
+        q_total = s["search_hits_local"] + s["search_hits_redis"] + s["search_misses"]
+        s["vector_hit_ratio"] = round((v_total - s["vector_misses"]) / v_total, 4) if v_total else 0.0
+        s["search_hit_ratio"] = round((q_total - s["search_misses"]) / q_total, 4) if q_total else 0.0
+        s["local_entries"] = len(self._local)
+        s["local_bytes"] = self._local.nbytes
+        s["generation"] = self._generation
+        s["redis"] = self._redis is not None
+        return s
+
+
+_query_cache: Optional[QueryCache] = None
+
+
+def _connect_redis() -> Any:
+    if not SEMANTIC_CACHE_REDIS:
+        return None
+    try:
+        import redis
+
+        client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "biochirp_redis_tool"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            socket_timeout=SEMANTIC_CACHE_REDIS_TIMEOUT,
+            socket_connect_timeout=SEMANTIC_CACHE_REDIS_TIMEOUT,
+        )
+        client.ping()
+        return client
+    except Exception as e:
+        logger.warning("[query cache] Redis unavailable (%s) — local tier only", e)
+        return None
+
+
+def init_query_cache(extra_paths: Sequence[Path] = ()) -> Optional[QueryCache]:
+    """Create the process-wide cache. Call from startup; None when disabled.
+
+    `extra_paths` are stamp files hashed into the generation next to the
+    Qdrant manifest (the embedded index's build stamp).
+    """
+    global _query_cache
+    if not SEMANTIC_QUERY_CACHE:
+        logger.info("[query cache] disabled (SEMANTIC_QUERY_CACHE=0)")
+        return None
+    _query_cache = QueryCache(redis_client=_connect_redis(), extra_paths=extra_paths)
+    logger.info(
+        "[query cache] ready: local budget %d MiB, TTL %ds, redis=%s, generation=%s",
+        SEMANTIC_CACHE_MAX_BYTES // (1024 * 1024), SEMANTIC_CACHE_TTL,
+        _query_cache._redis is not None, _query_cache.generation,
+    )
+    return _query_cache
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    return _query_cache
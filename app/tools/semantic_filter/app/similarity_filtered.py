@@ -1,5 +1,6 @@
 import os
 import sys
+import json
 import time
 import logging
 import asyncio
@@ -22,9 +23,13 @@ from qdrant_client.http import models as qm
 
 # Local imports
 from .filter import search_reference_terms_BATCH
+from .query_cache import get_query_cache, init_query_cache
+from .embedded_index import create_embedded_index
 from config.settings import (
     BIOMEDICAL_MODELS,
+    ONNX_EXPORT_MANIFEST,
     embedding_revision,
+    onnx_export_subdir,
 )
 from utils.concept_values import get_db_concept_values
 
@@ -61,10 +66,85 @@ KNEE_CUT_OFF = float(os.getenv("KNEE_CUT_OFF", "0.0"))
 QDRANT_LIMIT_PER_MODEL = int(os.getenv("QDRANT_LIMIT_PER_MODEL", "200"))
 QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "512"))
 QDRANT_SEARCH_TIMEOUT = float(os.getenv("QDRANT_SEARCH_TIMEOUT", "60"))
+# Inference backend for the SentenceTransformer models.
+#   "torch" (default) — PyTorch weights, CUDA when available.
+#   "onnx"            — dynamic-int8 ONNX Runtime export of the SAME pinned
+#                       revision (scripts/export_onnx_embedding_models.py).
+#                       CPU-only nodes; gate a rollout with
+#                       scripts/check_onnx_embedding_parity.py first.
+SEMANTIC_EMBED_BACKEND = os.getenv("SEMANTIC_EMBED_BACKEND", "torch").strip().lower()
+# ORT intra-op threads per model session (0 = onnxruntime default: all cores).
+SEMANTIC_ONNX_THREADS = int(os.getenv("SEMANTIC_ONNX_THREADS", "0"))
+# Where value vectors are searched.
+#   "qdrant" (default) — the bioc_qdrant server over gRPC.
+#   "embedded"         — in-process memory-mapped index built by
+#                        scripts/build_embedded_value_index.py (no network
+#                        hop, no stateful service; small/medium deployments).
+SEMANTIC_VALUE_BACKEND = os.getenv("SEMANTIC_VALUE_BACKEND", "qdrant").strip().lower()
 
 # Module-level caches (loaded at startup, not on import or first request)
 _model_cache: Optional[Dict[str, SentenceTransformer]] = None
 _qdrant_client: Optional[QdrantClient] = None
+# model name → "<revision>/<backend>" actually served; keys the vector cache so
+# a torch↔onnx switch or a re-pin never reuses the other weights' vectors.
+_model_tags: Dict[str, str] = {}
+
+
+def _repo_root() -> Path:
+    # Repo checkout: …/app/tools/semantic_filter/app/ → repo root. In the
+    # container this file sits at /app/app/, and resources/ is mounted at /app.
+    here = Path(__file__).resolve()
+    return here.parents[4] if len(here.parents) > 4 else Path("/app")
+
+
+def resolve_onnx_export(model_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Locate the quantised ONNX export for a pinned model.
+
+    The export directory is keyed by revision, and its manifest must record
+    the same revision as config.settings.EMBEDDING_MODELS — otherwise the
+    query vectors would come from different weights than the Qdrant index.
+
+    Returns:
+        {"path": <export dir>, "file_name": <onnx file relative to it>, ...}
+        or None if no valid export exists.
+    """
+    subdir = onnx_export_subdir(model_name)
+    if subdir is None:
+        return None
+    export_dir = _repo_root() / subdir
+    manifest_path = export_dir / ONNX_EXPORT_MANIFEST
+    if not manifest_path.is_file():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.error(f"Unreadable ONNX export manifest {manifest_path}: {e}")
+        return None
+    if manifest.get("revision") != embedding_revision(model_name):
+        logger.error(
+            f"ONNX export for {model_name} was built from revision "
+            f"{str(manifest.get('revision'))[:12]}, pin is "
+            f"{str(embedding_revision(model_name))[:12]} — re-run "
+            f"scripts/export_onnx_embedding_models.py"
+        )
+        return None
+    onnx_file = manifest.get("onnx_file")
+    if not onnx_file or not (export_dir / onnx_file).is_file():
+        logger.error(f"ONNX export manifest {manifest_path} points at a missing file: {onnx_file}")
+        return None
+    return {**manifest, "path": str(export_dir), "file_name": onnx_file}
+
+
+def _onnx_model_kwargs(file_name: str) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"file_name": file_name, "provider": "CPUExecutionProvider"}
+    if SEMANTIC_ONNX_THREADS > 0:
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = SEMANTIC_ONNX_THREADS
+        kwargs["session_options"] = opts
+    return kwargs
 
 
 def load_models() -> Dict[str, SentenceTransformer]:
@@ -79,7 +159,10 @@ def load_models() -> Dict[str, SentenceTransformer]:
     Raises:
         RuntimeError: If no models can be loaded
     """
-    logger.info(f"Loading {len(BIOMEDICAL_MODELS)} SentenceTransformer models...")
+    logger.info(
+        f"Loading {len(BIOMEDICAL_MODELS)} SentenceTransformer models "
+        f"(backend={SEMANTIC_EMBED_BACKEND})..."
+    )
     start_time = time.time()
     
     models = {}
@@ -106,9 +189,35 @@ def load_models() -> Dict[str, SentenceTransformer]:
             model_entry = EMBEDDING_MODELS.get(model_name, {})
             local_path = model_entry.get("local_path")
 
+            onnx_export = (
+                resolve_onnx_export(model_name)
+                if SEMANTIC_EMBED_BACKEND == "onnx" else None
+            )
+            if SEMANTIC_EMBED_BACKEND == "onnx" and onnx_export is None:
+                logger.warning(
+                    f"No valid ONNX export for {model_name} — serving it "
+                    f"from PyTorch. Run scripts/export_onnx_embedding_models.py"
+                )
+
+            if onnx_export is not None:
+                model_id = onnx_export["path"]
+                logger.info(
+                    f"Loading ONNX model: {model_name} from {onnx_export['file_name']} "
+                    f"({onnx_export.get('quantization', 'fp32')}, revision {revision[:12]})"
+                )
+                models[model_name] = SentenceTransformer(
+                    model_id,
+                    revision=revision,
+                    backend="onnx",
+                    model_kwargs=_onnx_model_kwargs(onnx_export["file_name"]),
+                )
+                logger.info(f"Successfully loaded model: {model_name} (onnx, revision {revision[:12]})")
+                _model_tags[model_name] = f"{revision}/onnx:{onnx_export.get('onnx_sha256', '')[:12]}"
+                continue
+
             if local_path:
                 # Local model: resolve path relative to repo root
-                model_id = str(Path(__file__).resolve().parents[4] / local_path)
+                model_id = str(_repo_root() / local_path)
                 logger.info(f"Loading local model: {model_name} from {model_id}  (hash {revision[:12]})")
             else:
                 # HuggingFace model
@@ -116,6 +225,7 @@ def load_models() -> Dict[str, SentenceTransformer]:
                 logger.info(f"Loading HuggingFace model: {model_name}  (revision {revision[:12]})")
 
             models[model_name] = SentenceTransformer(model_id, revision=revision)
+            _model_tags[model_name] = f"{revision}/torch"
             logger.info(f"Successfully loaded model: {model_name} (hash/revision {revision[:12]})")
         except Exception as e:
             logger.error(f"Failed to load model {model_name} (hash/revision {revision[:12]}): {e}")
@@ -212,14 +322,28 @@ def initialize_resources():
 
     try:
         # Load SentenceTransformer models
-        logger.info("[1/2] Loading SentenceTransformer models...")
+        logger.info("[1/3] Loading SentenceTransformer models...")
         _model_cache = load_models()
-        logger.info(f"[1/2] ✓ Loaded {len(_model_cache)} models")
-
-        # Connect to Qdrant
-        logger.info("[2/2] Connecting to Qdrant...")
-        _qdrant_client = create_qdrant_client()
-        logger.info("[2/2] ✓ Connected to Qdrant")
+        logger.info(f"[1/3] ✓ Loaded {len(_model_cache)} models")
+
+        # Connect to Qdrant (or open the embedded index in its place)
+        if SEMANTIC_VALUE_BACKEND == "embedded":
+            logger.info("[2/3] Opening embedded value index...")
+            _qdrant_client = create_embedded_index()
+            logger.info("[2/3] ✓ Embedded value index ready")
+        else:
+            logger.info("[2/3] Connecting to Qdrant...")
+            _qdrant_client = create_qdrant_client()
+            logger.info("[2/3] ✓ Connected to Qdrant")
+
+        # Query-term vector + search-result cache (best-effort; never fatal)
+        logger.info("[3/3] Initialising query cache...")
+        stamps = [_qdrant_client.stamp_path] if SEMANTIC_VALUE_BACKEND == "embedded" else []
+        cache = init_query_cache(extra_paths=stamps)
+        if cache is not None:
+            for name, tag in _model_tags.items():
+                cache.register_model(name, f"{name}@{tag}")
+        logger.info(f"[3/3] ✓ Query cache {'enabled' if cache else 'disabled'}")
 
         elapsed = time.time() - start_time
         logger.info("=" * 70)
@@ -251,7 +375,8 @@ def get_model_cache() -> Dict[str, SentenceTransformer]:
 
 def get_qdrant_client() -> QdrantClient:
     """
-    Get Qdrant client.
+    Get Qdrant client (an EmbeddedValueIndex when SEMANTIC_VALUE_BACKEND=embedded —
+    it answers the same collection_exists / search_batch calls).
     
     Returns:
         QdrantClient instance
@@ -364,6 +489,7 @@ async def compute_similarity_filtered_outputs(
                     score_threshold=KNEE_CUT_OFF if USE_KNEE_CUT_OFF else 0.0,
                     db_whitelist=[db_lookup_key],
                     hnsw_ef=QDRANT_HNSW_EF,
+                    query_cache=get_query_cache(),
                 ),
                 timeout=QDRANT_SEARCH_TIMEOUT,
             )
@@ -23,7 +23,7 @@ from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
-from utils.service_setup import add_open_cors, add_health_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_tracing
 from utils.logging_setup import setup_logging
 
 setup_logging(stream=sys.stdout)
@@ -90,6 +90,7 @@ app = FastAPI(
 )
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "share")
 
 
 @app.get("/")
@@ -20,6 +20,10 @@ def _normalize_ppi_v2(
     protein_partner_id, <partner_col>). We generate the reverse direction by
     swapping protein_id↔protein_partner_id and gene_col↔partner_col so that
     filtering on gene_col=X returns ALL partners of X in partner_col.
+
+    The /execute path does not scan this doubled frame for gene-filtered PPI
+    queries: app/ppi_graph.py collects it once per snapshot into a CSR index
+    and hands the join only the candidate rows.
     """
     rev = lf.rename({
         "protein_id": "protein_partner_id",
@@ -23,8 +23,9 @@ from app.string_db import (
     _STRING_LIMITATIONS, SUMMARIZER_MODEL_NAME, prompt_md,
     _annotation_output_only, _STRING_TERM_REWRITE,
 )
+from app.ppi_graph import STRING_PPI_GRAPH, narrow_ppi_tables, warm_ppi_graphs
 from config.guardrail import DatabaseTable, QueryInterpreterOutputGuardrail
-from utils.service_setup import add_open_cors, add_health_endpoint, add_download_endpoint
+from utils.service_setup import add_open_cors, add_health_endpoint, add_download_endpoint, add_tracing
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -39,6 +40,7 @@ app = FastAPI(
 )
 add_open_cors(app)
 add_health_endpoint(app)
+add_tracing(app, "string")
 add_download_endpoint(app)
 
 
@@ -55,6 +57,8 @@ async def _warmup():
     import asyncio
     from app.per_db_tool.schema_kg_chat import warm_pipeline
     asyncio.create_task(warm_pipeline("string"))
+    if STRING_PPI_GRAPH:
+        asyncio.create_task(asyncio.to_thread(warm_ppi_graphs, get_string_db))
 
 
 @app.get("/")
@@ -236,9 +240,23 @@ def _string_query_semantics(ctx) -> None:
                     partner, n, anchor, before, inter.height)
 
 
-def _string_execute_pre_join(ctx) -> None:
-    """Move annotation-only queries to output before join."""
+async def _string_execute_pre_join(ctx) -> None:
+    """Move annotation-only queries to output, then narrow filtered PPI tables
+    to their CSR-graph candidate rows so the join scans only those."""
     _annotation_output_only(ctx)
+    if not STRING_PPI_GRAPH or not ctx.data:
+        return
+    import asyncio
+    try:
+        narrowed, sizes = await asyncio.to_thread(
+            narrow_ppi_tables, ctx.data, ctx.plan, ctx.filter_val)
+    except Exception as exc:
+        ctx.log.warning("[string] PPI graph narrowing skipped: %s", exc)
+        return
+    if sizes:
+        ctx.narrow_for_join(narrowed)
+        for table, (total, kept) in sizes.items():
+            ctx.log.info("[string] PPI graph %s: %d → %d candidate rows", table, total, kept)
 
 
 register_execute_endpoint(
@@ -0,0 +1,265 @@
+"""CSR adjacency index over the STRING PPI tables.
+
+`_normalize_ppi_v2` serves every PPI table bidirectionally (each canonical
+edge A–B stored as A→B and B→A) so a filter on the anchor gene column finds
+all partners. The price is that every interaction query scans and filters a
+frame twice the size of the data. `PPIGraph` collects that served frame ONCE
+per snapshot, re-orders its rows by anchor protein and keeps a compressed
+sparse row index over protein ids:
+
+  indptr[u] : indptr[u + 1]   rows whose anchor (protein_id) is node u
+  dst[row]                    partner node of that row
+  scores[col][row]            per-channel score (association / physical /
+                              the seven detailed channels + combined), NaN = null
+
+so neighbours, k-hop neighbourhoods, edges among a node set and score
+thresholds are array slices and boolean masks instead of full-table scans.
+
+`narrow_ppi_tables` is the planner-path integration: for each PPI table in a
+plan whose anchor / partner gene-symbol columns carry filter values, it swaps
+the full LazyFrame for just the candidate rows the graph returns. Gene
+symbols resolve to nodes through maps built from the rows themselves, so the
+candidate set is always a superset of what the gene filter keeps;
+join_and_filter_database then runs unchanged on the small frame (same filter,
+rank, dedup and projection semantics — only the scan shrinks).
+
+Set STRING_PPI_GRAPH=0 to disable.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from utils.index_cache import SnapshotCache, ranges
+
+logger = logging.getLogger("uvicorn.error")
+
+STRING_PPI_GRAPH = os.getenv("STRING_PPI_GRAPH", "1") == "1"
+
+# table key → (anchor gene col, partner gene col, score cols)
+PPI_TABLES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "ppi_association_string": (
+        "association_gene_symbol", "association_partner_gene_symbol",
+        ("association_score",),
+    ),
+    "ppi_physical_string": (
+        "physical_gene_symbol", "physical_partner_gene_symbol",
+        ("physical_score",),
+    ),
+    "ppi_detailed_channels_string": (
+        "channel_gene_symbol", "channel_partner_gene_symbol",
+        ("neighborhood", "fusion", "cooccurence", "coexpression",
+         "experimental", "database", "textmining", "channel_combined_score"),
+    ),
+}
+
+
+def _lc_values(v: Any) -> List[str]:
+    """Lower-cased real filter values (drops None / blanks / 'requested')."""
+    if isinstance(v, str):
+        v = [v]
+    if not isinstance(v, (list, tuple)):
+        return []
+    out = []
+    for x in v:
+        if x is None:
+            continue
+        s = str(x).strip()
+        if s and s.lower() != "requested":
+            out.append(str(x).lower())
+    return out
+
+
+class PPIGraph:
+    """Row-level CSR index over one bidirectional PPI table."""
+
+    def __init__(self, table: str, frame: pl.DataFrame, gene_col: str,
+                 partner_col: str, score_cols: Sequence[str]) -> None:
+        self.table = table
+        self.gene_col = gene_col
+        self.partner_col = partner_col
+
+        src_ids = frame["protein_id"].cast(pl.Utf8).fill_null("")
+        dst_ids = frame["protein_partner_id"].cast(pl.Utf8).fill_null("")
+        ids = pl.concat([src_ids, dst_ids]).unique().sort()
+        src = ids.search_sorted(src_ids).to_numpy().astype(np.int32)
+        dst = ids.search_sorted(dst_ids).to_numpy().astype(np.int32)
+
+        order = np.lexsort((dst, src))
+        self.frame: pl.DataFrame = frame[order]
+        self.node_ids: np.ndarray = ids.to_numpy()
+        self.src: np.ndarray = src[order]
+        self.dst: np.ndarray = dst[order]
+        n = len(self.node_ids)
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=n), out=self.indptr[1:])
+
+        self.scores: Dict[str, np.ndarray] = {
+            c: self.frame[c].cast(pl.Float64, strict=False).to_numpy().astype(np.float32)
+            for c in score_cols if c in self.frame.columns
+        }
+        self._anchor_nodes = self._symbol_map(gene_col, self.src)
+        self._partner_nodes = self._symbol_map(partner_col, self.dst)
+        self._id_index = {pid: i for i, pid in enumerate(self.node_ids)}
+
+    def _symbol_map(self, col: str, nodes: np.ndarray) -> Dict[str, np.ndarray]:
+        if col not in self.frame.columns:
+            return {}
+        pairs = (
+            pl.DataFrame({"sym": self.frame[col].cast(pl.Utf8).str.to_lowercase(),
+                          "node": nodes})
+            .drop_nulls()
+            .unique()
+            .group_by("sym")
+            .agg(pl.col("node"))
+        )
+        return {s: np.asarray(v, dtype=np.int32)
+                for s, v in zip(pairs["sym"].to_list(), pairs["node"].to_list())}
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.dst)
+
+    # ── node lookup ──────────────────────────────────────────────────────
+    def nodes_for_symbols(self, symbols: Iterable[str], partner: bool = False) -> np.ndarray:
+        """Nodes carrying any of `symbols` (case-insensitive) on the given side."""
+        smap = self._partner_nodes if partner else self._anchor_nodes
+        hits = [smap[s] for s in {str(x).lower() for x in symbols} if s in smap]
+        return np.unique(np.concatenate(hits)) if hits else np.empty(0, dtype=np.int32)
+
+    def nodes_for_ids(self, protein_ids: Iterable[str]) -> np.ndarray:
+        idx = [self._id_index[p] for p in protein_ids if p in self._id_index]
+        return np.unique(np.asarray(idx, dtype=np.int32))
+
+    # ── row selections ───────────────────────────────────────────────────
+    def _score_mask(self, rows: np.ndarray, score_col: Optional[str],
+                    min_score: Optional[float]) -> np.ndarray:
+        if min_score is None or score_col is None or not len(rows):
+            return rows
+        vals = self.scores.get(score_col)
+        if vals is None:
+            raise KeyError(f"{self.table}: no score column {score_col!r}")
+        return rows[vals[rows] >= min_score]
+
+    def neighbour_rows(self, nodes: np.ndarray, score_col: Optional[str] = None,
+                       min_score: Optional[float] = None) -> np.ndarray:
+        """Rows anchored at any of `nodes` (optionally score >= min_score)."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        rows = ranges(self.indptr[nodes], self.indptr[nodes + 1])
+        return self._score_mask(rows, score_col, min_score)
+
+    def partner_rows(self, nodes: np.ndarray, score_col: Optional[str] = None,
+                     min_score: Optional[float] = None) -> np.ndarray:
+        """Rows whose partner is any of `nodes`."""
+        rows = np.flatnonzero(np.isin(self.dst, nodes))
+        return self._score_mask(rows, score_col, min_score)
+
+    def edges_among(self, nodes: np.ndarray, score_col: Optional[str] = None,
+                    min_score: Optional[float] = None) -> np.ndarray:
+        """Rows with BOTH ends in `nodes` (each undirected edge in both directions)."""
+        member = np.zeros(self.n_nodes, dtype=bool)
+        member[nodes] = True
+        rows = self.neighbour_rows(nodes, score_col, min_score)
+        return rows[member[self.dst[rows]]]
+
+    def neighbours(self, nodes: np.ndarray, score_col: Optional[str] = None,
+                   min_score: Optional[float] = None) -> np.ndarray:
+        return np.unique(self.dst[self.neighbour_rows(nodes, score_col, min_score)])
+
+    def k_hop(self, nodes: np.ndarray, k: int, score_col: Optional[str] = None,
+              min_score: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(nodes, hop distance) of the ≤k-hop neighbourhood of `nodes`, seeds at hop 0."""
+        hop = np.full(self.n_nodes, -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(nodes, dtype=np.int64))
+        hop[frontier] = 0
+        for h in range(1, max(0, k) + 1):
+            nxt = self.neighbours(frontier, score_col, min_score)
+            nxt = nxt[hop[nxt] < 0]
+            if not len(nxt):
+                break
+            hop[nxt] = h
+            frontier = nxt
+        reached = np.flatnonzero(hop >= 0)
+        return reached, hop[reached]
+
+    def rows_frame(self, rows: np.ndarray) -> pl.DataFrame:
+        return self.frame[np.sort(rows)]
+
+    # ── planner-path narrowing ───────────────────────────────────────────
+    def candidate_rows(self, filter_val: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Superset of the rows the anchor/partner gene filters keep; None if
+        neither column is filtered (nothing to narrow)."""
+        anchor = _lc_values(filter_val.get(self.gene_col))
+        partner = _lc_values(filter_val.get(self.partner_col))
+        if not anchor and not partner:
+            return None
+        if anchor:
+            rows = self.neighbour_rows(self.nodes_for_symbols(anchor))
+            if partner:
+                p_nodes = self.nodes_for_symbols(partner, partner=True)
+                rows = rows[np.isin(self.dst[rows], p_nodes)]
+            return rows
+        return self.partner_rows(self.nodes_for_symbols(partner, partner=True))
+
+
+# One graph per table, rebuilt when the loader hands out a new snapshot.
+_GRAPHS: SnapshotCache[PPIGraph] = SnapshotCache()
+
+
+def get_ppi_graph(table: str, lf: Any) -> Optional[PPIGraph]:
+    """The CSR graph for `table` at the snapshot `lf` belongs to (built once)."""
+    spec = PPI_TABLES.get(table)
+    if spec is None or lf is None:
+        return None
+
+    def build() -> PPIGraph:
+        frame = lf.collect() if isinstance(lf, pl.LazyFrame) else lf
+        graph = PPIGraph(table, frame, *spec)
+        logger.info("[string] PPI graph %s: %d nodes, %d rows (CSR)",
+                    table, graph.n_nodes, graph.n_rows)
+        return graph
+
+    return _GRAPHS.get(table, lf, build)
+
+
+def warm_ppi_graphs(get_db) -> None:
+    """Build every PPI graph for the current snapshot (startup warm-up)."""
+    if not STRING_PPI_GRAPH:
+        return
+    tables = (get_db() or {}).get("string") or {}
+    for table in PPI_TABLES:
+        try:
+            get_ppi_graph(table, tables.get(table))
+        except Exception as e:
+            logger.warning("[string] PPI graph warm-up for %s failed: %s", table, e)
+
+
+def narrow_ppi_tables(data: Dict[str, Dict[str, Any]], plan: Optional[dict],
+                      filter_val: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Tuple[int, int]]]:
+    """Return `data` with each filtered PPI table of `plan` replaced by its
+    candidate rows, plus {table: (served rows, candidate rows)} for logging.
+    The input dict is never mutated (it is the process-wide cached snapshot)."""
+    tables = (data or {}).get("string") or {}
+    plan_short = {str(t).split(".")[-1] for t in ((plan or {}).get("tables") or [])}
+    narrowed: Dict[str, Any] = {}
+    sizes: Dict[str, Tuple[int, int]] = {}
+    for table in PPI_TABLES:
+        if table not in tables or not ({table, table.removesuffix("_string")} & plan_short):
+            continue
+        graph = get_ppi_graph(table, tables[table])
+        rows = graph.candidate_rows(filter_val or {}) if graph is not None else None
+        if rows is None:
+            continue
+        narrowed[table] = graph.rows_frame(rows).lazy()
+        sizes[table] = (graph.n_rows, len(rows))
+    if not narrowed:
+        return data, sizes
+    return {**data, "string": {**tables, **narrowed}}, sizes
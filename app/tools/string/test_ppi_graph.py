@@ -0,0 +1,192 @@
+"""Local, Docker-free test for the STRING PPI graph.
+
+Serves a hand-built six-edge network bidirectionally through the service's
+own database_loader._normalize_ppi_v2 and checks the CSR graph against the
+neighbourhoods worked out by hand: anchor / partner lookups (case-
+insensitive), score thresholds, k-hop distances, edges among a gene set and
+the candidate rows for each filter shape. A generated network then checks
+that narrowing and filtering keeps exactly the rows a full-table filter
+keeps. Finally the /execute hooks run on a WorkerCtx: the pre_join hook
+hands the join the graph-narrowed table (ctx.data stays the full
+snapshot), join_and_filter_database returns EGFR's partners, and the
+post_join hook applies the "highest confidence" score floor.
+
+The service part imports app/main.py the way the image does (FastAPI,
+config, app.per_db_tool), so it needs the service requirements installed.
+
+Run:  python app/tools/string/test_ppi_graph.py
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parents[2]                                   # repo root
+sys.path[:0] = [str(ROOT), str(ROOT / "app")]            # `config`, `utils` as in the image
+
+TABLE = "ppi_association_string"
+GENE, PARTNER, SCORE = ("association_gene_symbol", "association_partner_gene_symbol",
+                        "association_score")
+
+# canonical (a < b) edges as the v2 parquet stores them
+_EDGES = [
+    ("EGFR", "ERBB2", 990),
+    ("EGFR", "GRB2", 980),
+    ("EGFR", "SHC1", 850),
+    ("GRB2", "SOS1", 960),
+    ("GRB2", "SHC1", 700),
+    ("MDM2", "TP53", 999),
+]
+
+
+def _load_service():
+    """`app` in the image is the repo's app/ package plus this service's files."""
+    settings = (ROOT / "config" / "settings.py").read_text(encoding="utf-8")
+    for env_var in re.findall(r'"\w+":\s*\("(\w+)",\s*None\)', settings):
+        os.environ.setdefault(env_var, "test/model")  # required model settings
+    import app
+    app.__path__.insert(0, str(HERE / "app"))
+    from app import database_loader, main, ppi_graph
+    from app.per_db_tool import _orchestrator
+    return database_loader, main, ppi_graph, _orchestrator
+
+
+def _served(loader, edges) -> pl.LazyFrame:
+    canon = pl.DataFrame({
+        "protein_id": [f"9606.{a}" for a, _, _ in edges],
+        GENE: [a for a, _, _ in edges],
+        "protein_partner_id": [f"9606.{b}" for _, b, _ in edges],
+        PARTNER: [b for _, b, _ in edges],
+        SCORE: [str(s) for _, _, s in edges],
+    }).lazy()
+    return loader._normalize_ppi_v2(canon, gene_col=GENE, partner_col=PARTNER)
+
+
+def _syms(graph, nodes) -> list:
+    return sorted(i.split(".")[1] for i in graph.node_ids[nodes])
+
+
+def _pairs(graph, rows) -> list:
+    f = graph.rows_frame(rows)
+    return sorted(zip(f[GENE].to_list(), f[PARTNER].to_list()))
+
+
+def _check_fixture(g, served) -> None:
+    graph = g.get_ppi_graph(TABLE, served)
+    assert (graph.n_nodes, graph.n_rows) == (7, 12)
+    assert g.get_ppi_graph(TABLE, served) is graph, "one build per snapshot"
+
+    egfr = graph.nodes_for_symbols(["egfr"])
+    assert _syms(graph, graph.neighbours(egfr)) == ["ERBB2", "GRB2", "SHC1"]
+    assert _syms(graph, graph.neighbours(egfr, SCORE, 900)) == ["ERBB2", "GRB2"]
+    assert _pairs(graph, graph.partner_rows(graph.nodes_for_symbols(["Grb2"], partner=True))) == [
+        ("EGFR", "GRB2"), ("SHC1", "GRB2"), ("SOS1", "GRB2")]
+    assert not len(graph.nodes_for_symbols(["NOT_A_GENE"]))
+    print("[ok] neighbours, partner rows and score floor match the hand-built network")
+
+    reached, hops = graph.k_hop(egfr, 2)
+    assert dict(zip(_syms(graph, reached[np.argsort(graph.node_ids[reached])]),
+                    hops[np.argsort(graph.node_ids[reached])].tolist())) == {
+        "EGFR": 0, "ERBB2": 1, "GRB2": 1, "SHC1": 1, "SOS1": 2}
+    reached, hops = graph.k_hop(graph.nodes_for_symbols(["TP53"]), 3)
+    assert _syms(graph, reached) == ["MDM2", "TP53"] and sorted(hops.tolist()) == [0, 1]
+    trio = graph.nodes_for_symbols(["EGFR", "GRB2", "SHC1"])
+    assert _pairs(graph, graph.edges_among(trio)) == [
+        ("EGFR", "GRB2"), ("EGFR", "SHC1"), ("GRB2", "EGFR"),
+        ("GRB2", "SHC1"), ("SHC1", "EGFR"), ("SHC1", "GRB2")]
+    print("[ok] k-hop distances and edges among {EGFR, GRB2, SHC1}")
+
+    assert _pairs(graph, graph.candidate_rows({GENE: ["EGFR"], PARTNER: ["grb2"]})) == [
+        ("EGFR", "GRB2")]
+    assert _pairs(graph, graph.candidate_rows({GENE: "requested", PARTNER: ["SOS1"]})) == [
+        ("GRB2", "SOS1")]
+    assert graph.candidate_rows({GENE: "requested"}) is None
+    print("[ok] candidate rows per filter shape; no gene filter means no narrowing")
+
+
+def _apply(lf: pl.LazyFrame, fv: dict) -> pl.DataFrame:
+    for col, vals in fv.items():
+        lf = lf.filter(pl.col(col).str.to_lowercase().is_in([v.lower() for v in vals]))
+    return lf.collect().sort(pl.all())
+
+
+def _check_equivalence(g, loader) -> None:
+    rng = random.Random(0)
+    pairs = set()
+    while len(pairs) < 3000:
+        a, b = rng.randrange(400), rng.randrange(400)
+        if a < b:
+            pairs.add((a, b))
+    served = _served(loader, [(f"GENE{a}", f"GENE{b}", rng.randint(400, 999))
+                              for a, b in sorted(pairs)])
+    data = {"string": {TABLE: served}}
+    plan = {"tables": [f"string.{TABLE}"]}
+    cases = [
+        {GENE: ["gene5", "Gene77", "GENE399"]},
+        {PARTNER: ["GENE9"]},
+        {GENE: ["GENE1", "GENE2", "GENE3"], PARTNER: ["gene4", "GENE1", "GENE300"]},
+        {GENE: ["NOT_A_GENE"]},
+    ]
+    for fv in cases:
+        narrowed, sizes = g.narrow_ppi_tables(data, plan, fv)
+        assert _apply(narrowed["string"][TABLE], fv).equals(_apply(served, fv)), fv
+        assert sizes[TABLE][1] <= sizes[TABLE][0]
+    assert data["string"][TABLE] is served, "input snapshot must not be mutated"
+    print(f"[ok] {len(cases)} filter shapes on a generated network: narrowed + filter == "
+          "full-table filter")
+
+
+async def _check_service(main, orch, served) -> None:
+    from config.guardrail import QueryInterpreterOutputGuardrail
+    from utils.dataframe_filtering import join_and_filter_database
+
+    fq = "string.ppi_association"
+    ctx = orch.WorkerCtx(
+        db="string", display_name="STRING", connection_id=None,
+        input=QueryInterpreterOutputGuardrail(
+            cleaned_query="highest confidence interaction partners of EGFR"),
+        log=logging.getLogger("test_ppi_graph"),
+    )
+    ctx.data = {"string": {TABLE: served}}
+    ctx.plan = {"tables": [fq], "parents": {fq: None}, "join_pairs": {},
+                "table_columns": {fq: [GENE, PARTNER, SCORE]}}
+    ctx.out_cols = [GENE, PARTNER, SCORE]
+    ctx.filter_val = {GENE: ["egfr"], PARTNER: "requested", SCORE: "requested"}
+
+    await main._string_execute_pre_join(ctx)
+    assert ctx.data["string"][TABLE] is served, "ctx.data stays the full snapshot"
+    assert ctx.join_data["string"][TABLE].collect().height == 3
+    with orch._join_data(ctx) as data:
+        ctx.df, ctx.filter_stats = join_and_filter_database(
+            data, ctx.plan, "string", ctx.out_cols, ctx.filter_val)
+    assert ctx.join_data is None
+    assert sorted(ctx.df[PARTNER].to_list()) == ["ERBB2", "GRB2", "SHC1"]
+    print("[ok] pre_join: the join runs on EGFR's 3 graph rows, ctx.data untouched")
+
+    main._string_query_semantics(ctx)
+    assert sorted(ctx.df[PARTNER].to_list()) == ["ERBB2", "GRB2"]
+    assert ctx.filter_stats[-1].rows_before == 3 and ctx.filter_stats[-1].rows_after == 2
+    print("[ok] post_join: 'highest confidence' keeps the score >= 900 partners")
+
+
+def main() -> int:
+    loader, service, g, orch = _load_service()
+    served = _served(loader, _EDGES)
+    _check_fixture(g, served)
+    _check_equivalence(g, loader)
+    asyncio.run(_check_service(service, orch, served))
+    print("\nPASS ✓  STRING PPI graph")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -163,7 +163,12 @@ def score_and_sort(query: str, df: pl.DataFrame) -> pl.DataFrame:
 
 
 # ── Background pre-warm ───────────────────────────────────────────────────────
-# Trigger ONNX JIT compilation at module import time so the first real user
-# query doesn't pay the cold-start penalty (3-4× slower on first batch).
-if _ENABLED:
-    threading.Thread(target=_get_model, daemon=True, name="bge-prewarm").start()
+# Load the model and trigger ONNX JIT compilation in the background so the
+# first real user query doesn't pay the cold-start penalty (3-4× slower on
+# first batch). Called from the service's startup hook (per_db_tool._main),
+# not at import: an import-time thread raced the rest of the app's imports
+# for the import lock, and under the pre-fork runner the startup hook
+# already runs once per worker, after the fork.
+def start_prewarm() -> None:
+    if _ENABLED and _model is None:
+        threading.Thread(target=_get_model, daemon=True, name="bge-prewarm").start()
@@ -0,0 +1,342 @@
+"""Result artifacts under RESULTS_ROOT: dedup, parquet twins, byte-budget eviction.
+
+Every per-DB answer used to be written with ``df.write_csv`` on the request
+path, to a fresh uuid-named file, and only a startup sweep ever removed
+them. Now:
+
+* ``publish_result(df, prefix)`` hashes the frame's content (schema + ordered
+  row hashes) and writes ``RESULTS_ROOT/<prefix>_<hash>.csv`` in a worker
+  thread, returning the path only once the file is in place. A
+  zstd-compressed ``artifacts/<hash>.parquet`` twin is then written in the
+  background. An identical result (the same question asked again, or by
+  another user) maps to the same files and is not written twice.
+* The CSV stays the public contract. nginx serves ``/results/*.csv``
+  statically, and the frontend, the MCP csv proxy, the cursors and
+  opentarget all read it by path, from any worker, as soon as the path is
+  handed out. The evictor drops CSVs that have a parquet twin before it
+  drops any parquet, since those are the cheapest to rebuild, and
+  ``ensure_csv`` (called by ``GET /download``) streams an evicted CSV back
+  out of its parquet.
+* ``run_evictor`` loops for the life of the service. Each pass deletes
+  anything older than RESULTS_TTL_DAYS, then the least recently used files
+  until RESULTS_ROOT/*.csv + artifacts/ fit in RESULTS_MAX_BYTES.
+  ``GET /download`` stamps atime, so a file someone still reads is kept.
+  Cursor copies (``artifacts/<hash>.arrow``) go first, then rebuildable CSVs.
+
+Counters (published, deduplicated, rebuilt, evicted) are on ``GET /metrics``.
+
+Several services share RESULTS_ROOT. Writes are tmp-file + ``os.replace``
+and an unlink that loses a race is ignored, so concurrent writers and
+evictors are safe.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import polars as pl
+
+from .preprocess import RESULTS_ROOT, _csv_path
+from .tracing import add_metrics_renderer
+
+log = logging.getLogger("uvicorn.error")
+
+ARTIFACT_DIR = os.path.join(RESULTS_ROOT, "artifacts")
+RESULTS_MAX_BYTES = int(os.getenv("RESULTS_MAX_BYTES", str(20 * 1024 ** 3)))
+RESULTS_EVICT_INTERVAL_S = float(os.getenv("RESULTS_EVICT_INTERVAL_S", "300"))
+
+_KEY_LEN = 32
+_KEY_RE = re.compile(r"_([0-9a-f]{%d})\.csv$" % _KEY_LEN)
+
+# CSVs being written by this process (concurrent publishes of the same
+# result share one write) and parquet twins still being written in the
+# background (the evictor leaves them alone)
+_PENDING: Dict[str, asyncio.Future] = {}
+_STATS = {"published": 0, "deduped": 0, "written_bytes": 0,
+          "evicted": 0, "evicted_bytes": 0, "csv_on_demand": 0}
+_EVICT_LOCK = threading.Lock()
+
+
+def _ttl_days() -> int:
+    try:
+        return int(os.environ.get("RESULTS_TTL_DAYS", "14"))
+    except ValueError:
+        return 14
+
+
+def content_key(df: pl.DataFrame) -> str:
+    """Hex digest of the frame's schema and its rows, in order."""
+    h = hashlib.sha256()
+    h.update(pl.__version__.encode())  # row hashes are only stable per version
+    h.update(repr(list(df.schema.items())).encode("utf-8"))
+    h.update(str(df.height).encode())
+    if df.height and df.width:
+        h.update(df.hash_rows(seed=0).to_numpy().tobytes())
+    return h.hexdigest()[:_KEY_LEN]
+
+
+def artifact_path(key: str) -> str:
+    return os.path.join(ARTIFACT_DIR, f"{key}.parquet")
+
+
+def cursor_path(key: str) -> str:
+    """Uncompressed Arrow IPC copy used for paging (see per_db_tool._cursors)."""
+    return os.path.join(ARTIFACT_DIR, f"{key}.arrow")
+
+
+def key_for_csv(csv_path: str) -> Optional[str]:
+    """Key encoded in a result CSV's name: the content hash of a published
+    result, or the random uuid hex of a spilled one (same length; it simply
+    has no parquet twin). None for any other name."""
+    m = _KEY_RE.search(os.path.basename(csv_path))
+    return m.group(1) if m else None
+
+
+def _touch(path: str) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except OSError:
+        return False
+
+
+def _atomic_write(path: str, write) -> int:
+    tmp = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}")
+    try:
+        write(tmp)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return size
+
+
+def _write_csv(df: pl.DataFrame, csv_path: str) -> None:
+    if not _touch(csv_path):
+        _STATS["written_bytes"] += _atomic_write(csv_path, df.write_csv)
+
+
+def _write_parquet(df: pl.DataFrame, key: str) -> None:
+    parquet = artifact_path(key)
+    if not _touch(parquet):
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        _STATS["written_bytes"] += _atomic_write(
+            parquet, lambda p: df.write_parquet(p, compression="zstd", statistics=False))
+
+
+def _track(path: str, fut: asyncio.Future) -> asyncio.Future:
+    _PENDING[path] = fut
+
+    def _done(f: asyncio.Future) -> None:
+        _PENDING.pop(path, None)
+        if not f.cancelled() and f.exception() is not None:
+            log.warning("[artifacts] writing %s failed: %s", os.path.basename(path), f.exception())
+
+    fut.add_done_callback(_done)
+    return fut
+
+
+async def publish_result(df: pl.DataFrame, prefix: str) -> str:
+    """Store *df* and return the path of its CSV, which exists by then. The
+    CSV is written in a worker thread; its parquet twin follows in the
+    background."""
+    try:
+        key = content_key(df)
+    except Exception as e:  # noqa: BLE001 — e.g. an unhashable dtype: no dedup
+        log.debug("[artifacts] content hash failed (%s); using a random key", e)
+        key = uuid.uuid4().hex[:_KEY_LEN]
+    csv_path = _csv_path(prefix, key)
+    parquet = artifact_path(key)
+    _STATS["published"] += 1
+    pending = _PENDING.get(csv_path)
+    if pending is not None:
+        _STATS["deduped"] += 1
+        await asyncio.shield(pending)
+    elif _touch(csv_path):
+        _STATS["deduped"] += 1
+    else:
+        os.makedirs(RESULTS_ROOT, exist_ok=True)
+        await asyncio.shield(_track(csv_path, asyncio.ensure_future(
+            asyncio.to_thread(_write_csv, df, csv_path))))
+    if parquet not in _PENDING and not _touch(parquet):
+        _track(parquet, asyncio.ensure_future(asyncio.to_thread(_write_parquet, df, key)))
+    return csv_path
+
+
+def _csv_from_parquet(parquet: str, csv_path: str) -> None:
+    _atomic_write(csv_path, lambda p: pl.scan_parquet(parquet).sink_csv(p))
+
+
+async def ensure_csv(csv_path: str) -> bool:
+    """Make sure *csv_path* exists: wait for a write still in progress here,
+    or rebuild an evicted CSV from its parquet artifact. False when neither
+    is possible."""
+    pending = _PENDING.get(csv_path)
+    if pending is not None:
+        try:
+            await asyncio.shield(pending)
+        except Exception:  # noqa: BLE001 — logged by the done callback
+            pass
+    if os.path.exists(csv_path):
+        return True
+    key = key_for_csv(csv_path)
+    if key is None or not os.path.exists(artifact_path(key)):
+        return False
+    try:
+        await asyncio.to_thread(_csv_from_parquet, artifact_path(key), csv_path)
+    except Exception as e:  # noqa: BLE001
+        log.warning("[artifacts] rebuilding %s from parquet failed: %s", os.path.basename(csv_path), e)
+        return os.path.exists(csv_path)
+    _STATS["csv_on_demand"] += 1
+    _touch(artifact_path(key))
+    return True
+
+
+async def ensure_parquet(csv_path: str) -> Optional[str]:
+    """The parquet twin of a published CSV, once its background write (if
+    it is still running here) has finished. None when there is none."""
+    key = key_for_csv(csv_path)
+    if key is None:
+        return None
+    parquet = artifact_path(key)
+    pending = _PENDING.get(parquet)
+    if pending is not None:
+        try:
+            await asyncio.shield(pending)
+        except Exception:  # noqa: BLE001 — logged by the done callback
+            pass
+    return parquet if os.path.exists(parquet) else None
+
+
+def _scan(root: Path) -> List[Tuple[int, float, float, int, Path]]:
+    """(rank, last_used, mtime, size, path) for every file the evictor owns.
+    rank 0 = a cursor copy or a CSV that can be rebuilt from its parquet,
+    1 = everything else."""
+    out = []
+    dirs = [root, root / "artifacts"]
+    artifacts = set()
+    try:
+        artifacts = {p.stem for p in dirs[1].glob("*.parquet")}
+    except OSError:
+        pass
+    for d, suffixes in zip(dirs, ((".csv",), (".parquet", ".arrow"))):
+        try:
+            entries = list(d.iterdir())
+        except OSError:
+            continue
+        for p in entries:
+            suffix = p.suffix.lower()
+            if suffix not in suffixes or p.name.startswith("."):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            rebuildable = suffix == ".arrow" or (suffix == ".csv" and key_for_csv(p.name) in artifacts)
+            out.append((0 if rebuildable else 1, max(st.st_atime, st.st_mtime),
+                        st.st_mtime, st.st_size, p))
+    return out
+
+
+def evict_results(
+    root: str = RESULTS_ROOT,
+    ttl_days: Optional[int] = None,
+    max_bytes: int = RESULTS_MAX_BYTES,
+) -> Tuple[int, int]:
+    """One eviction pass; returns (files removed, bytes freed). Only top-level
+    CSVs and artifacts/*.parquet are touched, never other subdirectories."""
+    ttl_days = _ttl_days() if ttl_days is None else ttl_days
+    if not _EVICT_LOCK.acquire(blocking=False):
+        return 0, 0
+    removed = freed = 0
+    try:
+        entries = _scan(Path(root))
+        in_flight = set(_PENDING)
+        cutoff = time.time() - ttl_days * 86400 if ttl_days > 0 else None
+        keep = []
+        for e in entries:
+            if cutoff is not None and e[1] < cutoff and str(e[4]) not in in_flight:
+                if _unlink(e[4]):
+                    removed += 1
+                    freed += e[3]
+            else:
+                keep.append(e)
+        total = sum(e[3] for e in keep)
+        if max_bytes > 0 and total > max_bytes:
+            for rank, _, _, size, p in sorted(keep):
+                if str(p) in in_flight:
+                    continue
+                if _unlink(p):
+                    removed += 1
+                    freed += size
+                total -= size
+                if total <= max_bytes:
+                    break
+    finally:
+        _EVICT_LOCK.release()
+    _STATS["evicted"] += removed
+    _STATS["evicted_bytes"] += freed
+    return removed, freed
+
+
+def _unlink(p: Path) -> bool:
+    try:
+        p.unlink()
+        return True
+    except FileNotFoundError:
+        return False  # another service got there first; harmless
+    except OSError as e:
+        log.debug("[artifacts] could not remove %s: %s", p, e)
+        return False
+
+
+async def run_evictor(display_name: str, interval_s: float = RESULTS_EVICT_INTERVAL_S) -> None:
+    """Run ``evict_results`` every *interval_s* seconds until cancelled."""
+    while True:
+        try:
+            removed, freed = await asyncio.to_thread(evict_results)
+            if removed:
+                log.info("[artifacts] %s: evicted %d file(s), %.1f MB (root=%s)",
+                         display_name, removed, freed / 1e6, RESULTS_ROOT)
+        except Exception as e:  # noqa: BLE001 — keep looping
+            log.warning("[artifacts] %s: eviction pass failed: %s", display_name, e)
+        if interval_s <= 0:
+            return
+        await asyncio.sleep(interval_s)
+
+
+def artifact_stats() -> dict:
+    return {**_STATS, "pending": len(_PENDING), "max_bytes": RESULTS_MAX_BYTES}
+
+
+def _render_metrics() -> str:
+    lines = ["# HELP biochirp_result_artifacts_total Result files published / deduplicated / evicted.",
+             "# TYPE biochirp_result_artifacts_total counter"]
+    for event in ("published", "deduped", "csv_on_demand", "evicted"):
+        lines.append(f'biochirp_result_artifacts_total{{event="{event}"}} {_STATS[event]}')
+    lines += ["# HELP biochirp_result_artifact_bytes_total Bytes written / evicted under RESULTS_ROOT.",
+              "# TYPE biochirp_result_artifact_bytes_total counter",
+              f'biochirp_result_artifact_bytes_total{{event="written"}} {_STATS["written_bytes"]}',
+              f'biochirp_result_artifact_bytes_total{{event="evicted"}} {_STATS["evicted_bytes"]}']
+    return "\n".join(lines)
+
+
+add_metrics_renderer(_render_metrics)
+
+
+__all__ = [
+    "artifact_path", "artifact_stats", "content_key", "cursor_path", "ensure_csv",
+    "ensure_parquet", "evict_results", "key_for_csv", "publish_result", "run_evictor",
+]
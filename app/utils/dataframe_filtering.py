@@ -13,12 +13,13 @@ Updates (high-value, low-risk):
 2) Better root selection (choose smallest root table by estimated rows)
 """
 
+import io
 import os
 import re
 import logging
 from typing import Any, Dict, List, Tuple, Optional, Set
 from functools import reduce
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from contextvars import ContextVar
 
 _HGVS_STRIP_RE = re.compile(r"(dup|del|ins)[acgt]+$", flags=re.IGNORECASE)
@@ -102,6 +103,10 @@ def _protein_shorthand_regex(v: str) -> Optional[str]:
 
 import polars as pl
 
+from .genomic_index import GENOMIC_REGION_KEY, parse_region, region_predicate
+from .preprocess import _csv_path
+from .tracing import span
+
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -120,9 +125,19 @@ STRICT_JOIN_MODE = os.getenv("STRICT_JOIN_MODE", "true").lower() == "true"
 CROSS_JOIN_THRESHOLD = float(os.getenv("CROSS_JOIN_THRESHOLD", "100000"))
 MAX_RESULT_SIZE = int(os.getenv("MAX_RESULT_SIZE", "10000000"))
 ENABLE_STREAMING = os.getenv("ENABLE_STREAMING", "true").lower() == "true"
+# Results estimated above RESULT_SPILL_ROWS are not collected whole: the
+# deduplicated, ranked result is streamed to disk (sink_parquet → sink_csv)
+# and only its first RESULT_TOPK_ROWS rows come back as the in-memory frame
+# for preview / relevance scoring. MAX_RESULT_SIZE then only applies with
+# RESULT_SPILL=false.
+RESULT_SPILL = os.getenv("RESULT_SPILL", "true").lower() == "true"
+RESULT_SPILL_ROWS = int(os.getenv("RESULT_SPILL_ROWS", str(MAX_UNIQUE_ROWS)))
+RESULT_TOPK_ROWS = int(os.getenv("RESULT_TOPK_ROWS", "50000"))
 
 # Per-query cardinality cache (concurrency-safe)
 _CARDINALITY_CACHE: ContextVar[Dict[int, int]] = ContextVar("_CARDINALITY_CACHE", default={})
+# Set by join_and_filter_database when the last join in this context spilled.
+_SPILLED_RESULT: ContextVar[Optional["SpilledResult"]] = ContextVar("_SPILLED_RESULT", default=None)
 
 @dataclass
 class FilterStat:
@@ -133,6 +148,44 @@ class FilterStat:
     table: str = ""
 
 
+@dataclass
+class SpilledResult:
+    """A join result written to disk instead of being collected whole."""
+    csv_path: str
+    total_rows: int
+    top_k: int
+    columns: List[str] = field(default_factory=list)   # the CSV's header, in order
+
+
+# Columns whose null means "no ID assigned", not a broken row: a null
+# kegg_hsa_xref (SMPDB-only pathway) or omim_xref (no OMIM entry) must not
+# drop an otherwise valid result row.
+NULLABLE_SUFFIXES = ("_xref", "xref_id", "xref_source", "icd11")
+
+
+def null_drop_columns(columns: List[str]) -> List[str]:
+    """Columns whose nulls mark outer-join / partial-match artefact rows.
+
+    Everything but relevance_score (added by scoring, always non-null) and
+    the optional cross-reference columns in NULLABLE_SUFFIXES. Shared by the
+    per-DB orchestrator's null-drop and the spill sink, so a spilled CSV holds
+    the same rows the in-memory preview does.
+    """
+    return [
+        c for c in columns
+        if c != "relevance_score"
+        and not any(c.endswith(s) or c == s for s in NULLABLE_SUFFIXES)
+    ]
+
+
+def take_spilled_result() -> Optional[SpilledResult]:
+    """The SpilledResult of the last join_and_filter_database call in this
+    context (cleared on read), or None when that result was collected whole."""
+    spilled = _SPILLED_RESULT.get()
+    _SPILLED_RESULT.set(None)
+    return spilled
+
+
 @dataclass
 class JoinMetrics:
     """Metrics for monitoring join operations."""
@@ -486,6 +539,31 @@ def fast_filter_dataframe(
         _numeric_handled.add(_num_col)
         _numeric_handled.add(_op_field)
 
+    # ── Genomic region filter ─────────────────────────────────────────────────
+    # `genomic_region` is a virtual key (no such column): its values are region
+    # strings ("GRCh38:17:43044295-43125483") matched as an interval overlap on
+    # any table carrying chrom + pos — see utils.genomic_index. Tables without
+    # coordinates ignore it, like any filter whose column they lack.
+    if GENOMIC_REGION_KEY in filters and "chrom" in schema and "pos" in schema:
+        _raw_regions = filters[GENOMIC_REGION_KEY]
+        _regions = [r for r in map(parse_region, _raw_regions if isinstance(_raw_regions, list) else [])
+                    if r is not None]
+        if _regions:
+            _nb = estimate_cardinality(df)
+            df = df.filter(reduce(lambda a, b: a | b,
+                                  [region_predicate(r, list(schema)) for r in _regions]))
+            _na = estimate_cardinality(df)
+            if filter_stats is not None:
+                filter_stats.append(
+                    FilterStat(
+                        column=GENOMIC_REGION_KEY,
+                        input_values=[str(r) for r in _regions],
+                        rows_before=_nb,
+                        rows_after=_na,
+                        table=table_name or "",
+                    )
+                )
+
     # AND columns
     # Columns whose stored value is a complex string (HGVS notation, free-text
     # variant descriptions, fusion-pair strings) which the user typically queries
@@ -778,7 +856,8 @@ def collect_with_memory_management(join_chain: pl.LazyFrame, db_name: str) -> pl
     """
     logger.info(f"[{db_name}] Collecting results...")
 
-    estimated_rows = estimate_cardinality(join_chain)
+    with span("estimate_rows", kind="scan", db=db_name):
+        estimated_rows = estimate_cardinality(join_chain)
     if estimated_rows > MAX_RESULT_SIZE:
         raise DatabaseJoinError(
             f"Query would return {estimated_rows:,} rows, which exceeds "
@@ -786,25 +865,119 @@ def collect_with_memory_management(join_chain: pl.LazyFrame, db_name: str) -> pl
             f"or adjust MAX_RESULT_SIZE environment variable."
         )
 
-    try:
-        if ENABLE_STREAMING:
-            result = join_chain.collect(streaming=True)
-        else:
-            result = join_chain.collect()
-    except pl.exceptions.ComputeError as exc:
-        # Polars streaming can fail with "Invalid thrift: protocol error" on the first
-        # collect after a container restart (stale OS-level file state). Retry once
-        # with non-streaming collect which forces a fresh file read.
-        if "thrift" in str(exc).lower() or "protocol error" in str(exc).lower() or "specification" in str(exc).lower():
-            logger.warning(f"[{db_name}] streaming collect failed ({exc}); retrying without streaming")
-            result = join_chain.collect()
-        else:
-            raise
+    # The lazy parquet scans, filters and joins all execute here.
+    with span("collect", kind="scan", db=db_name) as _sp:
+        try:
+            if ENABLE_STREAMING:
+                result = join_chain.collect(streaming=True)
+            else:
+                result = join_chain.collect()
+        except pl.exceptions.ComputeError as exc:
+            # Polars streaming can fail with "Invalid thrift: protocol error" on the first
+            # collect after a container restart (stale OS-level file state). Retry once
+            # with non-streaming collect which forces a fresh file read.
+            if "thrift" in str(exc).lower() or "protocol error" in str(exc).lower() or "specification" in str(exc).lower():
+                logger.warning(f"[{db_name}] streaming collect failed ({exc}); retrying without streaming")
+                result = join_chain.collect()
+            else:
+                raise
+
+        _sp["rows"] = result.height
 
     logger.info(f"[{db_name}] Collected {result.height:,} rows")
     return result
 
 
+def spill_large_result(
+    join_chain: pl.LazyFrame,
+    cols_to_use: List[str],
+    sort_cols: List[str],
+    descending: List[bool],
+    db_name: str,
+    top_k: int = RESULT_TOPK_ROWS,
+) -> Tuple[pl.DataFrame, SpilledResult]:
+    """
+    Stream a result too large to hold in memory to disk.
+
+    The deduplicated chain is ordered by the rank columns (or by every output
+    column when there is no rank column), with the remaining sortable columns
+    as tiebreakers so the order is total and reproducible. It is sunk once to
+    a zstd parquet, the CSV download is streamed from that parquet, and the
+    first *top_k* rows are read back as the in-memory frame. The parquet is
+    removed afterwards.
+
+    Rows with a null in a data column (see null_drop_columns) are dropped in
+    the sink, unless that would leave no rows at all: the same rule the
+    orchestrator applies to a collected frame.
+    """
+    schema = join_chain.collect_schema()
+    by = list(sort_cols)
+    desc = list(descending)
+    for c in cols_to_use:
+        if c not in by and not schema[c].is_nested():
+            by.append(c)
+            desc.append(False)
+
+    ordered = join_chain.unique(subset=cols_to_use)
+    if by:
+        ordered = ordered.sort(by, descending=desc, nulls_last=True)
+
+    csv_path = _csv_path(f"{db_name}_results")
+    parquet_path = csv_path[: -len(".csv")] + ".spill.parquet"
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    try:
+        with span("sink", kind="scan", db=db_name) as _sp:
+            ordered.sink_parquet(parquet_path, compression="zstd")
+            full = pl.scan_parquet(parquet_path)
+            total = int(full.select(pl.len()).collect().item())
+            data_cols = null_drop_columns(cols_to_use)
+            if data_cols:
+                clean = full.drop_nulls(subset=data_cols)
+                kept = int(clean.select(pl.len()).collect().item())
+                if kept:
+                    full, total = clean, kept
+            head = full.head(top_k).collect()
+            full.sink_csv(csv_path)
+            _sp["rows"] = total
+    finally:
+        try:
+            os.unlink(parquet_path)
+        except OSError:
+            pass
+
+    logger.info(
+        f"[{db_name}] Spilled {total:,} rows to {csv_path}; "
+        f"keeping top {head.height:,} in memory"
+    )
+    return head, SpilledResult(csv_path=csv_path, total_rows=total, top_k=head.height,
+                               columns=list(head.columns))
+
+
+def rewrite_spilled_csv(spilled: SpilledResult, head: pl.DataFrame) -> None:
+    """Rewrite a spilled CSV so it starts with *head* — the in-memory top-K
+    as the caller finally ordered and projected it (relevance sort, post-join
+    hooks) — followed by the rows past the top-K in rank order, projected to
+    the same columns. The CSV, and cursor pages over it, then agree row for
+    row with a preview taken from the head of *head*. Streamed, so the full
+    result is never held in memory; the tail is copied as text, unchanged."""
+    columns = list(head.columns)
+    head_text = pl.read_csv(io.BytesIO(head.write_csv().encode()), infer_schema=False)
+    tail = (pl.scan_csv(spilled.csv_path, infer_schema=False)
+            .slice(spilled.top_k).select(columns))
+    tmp = spilled.csv_path + ".tmp"
+    try:
+        pl.concat([head_text.lazy(), tail]).sink_csv(tmp)
+        os.replace(tmp, spilled.csv_path)
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    spilled.total_rows += head.height - spilled.top_k
+    spilled.top_k = head.height
+    spilled.columns = columns
+
+
 def normalize_join_pairs(join_pairs: Dict[Any, Dict[str, Any]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
     """
     Normalize join_pairs keys to (left, right) tuples.
@@ -861,6 +1034,7 @@ def join_and_filter_database(
     """
     # Reset per-query cache (ContextVar to avoid cross-request collisions)
     _CARDINALITY_CACHE.set({})
+    _SPILLED_RESULT.set(None)
     filter_stats: List[FilterStat] = []
 
     logger.info(f"[{db_name}] Starting join_and_filter_database")
@@ -922,6 +1096,8 @@ def join_and_filter_database(
                     _sch = _tbl_df.collect_schema() if hasattr(_tbl_df, "collect_schema") else _tbl_df.schema
                     for _c in (_sch.names() if hasattr(_sch, "names") else _sch):
                         _all_schema_cols.add(_c)
+                    if "chrom" in _all_schema_cols and "pos" in _all_schema_cols:
+                        _all_schema_cols.add(GENOMIC_REGION_KEY)
                 except Exception:
                     pass
         _real_keys = {
@@ -1317,6 +1493,9 @@ def join_and_filter_database(
     ]
     _rank_col = None
     _rank_desc = True
+    sort_cols: list[str] = []
+    descending: list[bool] = []
+    _unsorted_chain = join_chain
     for _c, _desc in _RANK_COLUMNS:
         if _c in final_schema:
             _rank_col = _c
@@ -1350,6 +1529,23 @@ def join_and_filter_database(
 
     join_chain = join_chain.select(cols_to_use)
 
+    # Large results: stream to disk, keep the top-K. require_all needs the
+    # whole frame for its group-by, so it stays on the collect path.
+    if RESULT_SPILL and not (plan or {}).get("require_all_fields"):
+        with span("estimate_rows", kind="scan", db=db_name):
+            estimated_rows = estimate_cardinality(join_chain)
+        if estimated_rows > RESULT_SPILL_ROWS:
+            try:
+                result, spilled = spill_large_result(
+                    _unsorted_chain.select(cols_to_use), cols_to_use,
+                    sort_cols, descending, db_name,
+                )
+            except Exception as e:
+                logger.exception(f"[{db_name}] Failed to spill results: {e}")
+                raise DatabaseJoinError(f"Failed to execute query: {e}") from e
+            _SPILLED_RESULT.set(spilled)
+            return result, filter_stats
+
     try:
         result = collect_with_memory_management(join_chain, db_name)
 
@@ -0,0 +1,237 @@
+"""Batched Redis pub/sub publishing for live progress events.
+
+The orchestrator's step events, the per-DB table / planner cards and the
+Open Targets table events each used to ``await client.publish(...)`` once per
+event, JSON-encoding it first on the caller's path. A query that streams a
+dozen step cards to several users paid a dozen round-trips each.
+
+``EventPublisher.publish`` now only appends the event to its channel's queue
+(one channel per connection) and returns. A single flusher task per process
+waits EVENT_COALESCE_MS for more events to arrive, encodes everything that is
+queued and sends it as one pipelined batch of PUBLISH commands: one
+round-trip for all connections. Order within a channel is kept.
+
+Backpressure: a channel holds at most EVENT_QUEUE_MAX unsent events. When it
+is full (Redis is slow, or the flusher is behind), ``publish`` waits for the
+next flush, for up to EVENT_BLOCK_S. If the channel is still full after that,
+the event is dropped and counted, so a stuck subscriber side can neither
+stall the pipeline nor grow memory. Events published with ``wait=True`` (the
+table events a client must not miss) are never dropped; they wait for their
+batch to be delivered.
+
+Each batch's round-trip and each event's time in the queue are observed into
+the ``utils.tracing`` histograms (kind ``redis``: stages ``publish.batch`` /
+``publish.queue``). Counters (events, batches, dropped, events that reached no
+subscriber) are appended to ``GET /metrics``.
+
+Events are encoded when their batch is sent, not when they are queued, so
+callers must not mutate an event dict after publishing it.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .tracing import add_metrics_renderer, observe
+
+log = logging.getLogger("uvicorn.error")
+
+EVENT_COALESCE_MS = float(os.getenv("EVENT_COALESCE_MS", "3"))
+EVENT_QUEUE_MAX = int(os.getenv("EVENT_QUEUE_MAX", "256"))
+EVENT_BLOCK_S = float(os.getenv("EVENT_BLOCK_S", "0.5"))
+
+# (queued at, event, delivery future or None)
+_Item = Tuple[float, Any, Optional[asyncio.Future]]
+
+_PUBLISHERS: List["EventPublisher"] = []
+
+
+class EventPublisher:
+    """Per-process publisher: per-channel queues, one pipelined flush loop."""
+
+    def __init__(
+        self,
+        redis_getter: Callable[[], Awaitable[Any]],
+        name: str = "events",
+        coalesce_ms: float = EVENT_COALESCE_MS,
+        queue_max: int = EVENT_QUEUE_MAX,
+        block_s: float = EVENT_BLOCK_S,
+    ):
+        self._redis_getter = redis_getter
+        self.name = name
+        self.coalesce_s = max(coalesce_ms, 0.0) / 1000.0
+        self.queue_max = max(queue_max, 1)
+        self.block_s = block_s
+        self._queues: Dict[str, Deque[_Item]] = {}
+        self._in_flight: set = set()          # channels in the batch being sent
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flushed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events = self.batches = self.dropped = self.throttled = self.unheard = 0
+        _PUBLISHERS.append(self)
+
+    def _ensure_started(self) -> None:
+        # asyncio primitives belong to the loop that made them; rebuild them
+        # if the publisher is first used (or reused) on another loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._flushed = asyncio.Event()
+            self._task = loop.create_task(self._run(), name=f"event-publisher-{self.name}")
+
+    async def _next_flush(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(asyncio.shield(self._flushed.wait()), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def publish(self, channel: str, event: Any, *, wait: bool = False) -> bool:
+        """Queue *event* (a JSON-serialisable dict) for *channel*. With
+        ``wait=True`` return once it has been sent. False when it was
+        dropped or could not be sent."""
+        if not channel:
+            return False
+        self._ensure_started()
+        q = self._queues.get(channel)
+        if q is not None and len(q) >= self.queue_max:
+            self.throttled += 1
+            deadline = time.monotonic() + (self.block_s if not wait else max(self.block_s, 30.0))
+            while len(self._queues.get(channel, ())) >= self.queue_max:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                await self._next_flush(left)
+            if len(self._queues.get(channel, ())) >= self.queue_max and not wait:
+                self.dropped += 1
+                log.debug("[events] %s: queue for %s full, dropping %s",
+                          self.name, channel, (event or {}).get("type") if isinstance(event, dict) else "event")
+                return False
+        fut = self._loop.create_future() if wait else None
+        self._queues.setdefault(channel, deque()).append((time.perf_counter(), event, fut))
+        self._wake.set()
+        if fut is None:
+            return True
+        return await asyncio.shield(fut)
+
+    async def flush(self, channel: Optional[str] = None, timeout: float = 2.0) -> None:
+        """Wait until *channel*'s queued events (every channel's when None)
+        have been sent, for up to *timeout* seconds."""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+
+        def _busy() -> bool:
+            if channel is None:
+                return bool(self._queues) or bool(self._in_flight)
+            return channel in self._queues or channel in self._in_flight
+
+        while _busy():
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            await self._next_flush(left)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self.coalesce_s:
+                await asyncio.sleep(self.coalesce_s)
+            batch = [(ch, item) for ch, q in self._queues.items() for item in q]
+            self._in_flight = set(self._queues)
+            self._queues = {}
+            try:
+                await self._send(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # noqa: BLE001 — never let the loop die
+                log.warning("[events] %s: publish batch failed: %s", self.name, e)
+            finally:
+                self._in_flight = set()
+                done, self._flushed = self._flushed, asyncio.Event()
+                done.set()
+
+    async def _send(self, batch: List[Tuple[str, _Item]]) -> None:
+        if not batch:
+            return
+        payloads: List[Tuple[str, str, _Item]] = []
+        for ch, item in batch:
+            try:
+                payloads.append((ch, json.dumps(item[1], default=str), item))
+            except (TypeError, ValueError) as e:
+                log.warning("[events] %s: unencodable event on %s: %s", self.name, ch, e)
+                _resolve(item[2], False)
+        ok = False
+        t0 = time.perf_counter()
+        try:
+            r = await self._redis_getter()
+            if r is None:
+                self.dropped += len(payloads)
+                return
+            pipe = r.pipeline(transaction=False)
+            for ch, data, _ in payloads:
+                pipe.publish(ch, data)
+            t0 = time.perf_counter()
+            receivers = await pipe.execute()
+            sent_at = time.perf_counter()
+            observe("publish.batch", sent_at - t0, kind="redis")
+            ok = True
+            self.batches += 1
+            self.events += len(payloads)
+            for (ch, _, item), n in zip(payloads, receivers):
+                observe("publish.queue", t0 - item[0], kind="redis")
+                if not n:
+                    self.unheard += 1
+        except Exception:
+            observe("publish.batch", time.perf_counter() - t0, kind="redis", ok=False)
+            self.dropped += len(payloads)
+            raise
+        finally:
+            for _, _, item in payloads:
+                _resolve(item[2], ok)
+
+
+def _resolve(fut: Optional[asyncio.Future], ok: bool) -> None:
+    if fut is not None and not fut.done():
+        fut.set_result(ok)
+
+
+def publisher_stats() -> Dict[str, dict]:
+    return {p.name: {"events": p.events, "batches": p.batches, "dropped": p.dropped,
+                     "throttled": p.throttled, "unheard": p.unheard,
+                     "queued": sum(len(q) for q in p._queues.values())}
+            for p in _PUBLISHERS}
+
+
+def _render_metrics() -> str:
+    if not _PUBLISHERS:
+        return ""
+    stats = publisher_stats()
+    lines = ["# HELP biochirp_events_published_total Progress events by outcome.",
+             "# TYPE biochirp_events_published_total counter"]
+    for name, s in sorted(stats.items()):
+        for outcome in ("events", "dropped", "throttled", "unheard"):
+            label = "sent" if outcome == "events" else outcome
+            lines.append(f'biochirp_events_published_total{{publisher="{name}",outcome="{label}"}} {s[outcome]}')
+    lines += ["# HELP biochirp_event_batches_total Pipelined PUBLISH round-trips.",
+              "# TYPE biochirp_event_batches_total counter"]
+    for name, s in sorted(stats.items()):
+        lines.append(f'biochirp_event_batches_total{{publisher="{name}"}} {s["batches"]}')
+    lines += ["# HELP biochirp_events_queued Events waiting for the next batch.",
+              "# TYPE biochirp_events_queued gauge"]
+    for name, s in sorted(stats.items()):
+        lines.append(f'biochirp_events_queued{{publisher="{name}"}} {s["queued"]}')
+    return "\n".join(lines)
+
+
+add_metrics_renderer(_render_metrics)
+
+
+__all__ = ["EVENT_COALESCE_MS", "EVENT_QUEUE_MAX", "EventPublisher", "publisher_stats"]
@@ -0,0 +1,345 @@
+"""Genomic interval index + region predicate for coordinate tables.
+
+ClinVar's `variant_genomic_coords_clinvar` carries assembly / chrom / pos per
+variant (~8.8M rows over GRCh38 + GRCh37), but the only filters the join path
+knew were string `is_in`s, so "pathogenic variants in chr17:43,044,295-43,125,483"
+meant casting and scanning the whole table on every query.
+
+Two pieces:
+
+  * `genomic_region` — a virtual filter key understood by
+    `fast_filter_dataframe`. Values are region strings
+    ("GRCh38:17:43044295-43125483", "17:43044295"; see `parse_region`) and
+    match every row whose interval [pos, pos + len(ref) - 1] overlaps the
+    region on the same chromosome (and assembly, when given). Any table with
+    chrom + pos columns gets the operator; it is exact on its own.
+
+  * `GenomicIndex` — the fast path. It collects a coordinate table ONCE per
+    snapshot, sorts it by (assembly, chrom, start) and keeps one sorted start
+    array per contig, plus the contig's longest interval span. Overlap,
+    range and nearest queries are then `searchsorted` windows instead of
+    scans. Intervals longer than GENOMIC_INDEX_LONG_SPAN (large CNVs) sit in
+    a separate, small per-contig bin that is checked linearly, so one huge
+    deletion cannot widen every window. `candidate_rows` turns a filter dict
+    into a row superset, and the caller swaps the table for it before the
+    join. The predicate above still runs on the narrowed frame, so results
+    are identical.
+
+With GENOMIC_INDEX_DIR set, the sorted frame is spilled to an uncompressed
+Arrow IPC file there and memory-mapped back. Rows then live in the page
+cache, shared by every worker on the host, instead of on each worker's heap.
+Unset, it is kept in memory.
+
+Set GENOMIC_INDEX=0 to disable the index (the predicate keeps working).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from .index_cache import SnapshotCache
+
+logger = logging.getLogger("uvicorn.error")
+
+GENOMIC_INDEX = os.getenv("GENOMIC_INDEX", "1") == "1"
+GENOMIC_INDEX_DIR = os.getenv("GENOMIC_INDEX_DIR", "")
+GENOMIC_INDEX_LONG_SPAN = int(os.getenv("GENOMIC_INDEX_LONG_SPAN", "10000"))
+
+GENOMIC_REGION_KEY = "genomic_region"
+DEFAULT_ASSEMBLY = "GRCh38"
+
+_ASSEMBLY_ALIASES = {
+    "grch38": "GRCh38", "hg38": "GRCh38", "b38": "GRCh38",
+    "grch37": "GRCh37", "hg19": "GRCh37", "b37": "GRCh37",
+}
+_CHROM = r"(?:chr)?(?:[1-9]|1\d|2[0-2]|X|Y|MT|M)"
+_NUM = r"\d[\d,]*"
+# "chr17:43,044,295-43,125,483", "17:43044295–43125483", "chrX:100000"
+_REGION_RE = re.compile(
+    rf"(?:\b(?P<asm>GRCh3[78]|hg19|hg38)\s*[:/ ]\s*)?"
+    rf"\b(?P<chrom>{_CHROM})\s*:\s*(?P<start>{_NUM})(?:\s*(?:-|–|—|\.\.)\s*(?P<end>{_NUM}))?\b",
+    re.IGNORECASE,
+)
+_ASSEMBLY_RE = re.compile(r"\b(GRCh3[78]|hg19|hg38)\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class GenomicRegion:
+    """1-based, closed interval on one chromosome (assembly None = any)."""
+    assembly: Optional[str]
+    chrom: str
+    start: int
+    end: int
+
+    def __str__(self) -> str:
+        loc = f"{self.chrom}:{self.start}" if self.start == self.end else \
+              f"{self.chrom}:{self.start}-{self.end}"
+        return f"{self.assembly}:{loc}" if self.assembly else loc
+
+
+def normalise_assembly(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return _ASSEMBLY_ALIASES.get(str(value).strip().lower())
+
+
+def normalise_chrom(value: Any) -> str:
+    c = str(value).strip().upper()
+    if c.startswith("CHR"):
+        c = c[3:]
+    return "MT" if c == "M" else c
+
+
+def parse_region(value: Any) -> Optional[GenomicRegion]:
+    """A GenomicRegion from "[assembly:]chrom:start[-end]", or None."""
+    if isinstance(value, GenomicRegion):
+        return value
+    if not isinstance(value, str):
+        return None
+    m = _REGION_RE.fullmatch(value.strip())
+    if not m:
+        return None
+    return _region_from_match(m, None)
+
+
+def _region_from_match(m: "re.Match", assembly: Optional[str]) -> Optional[GenomicRegion]:
+    start = int(m.group("start").replace(",", ""))
+    end = int(m.group("end").replace(",", "")) if m.group("end") else start
+    if start <= 0 or end < start:
+        return None
+    asm = normalise_assembly(m.group("asm")) or assembly
+    return GenomicRegion(asm, normalise_chrom(m.group("chrom")), start, end)
+
+
+def find_regions(text: str, default_assembly: Optional[str] = DEFAULT_ASSEMBLY) -> List[GenomicRegion]:
+    """Every region spelled out in free text. A build named anywhere in the text
+    ("… on hg19") applies to regions without their own prefix. Bare "N:M" pairs
+    need a chr / build prefix or a position ≥ 1000, so "1:2" ratios and times
+    are not read as loci."""
+    if not text:
+        return []
+    named = _ASSEMBLY_RE.search(text)
+    assembly = normalise_assembly(named.group(1)) if named else default_assembly
+    out = []
+    for m in _REGION_RE.finditer(text):
+        prefixed = m.group("asm") or m.group("chrom").lower().startswith("chr")
+        if not prefixed and int(m.group("start").replace(",", "")) < 1000:
+            continue
+        region = _region_from_match(m, assembly)
+        if region is not None and region not in out:
+            out.append(region)
+    return out
+
+
+def _assembly_expr() -> pl.Expr:
+    return pl.col("assembly").str.to_lowercase().replace_strict(
+        _ASSEMBLY_ALIASES, default=pl.col("assembly"), return_dtype=pl.Utf8)
+
+
+def _chrom_expr() -> pl.Expr:
+    return pl.col("chrom").str.to_uppercase().str.replace(r"^CHR", "").str.replace(r"^M$", "MT")
+
+
+def _end_expr(start: pl.Expr, columns: Iterable[str]) -> pl.Expr:
+    if "ref" not in set(columns):
+        return start
+    return start + (pl.col("ref").str.len_chars().cast(pl.Int64).fill_null(1) - 1).clip(0)
+
+
+def region_predicate(region: GenomicRegion, columns: Iterable[str]) -> pl.Expr:
+    """Overlap predicate for one region on a table with chrom / pos [/ ref / assembly]."""
+    cols = set(columns)
+    start = pl.col("pos").cast(pl.Int64, strict=False)
+    end = _end_expr(start, cols)
+    pred = (_chrom_expr() == region.chrom) & (start <= region.end) & (end >= region.start)
+    if region.assembly and "assembly" in cols:
+        pred = pred & (_assembly_expr() == region.assembly)
+    return pred
+
+
+class GenomicIndex:
+    """Per-contig sorted interval index over one coordinate table."""
+
+    def __init__(self, table: str, frame: pl.DataFrame, spill_dir: str = "") -> None:
+        self.table = table
+        cols = frame.columns
+        keyed = frame.with_columns(
+            (_assembly_expr() if "assembly" in cols else pl.lit(None, dtype=pl.Utf8)).alias("__asm"),
+            _chrom_expr().alias("__chrom"),
+            pl.col("pos").cast(pl.Int64, strict=False).alias("__start"),
+        ).filter(pl.col("__start").is_not_null())
+        keyed = keyed.with_columns(_end_expr(pl.col("__start"), cols).alias("__end")) \
+                     .sort(["__asm", "__chrom", "__start"], nulls_last=True)
+
+        starts = keyed["__start"].to_numpy().astype(np.int64)
+        ends = keyed["__end"].to_numpy().astype(np.int64)
+        contigs = keyed.select("__asm", "__chrom").with_row_index("__row") \
+                       .group_by(["__asm", "__chrom"], maintain_order=True) \
+                       .agg(pl.col("__row").min().alias("lo"), pl.col("__row").max().alias("hi"))
+        self._contigs: Dict[Tuple[Optional[str], str], Tuple[int, int]] = {
+            (a, c): (int(lo), int(hi) + 1)
+            for a, c, lo, hi in contigs.iter_rows()
+        }
+        self.n_rows = len(starts)
+
+        long_mask = (ends - starts) >= GENOMIC_INDEX_LONG_SPAN
+        self._short_rows = np.flatnonzero(~long_mask)
+        self._short_start = starts[self._short_rows]
+        self._short_end = ends[self._short_rows]
+        self._long_rows = np.flatnonzero(long_mask)
+        self._long_start = starts[self._long_rows]
+        self._long_end = ends[self._long_rows]
+        # Contig bounds inside the short / long bins + the short bin's widest
+        # span per contig (the searchsorted window for overlaps is widened by it).
+        self._short_bounds: Dict[Tuple[Optional[str], str], Tuple[int, int, int]] = {}
+        self._long_bounds: Dict[Tuple[Optional[str], str], Tuple[int, int]] = {}
+        for key, (lo, hi) in self._contigs.items():
+            s_lo, s_hi = np.searchsorted(self._short_rows, [lo, hi])
+            width = int((self._short_end[s_lo:s_hi] - self._short_start[s_lo:s_hi]).max()) \
+                if s_hi > s_lo else 0
+            self._short_bounds[key] = (int(s_lo), int(s_hi), width)
+            self._long_bounds[key] = tuple(int(x) for x in np.searchsorted(self._long_rows, [lo, hi]))
+
+        self.frame = self._store(keyed.drop(["__asm", "__chrom", "__start", "__end"]), spill_dir)
+        self._starts, self._ends = starts, ends
+
+    def _store(self, frame: pl.DataFrame, spill_dir: str) -> pl.DataFrame:
+        self.spill_path: Optional[str] = None
+        if not spill_dir:
+            return frame
+        try:
+            os.makedirs(spill_dir, exist_ok=True)
+            path = os.path.join(spill_dir, f"{self.table}.{os.getpid()}.{id(self):x}.arrow")
+            frame.write_ipc(path, compression="uncompressed")
+            self.spill_path = path
+            return pl.read_ipc(path, memory_map=True)
+        except Exception as e:
+            logger.warning("[genomic index] spill to %s failed (%s) — keeping %s in memory",
+                           spill_dir, e, self.table)
+            return frame
+
+    def _keys(self, region: GenomicRegion) -> List[Tuple[Optional[str], str]]:
+        return [k for k in self._contigs
+                if k[1] == region.chrom and (region.assembly is None or k[0] == region.assembly)]
+
+    # ── queries (row indices into self.frame) ───────────────────────────
+    def overlap_rows(self, region: GenomicRegion) -> np.ndarray:
+        """Rows whose [start, end] overlaps the region."""
+        parts = []
+        for key in self._keys(region):
+            s_lo, s_hi, width = self._short_bounds[key]
+            st = self._short_start[s_lo:s_hi]
+            a = np.searchsorted(st, region.start - width, side="left")
+            b = np.searchsorted(st, region.end, side="right")
+            hit = np.flatnonzero(self._short_end[s_lo + a:s_lo + b] >= region.start) + s_lo + a
+            parts.append(self._short_rows[hit])
+            l_lo, l_hi = self._long_bounds[key]
+            lmask = (self._long_start[l_lo:l_hi] <= region.end) & (self._long_end[l_lo:l_hi] >= region.start)
+            parts.append(self._long_rows[l_lo:l_hi][lmask])
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def range_rows(self, region: GenomicRegion) -> np.ndarray:
+        """Rows whose start position lies inside the region."""
+        parts = []
+        for key in self._keys(region):
+            lo, hi = self._contigs[key]
+            a, b = np.searchsorted(self._starts[lo:hi], [region.start, region.end + 1])
+            parts.append(np.arange(lo + a, lo + b, dtype=np.int64))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _distance(self, rows: np.ndarray, region: GenomicRegion) -> np.ndarray:
+        return np.maximum(0, np.maximum(self._starts[rows] - region.end,
+                                        region.start - self._ends[rows]))
+
+    def nearest_rows(self, region: GenomicRegion, k: int = 10) -> np.ndarray:
+        """The k rows closest to the region (distance 0 = overlapping), ties
+        broken by row. Exact: the k-th best distance D among the k short
+        intervals starting either side of region.end bounds the search, since
+        a closer short interval must start in [start - width - D, end + D]."""
+        best_rows, best_dist = [], []
+        for key in self._keys(region) if k > 0 else ():
+            s_lo, s_hi, width = self._short_bounds[key]
+            l_lo, l_hi = self._long_bounds[key]
+            st = self._short_start[s_lo:s_hi]
+            b = int(np.searchsorted(st, region.end, side="right"))
+            a, c = max(0, b - k), min(len(st), b + k)
+            dist = self._distance(self._short_rows[s_lo + a:s_lo + c], region)
+            if len(dist) >= k:  # fewer means the window already holds the whole bin
+                bound = int(np.partition(dist, k - 1)[k - 1])
+                a = min(a, int(np.searchsorted(st, region.start - width - bound, side="left")))
+                c = max(c, int(np.searchsorted(st, region.end + bound, side="right")))
+            rows = np.concatenate((self._short_rows[s_lo + a:s_lo + c],
+                                   self._long_rows[l_lo:l_hi]))
+            best_rows.append(rows)
+            best_dist.append(self._distance(rows, region))
+        if not best_rows:
+            return np.empty(0, dtype=np.int64)
+        rows, dist = np.concatenate(best_rows), np.concatenate(best_dist)
+        order = np.lexsort((rows, dist))[:k]
+        return rows[order]
+
+    def rows_frame(self, rows: np.ndarray) -> pl.DataFrame:
+        return self.frame[rows] if len(rows) else self.frame.clear()
+
+    def candidate_rows(self, filter_val: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Row superset for the filter's genomic_region values (None = no region)."""
+        raw = (filter_val or {}).get(GENOMIC_REGION_KEY)
+        if isinstance(raw, str):
+            raw = [raw]
+        regions = [r for r in map(parse_region, raw or []) if r is not None]
+        if not regions:
+            return None
+        return np.unique(np.concatenate([self.overlap_rows(r) for r in regions]))
+
+
+_INDEXES: SnapshotCache[GenomicIndex] = SnapshotCache()
+
+
+def _drop_spill(old: GenomicIndex) -> None:
+    if old.spill_path:
+        try:
+            os.unlink(old.spill_path)  # mapping stays valid until released
+        except OSError:
+            pass
+
+
+def get_genomic_index(table: str, lf: Any) -> Optional[GenomicIndex]:
+    """The index for `table` at the snapshot `lf` belongs to (built once)."""
+    if not GENOMIC_INDEX or lf is None:
+        return None
+
+    def build() -> GenomicIndex:
+        frame = lf.collect() if isinstance(lf, pl.LazyFrame) else lf
+        index = GenomicIndex(table, frame, GENOMIC_INDEX_DIR)
+        logger.info("[genomic index] %s: %d rows, %d contigs, %d long intervals%s",
+                    table, index.n_rows, len(index._contigs), len(index._long_rows),
+                    f", mmap {index.spill_path}" if index.spill_path else "")
+        return index
+
+    return _INDEXES.get(table, lf, build, on_replace=_drop_spill)
+
+
+def narrow_genomic_tables(data: Dict[str, Dict[str, Any]], db: str, tables: Sequence[str],
+                          filter_val: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Tuple[int, int]]]:
+    """Return `data` with each of `tables` replaced by the rows its index
+    returns for the filter's genomic_region values, plus {table: (rows,
+    candidates)} for logging. The input dict is never mutated."""
+    db_tables = (data or {}).get(db) or {}
+    narrowed: Dict[str, Any] = {}
+    sizes: Dict[str, Tuple[int, int]] = {}
+    for table in tables:
+        index = get_genomic_index(table, db_tables.get(table))
+        rows = index.candidate_rows(filter_val) if index is not None else None
+        if rows is None:
+            continue
+        narrowed[table] = index.rows_frame(rows).lazy()
+        sizes[table] = (index.n_rows, len(rows))
+    if not narrowed:
+        return data, sizes
+    return {**data, db: {**db_tables, **narrowed}}, sizes
@@ -0,0 +1,284 @@
+"""Ancestor / descendant index over ontology hierarchy tables.
+
+Reactome's `pathway_hierarchy_reactome` and HPO's `phenotype_hierarchy_hpo`
+are served as plain (parent, child) edge tables, so "all sub-pathways of X"
+or "genes annotated to any descendant of HP:0001250" would need one join per
+level. `HierarchyIndex` collects the edges ONCE per snapshot and precomputes
+the transitive closure as a compressed table — one CSR per direction:
+
+  desc_ptr[u] : desc_ptr[u + 1]   closure rows whose ancestor is node u
+  desc_node[row], desc_depth[row] descendant node, shortest is_a distance
+  (and the transpose anc_ptr / anc_node / anc_depth for ancestors)
+
+Both hierarchies are DAGs with multi-parent terms, where a single pre/post
+order interval per node is not exact; the closure table is, and stays small
+(HPO: ~19k terms, a few hundred thousand pairs). It is built semi-naively —
+each round joins only the pairs discovered in the previous round — so the
+depth stored per pair is the shortest path and cycles in a bad snapshot
+terminate instead of looping.
+
+Queries are array slices: `descendants` / `ancestors` take resolved nodes and
+an optional `max_depth`, `expand` goes from user values (ids or names, case-
+insensitive) to the expanded list of ids or names. The result is meant to be
+dropped into filter_val, so a descendant-expanded filter is one vectorised
+`is_in` in join_and_filter_database instead of repeated joins.
+
+Set HIERARCHY_INDEX=0 to disable (callers then keep their one-level paths).
+"""
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import polars as pl
+
+from .index_cache import SnapshotCache, ranges
+
+logger = logging.getLogger("uvicorn.error")
+
+HIERARCHY_INDEX = os.getenv("HIERARCHY_INDEX", "1") == "1"
+# Upper bound on the values one expanded filter may carry; larger expansions
+# (e.g. "descendants of Phenotypic abnormality") are left unexpanded.
+HIERARCHY_EXPAND_MAX_TERMS = int(os.getenv("HIERARCHY_EXPAND_MAX_TERMS", "5000"))
+
+
+@dataclass(frozen=True)
+class HierarchySpec:
+    """Where a hierarchy's edges and node names live in the served tables."""
+    parent_col: str
+    child_col: str
+    # (table or None for the edge table itself, id col, name col) — every
+    # source contributes id → name pairs; ids without a name stay resolvable.
+    name_sources: Tuple[Tuple[Optional[str], str, str], ...] = ()
+
+
+HIERARCHY_TABLES: Dict[str, HierarchySpec] = {
+    "pathway_hierarchy_reactome": HierarchySpec(
+        parent_col="parent_id", child_col="child_id",
+        name_sources=((None, "parent_id", "parent_pathway_name"),
+                      (None, "child_id", "child_pathway_name")),
+    ),
+    "phenotype_hierarchy_hpo": HierarchySpec(
+        parent_col="parent_id", child_col="phenotype_id",
+        name_sources=(("phenotype_master_table_hpo", "phenotype_id", "phenotype_name"),),
+    ),
+}
+
+
+def _clean_values(v: Any) -> List[str]:
+    """Real filter values as stripped strings (drops None / blanks / 'requested')."""
+    if isinstance(v, str):
+        v = [v]
+    if not isinstance(v, (list, tuple, set)):
+        return []
+    out = []
+    for x in v:
+        if x is None:
+            continue
+        s = str(x).strip()
+        if s and s.lower() != "requested":
+            out.append(s)
+    return out
+
+
+def _csr(src: np.ndarray, dst: np.ndarray, depth: np.ndarray,
+         n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    order = np.lexsort((dst, src))
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=ptr[1:])
+    return ptr, dst[order], depth[order]
+
+
+class HierarchyIndex:
+    """Compressed transitive closure of one (parent, child) edge table."""
+
+    def __init__(self, table: str, edges: pl.DataFrame, parent_col: str, child_col: str,
+                 names: Optional[pl.DataFrame] = None) -> None:
+        self.table = table
+        edges = (edges.select(pl.col(parent_col).cast(pl.Utf8).alias("p"),
+                              pl.col(child_col).cast(pl.Utf8).alias("c"))
+                      .drop_nulls().filter(pl.col("p") != pl.col("c")).unique())
+        ids = pl.concat([edges["p"], edges["c"]])
+        if names is not None and names.height:
+            ids = pl.concat([ids, names["id"]])
+        self.node_ids = np.asarray(ids.unique().sort().to_list(), dtype=object)
+        n = len(self.node_ids)
+        self._id_lc = {str(v).lower(): i for i, v in enumerate(self.node_ids)}
+
+        id_series = pl.Series(self.node_ids.tolist(), dtype=pl.Utf8)
+        p = id_series.search_sorted(edges["p"]).to_numpy().astype(np.int32)
+        c = id_series.search_sorted(edges["c"]).to_numpy().astype(np.int32)
+        self.n_edges = len(p)
+
+        anc, desc, depth = self._closure(p, c)
+        self.n_pairs = len(anc)
+        self.desc_ptr, self.desc_node, self.desc_depth = _csr(anc, desc, depth, n)
+        self.anc_ptr, self.anc_node, self.anc_depth = _csr(desc, anc, depth, n)
+
+        self.node_names = np.full(n, None, dtype=object)
+        self._name_lc: Dict[str, np.ndarray] = {}
+        if names is not None and names.height:
+            names = names.filter(pl.col("id").is_in(id_series)).unique(subset="id", keep="first")
+            pos = id_series.search_sorted(names["id"]).to_numpy()
+            self.node_names[pos] = names["name"].to_list()
+            grouped = (pl.DataFrame({"lc": names["name"].str.to_lowercase(), "node": pos})
+                         .group_by("lc").agg(pl.col("node")))
+            self._name_lc = {k: np.asarray(v, dtype=np.int64)
+                             for k, v in zip(grouped["lc"].to_list(), grouped["node"].to_list())}
+
+    @staticmethod
+    def _closure(p: np.ndarray, c: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Semi-naive closure: (ancestor, descendant, shortest depth) triples."""
+        edges = pl.DataFrame({"a": p, "d": c})
+        step = edges.rename({"a": "d", "d": "next"})
+        parts = [edges.with_columns(depth=pl.lit(1, dtype=pl.Int16))]
+        seen = edges
+        frontier = edges
+        depth = 1
+        while frontier.height:
+            depth += 1
+            frontier = (frontier.join(step, on="d")
+                                .select("a", pl.col("next").alias("d"))
+                                .filter(pl.col("a") != pl.col("d"))
+                                .unique()
+                                .join(seen, on=["a", "d"], how="anti"))
+            if frontier.height:
+                seen = pl.concat([seen, frontier])
+                parts.append(frontier.with_columns(depth=pl.lit(depth, dtype=pl.Int16)))
+        closure = pl.concat(parts)
+        return (closure["a"].to_numpy().astype(np.int32),
+                closure["d"].to_numpy().astype(np.int32),
+                closure["depth"].to_numpy())
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.node_ids)
+
+    # ── resolution ──────────────────────────────────────────────────────
+    def resolve(self, values: Iterable[Any]) -> np.ndarray:
+        """Nodes for ids or names (case-insensitive); unknown values drop out."""
+        hits: List[np.ndarray] = []
+        for v in _clean_values(list(values)):
+            lc = v.lower()
+            node = self._id_lc.get(lc)
+            if node is not None:
+                hits.append(np.asarray([node], dtype=np.int64))
+            elif lc in self._name_lc:
+                hits.append(self._name_lc[lc])
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
+
+    def ids(self, nodes: np.ndarray) -> List[str]:
+        return self.node_ids[nodes].tolist()
+
+    def names(self, nodes: np.ndarray) -> List[str]:
+        return [v for v in self.node_names[nodes].tolist() if isinstance(v, str) and v]
+
+    # ── traversal ───────────────────────────────────────────────────────
+    def _walk(self, ptr: np.ndarray, node: np.ndarray, depth: np.ndarray,
+              nodes: np.ndarray, include_self: bool, max_depth: Optional[int]) -> np.ndarray:
+        nodes = np.asarray(nodes, dtype=np.int64)
+        rows = ranges(ptr[nodes], ptr[nodes + 1])
+        if max_depth is not None:
+            rows = rows[depth[rows] <= max_depth]
+        out = node[rows].astype(np.int64)
+        if include_self:
+            out = np.concatenate([nodes, out])
+        return np.unique(out)
+
+    def descendants(self, nodes: np.ndarray, include_self: bool = False,
+                    max_depth: Optional[int] = None) -> np.ndarray:
+        """Every node below `nodes` (within `max_depth` is_a steps if given)."""
+        return self._walk(self.desc_ptr, self.desc_node, self.desc_depth,
+                          nodes, include_self, max_depth)
+
+    def ancestors(self, nodes: np.ndarray, include_self: bool = False,
+                  max_depth: Optional[int] = None) -> np.ndarray:
+        """Every node above `nodes` (within `max_depth` is_a steps if given)."""
+        return self._walk(self.anc_ptr, self.anc_node, self.anc_depth,
+                          nodes, include_self, max_depth)
+
+    def is_descendant(self, node: int, of: int) -> bool:
+        lo, hi = self.desc_ptr[of], self.desc_ptr[of + 1]
+        i = lo + np.searchsorted(self.desc_node[lo:hi], node)
+        return bool(i < hi and self.desc_node[i] == node)
+
+    def expand(self, values: Iterable[Any], direction: str = "descendants",
+               include_self: bool = True, max_depth: Optional[int] = None,
+               output: str = "ids") -> List[str]:
+        """Ids (or names) of `values` plus their descendants / ancestors."""
+        seeds = self.resolve(values)
+        if not len(seeds):
+            return []
+        walk = self.descendants if direction == "descendants" else self.ancestors
+        nodes = walk(seeds, include_self=include_self, max_depth=max_depth)
+        return self.names(nodes) if output == "names" else self.ids(nodes)
+
+
+_INDEXES: SnapshotCache[HierarchyIndex] = SnapshotCache()
+
+
+def _eager(lf: Any) -> pl.DataFrame:
+    return lf.collect() if isinstance(lf, pl.LazyFrame) else lf
+
+
+def _name_frame(spec: HierarchySpec, table: str,
+                tables: Dict[str, Any]) -> Optional[pl.DataFrame]:
+    frames = []
+    for src, id_col, name_col in spec.name_sources:
+        lf = tables.get(src or table)
+        if lf is None:
+            continue
+        frames.append(_eager(lf.select(pl.col(id_col).cast(pl.Utf8).alias("id"),
+                                       pl.col(name_col).cast(pl.Utf8).alias("name")))
+                      .drop_nulls())
+    return pl.concat(frames) if frames else None
+
+
+def get_hierarchy_index(table: str, tables: Dict[str, Any]) -> Optional[HierarchyIndex]:
+    """The index for `table` at the snapshot `tables` belongs to (built once).
+
+    `tables` is one DB's {table_key: LazyFrame} dict; the cache is keyed on the
+    identity of the edge frame, so a TTL reload rebuilds on next use.
+    """
+    spec = HIERARCHY_TABLES.get(table)
+    if not HIERARCHY_INDEX or spec is None or not tables or tables.get(table) is None:
+        return None
+    lf = tables[table]
+
+    def build() -> Optional[HierarchyIndex]:
+        try:
+            index = HierarchyIndex(table, _eager(lf), spec.parent_col, spec.child_col,
+                                   _name_frame(spec, table, tables))
+        except Exception as e:
+            logger.warning("[hierarchy] index build for %s failed: %s", table, e)
+            return None
+        logger.info("[hierarchy] %s: %d nodes, %d edges, %d closure pairs",
+                    table, index.n_nodes, index.n_edges, index.n_pairs)
+        return index
+
+    return _INDEXES.get(table, lf, build)
+
+
+def expand_filter_values(index: HierarchyIndex, values: Sequence[Any], *,
+                         direction: str = "descendants", include_self: bool = True,
+                         max_depth: Optional[int] = None,
+                         output: str = "ids") -> Optional[List[str]]:
+    """Hierarchy-expanded replacement for one filter column's values.
+
+    None when nothing resolves or the expansion exceeds
+    HIERARCHY_EXPAND_MAX_TERMS — the caller then keeps the original values.
+    """
+    expanded = index.expand(values, direction=direction, include_self=include_self,
+                            max_depth=max_depth, output=output)
+    if not expanded:
+        return None
+    if len(expanded) > HIERARCHY_EXPAND_MAX_TERMS:
+        logger.info("[hierarchy] %s expansion of %s has %d terms (> %d) — not applied",
+                    index.table, list(values)[:3], len(expanded), HIERARCHY_EXPAND_MAX_TERMS)
+        return None
+    return expanded
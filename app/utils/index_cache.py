@@ -0,0 +1,65 @@
+"""Shared pieces of the per-snapshot array indexes.
+
+The STRING PPI graph, the hierarchy closure, the ClinVar genomic index and
+the MSigDB gene-set index are each built once from a snapshot table and then
+answer queries with array slices. Two pieces are the same in all of them:
+
+  ranges(starts, ends)  one index array for many CSR slices, without a loop
+  SnapshotCache         one built index per name, rebuilt when the loader
+                        hands out a new snapshot
+
+The loaders keep their tables in a ttl cache, so a reload shows up as a new
+LazyFrame object. `SnapshotCache` compares that object by identity and keeps
+it next to the index, so its id() cannot be recycled while cached.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+
+def ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenate [starts[i], ends[i]) into one index array without a loop."""
+    lengths = ends - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(int(lengths.sum()), dtype=np.int64) + offsets
+
+
+class SnapshotCache(Generic[T]):
+    """{name: (snapshot, index)}, rebuilt when `snapshot` is a different object."""
+
+    def __init__(self) -> None:
+        self._items: Dict[str, Tuple[Any, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, snapshot: Any, build: Callable[[], Optional[T]],
+            on_replace: Optional[Callable[[T], None]] = None) -> Optional[T]:
+        """The index for `name` at `snapshot`, calling `build()` at most once per
+        snapshot. A None from `build` is not cached (the next call retries);
+        `on_replace` gets the index a rebuild displaced."""
+        cached = self._items.get(name)
+        if cached is not None and cached[0] is snapshot:
+            return cached[1]
+        with self._lock:
+            cached = self._items.get(name)
+            if cached is not None and cached[0] is snapshot:
+                return cached[1]
+            index = build()
+            if index is None:
+                return None
+            self._items[name] = (snapshot, index)
+            if cached is not None and on_replace is not None:
+                on_replace(cached[1])
+            return index
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
@@ -10,10 +10,13 @@ same three blocks:
 
 This module collapses them to three one-line calls. The per-DB tool services
 already use the higher-level `app.per_db_tool.build_app()` factory which
-calls these helpers internally.
+calls these helpers internally. `add_tracing` adds the shared request-id
+middleware and `/metrics` endpoint (see utils.tracing).
 """
 from __future__ import annotations
 
+import os
+import time
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -44,23 +47,92 @@ def add_health_endpoint(app: "FastAPI") -> None:
         return {"status": "OK"}
 
 
+def add_tracing(app: "FastAPI", service: str | None = None) -> None:
+    """Join incoming requests to the caller's trace and expose `GET /metrics`.
+
+    The `X-Request-ID` header (or a fresh id) becomes the request id for the
+    handler, is echoed on the response, and the whole request is timed as an
+    `http` span named by its route template ("GET /items/{id}", or
+    "unmatched" when no route matched). `X-Request-Deadline` (or now + REQUEST_DEADLINE_S for a
+    request that arrives without one) bounds the handler's outgoing service
+    calls. `/metrics` serves the stage histograms of utils.tracing.
+    """
+    from fastapi.responses import PlainTextResponse
+    from utils import tracing
+
+    if service:
+        tracing.TRACE_SERVICE = service
+    untraced = {"/metrics", "/health", "/memory", "/"}
+    default_budget = float(os.getenv("REQUEST_DEADLINE_S", "300"))
+
+    @app.middleware("http")
+    async def _trace_request(request, call_next):
+        if request.url.path in untraced:
+            return await call_next(request)
+        token = tracing.set_request_id(request.headers.get(tracing.REQUEST_ID_HEADER))
+        deadline = tracing.parse_deadline(request.headers.get(tracing.DEADLINE_HEADER))
+        if not deadline and default_budget > 0:
+            deadline = time.time() + default_budget
+        d_token = tracing.set_deadline(deadline)
+        try:
+            # label by the matched route template, never the raw path, so
+            # ids in paths and scanner 404s cannot grow the label set
+            with tracing.span("unmatched", kind="http") as attrs:
+                try:
+                    response = await call_next(request)
+                finally:
+                    route = request.scope.get("route")
+                    if getattr(route, "path", None):
+                        attrs["stage"] = f"{request.method} {route.path}"
+            response.headers[tracing.REQUEST_ID_HEADER] = tracing.current_request_id()
+            return response
+        finally:
+            tracing.reset_deadline(d_token)
+            tracing.reset_request_id(token)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():  # noqa: F811
+        return tracing.render_prometheus()
+
+
 def add_download_endpoint(app: "FastAPI") -> None:
     """Register `GET /download?path=<abs-path>` that serves result CSVs.
 
     Only paths that resolve under RESULTS_ROOT (default /app/results) are
-    served; anything outside returns 403.
+    served; anything outside returns 403. The file is streamed from disk
+    with Range support (206 partial content), so a large result can be
+    resumed or paged. A CSV the evictor dropped is rebuilt from its parquet
+    artifact (utils.artifact_store). `format=parquet` returns that
+    zstd-compressed artifact instead of the CSV.
     """
-    import os
     from pathlib import Path
     from fastapi import HTTPException, Query
-    from fastapi.responses import PlainTextResponse
+    from fastapi.responses import FileResponse
+
+    @app.get("/download")
+    async def download(
+        path: str = Query(..., description="Absolute path to the result CSV"),
+        format: str = Query("csv", pattern="^(csv|parquet)$"),
+    ):
+        from utils import artifact_store
 
-    @app.get("/download", response_class=PlainTextResponse)
-    async def download(path: str = Query(..., description="Absolute path to the result CSV")):
         results_root = Path(os.environ.get("RESULTS_ROOT", "/app/results")).resolve()
         requested = Path(path).resolve()
         if results_root not in requested.parents and requested != results_root:
             raise HTTPException(status_code=403, detail="Path outside results root")
-        if not requested.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-        return requested.read_text()
+        if format == "parquet":
+            parquet = await artifact_store.ensure_parquet(str(requested))
+            target = Path(parquet) if parquet else None
+            if target is None or not target.is_file():
+                raise HTTPException(status_code=404, detail="No parquet artifact for this result")
+            media_type = "application/vnd.apache.parquet"
+        else:
+            if not await artifact_store.ensure_csv(str(requested)) or not requested.is_file():
+                raise HTTPException(status_code=404, detail="File not found")
+            target, media_type = requested, "text/csv; charset=utf-8"
+        try:
+            os.utime(target)  # LRU clock for the evictor
+        except OSError:
+            pass
+        return FileResponse(target, media_type=media_type, filename=target.name,
+                            content_disposition_type="inline")
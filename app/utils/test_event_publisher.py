@@ -0,0 +1,132 @@
+"""Local, Docker-free test for the batched Redis event publisher.
+
+Imports utils.event_publisher (stdlib only — no Redis needed) and drives it
+against a stand-in for the async Redis client that records every pipelined
+PUBLISH. Checks that events are batched into few round-trips with their
+per-channel order kept, that ``wait=True`` returns only once its event has
+been sent, that a full channel drops fire-and-forget events (counted) while
+``wait=True`` events wait their turn instead, and that an unavailable or
+failing Redis makes ``publish`` report False without stalling the flusher.
+
+Run:  python app/utils/test_event_publisher.py
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # `utils` as the service image mounts it
+
+from utils.event_publisher import EventPublisher  # noqa: E402
+
+
+class _PubSubRedis:
+    """pipeline().publish / execute, recording (channel, payload) per batch."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def pipeline(self, transaction=False):
+        outer = self
+
+        class _Pipe:
+            def __init__(self):
+                self.sent = []
+
+            def publish(self, ch, data):
+                self.sent.append((ch, data))
+
+            async def execute(self):
+                if outer.delay:
+                    await asyncio.sleep(outer.delay)
+                if outer.fail:
+                    raise ConnectionError("redis went away")
+                outer.batches.append(self.sent)
+                return [1] * len(self.sent)
+
+        return _Pipe()
+
+    def sent(self, channel=None):
+        return [d for batch in self.batches for ch, d in batch if channel in (None, ch)]
+
+
+def _getter(redis):
+    async def get():
+        return redis
+    return get
+
+
+async def _ordering() -> None:
+    redis = _PubSubRedis()
+    pub = EventPublisher(_getter(redis), name="t-order", coalesce_ms=5)
+    for i in range(200):
+        assert await pub.publish(f"ws:{i % 3}", {"type": "step", "i": i})
+    await pub.flush(timeout=2.0)
+    for c in range(3):
+        got = [json.loads(d)["i"] for d in redis.sent(f"ws:{c}")]
+        assert got == list(range(c, 200, 3)), f"ws:{c} out of order"
+    assert len(redis.batches) <= 2 and pub.batches == len(redis.batches)
+    assert pub.events == 200 and pub.dropped == 0
+    print(f"[ok] 200 events on 3 channels: {len(redis.batches)} round-trip(s), per-channel order kept")
+
+
+async def _wait_delivery() -> None:
+    redis = _PubSubRedis(delay=0.05)
+    pub = EventPublisher(_getter(redis), name="t-wait", coalesce_ms=1)
+    assert await pub.publish("ws:a", {"type": "ttd_table"}, wait=True) is True
+    assert redis.sent("ws:a") == ['{"type": "ttd_table"}'], "wait=True returns after the send"
+    assert not await pub.publish("", {"type": "x"}), "no channel, nothing queued"
+    print("[ok] wait=True returns once its event has been sent")
+
+
+async def _backpressure() -> None:
+    redis = _PubSubRedis(delay=0.2)
+    pub = EventPublisher(_getter(redis), name="t-full", coalesce_ms=0, queue_max=5, block_s=0.05)
+    await pub.publish("ws:slow", {"n": -1})
+    await asyncio.sleep(0.01)  # the flusher is now stuck in a slow round-trip
+    results = [await pub.publish("ws:slow", {"n": i}) for i in range(8)]
+    assert results == [True] * 5 + [False] * 3, results
+    assert pub.dropped == 3 and pub.throttled == 3
+    assert await pub.publish("ws:slow", {"n": "table"}, wait=True) is True
+    await pub.flush(timeout=2.0)
+    sent = redis.sent("ws:slow")
+    assert sent[-1] == '{"n": "table"}' and len(sent) == 7, sent
+    print("[ok] full channel: fire-and-forget events dropped and counted, wait=True delivered")
+
+
+async def _redis_unavailable() -> None:
+    pub = EventPublisher(_getter(None), name="t-down", coalesce_ms=0)
+    assert await pub.publish("ws:x", {"type": "step"}, wait=True) is False
+    assert await pub.publish("ws:x", {"type": "step"}) is True  # queued, then dropped
+    await pub.flush(timeout=1.0)
+    assert pub.dropped == 2 and pub.events == 0
+
+    broken = _PubSubRedis(fail=True)
+    pub = EventPublisher(_getter(broken), name="t-fail", coalesce_ms=0)
+    assert await pub.publish("ws:y", {"type": "step"}, wait=True) is False
+    broken.fail = False
+    assert await pub.publish("ws:y", {"type": "after"}, wait=True) is True, "the flusher survives"
+    assert broken.sent("ws:y") == ['{"type": "after"}']
+    print("[ok] Redis down or failing: publish reports False, later events still go out")
+
+
+async def _run() -> None:
+    await _ordering()
+    await _wait_delivery()
+    await _backpressure()
+    await _redis_unavailable()
+
+
+def main() -> int:
+    asyncio.run(_run())
+    print("\nPASS ✓  event publisher")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,323 @@
+"""Request tracing and per-stage latency histograms.
+
+One request id follows a question from the chat WebSocket through the per-DB
+worker, expand_and_match_db, fuzzy / semantic / synonyms, schema_mapper and
+the join. It lives in a ContextVar, goes out as the ``X-Request-ID`` header
+on every internal POST, and each service's middleware (see
+``utils.service_setup.add_tracing``) picks it up again on the way in.
+
+A request deadline travels the same way: ``X-Request-Deadline`` carries the
+absolute unix time by which the caller gives up, and outgoing service calls
+shrink their timeouts to what is left of it (see ``remaining_s``).
+
+Stages are timed with ``span()``:
+
+    with span("qdrant.search", kind="qdrant", collection=coll):
+        hits = client.search_batch(...)
+
+Each finished span is
+
+* observed into a latency histogram, labelled (service, kind, stage, ok) and
+  served as Prometheus text on ``GET /metrics``;
+* appended as one JSON line to BIOCHIRP_TRACE_FILE when that is set, so a
+  slow request can be read back across services by grepping its id.
+
+The histograms are kept here rather than in prometheus_client so that every
+service image can expose them without another dependency. Stage names are a
+fixed vocabulary chosen at the call site, never user text, to keep label
+cardinality bounded.
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+log = logging.getLogger("uvicorn.error")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+DEADLINE_HEADER = "X-Request-Deadline"
+TRACE_FILE = os.getenv("BIOCHIRP_TRACE_FILE", "")
+TRACE_SERVICE = os.getenv("SERVICE_NAME", "biochirp")
+# Seconds. Spans run from sub-millisecond cache hits to multi-minute joins.
+_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("biochirp_request_id", default="")
+_span_id: contextvars.ContextVar[str] = contextvars.ContextVar("biochirp_span_id", default="")
+_deadline: contextvars.ContextVar[float] = contextvars.ContextVar("biochirp_deadline", default=0.0)
+
+
+# ── request id ────────────────────────────────────────────────────────────────
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_request_id() -> str:
+    """The request id in scope, or "" outside a traced request."""
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str] = None) -> contextvars.Token:
+    """Enter a request (a fresh id when none is given); returns the token for
+    ``reset_request_id``."""
+    return _request_id.set(request_id or new_request_id())
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+
+def set_deadline(deadline: Optional[float]) -> contextvars.Token:
+    """Enter a deadline (absolute ``time.time()``; None / 0 = none); returns
+    the token for ``reset_deadline``. An inner deadline never extends an
+    outer one."""
+    outer = _deadline.get()
+    if deadline and outer:
+        deadline = min(deadline, outer)
+    return _deadline.set(float(deadline or outer or 0.0))
+
+
+def reset_deadline(token: contextvars.Token) -> None:
+    _deadline.reset(token)
+
+
+def remaining_s() -> Optional[float]:
+    """Seconds left before the request deadline, or None when there is none."""
+    d = _deadline.get()
+    return None if not d else d - time.time()
+
+
+def parse_deadline(value: Optional[str]) -> float:
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers to merge into an outgoing internal request."""
+    rid = _request_id.get()
+    out = {REQUEST_ID_HEADER: rid} if rid else {}
+    d = _deadline.get()
+    if d:
+        out[DEADLINE_HEADER] = f"{d:.3f}"
+    return out
+
+
+def bind_context(fn: Callable) -> Callable:
+    """Wrap *fn* so it runs in the caller's context when handed to a thread
+    pool (``ThreadPoolExecutor.submit`` does not carry ContextVars; asyncio's
+    ``to_thread`` already does)."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def _run(*args, **kwargs):
+        # a Context can only be entered by one thread at a time
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return _run
+
+
+# ── histograms ────────────────────────────────────────────────────────────────
+
+# Extra exposition text appended to /metrics (e.g. the service client's
+# breaker and pool gauges); each callable returns complete lines.
+_RENDERERS: list = []
+
+
+def add_metrics_renderer(fn: Callable[[], str]) -> None:
+    if fn not in _RENDERERS:
+        _RENDERERS.append(fn)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(_BUCKETS)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, le in enumerate(_BUCKETS):
+            if seconds <= le:
+                self.counts[i] += 1
+                break
+        self.total += seconds
+        self.n += 1
+
+
+_HISTOGRAMS: Dict[Tuple[str, str, bool], _Histogram] = {}
+_LOCK = threading.Lock()
+
+
+def observe(stage: str, seconds: float, *, kind: str = "stage", ok: bool = True) -> None:
+    """Record one duration without a span (e.g. a timing measured elsewhere)."""
+    key = (kind, stage, ok)
+    with _LOCK:
+        h = _HISTOGRAMS.get(key)
+        if h is None:
+            h = _HISTOGRAMS[key] = _Histogram()
+        h.observe(seconds)
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """All histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP biochirp_stage_seconds Latency of one traced pipeline stage.",
+        "# TYPE biochirp_stage_seconds histogram",
+    ]
+    with _LOCK:
+        items = sorted(
+            (k, list(h.counts), h.total, h.n) for k, h in _HISTOGRAMS.items()
+        )
+    svc = _label(TRACE_SERVICE)
+    for (kind, stage, ok), counts, total, n in items:
+        base = f'service="{svc}",kind="{_label(kind)}",stage="{_label(stage)}",ok="{str(ok).lower()}"'
+        cum = 0
+        for le, c in zip(_BUCKETS, counts):
+            cum += c
+            lines.append(f'biochirp_stage_seconds_bucket{{{base},le="{le}"}} {cum}')
+        lines.append(f'biochirp_stage_seconds_bucket{{{base},le="+Inf"}} {n}')
+        lines.append(f"biochirp_stage_seconds_sum{{{base}}} {total:.6f}")
+        lines.append(f"biochirp_stage_seconds_count{{{base}}} {n}")
+    for fn in list(_RENDERERS):
+        try:
+            extra = fn()
+        except Exception as e:  # noqa: BLE001 — a broken gauge must not hide the histograms
+            log.warning("[tracing] metrics renderer %s failed: %s", getattr(fn, "__name__", fn), e)
+            continue
+        if extra:
+            lines.append(extra.rstrip("\n"))
+    return "\n".join(lines) + "\n"
+
+
+# ── trace file ────────────────────────────────────────────────────────────────
+
+_TRACE_LOCK = threading.Lock()
+_trace_fh = None
+
+
+def _write_trace(record: dict) -> None:
+    global _trace_fh
+    if not TRACE_FILE:
+        return
+    line = json.dumps(record, default=str, ensure_ascii=False)
+    with _TRACE_LOCK:
+        try:
+            if _trace_fh is None:
+                os.makedirs(os.path.dirname(TRACE_FILE) or ".", exist_ok=True)
+                _trace_fh = open(TRACE_FILE, "a", encoding="utf-8", buffering=1)
+            _trace_fh.write(line + "\n")
+        except OSError as e:
+            log.warning("[tracing] trace file write failed: %s", e)
+
+
+# ── spans ─────────────────────────────────────────────────────────────────────
+
+def _finish(stage: str, kind: str, dur: float, ok: bool, sid: str, parent: str,
+            attrs: Optional[Dict[str, Any]] = None) -> None:
+    observe(stage, dur, kind=kind, ok=ok)
+    if TRACE_FILE:
+        _write_trace({
+            "ts": round(time.time() - dur, 6),
+            "request_id": _request_id.get(),
+            "service": TRACE_SERVICE,
+            "span": sid,
+            "parent": parent,
+            "kind": kind,
+            "stage": stage,
+            "ms": round(dur * 1000, 3),
+            "ok": ok,
+            **({"attrs": attrs} if attrs else {}),
+        })
+
+
+@contextmanager
+def span(stage: str, *, kind: str = "stage", **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Time the enclosed block as *stage*. Yields the attribute dict so the
+    block can add results (row counts, hit counts) before the span closes,
+    or set ``stage`` in it to name the span once that is known (an HTTP
+    route is only matched inside the handler chain). An exception marks the
+    span ``ok=False`` and propagates unchanged."""
+    parent = _span_id.get()
+    sid = uuid.uuid4().hex[:8]
+    token = _span_id.set(sid)
+    ok = True
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        dur = time.perf_counter() - t0
+        _span_id.reset(token)
+        _finish(attrs.pop("stage", stage), kind, dur, ok, sid, parent, attrs)
+
+
+def traced(stage: str, *, kind: str = "stage") -> Callable:
+    """Decorator form of ``span`` for sync and async functions."""
+    def deco(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def _async(*args, **kwargs):
+                with span(stage, kind=kind):
+                    return await fn(*args, **kwargs)
+            return _async
+
+        @functools.wraps(fn)
+        def _sync(*args, **kwargs):
+            with span(stage, kind=kind):
+                return fn(*args, **kwargs)
+        return _sync
+    return deco
+
+
+def httpx_event_hooks() -> Dict[str, list]:
+    """``event_hooks=`` for an ``httpx.AsyncClient`` (or the OpenAI SDK's
+    ``DefaultAsyncHttpxClient``): stamps the request id on every outgoing
+    request and times it, up to the response headers, as a span named after
+    the target host — kind ``llm`` for chat-completion calls (time to first
+    token when streaming), ``http_client`` otherwise."""
+    async def _on_request(request) -> None:
+        for k, v in trace_headers().items():
+            if k not in request.headers:
+                request.headers[k] = v
+        request.extensions["biochirp_t0"] = time.perf_counter()
+
+    async def _on_response(response) -> None:
+        request = response.request
+        t0 = request.extensions.get("biochirp_t0")
+        if t0 is None:
+            return
+        kind = "llm" if request.url.path.endswith("/chat/completions") else "http_client"
+        _finish(request.url.host or "unknown", kind, time.perf_counter() - t0,
+                response.status_code < 500, uuid.uuid4().hex[:8], _span_id.get(),
+                {"status": response.status_code, "path": request.url.path})
+
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+__all__ = [
+    "DEADLINE_HEADER", "REQUEST_ID_HEADER", "add_metrics_renderer", "bind_context",
+    "current_request_id", "httpx_event_hooks", "new_request_id", "observe",
+    "parse_deadline", "remaining_s", "render_prometheus", "reset_deadline",
+    "reset_request_id", "set_deadline", "set_request_id", "span", "trace_headers",
+    "traced",
+]
@@ -18,7 +18,7 @@ import hashlib
 import json
 import logging
 import os
-from typing import Any, Iterable, Optional
+from typing import Any, Awaitable, Callable, Iterable, Optional
 
 # httpx is a transitive dep of the openai SDK that every per-DB service
 # already imports, so it is guaranteed to be importable here. We use the
@@ -54,8 +54,8 @@ def _cache_key(cleaned_query: str, missing: list[tuple[str, str]]) -> str:
     return f"biochirp:web_evidence:{h}"
 
 
-async def _cache_get(redis_client, key: str) -> Optional[list[dict]]:
-    """Best-effort Redis GET. Returns parsed JSON list on hit, None on miss
+async def _cache_get(redis_client, key: str) -> Any:
+    """Best-effort Redis GET. Returns the parsed JSON on hit, None on miss
     or any kind of failure (Redis unreachable, malformed payload, etc.).
     """
     if redis_client is None:
@@ -70,7 +70,7 @@ async def _cache_get(redis_client, key: str) -> Optional[list[dict]]:
         return None
 
 
-async def _cache_set(redis_client, key: str, value: list[dict], ttl: int) -> None:
+async def _cache_set(redis_client, key: str, value: Any, ttl: int) -> None:
     """Best-effort Redis SETEX. Swallows every error — the cache is purely
     a performance optimisation, never a correctness dependency."""
     if redis_client is None or ttl <= 0 or not value:
@@ -81,6 +81,34 @@ async def _cache_set(redis_client, key: str, value: list[dict], ttl: int) -> Non
         log.warning("[web_evidence] cache SET %s failed: %s", key, e)
 
 
+def _answer_cache_key(query: str) -> str:
+    """Cache key for a whole-question web answer (the chat web fallback)."""
+    h = hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest()[:16]
+    return f"biochirp:web_answer:{h}"
+
+
+async def cached_web_answer(
+    query: str,
+    search: Callable[[str], Awaitable[dict]],
+    *,
+    redis_client: Any = None,
+    cache_ttl: int = WEB_EVIDENCE_CACHE_TTL,
+) -> dict:
+    """``await search(query)`` behind the same Redis cache as the evidence
+    records. Only answers with text are stored, so a failed search is retried
+    next time rather than pinned."""
+    key = _answer_cache_key(query) if query.strip() else None
+    if key and cache_ttl > 0:
+        cached = await _cache_get(redis_client, key)
+        if cached:
+            log.info("[web_evidence] answer cache HIT key=%s", key)
+            return cached
+    res = await search(query)
+    if key and cache_ttl > 0 and (res or {}).get("answer"):
+        await _cache_set(redis_client, key, res, cache_ttl)
+    return res
+
+
 WEB_EVIDENCE_TIMEOUT = float(os.getenv("WEB_EVIDENCE_TIMEOUT", "15"))
 _GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 WEB_EVIDENCE_MAX_FIELDS = int(os.getenv("WEB_EVIDENCE_MAX_FIELDS", "2"))
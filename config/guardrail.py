@@ -436,6 +436,9 @@ class DatabaseTable(BaseModel):
     # "disease_name": ["tuberculosis", ...]}. Used by HCDT chat to show the
     # "Interpreted as:" interpretation section in the tool card.
     filter_val: Optional[dict] = None
+    # Server-side cursor over the full result: page it with
+    # GET /cursor/{cursor_id}/page on the same service (per_db_tool._cursors).
+    cursor_id: Optional[str] = None
 
 
 
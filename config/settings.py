@@ -133,6 +133,21 @@ BIOMEDICAL_MODELS = biomedical_models()
 
 DB_VALUE_DIR = "resources/values"  # Per-DB pickles: concept_values_{db}.pkl
 
+# Quantised ONNX exports of the BIOMEDICAL_MODELS, written by
+# scripts/export_onnx_embedding_models.py and served by the semantic filter
+# when SEMANTIC_EMBED_BACKEND=onnx. One directory per (model, revision) so a
+# re-pin can never silently serve weights exported from the previous commit.
+ONNX_EMBED_DIR = "resources/models/onnx"
+ONNX_EXPORT_MANIFEST = "export_manifest.json"
+
+
+def onnx_export_subdir(name: str) -> str | None:
+    """Repo-relative export directory for a pinned model, or None if unregistered."""
+    revision = embedding_revision(name)
+    if revision is None:
+        return None
+    return f"{ONNX_EMBED_DIR}/{name.replace('/', '_')}/{revision}"
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # MODEL SSOT (added 2026-06-20)
@@ -830,6 +830,19 @@
         return;
       }
 
+      case 'tool_update': {
+        // Late replacement for a card body, e.g. the LLM step summary that
+        // upgrades the templated text sent with the card. Replaces (never
+        // appends) and works on finalised cards; unknown cards are ignored.
+        const card = currentToolCards.get(canonicalId(d.tool_id || 'tool'));
+        const text = String(d.text ?? '');
+        if (!card || !text) return;
+        const outEl = card.querySelector('.tool-output');
+        outEl.innerHTML = DOMPurify.sanitize(marked.parse(text));
+        outEl.dataset.finalised = '1';
+        return;
+      }
+
       case 'Tool called':
       case 'tool_called': {
         suppressOrchStream = true;
@@ -18,6 +18,7 @@ Tools exposed
   query_string(question)        → STRING (protein–protein interactions)
   query_uniprot(question)       → UniProt/Swiss-Prot (protein biology)
   web_tool(query)               → Groq browser-search (live web, not a DB)
+  page_results(database, cursor_id, ...) → next page of an earlier DB result
 """
 from __future__ import annotations
 
@@ -213,7 +214,11 @@ _DB_TIMEOUT_OVERRIDES: dict[str, float] = {
 
 # ── Tool helpers ──────────────────────────────────────────────────────────────
 
-def _rows_to_markdown(rows: list[dict], max_rows: int = 50, *, total_rows: int | None = None) -> str:
+_MARKDOWN_MAX_ROWS = 50
+_PAGE_MAX_ROWS = int(os.getenv("MCP_PAGE_MAX_ROWS", "200"))
+
+
+def _rows_to_markdown(rows: list[dict], max_rows: int = _MARKDOWN_MAX_ROWS, *, total_rows: int | None = None) -> str:
     """Render `rows` (already the backend's preview, itself capped at
     HEAD_VIEW_ROW_COUNT before it ever reaches this server) as a markdown
     table, further capped to `max_rows` for display.
@@ -304,6 +309,14 @@ async def _query_db(db: str, question: str) -> str:
         csv_url = f"{_MCP_PUBLIC_BASE}/csv/{db}/{filename}"
         parts.append(f"\n📥 **Download full results:** [{filename}]({csv_url})")
 
+    # Server-side cursor — lets the client page past the preview cap
+    cursor_id = (data.get("cursor_id") or "").strip()
+    if cursor_id and isinstance(row_count, int) and row_count > min(len(rows), _MARKDOWN_MAX_ROWS):
+        parts.append(
+            f"\n🔖 **More rows:** call `page_results` with database=`{db}`, "
+            f"cursor_id=`{cursor_id}`, offset={min(len(rows), _MARKDOWN_MAX_ROWS)}"
+        )
+
     # Filter trace — what entities were resolved and used as DB filters
     filter_trace = data.get("filter_trace")
     if filter_trace:
@@ -312,6 +325,55 @@ async def _query_db(db: str, question: str) -> str:
     return "\n".join(parts) if parts else f"No result from {info['display_name']}."
 
 
+async def _page_results(arguments: dict) -> str:
+    """Fetch one page of a per-DB result cursor and render it as markdown."""
+    db = (arguments.get("database") or "").strip().lower()
+    cursor_id = (arguments.get("cursor_id") or "").strip()
+    if db not in _DB_CATALOGUE:
+        return f"Error: unknown database {db!r}."
+    if not cursor_id:
+        return "Error: 'cursor_id' is required."
+    info = _DB_CATALOGUE[db]
+    params: dict = {
+        "offset": max(0, int(arguments.get("offset") or 0)),
+        "limit": max(1, min(int(arguments.get("limit") or _MARKDOWN_MAX_ROWS), _PAGE_MAX_ROWS)),
+    }
+    if arguments.get("sort_by"):
+        params["sort"] = str(arguments["sort_by"])
+        params["descending"] = bool(arguments.get("descending"))
+    if arguments.get("columns"):
+        params["columns"] = ",".join(str(c) for c in arguments["columns"])
+    url = f"http://{_DB_HOST}:{info['port']}/cursor/{cursor_id}/page"
+    try:
+        async with httpx.AsyncClient(timeout=_DB_TIMEOUT) as client:
+            resp = await client.get(url, params=params)
+    except httpx.HTTPError as exc:
+        return f"Error paging {info['display_name']} results: {exc}"
+    if resp.status_code == 404:
+        return ("Error: this result cursor has expired. Re-run the original query "
+                "to get a fresh cursor_id.")
+    if resp.status_code >= 400:
+        try:
+            detail = resp.json().get("detail")
+        except ValueError:
+            detail = resp.text[:200]
+        return f"Error paging {info['display_name']} results: {detail}"
+    page = resp.json()
+    rows = page.get("rows") or []
+    total = page.get("row_count")
+    if not rows:
+        return f"No rows at offset {page.get('offset')} ({total} total rows)."
+    first = page["offset"] + 1
+    footer = f"*(rows {first}–{page['offset'] + len(rows)} of {total}"
+    if page.get("sort"):
+        footer += f", sorted by {page['sort']}{' descending' if page.get('descending') else ''}"
+    footer += ")*"
+    if page.get("next_offset") is not None:
+        footer += f"\n\nNext page: offset={page['next_offset']}"
+    return (f"**{info['display_name']} results**\n\n"
+            f"{_rows_to_markdown(rows, max_rows=len(rows))}\n\n{footer}")
+
+
 async def _web_search(query: str) -> str:
     """Call Groq browser_search for live web information."""
     api_key = os.getenv("GROQ_API_KEY", "").strip()
@@ -407,6 +469,9 @@ server = Server(
         "   - The filter/entity terms resolved (🔍 filter trace) if shown.\n"
         "   - A one-line arrow flow: DB1 (N rows) → DB2 (M rows) → Answer.\n"
         "   - Show ONLY actual tool results — never inferred or supplemented data.\n"
+        "7. A DB result longer than its preview carries a cursor_id (🔖). Call "
+        "page_results with it to read further rows, sorted or restricted to some "
+        "columns if needed, instead of asking the DB the same question again.\n"
     ),
 )
 
@@ -473,6 +538,37 @@ async def list_tools() -> list[Tool]:
         },
     ))
 
+    tools.append(Tool(
+        name="page_results",
+        description=(
+            "Read more rows of a result that an earlier database tool call returned "
+            "with a cursor_id (🔖 line). Pages through the full result on the server "
+            "without re-running the query; optionally sorted by one column and "
+            "limited to some columns."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "database": {
+                    "type": "string",
+                    "enum": sorted(_DB_CATALOGUE),
+                    "description": "Database the cursor came from (e.g. clinvar).",
+                },
+                "cursor_id": {"type": "string", "description": "cursor_id from the earlier result."},
+                "offset": {"type": "integer", "minimum": 0,
+                           "description": "First row to return (0-based, in result order; "
+                                          "the rows already shown are 0 to N-1)."},
+                "limit": {"type": "integer", "minimum": 1, "maximum": _PAGE_MAX_ROWS,
+                          "description": f"Rows per page (default {_MARKDOWN_MAX_ROWS})."},
+                "sort_by": {"type": "string", "description": "Column to sort the whole result by."},
+                "descending": {"type": "boolean"},
+                "columns": {"type": "array", "items": {"type": "string"},
+                            "description": "Only return these columns."},
+            },
+            "required": ["database", "cursor_id"],
+        },
+    ))
+
     return tools
 
 
@@ -507,6 +603,9 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         result = await _query_db(db, question)
         return [TextContent(type="text", text=result)]
 
+    if name == "page_results":
+        return [TextContent(type="text", text=await _page_results(arguments or {}))]
+
     if name in ("web_tool", "web_search_live"):
         query = (arguments.get("query") or "").strip()
         if not query:
@@ -0,0 +1,194 @@
+"""Per-connection state shared through Redis.
+
+A question's connection id outlives the call that created its state: the
+WS handler seeds intent hints, ``interpreter`` records the requested output
+type, the drug / target / disease tools read both back, ``_publish_ws``
+registers result CSVs and the handler collects them for the ``final`` event.
+All of that used to live in module-level dicts, which tied a connection to
+one process and grew with connection churn (only a FIFO cap kept it down).
+
+It now lives in Redis, one hash per connection (``ot:conn:v1:<id>``, fields
+JSON-encoded) plus a list of ``[tool_key, csv_path]`` pairs
+(``ot:conn:v1:<id>:csvs``). Every write refreshes the TTL of both keys in
+the same pipeline, so a connection that is never closed (the HTTP shim, a
+missed disconnect) expires on its own after OT_CONN_STATE_TTL_S. Any worker
+or replica can therefore serve any step of a question, with no sticky
+sessions.
+
+A small in-process LRU (OT_CONN_CACHE_MAX entries, OT_CONN_LOCAL_TTL_S
+seconds) sits in front, so the several reads one question makes cost one
+round-trip. The local TTL is short because another worker may write the same
+connection. Redis being down degrades to the in-process layer only, which
+is the old behaviour.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn.error").getChild("opentargets.conn_state")
+
+OT_CONN_STATE_TTL_S = int(os.getenv("OT_CONN_STATE_TTL_S", "3600"))
+OT_CONN_LOCAL_TTL_S = float(os.getenv("OT_CONN_LOCAL_TTL_S", "5"))
+OT_CONN_CACHE_MAX = int(os.getenv("OT_CONN_CACHE_MAX", "1000"))
+
+_KEY_PREFIX = "ot:conn:v1:"
+
+
+def _key(conn_id: str) -> str:
+    return _KEY_PREFIX + conn_id
+
+
+def _csv_key(conn_id: str) -> str:
+    return _KEY_PREFIX + conn_id + ":csvs"
+
+
+class ConnectionState:
+    """Per-connection fields and CSV registry: in-process LRU over optional Redis."""
+
+    def __init__(
+        self,
+        redis_getter: Optional[Callable[[], Awaitable[Any]]] = None,
+        max_items: int = OT_CONN_CACHE_MAX,
+        ttl_s: int = OT_CONN_STATE_TTL_S,
+        local_ttl_s: float = OT_CONN_LOCAL_TTL_S,
+    ):
+        self._redis_getter = redis_getter
+        self._lru: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # CSVs registered while Redis was unreachable; merged into pop_csvs
+        self._local_csvs: "OrderedDict[str, List[Tuple[str, str]]]" = OrderedDict()
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.local_ttl_s = local_ttl_s
+        self._redis_down_until = 0.0
+
+    async def _redis(self):
+        # same back-off as ResolverCache: a failed connect costs the getter's
+        # full socket timeout, so stop asking for a while
+        if self._redis_getter is None or time.time() < self._redis_down_until:
+            return None
+        try:
+            r = await self._redis_getter()
+        except Exception as e:  # noqa: BLE001
+            logger.debug("[CONN_STATE] redis unavailable: %s", e)
+            r = None
+        if r is None:
+            self._redis_down_until = time.time() + 60.0
+        return r
+
+    def _remember(self, conn_id: str, fields: Dict[str, Any], ttl: float) -> None:
+        self._lru[conn_id] = (time.time() + ttl, fields)
+        self._lru.move_to_end(conn_id)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    async def get_all(self, conn_id: str) -> Dict[str, Any]:
+        """Every field stored for *conn_id* ({} when there is none)."""
+        if not conn_id:
+            return {}
+        got = self._lru.get(conn_id)
+        if got is not None and got[0] > time.time():
+            self._lru.move_to_end(conn_id)
+            return got[1]
+        r = await self._redis()
+        if r is None:
+            # Redis down: the in-process copy is the only one, stale or not
+            return got[1] if got is not None else {}
+        try:
+            raw = await r.hgetall(_key(conn_id))
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[CONN_STATE] redis read failed: %s", e)
+            return got[1] if got is not None else {}
+        fields = {k: json.loads(v) for k, v in (raw or {}).items()}
+        self._remember(conn_id, fields, self.local_ttl_s)
+        return fields
+
+    async def get(self, conn_id: str, field: str, default: Any = None) -> Any:
+        return (await self.get_all(conn_id)).get(field, default)
+
+    async def set(self, conn_id: str, **fields: Any) -> None:
+        """Merge *fields* into the connection's state and refresh its TTL."""
+        if not conn_id or not fields:
+            return
+        r = await self._redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.hset(_key(conn_id), mapping={k: json.dumps(v) for k, v in fields.items()})
+                pipe.expire(_key(conn_id), self.ttl_s)
+                pipe.expire(_csv_key(conn_id), self.ttl_s)
+                await pipe.execute()
+                # the local copy may be missing fields another worker wrote, so
+                # it is dropped rather than patched; the next read fetches the
+                # whole hash, this write included
+                self._lru.pop(conn_id, None)
+                return
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[CONN_STATE] redis write failed: %s", e)
+        # not in Redis: the in-process copy is the only one, so merge into it
+        got = self._lru.get(conn_id)
+        self._remember(conn_id, {**(got[1] if got is not None else {}), **fields}, self.ttl_s)
+
+    async def add_csv(self, conn_id: str, tool_key: str, csv_path: str) -> None:
+        """Record a (tool_key, csv_path) pair for the connection."""
+        if not conn_id or not csv_path:
+            return
+        r = await self._redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=False)
+                pipe.rpush(_csv_key(conn_id), json.dumps([tool_key, csv_path]))
+                pipe.expire(_csv_key(conn_id), self.ttl_s)
+                pipe.expire(_key(conn_id), self.ttl_s)
+                await pipe.execute()
+                return
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[CONN_STATE] redis write failed: %s", e)
+        self._local_csvs.setdefault(conn_id, []).append((tool_key, csv_path))
+        self._local_csvs.move_to_end(conn_id)
+        while len(self._local_csvs) > self.max_items:
+            self._local_csvs.popitem(last=False)
+
+    async def pop_csvs(self, conn_id: str) -> Dict[str, str]:
+        """Return and clear the connection's CSVs: tool_key → csv_path (last
+        one wins if a tool fires twice)."""
+        if not conn_id:
+            return {}
+        entries: List[Tuple[str, str]] = list(self._local_csvs.pop(conn_id, []))
+        r = await self._redis()
+        if r is not None:
+            try:
+                pipe = r.pipeline(transaction=True)  # read + clear atomically
+                pipe.lrange(_csv_key(conn_id), 0, -1)
+                pipe.delete(_csv_key(conn_id))
+                raw, _ = await pipe.execute()
+                entries += [tuple(json.loads(v)) for v in raw or []]
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[CONN_STATE] redis read failed: %s", e)
+        return {k: v for k, v in entries}
+
+    async def evict(self, conn_id: str) -> None:
+        """Drop everything stored for *conn_id* (called when it closes)."""
+        if not conn_id:
+            return
+        self._lru.pop(conn_id, None)
+        self._local_csvs.pop(conn_id, None)
+        r = await self._redis()
+        if r is None:
+            return
+        try:
+            await r.delete(_key(conn_id), _csv_key(conn_id))
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[CONN_STATE] redis delete failed: %s", e)
+
+
+async def _state_redis():
+    from .redis import _get_redis
+    return await _get_redis()
+
+
+conn_state = ConnectionState(_state_redis)
@@ -12,6 +12,7 @@ from .graphql import (
     DISEASE_TARGETS_PAGED_QUERY,
     DISEASE_TARGETS_PAGED_QUERY_V2,
 )
+from .platform_snapshot import snapshot_backed
 from .resolvers import resolve_disease_id
 from .uvicorn_logger import setup_logger
 
@@ -193,6 +194,7 @@ async def _get_disease_target_scores_raw(disease_id: str) -> pd.DataFrame:
     return pd.DataFrame.from_records(records)
 
 
+@snapshot_backed
 async def get_disease_combined_knowledge(disease_name_or_id: str) -> pd.DataFrame:
     """
     COMBINED TABLE 3 & 4:
@@ -221,6 +223,7 @@ async def get_disease_combined_knowledge(disease_name_or_id: str) -> pd.DataFram
     return ensure_cols(df_merged, extra_cols=_extra)
 
 
+@snapshot_backed
 async def get_targets_for_disease_all(
     disease_name: str, page_size: int = 1000, max_rows: int = 0
 ) -> pd.DataFrame:
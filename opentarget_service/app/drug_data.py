@@ -11,6 +11,7 @@ from .graphql import (
     DRUG_INDICATIONS_QUERY_V26,
     DRUG_MOA_QUERY,
 )
+from .platform_snapshot import snapshot_backed
 from .resolvers import resolve_drug_id
 from .uvicorn_logger import setup_logger
 
@@ -57,6 +58,7 @@ def _parse_drug_indications_v26_rows(
     return ensure_cols(pd.DataFrame.from_records(recs), extra_cols=["phase", "status"])
 
 
+@snapshot_backed
 async def get_drug_known_diseases_targets(drug_name_or_id: str) -> pd.DataFrame:
     drug_id, drug_name = await resolve_drug_id(drug_name_or_id)
     data = await _ot.run(DRUG_INDICATIONS_QUERY_V26, {"chemblId": drug_id})
@@ -64,6 +66,7 @@ async def get_drug_known_diseases_targets(drug_name_or_id: str) -> pd.DataFrame:
     return _parse_drug_indications_v26_rows(rows, drug_id, drug_name)
 
 
+@snapshot_backed
 async def get_drug_mechanisms_of_action(drug_name_or_id: str) -> pd.DataFrame:
     drug_id, drug_name = await resolve_drug_id(drug_name_or_id)
     data = await _ot.run(DRUG_MOA_QUERY, {"chemblId": drug_id})
@@ -12,6 +12,7 @@ import pandas as pd
 
 from .client import OTGraphQLClient
 from .config import OTClientConfig
+from .platform_snapshot import snapshot_backed
 from .resolvers import resolve_target_id, resolve_disease_id
 
 _ot = OTGraphQLClient(OTClientConfig())
@@ -35,6 +36,7 @@ query($efoId:String!, $ensg:[String!]!, $ds:[String!], $size:Int!){
 """
 
 
+@snapshot_backed
 async def get_target_disease_evidence(
     target_name_or_id: str,
     disease_name_or_id: str,
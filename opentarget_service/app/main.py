@@ -79,6 +79,8 @@ from utils.bounded_history import BoundedConversationMemory
 from .uvicorn_logger import setup_logger
 from .client import close_all_open_targets_clients
 from .http_client import close_http_client
+from .platform_snapshot import OT_BACKEND, OT_PLATFORM_DIR, warm_platform_snapshot
+from .resolver_cache import OT_RESOLVER_LOCAL_NAMES
 import pandas as pd
 import redis.asyncio as redis
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPException, Request
@@ -201,6 +203,14 @@ async def startup():
         logger.info("Redis client initialized", extra={"connection_id": "startup"})
     except Exception as e:
         logger.error("Redis init failed at startup: %s", e, extra={"connection_id": "startup"})
+    if OT_BACKEND == "parquet":
+        # index the local Open Targets release off the event loop; queries that
+        # arrive before it finishes wait on the table they need
+        asyncio.create_task(asyncio.to_thread(warm_platform_snapshot))
+    elif OT_RESOLVER_LOCAL_NAMES and Path(OT_PLATFORM_DIR).is_dir():
+        # GraphQL backend, but the release's name tables still bootstrap the
+        # resolver cache
+        asyncio.create_task(asyncio.to_thread(warm_platform_snapshot, True))
 
 
 @app.on_event("shutdown")
@@ -354,7 +364,7 @@ async def opentargets_db_shim(req: _MultiDbRequest, connection_id: Optional[str]
     # set_query_intent_hints call below) so the interpreter can recover the
     # requested output type when NER strips intent words ("which genes", "indications").
     # Without this the federated route can return the wrong column set.
-    set_query_intent_hints(cid, req.cleaned_query or "")
+    await set_query_intent_hints(cid, req.cleaned_query or "")
 
     try:
         # 1) NER + resolution
@@ -465,7 +475,7 @@ async def opentargets_db_shim(req: _MultiDbRequest, connection_id: Optional[str]
         # Evict this connection's per-request resolver state (intent hints +
         # requested_output) so it can't leak into a later request that reuses
         # the same connection_id — the WS handler does this in its finally too.
-        evict_connection(cid)
+        await evict_connection(cid)
 
 
 @app.get("/download")
@@ -769,7 +779,7 @@ async def opentarget_ws(websocket: WebSocket):
             # Pre-process user_input with keyword rules before orchestrator runs
             # so interpreter can apply deterministic type hints even when the
             # orchestrator model strips "which genes" / "which pathways" context.
-            set_query_intent_hints(connection_id, user_input)
+            await set_query_intent_hints(connection_id, user_input)
 
 # json.dumps(input_payload)
             # stream = Runner.run_streamed(orchestrator, input=input_data)
@@ -1048,7 +1058,7 @@ async def opentarget_ws(websocket: WebSocket):
                     final_payload["text"] = fallback_orchestrator_text
                 # Belt-and-suspenders: include csv_paths registered via _publish_ws
                 # so the client can recover if it missed the Redis-relayed *_table event.
-                registered_csvs = pop_connection_csvs(connection_id)
+                registered_csvs = await pop_connection_csvs(connection_id)
                 if registered_csvs:
                     final_payload["csv_paths"] = registered_csvs
                 await ws_send(final_payload)
@@ -1111,10 +1121,10 @@ async def opentarget_ws(websocket: WebSocket):
             await pubsub.close()
         # Evict per-connection intent / requested-output caches in resolvers
         with suppress(Exception):
-            evict_connection(connection_id)
+            await evict_connection(connection_id)
         # Clean up any leftover CSV registry entries for this connection
         with suppress(Exception):
-            pop_connection_csvs(connection_id)
+            await pop_connection_csvs(connection_id)
 
 
 # Accept *both* /chat and /chat/ to avoid trailing-slash 403s on WS handshakes.
@@ -0,0 +1,633 @@
+"""Offline Open Targets backend over a local platform parquet release.
+
+The data functions in target_data / disease_data / drug_data / evidence_data
+answer from paginated live GraphQL calls. With ``OT_BACKEND=parquet`` the ones
+decorated with :func:`snapshot_backed` are served from the Open Targets
+platform parquet release under ``OT_PLATFORM_DIR`` instead — associations
+(overall + per-datatype, direct), known drugs, mechanisms of action,
+indications, evidence and the target / disease / drug tables — returning the
+same DataFrame shapes, so callers do not change.
+
+The hot tables are collected once (Polars, projected to the columns we serve)
+and indexed per key: a row permutation plus ``key -> [start, end)`` spans, so
+"every disease for target X" is one slice instead of N GraphQL pages. Evidence
+is too large to hold in memory and is read with a predicate-pushed lazy scan.
+Names resolve locally (id / symbol / name / synonyms, case-insensitive); a
+local miss goes to the GraphQL resolvers unless ``OT_SNAPSHOT_RESOLVE_ONLINE=0``.
+
+Release directory names moved between versions (``associationByOverallDirect``
+→ ``association_overall_direct``, ``knownDrugsAggregated`` → ``known_drug``);
+both spellings are accepted. A dataset that is missing raises
+:class:`SnapshotUnavailable` and the wrapper falls back to GraphQL for that
+call, so a partial download still serves what it can.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import polars as pl
+
+logger = logging.getLogger("uvicorn.error").getChild("opentargets.platform_snapshot")
+
+OT_BACKEND = os.getenv("OT_BACKEND", "graphql").strip().lower()
+OT_PLATFORM_DIR = os.getenv("OT_PLATFORM_DIR", "/app/database/opentargets/platform")
+OT_SNAPSHOT_RESOLVE_ONLINE = os.getenv("OT_SNAPSHOT_RESOLVE_ONLINE", "1").lower() in ("1", "true", "yes")
+
+
+class SnapshotUnavailable(RuntimeError):
+    """The local release (or one dataset of it) is not there — use GraphQL."""
+
+
+# canonical dataset -> directory names tried in order (newest release first)
+_DATASET_DIRS: Dict[str, Tuple[str, ...]] = {
+    "association_overall_direct": ("association_overall_direct", "associationByOverallDirect"),
+    "association_by_datatype_direct": ("association_by_datatype_direct", "associationByDatatypeDirect"),
+    "target": ("target", "targets"),
+    "disease": ("disease", "diseases"),
+    "drug_molecule": ("drug_molecule", "molecule"),
+    "drug_mechanism_of_action": ("drug_mechanism_of_action", "mechanismOfAction"),
+    "drug_indication": ("drug_indication", "indication"),
+    "known_drug": ("known_drug", "knownDrugsAggregated"),
+    "evidence": ("evidence",),
+}
+
+# Same column set / id mapping as target_data and disease_data; the parquet
+# release names the drug datatype "known_drug" where GraphQL says "drugs".
+_DATATYPE_COLS = [
+    "score_genetic_association",
+    "score_somatic_mutation",
+    "score_drugs",
+    "score_affected_pathway",
+    "score_literature",
+    "score_animal_model",
+    "score_rna_expression",
+    "score_known_variant",
+    "score_clinical",
+    "score_genetic_literature",
+]
+
+_DATATYPE_ID_MAP = {
+    "genetic_association": "score_genetic_association",
+    "somatic_mutation": "score_somatic_mutation",
+    "drugs": "score_drugs",
+    "known_drug": "score_drugs",
+    "affected_pathway": "score_affected_pathway",
+    "literature": "score_literature",
+    "animal_model": "score_animal_model",
+    "rna_expression": "score_rna_expression",
+    "known_variant": "score_known_variant",
+    "clinical": "score_clinical",
+    "genetic_literature": "score_genetic_literature",
+}
+
+# Releases before v26 store the clinical phase as a number; GraphQL v26 (and
+# utility_join._phase_ordinal) speak the maxClinicalStage enum.
+_PHASE_ENUM = {
+    4.0: "APPROVAL",
+    3.0: "PHASE_3",
+    2.0: "PHASE_2",
+    1.0: "PHASE_1",
+    0.5: "EARLY_PHASE_1",
+    0.0: "PRECLINICAL",
+}
+
+_APOSTROPHES = str.maketrans({"‘": "'", "’": "'"})
+_WS_RE = re.compile(r"\s+")
+
+
+def _norm(term: str) -> str:
+    return _WS_RE.sub(" ", (term or "").translate(_APOSTROPHES)).strip().casefold()
+
+
+def _norm_expr(e: pl.Expr) -> pl.Expr:
+    return (e.cast(pl.Utf8).str.replace_all("[‘’]", "'")
+            .str.replace_all(r"\s+", " ").str.strip_chars().str.to_lowercase())
+
+
+def _phase_enum(s: pl.Series) -> pl.Series:
+    if s.dtype.is_numeric():
+        return s.cast(pl.Float64).replace_strict(_PHASE_ENUM, default=None, return_dtype=pl.Utf8)
+    return s.cast(pl.Utf8)
+
+
+def _phase_rank(e: pl.Expr) -> pl.Expr:
+    """Polars twin of utility_join._phase_ordinal (approval 5, else max digit,
+    digit-less 0, missing -1), with EARLY_PHASE_1 just below PHASE_1 so the
+    "most advanced phase" pick is deterministic."""
+    s = e.str.to_uppercase()
+    digits = s.str.extract_all(r"\d+").list.eval(pl.element().cast(pl.Int32)).list.max()
+    rank = digits.cast(pl.Float64).fill_null(0.0)
+    return (pl.when(s.is_null()).then(-1.0)
+            .when(s.str.contains("APPROV|MARKET")).then(5.0)
+            .when(s.str.contains("EARLY")).then(rank - 0.5)
+            .otherwise(rank))
+
+
+def _joined(col: str, sep: str) -> pl.Expr:
+    """Sorted unique non-empty values of *col* joined with *sep* (None if none)."""
+    c = pl.col(col)
+    s = c.filter(c.is_not_null() & (c != "")).unique().sort().str.join(sep)
+    return pl.when(s == "").then(None).otherwise(s).alias(col)
+
+
+class _KeyIndex:
+    """key -> rows of *frame*, as a row permutation plus per-key [start, end).
+
+    With *score* the rows of each key come out highest score first, matching
+    the GraphQL association ordering.
+    """
+
+    def __init__(self, frame: pl.DataFrame, key: str, score: Optional[str] = None):
+        by = [key] + ([score] if score else [])
+        idx = (frame.select(by).with_row_index("_row")
+               .filter(pl.col(key).is_not_null())
+               .sort(by, descending=[False] + ([True] if score else []), nulls_last=True, maintain_order=True))
+        self.frame = frame
+        self._order = idx["_row"].to_numpy()
+        runs = (idx.select(key).with_row_index("_i")
+                .group_by(key, maintain_order=True)
+                .agg(pl.col("_i").first().alias("a"), pl.len().alias("n")))
+        a = runs["a"].to_numpy()
+        self._spans = dict(zip(runs[key].to_list(), zip(a.tolist(), (a + runs["n"].to_numpy()).tolist())))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._spans
+
+    def rows(self, key: str, limit: int = 0) -> pl.DataFrame:
+        span = self._spans.get(key)
+        if span is None:
+            return self.frame.clear()
+        a, b = span
+        if limit and limit > 0:
+            b = min(b, a + limit)
+        return self.frame.select(pl.all().gather(pl.Series(self._order[a:b], dtype=pl.UInt32)))
+
+
+class PlatformSnapshot:
+    """Lazily collected, key-indexed view of one local platform release."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._parts: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    # ── dataset access ──────────────────────────────────────────────────
+    def dataset_path(self, dataset: str) -> Path:
+        for name in _DATASET_DIRS[dataset]:
+            p = self.root / name
+            if p.exists():
+                return p
+        raise SnapshotUnavailable(f"{dataset} not found under {self.root}")
+
+    def scan(self, dataset: str, columns: Dict[str, Tuple[str, ...]]) -> pl.LazyFrame:
+        """Lazy scan of *dataset* projected to *columns* (canonical name ->
+        source-column candidates); absent columns come back as Utf8 nulls."""
+        p = self.dataset_path(dataset)
+        files = sorted(p.rglob("*.parquet")) if p.is_dir() else [p]
+        if not files:
+            raise SnapshotUnavailable(f"{dataset}: no parquet files in {p}")
+        lf = pl.scan_parquet(files, hive_partitioning=p.is_dir())
+        have = lf.collect_schema()
+        sel = []
+        for name, candidates in columns.items():
+            src = next((c for c in candidates if c in have), None)
+            sel.append(pl.col(src).alias(name) if src else pl.lit(None, pl.Utf8).alias(name))
+        return lf.select(sel)
+
+    def _part(self, name: str, build: Callable[[], Any]) -> Any:
+        got = self._parts.get(name)
+        if got is not None:
+            return got
+        with self._lock:
+            got = self._parts.get(name)
+            if got is None:
+                t0 = time.perf_counter()
+                got = build()
+                self._parts[name] = got
+                logger.info("[OT_SNAPSHOT] built %s in %.1fs", name, time.perf_counter() - t0)
+        return got
+
+    # ── dimension tables ────────────────────────────────────────────────
+    def targets(self) -> pl.DataFrame:
+        return self._part("targets", lambda: self.scan("target", {
+            "gene_id": ("id",), "gene_symbol": ("approvedSymbol",),
+            "target_name": ("approvedName",), "gene_biotype": ("biotype",),
+        }).collect())
+
+    def diseases(self) -> pl.DataFrame:
+        return self._part("diseases", lambda: self.scan("disease", {
+            "disease_id": ("id",), "disease_name": ("name",),
+        }).collect())
+
+    def drugs(self) -> pl.DataFrame:
+        return self._part("drugs", lambda: self.scan("drug_molecule", {
+            "drug_id": ("id",), "drug_name": ("name",), "drug_type": ("drugType",),
+        }).collect())
+
+    # ── associations ────────────────────────────────────────────────────
+    def _build_associations(self) -> Tuple[_KeyIndex, _KeyIndex]:
+        keys = {"disease_id": ("diseaseId",), "gene_id": ("targetId",)}
+        wide = self.scan("association_overall_direct",
+                         {**keys, "association_score": ("score", "associationScore")}).collect()
+        try:
+            dt = (self.scan("association_by_datatype_direct",
+                            {**keys, "datatype": ("datatypeId",), "score": ("score",)})
+                  .with_columns(pl.col("datatype").replace_strict(_DATATYPE_ID_MAP, default=None))
+                  .drop_nulls("datatype").collect())
+        except SnapshotUnavailable:
+            dt = None
+        if dt is not None and dt.height:
+            wide = wide.join(dt.pivot(on="datatype", index=["disease_id", "gene_id"],
+                                      values="score", aggregate_function="max"),
+                             on=["disease_id", "gene_id"], how="left")
+        wide = wide.with_columns(
+            pl.col("association_score").cast(pl.Float64),
+            *[(pl.col(c).fill_null(0.0) if c in wide.columns else pl.lit(0.0)).cast(pl.Float32).alias(c)
+              for c in _DATATYPE_COLS],
+        ).select(["disease_id", "gene_id", "association_score"] + _DATATYPE_COLS)
+        return (_KeyIndex(wide, "gene_id", "association_score"),
+                _KeyIndex(wide, "disease_id", "association_score"))
+
+    def associations(self) -> Tuple[_KeyIndex, _KeyIndex]:
+        """(by target, by disease) over the wide direct-association frame."""
+        return self._part("associations", self._build_associations)
+
+    # ── drugs ───────────────────────────────────────────────────────────
+    def _build_known_drugs(self) -> Tuple[_KeyIndex, _KeyIndex, _KeyIndex]:
+        kd = self.scan("known_drug", {
+            "drug_id": ("drugId",), "drug_name": ("prefName", "drugName"),
+            "gene_id": ("targetId",), "gene_symbol": ("approvedSymbol", "targetSymbol"),
+            "disease_id": ("diseaseId",), "disease_name": ("label", "diseaseName"),
+            "phase": ("phase", "maxClinicalStage", "maxPhase"), "status": ("status",),
+            "drug_type": ("drugType",), "mechanism_of_action": ("mechanismOfAction",),
+        }).collect()
+        kd = kd.with_columns(_phase_enum(kd["phase"]).alias("phase"))
+        kd = kd.with_columns(_phase_rank(pl.col("phase")).alias("_phase_rank"))
+        return (_KeyIndex(kd, "gene_id", "_phase_rank"),
+                _KeyIndex(kd, "disease_id", "_phase_rank"),
+                _KeyIndex(kd, "drug_id", "_phase_rank"))
+
+    def known_drugs(self) -> Tuple[_KeyIndex, _KeyIndex, _KeyIndex]:
+        """(by target, by disease, by drug), most advanced phase first."""
+        return self._part("known_drugs", self._build_known_drugs)
+
+    def _build_mechanisms(self) -> Tuple[_KeyIndex, _KeyIndex]:
+        lf = self.scan("drug_mechanism_of_action", {
+            "drug_id": ("chemblIds",), "gene_id": ("targets",), "target_name": ("targetName",),
+            "mechanism_of_action": ("mechanismOfAction",), "action_type": ("actionType",),
+            "references": ("references",),
+        })
+        moa = lf.collect().with_row_index("_moa")
+        if isinstance(moa.schema["references"], pl.List) and isinstance(moa.schema["references"].inner, pl.Struct):
+            refs = (moa.select("_moa", pl.col("references").list.eval(pl.element().struct.field("source")))
+                    .explode("references").group_by("_moa").agg(_joined("references", ", ")))
+            moa = moa.drop("references").join(refs, on="_moa", how="left")
+        else:
+            moa = moa.with_columns(pl.lit(None, pl.Utf8).alias("references"))
+        for c in ("drug_id", "gene_id"):
+            if isinstance(moa.schema[c], pl.List):
+                moa = moa.explode(c)
+        moa = moa.drop("_moa")
+        return _KeyIndex(moa, "drug_id"), _KeyIndex(moa, "gene_id")
+
+    def mechanisms(self) -> Tuple[_KeyIndex, _KeyIndex]:
+        """(by drug, by target) over mechanism-of-action rows, one per target."""
+        return self._part("mechanisms", self._build_mechanisms)
+
+    def _build_indications(self) -> _KeyIndex:
+        ind = self.scan("drug_indication", {"drug_id": ("id",), "indications": ("indications",)}).collect()
+        ind = ind.explode("indications").drop_nulls("indications").with_columns(
+            pl.col("indications").struct.field("disease").alias("disease_id"),
+            pl.col("indications").struct.field("efoName").alias("disease_name"),
+            pl.col("indications").struct.field("maxPhaseForIndication").alias("phase"),
+        ).drop("indications")
+        ind = ind.with_columns(_phase_enum(ind["phase"]).alias("phase"))
+        ind = ind.with_columns(_phase_rank(pl.col("phase")).alias("_phase_rank"))
+        return _KeyIndex(ind, "drug_id", "_phase_rank")
+
+    def indications(self) -> _KeyIndex:
+        return self._part("indications", self._build_indications)
+
+    # ── name resolution ─────────────────────────────────────────────────
+    def _build_names(self, kind: str) -> Dict[str, Tuple[str, Optional[str]]]:
+        dataset, label_cols, synonym_cols = {
+            "target": ("target", ("approvedSymbol", "approvedName"), ("symbolSynonyms", "nameSynonyms", "synonyms")),
+            "disease": ("disease", ("name",), ("synonyms",)),
+            "drug": ("drug_molecule", ("name",), ("synonyms", "tradeNames")),
+        }[kind]
+        p = self.dataset_path(dataset)
+        files = sorted(p.rglob("*.parquet")) if p.is_dir() else [p]
+        lf = pl.scan_parquet(files)
+        have = lf.collect_schema()
+        display = label_cols[0]
+        terms = [lf.select(pl.col("id"), pl.col("id").alias("term"), pl.lit(0).alias("rank"))]
+        for rank, col in enumerate(label_cols, start=1):
+            terms.append(lf.select(pl.col("id"), pl.col(col).alias("term"), pl.lit(rank).alias("rank")))
+        for col in synonym_cols:
+            dtype = have.get(col)
+            if isinstance(dtype, pl.List):
+                inner = dtype.inner
+                expr = pl.col(col)
+                if isinstance(inner, pl.Struct):
+                    field = next((f.name for f in inner.fields if f.name == "label"), inner.fields[0].name)
+                    expr = expr.list.eval(pl.element().struct.field(field))
+            elif isinstance(dtype, pl.Struct):  # disease synonyms: {hasExactSynonym: [..], ...}
+                lists = [f.name for f in dtype.fields if isinstance(f.dtype, pl.List)]
+                if not lists:
+                    continue
+                expr = pl.concat_list([pl.col(col).struct.field(f) for f in lists])
+            else:
+                continue
+            terms.append(lf.select(pl.col("id"), expr.alias("term"), pl.lit(10).alias("rank")).explode("term"))
+        # rank 0 ids, then primary labels, then synonyms; first claimant of a term wins
+        table = (pl.concat(terms).drop_nulls("term")
+                 .with_columns(_norm_expr(pl.col("term")).alias("term"))
+                 .sort("rank", maintain_order=True).unique("term", keep="first", maintain_order=True)
+                 .join(lf.select(pl.col("id"), pl.col(display).alias("display")), on="id", how="left")
+                 .collect())
+        return dict(zip(table["term"].to_list(), zip(table["id"].to_list(), table["display"].to_list())))
+
+    def names_ready(self, kind: str) -> bool:
+        return f"names:{kind}" in self._parts
+
+    def resolve(self, kind: str, term: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Local (id, display name) for a target / disease / drug term, or None."""
+        names = self._part(f"names:{kind}", lambda: self._build_names(kind))
+        return names.get(_norm(term))
+
+    # ── queries (Polars in, Polars out) ─────────────────────────────────
+    def target_diseases(self, target_id: str, target_name: Optional[str], max_rows: int = 0) -> pl.DataFrame:
+        rows = self.associations()[0].rows(target_id, max_rows)
+        return (rows.join(self.diseases(), on="disease_id", how="left", maintain_order="left")
+                .with_columns(pl.lit(target_name, pl.Utf8).alias("gene_symbol"))
+                .select(["gene_id", "gene_symbol", "disease_id", "disease_name", "association_score"]
+                        + _DATATYPE_COLS))
+
+    def disease_targets(self, disease_id: str, disease_name: Optional[str], max_rows: int = 0) -> pl.DataFrame:
+        rows = self.associations()[1].rows(disease_id, max_rows)
+        return (rows.join(self.targets(), on="gene_id", how="left", maintain_order="left")
+                .with_columns(pl.lit(disease_name, pl.Utf8).alias("disease_name"))
+                .select(["disease_id", "disease_name", "gene_id", "gene_symbol", "target_name",
+                         "gene_biotype", "association_score"] + _DATATYPE_COLS))
+
+    def target_drugs(self, target_id: str, target_name: Optional[str]) -> pl.DataFrame:
+        """One row per drug (its most advanced indication as the disease), like
+        drugAndClinicalCandidates' primary-disease rows."""
+        rows = self.known_drugs()[0].rows(target_id)
+        return (rows.group_by("drug_id", maintain_order=True).agg(
+                    pl.col("drug_name").first(), pl.col("disease_id").first(),
+                    pl.col("disease_name").first(), pl.col("phase").first(), _joined("status", "; "))
+                .with_columns(pl.lit(target_id, pl.Utf8).alias("gene_id"),
+                              pl.lit(target_name, pl.Utf8).alias("gene_symbol"))
+                .select(["gene_id", "gene_symbol", "drug_id", "drug_name", "disease_id",
+                         "disease_name", "phase", "status"]))
+
+    def target_drug_associations(self, target_id: str, target_name: Optional[str]) -> pl.DataFrame:
+        drugs = self.target_drugs(target_id, target_name)
+        moa = (self.mechanisms()[1].rows(target_id)
+               .group_by("drug_id").agg(_joined("action_type", ", ").alias("action_types"),
+                                        _joined("mechanism_of_action", "; ")))
+        scores = self.associations()[0].rows(target_id).drop("gene_id")
+        return (drugs.join(moa, on="drug_id", how="left", maintain_order="left")
+                .join(scores, on="disease_id", how="left", maintain_order="left")
+                .select(["gene_id", "gene_symbol", "drug_id", "drug_name", "disease_id", "disease_name",
+                         "phase", "status", "action_types", "mechanism_of_action", "association_score"]
+                        + _DATATYPE_COLS))
+
+    def disease_drugs(self, disease_id: str, disease_name: Optional[str]) -> pl.DataFrame:
+        """Drug × MoA-target rows for a disease with that target's association scores."""
+        rows = self.known_drugs()[1].rows(disease_id)
+        drug_moa = (self.mechanisms()[0].frame.filter(pl.col("drug_id").is_in(rows["drug_id"].unique().implode()))
+                    .group_by("drug_id").agg(_joined("mechanism_of_action", "; ")))
+        per_pair = (rows.group_by(["drug_id", "gene_id"], maintain_order=True).agg(
+                        pl.col("drug_name").first(), pl.col("gene_symbol").first(),
+                        pl.col("phase").first(), _joined("status", "; "), pl.col("drug_type").first())
+                    .join(drug_moa, on="drug_id", how="left", maintain_order="left"))
+        scores = self.associations()[1].rows(disease_id).drop("disease_id")
+        biotype = self.targets().select("gene_id", "gene_biotype")
+        return (per_pair.join(scores, on="gene_id", how="left", maintain_order="left")
+                .join(biotype, on="gene_id", how="left", maintain_order="left")
+                .with_columns(pl.lit(disease_id, pl.Utf8).alias("disease_id"),
+                              pl.lit(disease_name, pl.Utf8).alias("disease_name"))
+                .select(["disease_id", "disease_name", "drug_id", "drug_name", "gene_id", "gene_symbol",
+                         "phase", "status", "drug_type", "mechanism_of_action", "association_score",
+                         "gene_biotype"] + _DATATYPE_COLS))
+
+    def drug_indications(self, drug_id: str, drug_name: Optional[str]) -> pl.DataFrame:
+        try:
+            rows = self.indications().rows(drug_id).with_columns(pl.lit(None, pl.Utf8).alias("status"))
+        except SnapshotUnavailable:
+            rows = (self.known_drugs()[2].rows(drug_id)
+                    .group_by("disease_id", maintain_order=True)
+                    .agg(pl.col("disease_name").first(), pl.col("phase").first(), _joined("status", "; ")))
+        return (rows.with_columns(pl.lit(drug_id, pl.Utf8).alias("drug_id"),
+                                  pl.lit(drug_name, pl.Utf8).alias("drug_name"))
+                .select(["drug_id", "drug_name", "disease_id", "disease_name", "phase", "status"]))
+
+    def drug_mechanisms(self, drug_id: str, drug_name: Optional[str]) -> pl.DataFrame:
+        rows = self.mechanisms()[0].rows(drug_id)
+        return (rows.join(self.targets().select("gene_id", "gene_symbol", "target_name").rename(
+                    {"target_name": "approved_name"}), on="gene_id", how="left", maintain_order="left")
+                .with_columns(pl.coalesce("gene_symbol", "approved_name", "target_name").alias("gene_name"),
+                              pl.lit(drug_id, pl.Utf8).alias("drug_id"),
+                              pl.lit(drug_name, pl.Utf8).alias("drug_name"))
+                .select(["gene_id", "gene_name", "drug_id", "drug_name", "mechanism_of_action", "references"]))
+
+    def evidence(self, target_id: str, disease_id: str, datasource: Optional[str] = None,
+                 size: int = 50) -> Tuple[pl.DataFrame, int]:
+        """Evidence rows for one target-disease pair, best score first, and the
+        total count before *size*."""
+        lf = self.scan("evidence", {
+            "gene_id": ("targetId",), "disease_id": ("diseaseId",),
+            "datasource": ("datasourceId", "sourceId"), "datatype": ("datatypeId",),
+            "evidence_score": ("score", "resourceScore"), "drug_id": ("drugId",),
+            "clinical_stage": ("clinicalStage", "clinicalPhase"),
+            "clinical_significances": ("clinicalSignificances",), "confidence": ("confidence",),
+            "disease_from_source": ("diseaseFromSource",), "publication_year": ("publicationYear",),
+            "literature": ("literature",),
+        })
+        pred = (pl.col("gene_id") == target_id) & (pl.col("disease_id") == disease_id)
+        if datasource:
+            pred = pred & (pl.col("datasource") == datasource)
+        hits = lf.filter(pred).collect()
+        total = hits.height
+        hits = hits.sort("evidence_score", descending=True, nulls_last=True).head(max(1, min(int(size or 50), 200)))
+        for col, n in (("clinical_significances", 0), ("literature", 5)):
+            if isinstance(hits.schema[col], pl.List):
+                e = pl.col(col).list.head(n) if n else pl.col(col)
+                hits = hits.with_columns(e.list.eval(pl.element().cast(pl.Utf8)).list.join(", ").alias(col))
+        try:
+            hits = hits.join(self.drugs().select("drug_id", "drug_name"), on="drug_id", how="left",
+                             maintain_order="left")
+        except SnapshotUnavailable:
+            hits = hits.with_columns(pl.lit(None, pl.Utf8).alias("drug_name"))
+        hits = hits.join(self.targets().select("gene_id", pl.col("gene_symbol").alias("gene_name")),
+                         on="gene_id", how="left", maintain_order="left")
+        return hits.select(["gene_id", "gene_name", "disease_id", "datasource", "datatype",
+                            "evidence_score", "drug_id", "drug_name", "clinical_stage",
+                            "clinical_significances", "confidence", "disease_from_source",
+                            "publication_year", "literature"]), total
+
+    def warm(self, names_only: bool = False) -> None:
+        tables = () if names_only else (self.targets, self.diseases, self.associations,
+                                         self.known_drugs, self.mechanisms)
+        for build in tables:
+            try:
+                build()
+            except SnapshotUnavailable as e:
+                logger.warning("[OT_SNAPSHOT] warm skipped: %s", e)
+        for kind in ("target", "disease", "drug"):
+            try:
+                self.resolve(kind, "")
+            except SnapshotUnavailable as e:
+                logger.warning("[OT_SNAPSHOT] warm skipped: %s", e)
+
+
+_SNAPSHOTS: Dict[str, PlatformSnapshot] = {}
+_SNAPSHOTS_LOCK = threading.Lock()
+
+
+def get_platform_snapshot(root: Optional[str] = None) -> PlatformSnapshot:
+    root = root or OT_PLATFORM_DIR
+    if not Path(root).is_dir():
+        raise SnapshotUnavailable(f"OT_PLATFORM_DIR {root} does not exist")
+    with _SNAPSHOTS_LOCK:
+        snap = _SNAPSHOTS.get(root)
+        if snap is None:
+            snap = _SNAPSHOTS[root] = PlatformSnapshot(Path(root))
+    return snap
+
+
+def warm_platform_snapshot(names_only: bool = False) -> None:
+    """Collect and index the hot tables up front (startup, in a thread).
+    *names_only* builds just the name tables the resolver cache reads."""
+    try:
+        get_platform_snapshot().warm(names_only)
+    except SnapshotUnavailable as e:
+        logger.warning("[OT_SNAPSHOT] %s — serving from GraphQL", e)
+
+
+# =========================================================
+# Async data functions (same signatures / shapes as the GraphQL ones)
+# =========================================================
+_IMPLS: Dict[str, Callable[..., Any]] = {}
+
+
+def _implements(fn: Callable[..., Any]) -> Callable[..., Any]:
+    _IMPLS[fn.__name__] = fn
+    return fn
+
+
+def snapshot_backed(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Serve *fn* from the local release when OT_BACKEND=parquet; fall back to
+    the wrapped GraphQL implementation when the release cannot answer."""
+    impl = _IMPLS[fn.__name__]
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if OT_BACKEND != "parquet":
+            return await fn(*args, **kwargs)
+        try:
+            return await impl(*args, **kwargs)
+        except SnapshotUnavailable as e:
+            logger.warning("[OT_SNAPSHOT] %s unavailable (%s) — using GraphQL", fn.__name__, e)
+            return await fn(*args, **kwargs)
+
+    return wrapper
+
+
+async def _resolve(kind: str, term: str) -> Tuple[str, Optional[str]]:
+    snap = get_platform_snapshot()
+    hit = await asyncio.to_thread(snap.resolve, kind, term)
+    if hit:
+        return hit
+    from . import resolvers
+    if not OT_SNAPSHOT_RESOLVE_ONLINE:
+        raise resolvers.OpenTargetsNotFound(f"{kind.capitalize()} not found in local release: {term}")
+    return await getattr(resolvers, f"resolve_{kind}_id")(term)
+
+
+def _to_pandas(df: pl.DataFrame, extra_cols: Optional[List[str]] = None):
+    # via python lists: pyarrow is not in every service image
+    import pandas as pd
+    out = pd.DataFrame(df.to_dict(as_series=False), columns=df.columns)
+    if extra_cols is None:
+        return out
+    from .dataframe import ensure_cols
+    return ensure_cols(out, extra_cols=extra_cols)
+
+
+@_implements
+async def get_target_diseases_all(gene_symbol_or_ensembl: str, page_size: int = 1000, max_rows: int = 0):
+    snap = get_platform_snapshot()
+    tid, tname = await _resolve("target", gene_symbol_or_ensembl)
+    return _to_pandas(await asyncio.to_thread(snap.target_diseases, tid, tname, max_rows))
+
+
+@_implements
+async def get_targets_for_disease_all(disease_name: str, page_size: int = 1000, max_rows: int = 0):
+    snap = get_platform_snapshot()
+    did, dname = await _resolve("disease", disease_name)
+    return _to_pandas(await asyncio.to_thread(snap.disease_targets, did, dname, max_rows))
+
+
+@_implements
+async def get_target_drugs_all(gene_symbol_or_ensembl: str):
+    snap = get_platform_snapshot()
+    tid, tname = await _resolve("target", gene_symbol_or_ensembl)
+    return _to_pandas(await asyncio.to_thread(snap.target_drugs, tid, tname), ["phase", "status"])
+
+
+@_implements
+async def get_target_associations_no_pathways(gene_symbol_or_ensembl: str):
+    snap = get_platform_snapshot()
+    tid, tname = await _resolve("target", gene_symbol_or_ensembl)
+    df = await asyncio.to_thread(snap.target_drug_associations, tid, tname)
+    return _to_pandas(df, ["phase", "status", "action_types", "mechanism_of_action",
+                           "association_score"] + _DATATYPE_COLS)
+
+
+@_implements
+async def get_disease_combined_knowledge(disease_name_or_id: str):
+    snap = get_platform_snapshot()
+    did, dname = await _resolve("disease", disease_name_or_id)
+    df = await asyncio.to_thread(snap.disease_drugs, did, dname)
+    return _to_pandas(df, ["phase", "status", "drug_type", "mechanism_of_action", "association_score",
+                           "gene_biotype", "indication_id", "indication_name"] + _DATATYPE_COLS)
+
+
+@_implements
+async def get_drug_known_diseases_targets(drug_name_or_id: str):
+    snap = get_platform_snapshot()
+    did, dname = await _resolve("drug", drug_name_or_id)
+    return _to_pandas(await asyncio.to_thread(snap.drug_indications, did, dname), ["phase", "status"])
+
+
+@_implements
+async def get_drug_mechanisms_of_action(drug_name_or_id: str):
+    snap = get_platform_snapshot()
+    did, dname = await _resolve("drug", drug_name_or_id)
+    df = await asyncio.to_thread(snap.drug_mechanisms, did, dname)
+    return _to_pandas(df, ["mechanism_of_action", "references"])
+
+
+@_implements
+async def get_target_disease_evidence(target_name_or_id: str, disease_name_or_id: str,
+                                      datasource: Optional[str] = None, size: int = 50):
+    snap = get_platform_snapshot()
+    tid, tname = await _resolve("target", target_name_or_id)
+    did, dname = await _resolve("disease", disease_name_or_id)
+    df, total = await asyncio.to_thread(snap.evidence, tid, did, datasource, size)
+    df = df.with_columns(pl.col("gene_name").fill_null(pl.lit(tname, pl.Utf8)),
+                         pl.lit(dname, pl.Utf8).alias("disease_name"))
+    cols = df.columns
+    cols.insert(3, cols.pop(cols.index("disease_name")))
+    return _to_pandas(df.select(cols)), (tname, dname), int(total)
@@ -7,6 +7,10 @@ import pandas as pd
 import redis.asyncio as redis
 import json
 
+from utils.event_publisher import EventPublisher
+
+from .conn_state import conn_state
+
 
 # ------------------------------------------------------------------------------
 # LOGGING
@@ -45,28 +49,29 @@ async def _get_redis() -> Optional[redis.Redis]:
     return _redis_client
 
 
+# Table events share one batched, pipelined publisher (utils.event_publisher).
+_EVENTS = EventPublisher(_get_redis, name="opentargets")
 
 
 
-# Per-connection CSV registry: connection_id → [(tool_key, csv_path), ...]
-# Populated by _publish_ws so main.py can include csv_paths in the `final`
-# event even when the tool's JSON output is too large to parse.
-_connection_csv_registry: Dict[str, List[tuple]] = {}
 
 
-def register_connection_csv(conn_id: str, tool_key: str, csv_path: str) -> None:
+# Per-connection CSV registry: connection_id → {tool_key: csv_path}. Filled
+# by _publish_ws so main.py can include csv_paths in the `final` event even
+# when the tool's JSON output is too large to parse. Kept in Redis (see
+# conn_state) so the worker that sends `final` need not be the one that ran
+# the tool.
+async def register_connection_csv(conn_id: str, tool_key: str, csv_path: str) -> None:
     """Record a (tool_key, csv_path) pair for a connection."""
-    if conn_id and csv_path:
-        _connection_csv_registry.setdefault(conn_id, []).append((tool_key, csv_path))
+    await conn_state.add_csv(conn_id, tool_key, csv_path)
 
 
-def pop_connection_csvs(conn_id: str) -> Dict[str, str]:
+async def pop_connection_csvs(conn_id: str) -> Dict[str, str]:
     """Return and clear all registered CSV paths for conn_id.
 
     Returns dict: tool_key → csv_path (last one wins if a tool fires twice).
     """
-    entries = _connection_csv_registry.pop(conn_id, [])
-    return {k: v for k, v in entries}
+    return await conn_state.pop_csvs(conn_id)
 
 
 async def _publish_ws(
@@ -85,9 +90,9 @@ async def _publish_ws(
 
     name = service_name or SERVICE_NAME
 
-    # Register locally so main.py can include this path in the `final` event
+    # Register so main.py can include this path in the `final` event
     # as a fallback if the client misses the Redis-relayed *_table event.
-    register_connection_csv(conn_id, name, csv_path)
+    await register_connection_csv(conn_id, name, csv_path)
 
     payload = {
         "type": f"{name}_table",
@@ -95,13 +100,12 @@ async def _publish_ws(
         "row_count": rows,
     }
 
-    try:
-        await client.publish(conn_id, json.dumps(payload))
+    if await _EVENTS.publish(conn_id, payload, wait=True):
         logger.info(
             "[%s function][ws] Published %s_table — %s rows",
             name,
             name,
             rows,
         )
-    except Exception as e:
-        logger.error("[%s function][ws] Publish failed: %s", name, e, exc_info=True)
+    else:
+        logger.error("[%s function][ws] Publish failed", name)
@@ -0,0 +1,187 @@
+"""Term → Open Targets id resolution cache, and the batched lookups.
+
+resolve_*_id / open_targets_resolver used to spend one GraphQL round-trip per
+term per entity type on every question. Answers (hits *and* misses) are now
+kept in a small in-process LRU in front of Redis, so they survive restarts
+and are shared by workers. Misses expire sooner than hits so a term that Open
+Targets starts recognising in a new release is picked up.
+
+The values are the JSON the resolvers already handle (a search hit dict, a
+mapIds hit list, an ``[id, name]`` pair); ``None`` / ``[]`` are negative
+entries. Redis being down degrades to the in-process layer only. A batch
+request that fails is retried term by term, and terms whose own request
+fails are not cached at all, so an upstream error never becomes a miss.
+
+When the Open Targets platform release is mounted (see platform_snapshot),
+its id / name / synonym tables bootstrap the cache offline: exact matches
+never reach the network at all.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("uvicorn.error").getChild("opentargets.resolver_cache")
+
+OT_RESOLVER_CACHE = os.getenv("OT_RESOLVER_CACHE", "1").lower() in ("1", "true", "yes")
+OT_RESOLVER_TTL_S = int(os.getenv("OT_RESOLVER_TTL_S", str(7 * 24 * 3600)))
+OT_RESOLVER_NEG_TTL_S = int(os.getenv("OT_RESOLVER_NEG_TTL_S", str(6 * 3600)))
+OT_RESOLVER_CACHE_MAX = int(os.getenv("OT_RESOLVER_CACHE_MAX", "50000"))
+OT_RESOLVER_BATCH_MAX = int(os.getenv("OT_RESOLVER_BATCH_MAX", "24"))  # search aliases per request
+# answer exact name / synonym lookups from the local platform release when mounted
+OT_RESOLVER_LOCAL_NAMES = os.getenv("OT_RESOLVER_LOCAL_NAMES", "1").lower() in ("1", "true", "yes")
+
+_KEY_PREFIX = "ot:resolve:v2:"  # v2: raw-term keys
+MISSING = object()  # "not cached" (None is a cached negative)
+
+
+def cache_key(kind: str, term: str) -> str:
+    """*kind* is the lookup flavour ("target" / "disease" / "drug" search,
+    "mapids", "id:<entity>"). The term is kept as the resolver sent it (only
+    surrounding whitespace is dropped): Open Targets ranks hits against the
+    literal string, so "SET" and "set" are separate answers."""
+    return f"{kind}:{(term or '').strip()}"
+
+
+def _is_negative(value: Any) -> bool:
+    return value is None or value == []
+
+
+class ResolverCache:
+    """In-process LRU (with expiry) in front of an optional async Redis."""
+
+    def __init__(
+        self,
+        redis_getter: Optional[Callable[[], Awaitable[Any]]] = None,
+        max_items: int = OT_RESOLVER_CACHE_MAX,
+        ttl_s: int = OT_RESOLVER_TTL_S,
+        neg_ttl_s: int = OT_RESOLVER_NEG_TTL_S,
+    ):
+        self._redis_getter = redis_getter
+        self._lru: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self.neg_ttl_s = neg_ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._redis_down_until = 0.0
+
+    async def _redis(self):
+        # a failed connect costs the getter's full socket timeout, so stop
+        # asking for a while instead of paying it on every resolve
+        if self._redis_getter is None or time.time() < self._redis_down_until:
+            return None
+        try:
+            r = await self._redis_getter()
+        except Exception as e:  # noqa: BLE001
+            logger.debug("[RESOLVER_CACHE] redis unavailable: %s", e)
+            r = None
+        if r is None:
+            self._redis_down_until = time.time() + 60.0
+        return r
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        self._lru[key] = (expires_at, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached values for whichever *keys* are known (negatives included)."""
+        out: Dict[str, Any] = {}
+        pending: List[str] = []
+        now = time.time()
+        for k in dict.fromkeys(keys):
+            got = self._lru.get(k)
+            if got is not None and got[0] > now:
+                self._lru.move_to_end(k)
+                out[k] = got[1]
+            else:
+                pending.append(k)
+        r = await self._redis() if pending else None
+        if r is not None:
+            try:
+                raw = await r.mget([_KEY_PREFIX + k for k in pending])
+                for k, v in zip(pending, raw):
+                    if v is None:
+                        continue
+                    value = json.loads(v)
+                    ttl = self.neg_ttl_s if _is_negative(value) else self.ttl_s
+                    self._remember(k, value, now + ttl)
+                    out[k] = value
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[RESOLVER_CACHE] redis read failed: %s", e)
+        self.hits += len(out)
+        self.misses += len(set(pending) - out.keys())
+        return out
+
+    async def get(self, key: str) -> Any:
+        """Cached value, or ``MISSING``."""
+        return (await self.get_many([key])).get(key, MISSING)
+
+    async def put_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        now = time.time()
+        for k, v in items.items():
+            self._remember(k, v, now + (self.neg_ttl_s if _is_negative(v) else self.ttl_s))
+        r = await self._redis()
+        if r is None:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for k, v in items.items():
+                pipe.set(_KEY_PREFIX + k, json.dumps(v), ex=self.neg_ttl_s if _is_negative(v) else self.ttl_s)
+            await pipe.execute()
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[RESOLVER_CACHE] redis write failed: %s", e)
+
+    async def put(self, key: str, value: Any) -> None:
+        await self.put_many({key: value})
+
+
+def build_search_batch(pairs: List[Tuple[str, str]]) -> Tuple[str, Dict[str, Any]]:
+    """One aliased GraphQL document searching every (term, entity) pair:
+    ``q0: search(queryString:$t0, entityNames:$e0) { hits {…} }`` and so on."""
+    decl = ", ".join(f"$t{i}: String!, $e{i}: [String!]" for i in range(len(pairs)))
+    body = "\n".join(
+        f"  q{i}: search(queryString: $t{i}, entityNames: $e{i}) {{ hits {{ id name entity }} }}"
+        for i in range(len(pairs))
+    )
+    variables: Dict[str, Any] = {}
+    for i, (term, entity) in enumerate(pairs):
+        variables[f"t{i}"] = term
+        variables[f"e{i}"] = [entity]
+    return f"query SearchBatch({decl}) {{\n{body}\n}}", variables
+
+
+async def run_batched(
+    run_batch: Callable[[list], Awaitable[dict]], items: list, step: int,
+) -> dict:
+    """Merge *run_batch* over chunks of *items*. A chunk whose request fails
+    is retried one item per request, so one bad term cannot sink the rest of
+    the batch; items that still fail are left out (and so never cached as
+    misses). Raises the first error only when nothing resolved at all."""
+    out: dict = {}
+    errors: List[Exception] = []
+
+    async def _run(chunk: list) -> None:
+        try:
+            out.update(await run_batch(chunk))
+        except Exception as e:  # noqa: BLE001
+            if len(chunk) == 1:
+                errors.append(e)
+                return
+            logger.warning("[RESOLVER_CACHE] batch of %d failed (%s); retrying per term", len(chunk), e)
+            await asyncio.gather(*[_run([x]) for x in chunk])
+
+    step = max(1, step)
+    await asyncio.gather(*[_run(items[i:i + step]) for i in range(0, len(items), step)])
+    if errors and not out:
+        raise errors[0]
+    return out
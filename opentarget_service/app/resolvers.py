@@ -2,6 +2,18 @@ from typing import List, Dict, Any, Tuple, Set, Optional
 from .guard_rail import ResolvedEntity, QueryResolution, CombinedOutput
 from .client import OTGraphQLClient, _pick_canonical_hit, _norm_term
 from .config import OTClientConfig
+from .platform_snapshot import SnapshotUnavailable, get_platform_snapshot
+from .resolver_cache import (
+    MISSING,
+    OT_RESOLVER_BATCH_MAX,
+    OT_RESOLVER_CACHE,
+    OT_RESOLVER_CACHE_MAX,
+    OT_RESOLVER_LOCAL_NAMES,
+    ResolverCache,
+    build_search_batch,
+    cache_key,
+    run_batched,
+)
 from .uvicorn_logger import setup_logger
 from agents import Agent, Runner, function_tool
 from agents import OpenAIChatCompletionsModel
@@ -9,6 +21,7 @@ from openai import AsyncOpenAI
 import asyncio
 import logging
 import os
+import time
 
 from config import settings  # repo-wide model SSOT (reads .env); never os.environ for models
 
@@ -51,6 +64,162 @@ def _normalize_term(t: str) -> str:
     return (t or "").strip().replace('‘', "'").replace('’', "'")
 
 
+# =========================================================
+# Resolution cache + batched lookups
+# =========================================================
+async def _cache_redis():
+    from .redis import _get_redis
+    return await _get_redis()
+
+
+_rcache = ResolverCache(
+    _cache_redis if OT_RESOLVER_CACHE else None,
+    max_items=OT_RESOLVER_CACHE_MAX if OT_RESOLVER_CACHE else 0,
+)
+
+_MAPIDS_Q = """
+query ($terms:[String!]!) {
+  mapIds(queryTerms:$terms) {
+    mappings {
+      term
+      hits {
+        id
+        entity
+        name
+      }
+    }
+  }
+}
+"""
+
+_ENTITY_TYPES = ("target", "disease", "drug")
+
+
+def _local_hit(term: str, entity: str) -> Optional[Dict[str, Any]]:
+    """Exact id / name / synonym match in the local platform release, once
+    its name table for *entity* has been built (startup warm-up)."""
+    if not OT_RESOLVER_LOCAL_NAMES:
+        return None
+    try:
+        snap = get_platform_snapshot()
+    except SnapshotUnavailable:
+        return None
+    if not snap.names_ready(entity):
+        return None
+    hit = snap.resolve(entity, term)
+    return {"id": hit[0], "name": hit[1], "entity": entity} if hit else None
+
+
+async def search_hits_bulk(
+    pairs: List[Tuple[str, str]],
+) -> Dict[Tuple[str, str], Optional[Dict[str, Any]]]:
+    """Canonical search hit (or None) for every (term, entity) pair.
+
+    Cached answers and exact local-release matches cost nothing; everything
+    else goes out as ONE aliased ``search`` request (chunks of
+    OT_RESOLVER_BATCH_MAX run in parallel), so a question with five entities
+    costs one round-trip instead of five. A failed batch falls back to one
+    request per pair.
+    """
+    norm = {p: (_normalize_term(p[0]), p[1]) for p in pairs if _normalize_term(p[0])}
+    uniq = list(dict.fromkeys(norm.values()))
+    keys = {p: cache_key(p[1], p[0]) for p in uniq}
+    cached = await _rcache.get_many(keys.values())
+
+    found: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+    local: Dict[str, Any] = {}
+    misses: List[Tuple[str, str]] = []
+    for p in uniq:
+        if keys[p] in cached:
+            found[p] = cached[keys[p]]
+        elif (hit := _local_hit(*p)) is not None:
+            found[p] = local[keys[p]] = hit
+        else:
+            misses.append(p)
+
+    async def _search_chunk(chunk: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional[Dict[str, Any]]]:
+        query, variables = build_search_batch(chunk)
+        data = await _ot.run(query, variables)
+        return {
+            p: _pick_canonical_hit(((data.get(f"q{i}") or {}).get("hits")) or [], p[0])
+            for i, p in enumerate(chunk)
+        }
+
+    fresh: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+    if misses:
+        fresh = await run_batched(_search_chunk, misses, OT_RESOLVER_BATCH_MAX)
+        found.update(fresh)
+    await _rcache.put_many({**local, **{keys[p]: h for p, h in fresh.items()}})
+    logger.info(
+        "[resolver] search %d pair(s): %d cached, %d local, %d in one batched request",
+        len(uniq), len(uniq) - len(local) - len(misses), len(local), len(misses),
+    )
+    return {p: found.get(n) for p, n in norm.items()}
+
+
+async def _search_first_hit(term: str, entity: str) -> Optional[Dict[str, Any]]:
+    return (await search_hits_bulk([(term, entity)])).get((term, entity))
+
+
+async def mapids_hits_bulk(terms: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """mapIds hits per term — uncached terms share one ``mapIds`` request
+    (one request per term if that fails)."""
+    uniq = list(dict.fromkeys(t for t in terms if t))
+    keys = {t: cache_key("mapids", t) for t in uniq}
+    cached = await _rcache.get_many(keys.values())
+    out = {t: cached[keys[t]] for t in uniq if keys[t] in cached}
+    misses = [t for t in uniq if t not in out]
+
+    async def _mapids(chunk: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        data = await _ot.run(_MAPIDS_Q, {"terms": chunk})
+        mappings = (data.get("mapIds") or {}).get("mappings") or []
+        by_term = {m.get("term"): m.get("hits") or [] for m in mappings if m.get("term") is not None}
+        got: Dict[str, List[Dict[str, Any]]] = {}
+        for i, t in enumerate(chunk):
+            hits = by_term.get(t)
+            if hits is None:
+                hits = (mappings[i].get("hits") or []) if len(mappings) == len(chunk) else []
+            got[t] = [{"id": h.get("id"), "entity": h.get("entity"), "name": h.get("name")} for h in hits]
+        return got
+
+    if misses:
+        fresh = await run_batched(_mapids, misses, len(misses))
+        out.update(fresh)
+        await _rcache.put_many({keys[t]: v for t, v in fresh.items()})
+    return out
+
+
+async def prefetch_entities(terms: List[str]) -> None:
+    """Warm the cache for every entity of a question in at most two
+    round-trips: one multi-term mapIds, then one aliased search covering the
+    terms mapIds missed (and their "A/B" halves) for each entity type."""
+    uniq = list(dict.fromkeys(_normalize_term(t) for t in terms if _normalize_term(t)))
+    if not uniq:
+        return
+    t0 = time.perf_counter()
+    mapped = await mapids_hits_bulk(uniq)
+    missed = [t for t in uniq if not mapped.get(t)]
+    missed += [part.strip() for t in missed if "/" in t for part in t.split("/") if part.strip()]
+    if missed:
+        await search_hits_bulk([(t, e) for t in missed for e in _ENTITY_TYPES])
+    logger.info(
+        "[resolver] prefetched %d term(s), %d via search, in %.0f ms",
+        len(uniq), len(missed), (time.perf_counter() - t0) * 1000,
+    )
+
+
+async def _node_by_id(entity: str, ident: str, query: str, name_keys: Tuple[str, ...]) -> Optional[List[Any]]:
+    """Cached ``[id, name]`` for an explicit CHEMBL / ENS / ontology id (None
+    when Open Targets does not know it)."""
+    key = cache_key(f"id:{entity}", ident)
+    got = await _rcache.get(key)
+    if got is MISSING:
+        d = (await _ot.run(query, {"id": ident})).get(entity) or {}
+        got = [d.get("id") or ident, next((d[k] for k in name_keys if d.get(k)), None)] if d else None
+        await _rcache.put(key, got)
+    return got
+
+
 
 async def resolve_drug_id(drug_name_or_id: str) -> Tuple[str, str]:
     t = _normalize_term(drug_name_or_id)
@@ -60,12 +229,12 @@ async def resolve_drug_id(drug_name_or_id: str) -> Tuple[str, str]:
     if t.upper().startswith("CHEMBL"):
         chembl = t.upper()
         q = "query($id:String!){drug(chemblId:$id){id name}}"
-        d = (await _ot.run(q, {"id": chembl})).get("drug") or {}
+        d = await _node_by_id("drug", chembl, q, ("name",))
         if not d:
             raise OpenTargetsNotFound(f"Drug not found: {t}")
-        return d.get("id") or chembl, d.get("name") or None
+        return d[0], d[1]
 
-    hit = await _ot.search_first_hit(t, "drug")
+    hit = await _search_first_hit(t, "drug")
     if not hit:
         raise OpenTargetsNotFound(f"Drug not found: {t}")
     return hit["id"], hit.get("name")
@@ -79,12 +248,12 @@ async def resolve_target_id(target_symbol_or_id: str) -> Tuple[str, str]:
     if t.upper().startswith("ENS"):
         tid = t
         q = "query($id:String!){target(ensemblId:$id){id approvedSymbol approvedName}}"
-        d = (await _ot.run(q, {"id": tid})).get("target") or {}
+        d = await _node_by_id("target", tid, q, ("approvedSymbol", "approvedName"))
         if not d:
             return tid, None
-        return d.get("id") or tid, d.get("approvedSymbol") or d.get("approvedName")
+        return d[0], d[1]
 
-    hit = await _ot.search_first_hit(t, "target")
+    hit = await _search_first_hit(t, "target")
     if not hit:
         raise OpenTargetsNotFound(f"Target not found: {t}")
     return hit["id"], hit.get("name")
@@ -100,15 +269,15 @@ async def resolve_disease_id(disease_name_or_id: str) -> Tuple[str, str]:
     if t.upper().startswith(("EFO_", "MONDO_")):
         did = t.upper()
         q = "query($id:String!){disease(efoId:$id){id name}}"
-        d = (await _ot.run(q, {"id": did})).get("disease") or {}
+        d = await _node_by_id("disease", did, q, ("name",))
         if not d:
             # Stale/retired ID — do NOT search for the literal ID string;
             # that returns nothing. Raise so callers can fall back to the
             # surface-form name resolver.
             raise OpenTargetsNotFound(f"Stale or retired disease ID: {did}")
-        return d.get("id") or did, d.get("name")
+        return d[0], d[1]
 
-    hit = await _ot.search_first_hit(t, "disease")
+    hit = await _search_first_hit(t, "disease")
     if not hit:
         raise OpenTargetsNotFound(f"Disease not found: {t}")
     return hit["id"], hit.get("name")
@@ -132,75 +301,60 @@ async def open_targets_resolver(term: str) -> ResolvedEntity:
             resolution_method="not_found",
         )
 
-    _mapids_q = """
-            query ($terms:[String!]!) {
-              mapIds(queryTerms:$terms) {
-                mappings {
-                  hits {
-                    id
-                    entity
-                    name
-                  }
-                }
-              }
-            }
-            """
     try:
         try:
-            data = await _ot.run(_mapids_q, {"terms": [t]})
+            hits = (await mapids_hits_bulk([t])).get(t) or []
         except Exception as first_exc:  # noqa: BLE001
             # One extra retry to ride out a transient OT gateway blip, so a brief
             # upstream failure is NOT silently reported as 'entity not found'
             # (which would wrongly trigger the drug/acronym fallback chains).
             logger.info("[open_targets_resolver] mapIds retry after: %s", first_exc)
             await asyncio.sleep(0.6)
-            data = await _ot.run(_mapids_q, {"terms": [t]})
-
-        hits: List[Dict[str, Any]] = []
-        for m in (data.get("mapIds") or {}).get("mappings", []):
-            hits.extend(m.get("hits") or [])
+            hits = (await mapids_hits_bulk([t])).get(t) or []
 
         if not hits:
-            # mapIds missed — try the OT search API (handles aliases, synonyms, legacy names)
-            for entity_type in ("target", "disease", "drug"):
-                try:
-                    hit = await _ot.search_first_hit(t, entity_type)
-                    if hit:
-                        logger.info(
-                            "[open_targets_resolver] search fallback hit %r → %s (%s)",
-                            t, hit["id"], entity_type,
-                        )
-                        return ResolvedEntity(
-                            surface_form=t,
-                            type=entity_type,
-                            id=str(hit["id"]),
-                            resolution_method="search_fallback",
-                        )
-                except Exception:
-                    pass
+            # mapIds missed — try the OT search API (handles aliases, synonyms, legacy names).
+            # All three entity types go out in one batched request; the first
+            # type (target, disease, drug) with a hit wins, as before.
+            try:
+                found = await search_hits_bulk([(t, e) for e in _ENTITY_TYPES])
+            except Exception:
+                found = {}
+            for entity_type in _ENTITY_TYPES:
+                hit = found.get((t, entity_type))
+                if hit:
+                    logger.info(
+                        "[open_targets_resolver] search fallback hit %r → %s (%s)",
+                        t, hit["id"], entity_type,
+                    )
+                    return ResolvedEntity(
+                        surface_form=t,
+                        type=entity_type,
+                        id=str(hit["id"]),
+                        resolution_method="search_fallback",
+                    )
             # Last resort: if term looks like "A/B" (slash-paired genes/diseases),
             # try each part independently and return the first hit.
             if "/" in t:
-                for part in t.split("/"):
-                    part = part.strip()
-                    if not part:
-                        continue
-                    for entity_type in ("target", "disease", "drug"):
-                        try:
-                            hit = await _ot.search_first_hit(part, entity_type)
-                            if hit:
-                                logger.info(
-                                    "[open_targets_resolver] slash-split hit %r → %s (%s)",
-                                    part, hit["id"], entity_type,
-                                )
-                                return ResolvedEntity(
-                                    surface_form=t,
-                                    type=entity_type,
-                                    id=str(hit["id"]),
-                                    resolution_method="slash_split_fallback",
-                                )
-                        except Exception:
-                            pass
+                parts = [part.strip() for part in t.split("/") if part.strip()]
+                try:
+                    found = await search_hits_bulk([(part, e) for part in parts for e in _ENTITY_TYPES])
+                except Exception:
+                    found = {}
+                for part in parts:
+                    for entity_type in _ENTITY_TYPES:
+                        hit = found.get((part, entity_type))
+                        if hit:
+                            logger.info(
+                                "[open_targets_resolver] slash-split hit %r → %s (%s)",
+                                part, hit["id"], entity_type,
+                            )
+                            return ResolvedEntity(
+                                surface_form=t,
+                                type=entity_type,
+                                id=str(hit["id"]),
+                                resolution_method="slash_split_fallback",
+                            )
             return ResolvedEntity(
                 surface_form=t,
                 type=None,
@@ -366,40 +520,27 @@ async def call_grok(user_prompt: str, model: str | None = None, reasoning_effort
 # orchestrator runs) using the FULL user_input.  The interpreter reads this
 # to override the NER model when the orchestrator passes only the entity name.
 #
-# Both caches are keyed by connection_id and are normally evicted by
-# evict_connection() from the WS handler's finally-block.  They are also
-# capped FIFO (OrderedDict) as a safety net so that HTTP-shim connection ids
-# (which have no WS lifecycle) and any missed disconnects can't grow unbounded.
-from collections import OrderedDict as _OrderedDict
-
-_CONN_CACHE_MAX = int(os.getenv("OT_CONN_CACHE_MAX", "1000"))
-_CONN_INTENT_HINTS: "_OrderedDict[str, list[str]]" = _OrderedDict()
-
-# Stores requested_output ("drug"|"disease"|"target"|"pathway"|"any"|None) keyed
-# by connection_id.  Set by interpreter() and read by utility_drug/target/disease.
-# This is NOT included in the interpreter's returned QueryResolution JSON to
-# prevent the orchestrator from trying to pass it back to interpreter (which
-# rejects unknown fields and causes retry loops).
-_CONN_REQUESTED_OUTPUT: "_OrderedDict[str, Optional[str]]" = _OrderedDict()
-
-
-def _cap_conn_cache(cache: "_OrderedDict") -> None:
-    """FIFO-evict the oldest entries until *cache* is within _CONN_CACHE_MAX."""
-    while len(cache) > _CONN_CACHE_MAX:
-        cache.popitem(last=False)
+# Alongside it, interpreter() stores requested_output ("drug"|"disease"|
+# "target"|"pathway"|"any"|None), read by utility_drug/target/disease.  It is
+# NOT included in the interpreter's returned QueryResolution JSON to prevent
+# the orchestrator from trying to pass it back to interpreter (which rejects
+# unknown fields and causes retry loops).
+#
+# Both live in conn_state (Redis hash per connection_id, TTL-bounded, with a
+# small local LRU) so any worker can serve any step of a question.  They are
+# normally evicted by evict_connection() from the WS handler's finally-block;
+# the TTL covers HTTP-shim connection ids and missed disconnects.
+from .conn_state import conn_state
 
 
-def evict_connection(connection_id: str) -> None:
-    """Drop both per-connection caches for *connection_id* (called on WS close)."""
-    if not connection_id:
-        return
-    _CONN_INTENT_HINTS.pop(connection_id, None)
-    _CONN_REQUESTED_OUTPUT.pop(connection_id, None)
+async def evict_connection(connection_id: str) -> None:
+    """Drop all per-connection state for *connection_id* (called on WS close)."""
+    await conn_state.evict(connection_id)
 
 
-def get_requested_output(connection_id: str) -> Optional[str]:
+async def get_requested_output(connection_id: str) -> Optional[str]:
     """Return the cached requested_output for a connection."""
-    return _CONN_REQUESTED_OUTPUT.get(connection_id or "")
+    return await conn_state.get(connection_id or "", "requested_output")
 
 # ─── Output-type keyword sets (replaces regex patterns) ──────────────────────
 # Simple word-presence check — the NER model is the primary authority for intent;
@@ -436,12 +577,12 @@ _GWAS_KEYWORDS = frozenset([
 # in _REWRITE_SYSTEM plus mapIds — not by an intent hint.
 
 
-def get_query_intent_hints(connection_id: str) -> list:
+async def get_query_intent_hints(connection_id: str) -> list:
     """Return cached intent hints for a connection (empty list if none)."""
-    return _CONN_INTENT_HINTS.get(connection_id or "", [])
+    return await conn_state.get(connection_id or "", "intent_hints", []) or []
 
 
-def set_query_intent_hints(connection_id: str, user_input: str) -> None:
+async def set_query_intent_hints(connection_id: str, user_input: str) -> None:
     """Called by main.py WS handler before the orchestrator runs.
     Detects output-type intent from keyword presence in the full user question
     and caches it so the interpreter can apply it even when the orchestrator
@@ -460,8 +601,7 @@ def set_query_intent_hints(connection_id: str, user_input: str) -> None:
         hints.append("expression")
     if tokens & _GWAS_KEYWORDS:
         hints.append("gwas")
-    _CONN_INTENT_HINTS[connection_id] = hints
-    _cap_conn_cache(_CONN_INTENT_HINTS)
+    await conn_state.set(connection_id, intent_hints=hints)
     if hints:
         logger.info(
             f"[intent_hints] conn={connection_id} → {hints} (from '{user_input[:60]}')"
@@ -579,7 +719,7 @@ async def combined_ner_and_types(query: str) -> CombinedOutput:
         ]
 
         # Note: keyword-based type overrides are applied at the interpreter level
-        # via _CONN_INTENT_HINTS (populated from the FULL user question in main.py),
+        # via the per-connection intent hints (populated from the FULL user question in main.py),
         # NOT here — the LLM only receives the entity name from the orchestrator,
         # not the full question, so pattern-matching here would be unreliable.
 
@@ -654,7 +794,7 @@ async def interpreter(user_query: str, connection_id: Optional[str] = None) -> Q
 
     # Apply per-connection intent hints (detected from the FULL user question
     # in main.py before the orchestrator ran — immune to orchestrator stripping).
-    cached_hints = _CONN_INTENT_HINTS.get(connection_id or "", [])
+    cached_hints = await get_query_intent_hints(connection_id or "")
     for h in cached_hints:
         if h not in requested_types:
             requested_types.append(h)
@@ -662,6 +802,13 @@ async def interpreter(user_query: str, connection_id: Optional[str] = None) -> Q
 
     resolved: List[ResolvedEntity] = []
 
+    # Resolve every candidate term up front in (at most) two batched requests,
+    # so the per-term loops below are cache hits instead of one round-trip each.
+    try:
+        await prefetch_entities(list(terms) + list(combined.entities_raw))
+    except Exception as e:  # noqa: BLE001
+        logger.info("[interpreter] batched prefetch failed, resolving per term: %s", e)
+
     # 1. Resolve explicit entities (ONLY what appears in text)
     for t in terms:
         resolved_entity = await open_targets_resolver(t)
@@ -762,7 +909,7 @@ async def interpreter(user_query: str, connection_id: Optional[str] = None) -> Q
                 continue
             _dpf_tried.add(phrase.lower())
             try:
-                hit = await _ot.search_first_hit(phrase, "disease")
+                hit = await _search_first_hit(phrase, "disease")
                 if hit and hit.get("id"):
                     resolved.append(ResolvedEntity(
                         surface_form=phrase,
@@ -853,8 +1000,7 @@ async def interpreter(user_query: str, connection_id: Optional[str] = None) -> Q
     # Mistral Small 4 to retry interpreter with `requested_output` as a parameter
     # (invalid), producing 3 useless interpreter loops before calling the tool.
     if connection_id:
-        _CONN_REQUESTED_OUTPUT[connection_id] = requested_output
-        _cap_conn_cache(_CONN_REQUESTED_OUTPUT)
+        await conn_state.set(connection_id, requested_output=requested_output)
         logger.info(f"[interpreter] cached requested_output={requested_output!r} for conn={connection_id}")
 
     out = QueryResolution(
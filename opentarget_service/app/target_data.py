@@ -14,6 +14,7 @@ from .graphql import (
     TARGET_INFO_QUERY,
     TARGET_PATHWAYS_QUERY,
 )
+from .platform_snapshot import snapshot_backed
 from .resolvers import resolve_target_id
 from .uvicorn_logger import setup_logger
 
@@ -81,6 +82,7 @@ async def _get_target_drug_rows(target_id: str) -> List[Dict[str, Any]]:
     return normalized
 
 
+@snapshot_backed
 async def get_target_drugs_all(gene_symbol_or_ensembl: str) -> pd.DataFrame:
     """Return all drugs linked to a target via drugAndClinicalCandidates as a flat DataFrame."""
     target_id, target_name = await resolve_target_id(gene_symbol_or_ensembl)
@@ -203,6 +205,7 @@ async def get_target_pathways_only(gene_symbol_or_ensembl: str) -> pd.DataFrame:
     )
 
 
+@snapshot_backed
 async def get_target_associations_no_pathways(gene_symbol_or_ensembl: str) -> pd.DataFrame:
     target_id, target_name = await resolve_target_id(gene_symbol_or_ensembl)
 
@@ -335,6 +338,7 @@ def _unpack_datatype_scores(datatype_scores: List[Dict[str, Any]]) -> Dict[str,
     return out
 
 
+@snapshot_backed
 async def get_target_diseases_all(
     gene_symbol_or_ensembl: str, page_size: int = 1000, max_rows: int = 0
 ) -> pd.DataFrame:
@@ -125,7 +125,7 @@ async def disease_tool(
         # for intent when the user asks "which genes?" because those requested_types
         # entities don't appear in resolved_entities and thus don't populate
         # present_types.
-        _requested_output = get_requested_output(connection_id)
+        _requested_output = await get_requested_output(connection_id)
         logger.info(f"[DISEASE TOOL] requested_output={_requested_output!r} (from cache)")
 
         # When only the disease anchor reaches the tool (no drug/target/mechanism
@@ -174,7 +174,7 @@ async def drug_tool(
             # The cache is populated by interpreter() from the NER model's output;
             # "target" in present_types catches it when the orchestrator correctly
             # forwards the implicit-request entity from the interpreter result.
-            _requested_output = getattr(input, "requested_output", None) or get_requested_output(connection_id)
+            _requested_output = getattr(input, "requested_output", None) or await get_requested_output(connection_id)
             logger.info(f"[DRUG TOOL] requested_output={_requested_output!r} (from input or cache)")
             _wants_targets = (
                 "target" in effective_filter_types
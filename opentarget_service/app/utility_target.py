@@ -140,8 +140,8 @@ async def target_tool(
         # requested_output (set by interpreter).  Using the NER cache as a second
         # path means the model's output is authoritative even when the orchestrator
         # strips implicit-request entities before calling the tool.
-        _pathway_from_hint = "pathway" in get_query_intent_hints(connection_id or "")
-        _pathway_from_ner = get_requested_output(connection_id or "") == "pathway"
+        _pathway_from_hint = "pathway" in await get_query_intent_hints(connection_id or "")
+        _pathway_from_ner = await get_requested_output(connection_id or "") == "pathway"
         if not pathways and (_pathway_from_hint or _pathway_from_ner):
             from .guard_rail import ResolvedEntity
             pathways = [ResolvedEntity(surface_form=None, type="pathway", id="requested", resolution_method="implicit_request")]
@@ -166,13 +166,13 @@ async def target_tool(
         # "requested" entities), default to disease associations — UNLESS the
         # caller explicitly requested drugs. requested_output is stored in the
         # connection cache (not in QueryResolution JSON) to avoid orchestrator confusion.
-        _requested_output = getattr(input, "requested_output", None) or get_requested_output(connection_id)
+        _requested_output = getattr(input, "requested_output", None) or await get_requested_output(connection_id)
         logger.info(f"[TARGET TOOL] requested_output={_requested_output!r} (from input or cache)")
 
         # Detect expression / GWAS intent early so we can bypass the default
         # disease-association branch and return the correct data type instead.
         _query_lower = input.query.lower()
-        _intent_hints = get_query_intent_hints(connection_id or "")
+        _intent_hints = await get_query_intent_hints(connection_id or "")
         _requested_expression = (
             _requested_output == "expression"
             or "expression" in _intent_hints   # set from "expressed"/"tissue"/"organ" tokens in resolvers.py
@@ -0,0 +1,170 @@
+"""Local, Docker-free test for the Open Targets per-connection state store.
+
+Loads app/conn_state.py directly (stdlib only — no Redis, agents or GraphQL
+client needed) and checks field merge and read-back from a second "worker"
+over a dict-backed stand-in for the async Redis client, TTL refresh on every
+write (the writer then re-reads the whole hash, never caching a partial
+merge), the CSV registry (pop returns and clears, last write per tool wins),
+eviction, the bounded local LRU, the in-process fallback with back-off
+when Redis is unreachable, and a write Redis rejects being kept locally.
+
+Run:  python opentarget_service/test_conn_state.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("conn_state_under_test",
+                                                  HERE / "app" / "conn_state.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class _DictRedis:
+    """The calls ConnectionState makes, over dicts (expiry recorded, not enforced)."""
+
+    def __init__(self):
+        self.hashes, self.lists, self.ex = {}, {}, {}
+        self.round_trips = 0
+
+    async def hgetall(self, k):
+        self.round_trips += 1
+        return dict(self.hashes.get(k, {}))
+
+    async def delete(self, *keys):
+        self.round_trips += 1
+        for k in keys:
+            self.hashes.pop(k, None)
+            self.lists.pop(k, None)
+
+    def pipeline(self, transaction=False):
+        outer = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def hset(self, k, mapping):
+                self.ops.append(lambda: outer.hashes.setdefault(k, {}).update(mapping))
+
+            def rpush(self, k, v):
+                self.ops.append(lambda: outer.lists.setdefault(k, []).append(v))
+
+            def expire(self, k, s):
+                self.ops.append(lambda: outer.ex.__setitem__(k, s))
+
+            def lrange(self, k, a, b):
+                self.ops.append(lambda: list(outer.lists.get(k, [])))
+
+            def delete(self, k):
+                self.ops.append(lambda: outer.lists.pop(k, None))
+
+            async def execute(self):
+                outer.round_trips += 1
+                return [op() for op in self.ops]
+
+        return _Pipe()
+
+
+async def _run(cs) -> None:
+    redis = _DictRedis()
+
+    async def getter():
+        return redis
+
+    a = cs.ConnectionState(getter, max_items=2, ttl_s=600, local_ttl_s=5)
+    b = cs.ConnectionState(getter, max_items=2, ttl_s=600, local_ttl_s=5)
+    await a.set("ws-1", intent_hints=["target", "pathway"])
+    await a.set("ws-1", requested_output="pathway")
+    assert redis.ex["ot:conn:v1:ws-1"] == 600 and redis.ex["ot:conn:v1:ws-1:csvs"] == 600
+    assert await b.get_all("ws-1") == {"intent_hints": ["target", "pathway"], "requested_output": "pathway"}
+    n = redis.round_trips
+    assert await b.get("ws-1", "requested_output") == "pathway"
+    assert await b.get("ws-1", "intent_hints") == ["target", "pathway"]
+    assert redis.round_trips == n, "repeat reads are served by the local LRU"
+    assert await b.get("ws-2", "intent_hints", []) == []
+    print("[ok] fields merge, refresh the TTL and are read back by another worker")
+
+    c = cs.ConnectionState(getter, max_items=2, ttl_s=600, local_ttl_s=5)
+    await a.set("ws-3", intent_hints=["drug"])
+    await c.set("ws-3", requested_output="drug")  # c never read ws-3
+    assert await c.get_all("ws-3") == {"intent_hints": ["drug"], "requested_output": "drug"}
+    await b.get_all("ws-3")
+    await a.set("ws-3", requested_output="target")
+    assert await a.get("ws-3", "requested_output") == "target"
+    print("[ok] a write never caches a partial view of the connection")
+
+    await a.add_csv("ws-1", "target_tool", "/r/a.csv")
+    await a.add_csv("ws-1", "drug_tool", "/r/b.csv")
+    await b.add_csv("ws-1", "target_tool", "/r/c.csv")
+    assert await b.pop_csvs("ws-1") == {"target_tool": "/r/c.csv", "drug_tool": "/r/b.csv"}
+    assert await a.pop_csvs("ws-1") == {}, "pop clears the registry for every worker"
+    print("[ok] CSV registry: shared, last write per tool wins, pop clears")
+
+    await a.get_all("ws-1")
+    await b.evict("ws-1")
+    assert "ot:conn:v1:ws-1" not in redis.hashes
+    a._lru["ws-1"] = (0.0, a._lru["ws-1"][1])  # local copy expired
+    assert await a.get_all("ws-1") == {}
+    for i in range(5):
+        await a.set(f"ws-x{i}", requested_output="drug")
+        await a.get_all(f"ws-x{i}")
+    assert len(a._lru) == 2
+    print("[ok] evict and LRU bound")
+
+    calls = {"n": 0}
+
+    async def down():
+        calls["n"] += 1
+        return None
+
+    d = cs.ConnectionState(down)
+    await d.set("http-1", intent_hints=["gwas"])
+    await d.add_csv("http-1", "disease_tool", "/r/d.csv")
+    assert await d.get("http-1", "intent_hints") == ["gwas"]
+    assert await d.pop_csvs("http-1") == {"disease_tool": "/r/d.csv"}
+    assert calls["n"] == 1, "an unreachable Redis is not retried on every call"
+    print("[ok] Redis down degrades to the in-process layer with back-off")
+
+    failing = _DictRedis()
+
+    def _broken_pipeline(transaction=False):
+        pipe = _DictRedis.pipeline(failing, transaction)
+
+        async def execute():
+            raise ConnectionError("connection reset")
+
+        pipe.execute = execute
+        return pipe
+
+    async def flaky():
+        return failing
+
+    e = cs.ConnectionState(flaky, ttl_s=600, local_ttl_s=5)
+    failing.hashes["ot:conn:v1:ws-9"] = {"intent_hints": '["drug"]'}
+    assert await e.get_all("ws-9") == {"intent_hints": ["drug"]}
+    failing.pipeline = _broken_pipeline
+    await e.set("ws-9", requested_output="target")
+    assert "requested_output" not in failing.hashes["ot:conn:v1:ws-9"]
+    assert await e.get_all("ws-9") == {"intent_hints": ["drug"], "requested_output": "target"}
+    print("[ok] a write Redis rejects is merged into the local copy, not dropped")
+
+
+def main() -> int:
+    cs = _load_module()
+    asyncio.run(_run(cs))
+    print("\nPASS ✓  connection state")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
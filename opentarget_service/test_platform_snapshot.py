@@ -0,0 +1,279 @@
+"""Local, Docker-free test for the offline Open Targets backend.
+
+Writes a hand-made platform release (three targets, three diseases, three
+drugs) into a temp dir using the pre-v26 directory names and nested column
+types (associationBy*Direct, knownDrugsAggregated with numeric phases,
+mechanismOfAction with list chemblIds / targets and reference structs,
+disease synonym structs, a hive-partitioned evidence dataset) and calls the
+service's own data functions — target_data / disease_data / drug_data /
+evidence_data, as decorated with snapshot_backed — with OT_BACKEND=parquet.
+Every answer is checked against rows worked out by hand: local name
+resolution by symbol / synonym / trade name, per-datatype scores, the most
+advanced phase per drug, mechanisms, indications and evidence. A local miss
+with online resolution off raises OpenTargetsNotFound; a missing release or
+OT_BACKEND=graphql goes to the GraphQL implementation. A generated release
+then checks the key-indexed slices against a brute-force parquet filter.
+
+resolvers.py builds its Groq client and reads its prompt from /app at import,
+so a stand-in for it is registered first; the snapshot path must resolve
+every name locally and never reach it. The data modules need the service
+requirements (pandas, httpx) installed.
+
+Run:  python opentarget_service/test_platform_snapshot.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib
+import random
+import sys
+import tempfile
+import types
+from pathlib import Path
+
+import polars as pl
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))  # `opentarget_service` as a package
+PKG = "opentarget_service.app"
+DATATYPES = ["genetic_association", "somatic_mutation", "known_drug", "literature", "animal_model"]
+
+
+class _GraphQLPath(Exception):
+    """Raised by the resolver stand-in: the call left the snapshot path."""
+
+
+def _load_service():
+    class OpenTargetsNotFound(Exception):
+        pass
+
+    async def _online(term):
+        raise _GraphQLPath(term)
+
+    resolvers = types.ModuleType(f"{PKG}.resolvers")
+    resolvers.OpenTargetsNotFound = OpenTargetsNotFound
+    resolvers.resolve_target_id = resolvers.resolve_disease_id = resolvers.resolve_drug_id = _online
+    sys.modules[resolvers.__name__] = resolvers
+    mods = [importlib.import_module(f"{PKG}.{m}")
+            for m in ("platform_snapshot", "target_data", "disease_data", "drug_data", "evidence_data")]
+    return (*mods, resolvers)
+
+
+def _write(root: Path, name: str, df: pl.DataFrame, parts: int = 2) -> None:
+    d = root / name
+    d.mkdir(parents=True)
+    step = max(1, -(-df.height // parts))
+    for i in range(0, df.height, step):
+        df.slice(i, step).write_parquet(d / f"part-{i:05d}.parquet")
+
+
+def _hand_release(root: Path) -> None:
+    targets = pl.DataFrame({
+        "id": ["ENSG01", "ENSG02", "ENSG03"], "approvedSymbol": ["EGFR", "KRAS", "TP53"],
+        "approvedName": ["epidermal growth factor receptor", "KRAS proto-oncogene", "tumor protein p53"],
+        "biotype": ["protein_coding"] * 3,
+        "symbolSynonyms": [[{"label": "ERBB1", "source": "HGNC"}], [{"label": "KRAS2", "source": "HGNC"}],
+                           [{"label": "P53", "source": "HGNC"}]],
+    })
+    diseases = pl.DataFrame({
+        "id": ["EFO_1", "EFO_2", "EFO_3"],
+        "name": ["lung carcinoma", "colorectal cancer", "breast cancer"],
+        "synonyms": [{"hasExactSynonym": ["lung cancer"], "hasRelatedSynonym": []},
+                     {"hasExactSynonym": ["colon cancer"], "hasRelatedSynonym": []},
+                     {"hasExactSynonym": [], "hasRelatedSynonym": []}],
+    })
+    molecule = pl.DataFrame({
+        "id": ["CHEMBL1", "CHEMBL2", "CHEMBL3"], "name": ["ERLOTINIB", "SOTORASIB", "GEFITINIB"],
+        "drugType": ["Small molecule"] * 3,
+        "synonyms": [["OSI-774"], ["AMG 510"], []], "tradeNames": [["Tarceva"], ["Lumakras"], ["Iressa"]],
+    })
+    overall = pl.DataFrame({
+        "diseaseId": ["EFO_1", "EFO_2", "EFO_1", "EFO_2", "EFO_3"],
+        "targetId": ["ENSG01", "ENSG01", "ENSG02", "ENSG02", "ENSG03"],
+        "score": [0.9, 0.4, 0.8, 0.7, 0.6],
+    })
+    by_dt = pl.DataFrame([
+        ("EFO_1", "ENSG01", "known_drug", 0.95), ("EFO_1", "ENSG01", "literature", 0.5),
+        ("EFO_1", "ENSG01", "literature", 0.3), ("EFO_2", "ENSG01", "somatic_mutation", 0.4),
+        ("EFO_1", "ENSG02", "known_drug", 0.9),
+    ], schema=["diseaseId", "targetId", "datatypeId", "score"], orient="row")
+    names = dict(zip(diseases["id"], diseases["name"]))
+    drugs = dict(zip(molecule["id"], molecule["name"]))
+    symbols = dict(zip(targets["id"], targets["approvedSymbol"]))
+    kd = pl.DataFrame([
+        ("CHEMBL1", "ENSG01", "EFO_1", 4.0, "Completed"),
+        ("CHEMBL1", "ENSG01", "EFO_2", 2.0, "Recruiting"),
+        ("CHEMBL3", "ENSG01", "EFO_1", 4.0, None),
+        ("CHEMBL2", "ENSG02", "EFO_1", 4.0, "Completed"),
+        ("CHEMBL2", "ENSG02", "EFO_2", 3.0, "Active"),
+    ], schema=["drugId", "targetId", "diseaseId", "phase", "status"], orient="row")
+    kd = kd.with_columns(prefName=pl.col("drugId").replace_strict(drugs),
+                         label=pl.col("diseaseId").replace_strict(names),
+                         approvedSymbol=pl.col("targetId").replace_strict(symbols),
+                         drugType=pl.lit("Small molecule"), mechanismOfAction=pl.lit("inhibitor"))
+    moa = pl.DataFrame({
+        "chemblIds": [["CHEMBL1"], ["CHEMBL3"], ["CHEMBL2"]],
+        "targets": [["ENSG01"], ["ENSG01"], ["ENSG02"]],
+        "targetName": ["EGFR", "EGFR", "KRAS"],
+        "mechanismOfAction": ["EGFR inhibitor", "EGFR inhibitor", "GTPase KRas inhibitor"],
+        "actionType": ["INHIBITOR"] * 3,
+        "references": [[{"source": "FDA", "ids": ["a"]}, {"source": "DailyMed", "ids": []}],
+                       [{"source": "FDA", "ids": []}],
+                       [{"source": "FDA", "ids": []}, {"source": "DailyMed", "ids": []}]],
+    })
+    indication = pl.DataFrame({
+        "id": ["CHEMBL1", "CHEMBL2", "CHEMBL3"],
+        "indications": [
+            [{"disease": "EFO_2", "efoName": "colorectal cancer", "maxPhaseForIndication": 2.0},
+             {"disease": "EFO_1", "efoName": "lung carcinoma", "maxPhaseForIndication": 4.0}],
+            [{"disease": "EFO_1", "efoName": "lung carcinoma", "maxPhaseForIndication": 4.0}],
+            [{"disease": "EFO_1", "efoName": "lung carcinoma", "maxPhaseForIndication": 4.0}],
+        ],
+    })
+    for name, df in (("targets", targets), ("diseases", diseases), ("molecule", molecule),
+                     ("associationByOverallDirect", overall), ("associationByDatatypeDirect", by_dt),
+                     ("knownDrugsAggregated", kd), ("mechanismOfAction", moa), ("indication", indication)):
+        _write(root, name, df)
+    ev_schema = {"targetId": pl.Utf8, "diseaseId": pl.Utf8, "score": pl.Float64,
+                 "drugId": pl.Utf8, "literature": pl.List(pl.Utf8)}
+    for src, rows in (
+        ("chembl", [("ENSG01", "EFO_1", 0.9, "CHEMBL1", [])]),
+        ("europepmc", [("ENSG01", "EFO_1", 0.7, None, ["111", "222"]),
+                       ("ENSG01", "EFO_1", 0.2, None, ["333"]),
+                       ("ENSG02", "EFO_2", 0.5, None, ["444"])]),
+    ):
+        part = root / "evidence" / f"sourceId={src}"
+        part.mkdir(parents=True)
+        pl.DataFrame(rows, schema=ev_schema, orient="row").write_parquet(part / "part-0.parquet")
+
+
+async def _check_service(ps, target_data, disease_data, drug_data, evidence_data, resolvers) -> None:
+    df = await target_data.get_target_diseases_all("erbb1")
+    assert df["gene_id"].unique().tolist() == ["ENSG01"] and df["gene_symbol"].unique().tolist() == ["EGFR"]
+    assert df["disease_id"].tolist() == ["EFO_1", "EFO_2"]
+    assert df["disease_name"].tolist() == ["lung carcinoma", "colorectal cancer"]
+    assert df["association_score"].tolist() == [0.9, 0.4]
+    assert [round(x, 4) for x in df["score_drugs"]] == [0.95, 0.0]
+    assert [round(x, 4) for x in df["score_literature"]] == [0.5, 0.0], "max over duplicate datatype rows"
+    assert [round(x, 4) for x in df["score_somatic_mutation"]] == [0.0, 0.4]
+    assert (await target_data.get_target_diseases_all("EGFR", max_rows=1))["disease_id"].tolist() == ["EFO_1"]
+
+    df = await disease_data.get_targets_for_disease_all("Lung  Cancer")
+    assert df["disease_name"].unique().tolist() == ["lung carcinoma"]
+    assert df["gene_symbol"].tolist() == ["EGFR", "KRAS"] and df["association_score"].tolist() == [0.9, 0.8]
+    print("[ok] associations both ways: synonym resolution, score order, per-datatype scores")
+
+    df = await target_data.get_target_drugs_all("ENSG01")
+    assert df["drug_id"].tolist() == ["CHEMBL1", "CHEMBL3"]
+    assert df["disease_id"].tolist() == ["EFO_1", "EFO_1"] and df["phase"].tolist() == ["APPROVAL", "APPROVAL"]
+    assert df["status"].tolist() == ["Completed; Recruiting", None]
+    df = await target_data.get_target_associations_no_pathways("egfr")
+    assert df["action_types"].tolist() == ["INHIBITOR", "INHIBITOR"]
+    assert df["mechanism_of_action"].tolist() == ["EGFR inhibitor", "EGFR inhibitor"]
+    assert df["association_score"].tolist() == [0.9, 0.9]
+
+    df = await disease_data.get_disease_combined_knowledge("colon cancer")
+    assert list(zip(df["drug_id"], df["gene_symbol"], df["phase"], df["status"])) == [
+        ("CHEMBL2", "KRAS", "PHASE_3", "Active"), ("CHEMBL1", "EGFR", "PHASE_2", "Recruiting")]
+    assert df["association_score"].tolist() == [0.7, 0.4] and set(df["gene_biotype"]) == {"protein_coding"}
+    print("[ok] drugs per target / disease: most advanced phase first, statuses joined, MoA attached")
+
+    df = await drug_data.get_drug_known_diseases_targets("tarceva")
+    assert df["drug_name"].unique().tolist() == ["ERLOTINIB"]
+    assert list(zip(df["disease_id"], df["phase"])) == [("EFO_1", "APPROVAL"), ("EFO_2", "PHASE_2")]
+    df = await drug_data.get_drug_mechanisms_of_action("Lumakras")
+    assert list(zip(df["gene_id"], df["gene_name"], df["references"])) == [("ENSG02", "KRAS", "DailyMed, FDA")]
+    print("[ok] indications by phase and mechanisms with their reference sources, by trade name")
+
+    df, names, total = await evidence_data.get_target_disease_evidence("EGFR", "lung carcinoma", None, 2)
+    assert names == ("EGFR", "lung carcinoma") and total == 3
+    assert list(zip(df["datasource"], df["evidence_score"], df["drug_name"])) == [
+        ("chembl", 0.9, "ERLOTINIB"), ("europepmc", 0.7, None)]
+    assert df["literature"].tolist() == ["", "111, 222"]
+    _, _, total = await evidence_data.get_target_disease_evidence("EGFR", "lung carcinoma", "europepmc")
+    assert total == 2
+    print("[ok] evidence: best score first, total before the size cut, datasource partition filter")
+
+    ps.OT_SNAPSHOT_RESOLVE_ONLINE = False
+    try:
+        await target_data.get_target_drugs_all("BRAF")
+        raise AssertionError("a local miss must not resolve")
+    except resolvers.OpenTargetsNotFound:
+        pass
+    ps.OT_SNAPSHOT_RESOLVE_ONLINE = True
+    for backend, root in (("parquet", "/nonexistent/ot-release"), ("graphql", ps.OT_PLATFORM_DIR)):
+        ps.OT_BACKEND, ps.OT_PLATFORM_DIR = backend, root
+        try:
+            await target_data.get_target_drugs_all("EGFR")
+            raise AssertionError(f"{backend}: expected the GraphQL implementation")
+        except _GraphQLPath:
+            pass
+    print("[ok] a local miss raises OpenTargetsNotFound offline; a missing release and "
+          "OT_BACKEND=graphql use GraphQL")
+
+
+def _generated_release(root: Path, seed: int) -> dict:
+    rng = random.Random(seed)
+    tids = [f"ENSG{i:011d}" for i in range(300)]
+    dids = [f"EFO_{i:07d}" for i in range(200)]
+    _write(root, "targets", pl.DataFrame({"id": tids, "approvedSymbol": [f"GENE{i}" for i in range(300)],
+                                          "approvedName": ["x"] * 300, "biotype": ["protein_coding"] * 300}))
+    _write(root, "diseases", pl.DataFrame({"id": dids, "name": [f"disease {i}" for i in range(200)]}))
+    pairs = sorted({(rng.choice(tids), rng.choice(dids)) for _ in range(5000)})
+    overall = pl.DataFrame({"diseaseId": [d for _, d in pairs], "targetId": [t for t, _ in pairs],
+                            "score": [rng.random() for _ in pairs]})
+    by_dt = pl.DataFrame([(d, t, dt, rng.random()) for t, d in pairs
+                          for dt in rng.sample(DATATYPES, rng.randint(1, 3))],
+                         schema=["diseaseId", "targetId", "datatypeId", "score"], orient="row")
+    kd = pl.DataFrame([(f"CHEMBL{rng.randrange(50)}", rng.choice(tids[:40]), rng.choice(dids),
+                        rng.choice([0.5, 1.0, 2.0, 3.0, 4.0]), None) for _ in range(800)],
+                      schema=["drugId", "targetId", "diseaseId", "phase", "status"], orient="row")
+    for name, df in (("associationByOverallDirect", overall), ("associationByDatatypeDirect", by_dt),
+                     ("knownDrugsAggregated", kd)):
+        _write(root, name, df, parts=3)
+    return {"overall": overall, "by_dt": by_dt, "kd": kd, "tids": tids, "dids": dids}
+
+
+def _check_equivalence(ps) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = _generated_release(Path(tmp), seed=0)
+        snap = ps.get_platform_snapshot(tmp)
+        assert snap is ps.get_platform_snapshot(tmp), "one snapshot per release dir"
+        by_dt = raw["by_dt"].group_by(["diseaseId", "targetId", "datatypeId"]).agg(pl.col("score").max())
+        rng = random.Random(1)
+        for tid in rng.sample(raw["tids"], 20):
+            got = snap.target_diseases(tid, "SYM", 0)
+            want = raw["overall"].filter(pl.col("targetId") == tid).sort("score", descending=True)
+            assert got["disease_id"].to_list() == want["diseaseId"].to_list(), tid
+            for r in got.head(3).iter_rows(named=True):
+                dts = by_dt.filter((pl.col("targetId") == tid) & (pl.col("diseaseId") == r["disease_id"]))
+                m = dict(zip(dts["datatypeId"].to_list(), dts["score"].to_list()))
+                assert abs(r["score_drugs"] - m.get("known_drug", 0.0)) < 1e-6
+                assert abs(r["score_literature"] - m.get("literature", 0.0)) < 1e-6
+        for did in rng.sample(raw["dids"], 20):
+            got = snap.disease_targets(did, "d", 0)
+            want = raw["overall"].filter(pl.col("diseaseId") == did).sort("score", descending=True)
+            assert got["gene_id"].to_list() == want["targetId"].to_list(), did
+        enum = {4.0: "APPROVAL", 3.0: "PHASE_3", 2.0: "PHASE_2", 1.0: "PHASE_1", 0.5: "EARLY_PHASE_1"}
+        for tid in raw["tids"][:40]:
+            got = snap.target_drugs(tid, "SYM")
+            want = raw["kd"].filter(pl.col("targetId") == tid).group_by("drugId").agg(pl.col("phase").max())
+            assert dict(zip(got["drug_id"], got["phase"])) == {
+                d: enum[p] for d, p in zip(want["drugId"], want["phase"])}, tid
+        assert snap.target_diseases("ENSG_MISSING", None, 0).is_empty()
+    print("[ok] generated release: key-indexed slices == parquet filter + sort")
+
+
+def main() -> int:
+    ps, target_data, disease_data, drug_data, evidence_data, resolvers = _load_service()
+    with tempfile.TemporaryDirectory() as tmp:
+        _hand_release(Path(tmp))
+        ps.OT_BACKEND, ps.OT_PLATFORM_DIR = "parquet", tmp
+        asyncio.run(_check_service(ps, target_data, disease_data, drug_data, evidence_data, resolvers))
+    _check_equivalence(ps)
+    print("\nPASS ✓  offline Open Targets backend")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
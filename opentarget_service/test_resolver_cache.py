@@ -0,0 +1,140 @@
+"""Local, Docker-free test for the Open Targets resolver cache.
+
+Loads app/resolver_cache.py directly (stdlib only — no GraphQL client, Redis
+or agents needed) and checks cache keys, positive / negative entries and
+their separate expiries, LRU eviction, the write-through / read-back path via
+a dict-backed stand-in for the async Redis client, the back-off when Redis is
+unreachable, the aliased batch search document and the per-term fallback
+when a batch request fails.
+
+Run:  python opentarget_service/test_resolver_cache.py
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("resolver_cache_under_test",
+                                                  HERE / "app" / "resolver_cache.py")
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class _DictRedis:
+    """The three calls ResolverCache makes, over a dict (expiry recorded, not enforced)."""
+
+    def __init__(self):
+        self.data, self.ex = {}, {}
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=False):
+        outer = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, k, v, ex=None):
+                self.ops.append((k, v, ex))
+
+            async def execute(self):
+                for k, v, ex in self.ops:
+                    outer.data[k], outer.ex[k] = v, ex
+
+        return _Pipe()
+
+
+async def _run(rc) -> None:
+    k = rc.cache_key
+    assert k("target", "  TP53 ") == "target:TP53" != k("target", "tp53")
+    assert k("disease", "Alzheimer's disease") == "disease:Alzheimer's disease"
+
+    redis = _DictRedis()
+
+    async def getter():
+        return redis
+
+    c = rc.ResolverCache(getter, max_items=3, ttl_s=100, neg_ttl_s=10)
+    hit = {"id": "ENSG00000141510", "name": "TP53", "entity": "target"}
+    await c.put_many({k("target", "tp53"): hit, k("drug", "notadrug"): None, k("mapids", "x"): []})
+    assert await c.get(k("target", "tp53")) == hit
+    assert await c.get(k("target", "TP53")) is rc.MISSING, "terms are not case-folded"
+    assert await c.get(k("drug", "notadrug")) is None, "negative entries are cached as None"
+    assert await c.get(k("target", "brca1")) is rc.MISSING
+    assert redis.ex[f"ot:resolve:v2:{k('target', 'tp53')}"] == 100
+    assert redis.ex[f"ot:resolve:v2:{k('drug', 'notadrug')}"] == 10
+    assert redis.ex[f"ot:resolve:v2:{k('mapids', 'x')}"] == 10
+    print("[ok] raw-term keys, positive / negative entries, separate TTLs")
+
+    fresh = rc.ResolverCache(getter, max_items=3)
+    got = await fresh.get_many([k("target", "tp53"), k("drug", "notadrug"), k("target", "brca1")])
+    assert got == {k("target", "tp53"): hit, k("drug", "notadrug"): None}
+    assert fresh.hits == 2 and fresh.misses == 1
+    print("[ok] a new process reads the shared Redis layer back")
+
+    await c.put_many({k("target", f"g{i}"): [f"ENSG{i}", f"G{i}"] for i in range(3)})
+    assert len(c._lru) == 3 and k("target", "tp53") not in c._lru
+    c._lru[k("target", "g0")] = (time.time() - 1, ["stale"])
+    assert await c.get(k("target", "g0")) == ["ENSG0", "G0"], "expired LRU entries re-read from Redis"
+    print("[ok] LRU bound and expiry")
+
+    calls = {"n": 0}
+
+    async def down():
+        calls["n"] += 1
+        return None
+
+    d = rc.ResolverCache(down)
+    await d.put(k("drug", "aspirin"), {"id": "CHEMBL25"})
+    assert await d.get(k("drug", "aspirin")) == {"id": "CHEMBL25"}
+    assert await d.get(k("drug", "ibuprofen")) is rc.MISSING
+    assert calls["n"] == 1, "an unreachable Redis is not retried on every call"
+    print("[ok] Redis down degrades to the in-process layer with back-off")
+
+    q, v = rc.build_search_batch([("TP53", "target"), ("asthma", "disease"), ("aspirin", "drug")])
+    assert q.count("search(") == 3 and "q2: search(queryString: $t2, entityNames: $e2)" in q
+    assert v == {"t0": "TP53", "e0": ["target"], "t1": "asthma", "e1": ["disease"],
+                 "t2": "aspirin", "e2": ["drug"]}
+    print("[ok] aliased batch search document")
+
+    requests = []
+
+    async def run_batch(chunk):
+        requests.append(list(chunk))
+        if len(chunk) > 1 or chunk[0] == "bad":
+            raise RuntimeError("upstream 502")
+        return {t: [t.upper()] for t in chunk}
+
+    got = await rc.run_batched(run_batch, ["a", "bad", "c", "d"], 3)
+    assert got == {"a": ["A"], "c": ["C"], "d": ["D"]}, "the failing term is left out"
+    assert requests[0] == ["a", "bad", "c"] and sorted(map(tuple, requests[1:])) == [
+        ("a",), ("bad",), ("c",), ("d",)], "only the failed chunk is split"
+    try:
+        await rc.run_batched(run_batch, ["bad"], 3)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("nothing resolved: the upstream error is raised")
+    print("[ok] a failed batch falls back to one request per term")
+
+
+def main() -> int:
+    rc = _load_module()
+    asyncio.run(_run(rc))
+    print("\nPASS ✓  resolver cache")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
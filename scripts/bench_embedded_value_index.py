@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Recall + latency of the embedded value index against the Qdrant server.
+
+Encodes a sample of real concept values for one (db, field) with each pinned
+BIOMEDICAL_MODELS model, sends the SAME SearchRequest batch to Qdrant and to
+the embedded index (resources/ann/, scripts/build_embedded_value_index.py),
+and reports:
+
+  recall@k   — |embedded ∩ qdrant| / |qdrant| on payload text, per term
+  latency    — p50 / p95 wall time of one search_batch call, per backend
+
+Qdrant's own HNSW is approximate too, so recall < 1.0 can mean either side
+missed; pass --exact to make Qdrant search exhaustively and use it as ground
+truth.
+
+Run from repo root:
+    python scripts/bench_embedded_value_index.py --db ttd --field drug_name
+    python scripts/bench_embedded_value_index.py --db hcdt --field gene_symbol --exact --repeats 20
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "app"))   # so `utils.*` resolves as in-container
+
+from config.settings import BIOMEDICAL_MODELS, EMBEDDING_MODELS, embedding_revision  # noqa: E402
+
+EMBEDDED_MODULE = REPO_ROOT / "app" / "tools" / "semantic_filter" / "app" / "embedded_index.py"
+
+
+def _load_embedded_module():
+    spec = importlib.util.spec_from_file_location("embedded_index_under_test", EMBEDDED_MODULE)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def sample_terms(db: str, field: str, n: int, seed: int) -> list[str]:
+    from utils.concept_values import get_db_concept_values
+
+    values = [str(v) for v in (get_db_concept_values(db).get(field) or []) if str(v).strip()]
+    random.Random(seed).shuffle(values)
+    return values[:n]
+
+
+def timed(fn, repeats: int):
+    times, out = [], None
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, np.asarray(times)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--field", required=True)
+    ap.add_argument("--n-terms", type=int, default=50)
+    ap.add_argument("--top-k", type=int, default=50)
+    ap.add_argument("--hnsw-ef", type=int, default=512)
+    ap.add_argument("--exact", action="store_true", help="exhaustive Qdrant search as ground truth")
+    ap.add_argument("--repeats", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models as qm
+    from sentence_transformers import SentenceTransformer
+
+    db = args.db.lower()
+    terms = sample_terms(db, args.field, args.n_terms, args.seed)
+    if not terms:
+        print(f"ERROR: no concept values for {db}.{args.field}", file=sys.stderr)
+        return 2
+
+    qdrant = QdrantClient(host=os.getenv("QDRANT_HOST", "localhost"),
+                          port=int(os.getenv("QDRANT_PORT", "6333")),
+                          grpc_port=6334, prefer_grpc=True, timeout=300.0)
+    embedded = _load_embedded_module().EmbeddedValueIndex()
+
+    for model_name in BIOMEDICAL_MODELS:
+        coll = f"emb_{model_name.replace('/', '_')}"
+        if not embedded.collection_exists(coll):
+            print(f"  {model_name}: no embedded shard — skipped")
+            continue
+        local_path = EMBEDDING_MODELS[model_name].get("local_path")
+        model = SentenceTransformer(str(REPO_ROOT / local_path) if local_path else model_name,
+                                    revision=embedding_revision(model_name))
+        vecs = model.encode(terms, convert_to_numpy=True, normalize_embeddings=True,
+                            show_progress_bar=False)
+        flt = qm.Filter(must=[
+            qm.FieldCondition(key="model", match=qm.MatchValue(value=model_name)),
+            qm.FieldCondition(key="field", match=qm.MatchValue(value=args.field)),
+            qm.FieldCondition(key="db", match=qm.MatchValue(value=db)),
+        ])
+        reqs = [qm.SearchRequest(vector=v.tolist(), filter=flt, limit=args.top_k, with_payload=True,
+                                 params=qm.SearchParams(hnsw_ef=args.hnsw_ef, exact=args.exact))
+                for v in vecs]
+
+        embedded.search_batch(coll, reqs[:1])                      # load shard outside timing
+        ref, t_q = timed(lambda: qdrant.search_batch(collection_name=coll, requests=reqs), args.repeats)
+        got, t_e = timed(lambda: embedded.search_batch(coll, reqs), args.repeats)
+
+        recalls = []
+        for r_hits, e_hits in zip(ref, got):
+            r = {str((h.payload or {}).get("text", "")).lower() for h in r_hits}
+            e = {str((h.payload or {}).get("text", "")).lower() for h in e_hits}
+            if r:
+                recalls.append(len(r & e) / len(r))
+        print(f"  {model_name}  ({db}.{args.field}, {len(terms)} terms, k={args.top_k})\n"
+              f"    recall@{args.top_k}  mean={np.mean(recalls):.4f}  min={np.min(recalls):.4f}\n"
+              f"    qdrant    p50={np.median(t_q) * 1e3:8.2f} ms  p95={np.quantile(t_q, 0.95) * 1e3:8.2f} ms\n"
+              f"    embedded  p50={np.median(t_e) * 1e3:8.2f} ms  p95={np.quantile(t_e, 0.95) * 1e3:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
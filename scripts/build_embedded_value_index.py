@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Build the embedded (in-process) value index from the Qdrant collections.
+
+Reads the same `emb_<org>_<name>` collections that
+scripts/build_qdrant_collection_manifests.py describes, scrolls every point
+(vector + payload) per DB, and writes one memory-mappable shard per
+(collection, db) for the semantic filter's SEMANTIC_VALUE_BACKEND=embedded
+mode (app/tools/semantic_filter/app/embedded_index.py):
+
+  resources/ann/<collection>/<db>/
+      vectors.f32       float32, L2-normalised, rows grouped by payload `field`
+      payloads.jsonl    Qdrant payload per row, same order
+      hnsw_<field>.bin  hnswlib graph for fields above --exact-max rows
+      index.json        dim, count, field row ranges, model + revision, and the
+                        sha1 of qdrant_manifests/collections_manifest.json it
+                        was built against
+  resources/ann/build.json
+                        build stamp: time and shards of the last run
+
+Each shard is written to a temp dir and renamed into place, so a running
+service never maps a half-written file. The build stamp is replaced last; the
+running service reopens its shards and moves its query cache to a new
+generation when it changes. Re-run after every Qdrant re-ingest.
+
+Run from repo root (needs qdrant_client, numpy; hnswlib optional):
+    python scripts/build_embedded_value_index.py
+    python scripts/build_embedded_value_index.py --db ttd --db hcdt
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from config.settings import BIOMEDICAL_MODELS, EMBEDDING_MODELS  # noqa: E402
+
+OUT_ROOT = REPO_ROOT / "resources" / "ann"
+MANIFEST = REPO_ROOT / "qdrant_manifests" / "collections_manifest.json"
+QDRANT_URL = os.environ.get("QDRANT_URL", "http://localhost:6333").rstrip("/")
+
+
+def collection_for(model_name: str) -> str:
+    return f"emb_{model_name.replace('/', '_')}"
+
+
+def manifest_generation() -> str:
+    try:
+        return hashlib.sha1(MANIFEST.read_bytes()).hexdigest()[:12]
+    except OSError:
+        return "nomanifest"
+
+
+def default_dbs() -> list[str]:
+    return sorted(p.parent.name for p in (REPO_ROOT / "dbs").glob("*/manifest.yaml"))
+
+
+def scroll_db(client, collection: str, db: str, page: int) -> dict[str, tuple[list, list]]:
+    """{field: ([vectors], [payloads])} for every point of `db` in `collection`."""
+    from qdrant_client.http import models as qm
+
+    flt = qm.Filter(must=[qm.FieldCondition(key="db", match=qm.MatchValue(value=db))])
+    by_field: dict[str, tuple[list, list]] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection, scroll_filter=flt,
+                                       limit=page, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        for p in points:
+            payload = p.payload or {}
+            vecs, pls = by_field.setdefault(payload.get("field", ""), ([], []))
+            vecs.append(p.vector)
+            pls.append(payload)
+        if offset is None:
+            break
+    return by_field
+
+
+def write_shard(out_dir: Path, collection: str, model: str, db: str,
+                by_field: dict[str, tuple[list, list]], exact_max: int,
+                hnsw_m: int, hnsw_ef_construction: int) -> dict:
+    tmp = out_dir.with_name(out_dir.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    fields: dict[str, list[int]] = {}
+    hnsw: dict[str, dict] = {}
+    dim = None
+    row = 0
+    try:
+        import hnswlib
+    except ImportError:
+        hnswlib = None
+        print("  (hnswlib not installed — every field will be searched exactly)")
+
+    with open(tmp / "vectors.f32", "wb") as vf, open(tmp / "payloads.jsonl", "w", encoding="utf-8") as pf:
+        for field in sorted(by_field):
+            vecs, payloads = by_field[field]
+            mat = np.asarray(vecs, dtype=np.float32)
+            mat /= np.linalg.norm(mat, axis=1, keepdims=True) + 1e-12
+            dim = dim or mat.shape[1]
+            vf.write(mat.tobytes())
+            for pl in payloads:
+                pf.write(json.dumps(pl, ensure_ascii=False, default=str) + "\n")
+            fields[field] = [row, row + len(mat)]
+            row += len(mat)
+            if hnswlib is not None and len(mat) > exact_max:
+                idx = hnswlib.Index(space="cosine", dim=mat.shape[1])
+                idx.init_index(max_elements=len(mat), M=hnsw_m, ef_construction=hnsw_ef_construction)
+                idx.add_items(mat, np.arange(len(mat)))
+                fname = f"hnsw_{field}.bin"
+                idx.save_index(str(tmp / fname))
+                hnsw[field] = {"file": fname, "M": hnsw_m, "ef_construction": hnsw_ef_construction}
+
+    meta = {
+        "collection": collection,
+        "model": model,
+        "revision": (EMBEDDING_MODELS.get(model) or {}).get("revision"),
+        "db": db,
+        "dim": dim,
+        "count": row,
+        "fields": fields,
+        "hnsw": hnsw,
+        "distance": "Cosine",
+        "source_manifest_generation": manifest_generation(),
+        "qdrant_url": QDRANT_URL,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "generator": "scripts/build_embedded_value_index.py",
+    }
+    (tmp / "index.json").write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp.rename(out_dir)
+    return meta
+
+
+def write_build_stamp(out_root: Path, shards: list[str]) -> None:
+    stamp = {
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+        "shards": sorted(shards),
+        "source_manifest_generation": manifest_generation(),
+        "generator": "scripts/build_embedded_value_index.py",
+    }
+    tmp = out_root / "build.json.tmp"
+    tmp.write_text(json.dumps(stamp, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, out_root / "build.json")
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", action="append", help="DB slug (repeatable). Default: every dbs/<slug>.")
+    ap.add_argument("--model", action="append", help="HF repo id. Default: BIOMEDICAL_MODELS.")
+    ap.add_argument("--out", type=Path, default=OUT_ROOT)
+    ap.add_argument("--page", type=int, default=2048, help="scroll page size")
+    ap.add_argument("--exact-max", type=int, default=50000,
+                    help="fields up to this many rows are searched exactly (no HNSW graph)")
+    ap.add_argument("--hnsw-m", type=int, default=16)
+    ap.add_argument("--hnsw-ef-construction", type=int, default=200)
+    args = ap.parse_args(argv)
+
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=QDRANT_URL, timeout=300.0)
+    dbs = [d.lower() for d in (args.db or default_dbs())]
+    models = args.model or list(BIOMEDICAL_MODELS)
+
+    built: list[str] = []
+    for model in models:
+        coll = collection_for(model)
+        if not client.collection_exists(coll):
+            print(f"WARNING: collection {coll} not found at {QDRANT_URL} — skipped", file=sys.stderr)
+            continue
+        for db in dbs:
+            by_field = scroll_db(client, coll, db, args.page)
+            if not by_field:
+                continue
+            meta = write_shard(args.out / coll / db, coll, model, db, by_field,
+                               args.exact_max, args.hnsw_m, args.hnsw_ef_construction)
+            built.append(f"{coll}/{db}")
+            print(f"  {coll:<48s} {db:<10s} rows={meta['count']:>9,}  dim={meta['dim']}  "
+                  f"fields={len(meta['fields'])}  hnsw={sorted(meta['hnsw'])}")
+
+    if not built:
+        print("ERROR: nothing built — no matching points in Qdrant", file=sys.stderr)
+        return 1
+    write_build_stamp(args.out, built)
+    print(f"\nWrote {len(built)} shard(s) under {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Import-time budget gate for every service entry point.
+
+WHY
+---
+A per-DB container's cold start is mostly `import app.main`: FastAPI,
+pydantic, polars, the per_db_tool modules and whatever they drag in. One
+eager `import openai` / `networkx` / `duckdb` at module top adds hundreds of
+milliseconds to every restart and every autoscaled replica, and nothing
+notices. scripts/smoke_test_imports.py only checks that imports succeed;
+this checks what they cost.
+
+What it does
+------------
+For each `app/tools/<service>/app/main.py` it rebuilds the container's /app
+tree in a temp dir with symlinks (the same mounts as docker-compose.yml:
+the service's app/ files, app/per_db_tool, app/utils as both `utils` and
+`app.utils`, config/, resources/). It then runs `python -X importtime -c
+"import app.main"` in a fresh interpreter: one warm-up run to fill the
+bytecode cache, then --repeat measured runs, keeping the fastest.
+
+From that it reports the cumulative import time of app.main and the self
+time per top-level package (the repo's own code is split one level deeper:
+app.per_db_tool, utils, config, ...). It fails when
+
+  * a lean per-DB service (one built on app.per_db_tool) imports a module
+    from LAZY_ONLY at startup: those must sit behind lazy accessors. This is
+    the real gate: it does not depend on the machine;
+  * the total exceeds --budget-ms (default 10000 ms). Timings differ too
+    much between machines to compare against recorded numbers, so this is
+    only a wide backstop: about three times the slowest service's import
+    with requirements-base.txt on a developer machine (~3 s).
+
+Behaviour
+---------
+  python scripts/check_import_budget.py                    # all services
+  python scripts/check_import_budget.py ttd clinvar        # just these
+  python scripts/check_import_budget.py --top 15           # also list the slowest modules
+  python scripts/check_import_budget.py --record out.json  # per-module costs as JSON
+
+Services whose third-party deps are not installed fail, unless
+--allow-missing is given; then they are reported as skipped. The CI job
+installs requirements-base.txt only, so it uses --allow-missing. A run in
+which every service was skipped fails: it checked nothing. Required LLM model
+settings get placeholder values, since importing never calls a model.
+Compare two --record files from the same machine to see where a regression
+came from.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TOOLS = ROOT / "app" / "tools"
+
+# Must not be imported while a lean per-DB service starts. Each is used on
+# one request path only and imported there (or in the loader that needs it).
+LAZY_ONLY = frozenset({
+    "openai", "agents", "networkx", "duckdb", "fastembed", "onnxruntime",
+    "tiktoken", "requests", "redis", "qdrant_client", "torch", "transformers",
+    "sklearn", "pandas",
+})
+# Top-level packages that are the repo's own code, never a missing dependency.
+_OWN = ("app", "utils", "config")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+_MISSING_RE = re.compile(r"ModuleNotFoundError: No module named '([^']+)'")
+
+# (path inside the staged /app tree, source in the repo)
+_MOUNTS = (
+    ("app/per_db_tool", ROOT / "app" / "per_db_tool"),
+    ("app/utils", ROOT / "app" / "utils"),
+    ("utils", ROOT / "app" / "utils"),
+    ("config", ROOT / "config"),
+    ("resources", ROOT / "resources"),
+    ("schema_kg/inputs", ROOT / "evaluation" / "schema_kg" / "inputs"),
+)
+
+
+def _model_placeholders() -> dict:
+    """A stand-in for every required LLM model setting. config.settings raises
+    at import when one is unset (compose supplies them from .env); importing
+    only needs a name, no model is ever called."""
+    spec = importlib.util.spec_from_file_location("_budget_settings", ROOT / "config" / "settings.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return {env: "import-budget-placeholder"
+            for env, default in mod._MODEL_SETTINGS.values() if default is None}
+
+
+def _services() -> list[str]:
+    return sorted(p.parent.parent.name for p in TOOLS.glob("*/app/main.py"))
+
+
+def _is_lean(service: str) -> bool:
+    return "app.per_db_tool" in (TOOLS / service / "app" / "main.py").read_text(encoding="utf-8")
+
+
+def _stage(service: str, root: Path) -> None:
+    """Recreate the container's /app layout for *service* under *root*."""
+    (root / "app").mkdir(parents=True)
+    for p in (TOOLS / service / "app").iterdir():
+        if p.name != "__pycache__":
+            (root / "app" / p.name).symlink_to(p)
+    for rel, src in _MOUNTS:
+        dst = root / rel
+        if src.exists() and not dst.exists():
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            dst.symlink_to(src)
+    (root / "results").mkdir()
+
+
+def _group(module: str) -> str:
+    parts = module.split(".")
+    if parts[0] == "app" and len(parts) > 1:
+        return ".".join(parts[:2])
+    return parts[0]
+
+
+def _parse(stderr: str) -> dict:
+    """Per-module (self_ms, cumulative_ms) plus per-group self time."""
+    modules: dict[str, tuple[float, float]] = {}
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            modules[m.group(4)] = (int(m.group(1)) / 1000.0, int(m.group(2)) / 1000.0)
+    groups: dict[str, float] = {}
+    for name, (self_ms, _) in modules.items():
+        g = _group(name)
+        groups[g] = groups.get(g, 0.0) + self_ms
+    total = modules.get("app.main", (0.0, 0.0))[1]
+    return {"total_ms": total, "packages": groups, "modules": modules}
+
+
+def _measure(service: str, repeat: int) -> dict:
+    """Fastest of *repeat* cold-interpreter imports of the service's app.main."""
+    with tempfile.TemporaryDirectory(prefix=f"importbudget_{service}_") as tmp:
+        root = Path(tmp)
+        _stage(service, root / "app_root")
+        # `utils` resolves resources/ as ../.. of itself, falling back to /app;
+        # staged, ../.. is this temp dir
+        (root / "resources").symlink_to(ROOT / "resources")
+        env = {
+            **_model_placeholders(),
+            **os.environ,
+            "SCHEMA_KG_INPUTS_ROOT": str(root / "app_root" / "schema_kg" / "inputs"),
+            "PYTHONPATH": str(root / "app_root"),
+            "PYTHONPYCACHEPREFIX": str(root / "pycache"),
+            "SERVICE_NAME": service,
+            "RESULTS_ROOT": str(root / "app_root" / "results"),
+        }
+        best = None
+        for i in range(repeat + 1):
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "import app.main"],
+                cwd=root / "app_root", env=env, capture_output=True, text=True, timeout=600,
+            )
+            if proc.returncode != 0:
+                tail = proc.stderr.strip().splitlines()[-1:] or ["(no output)"]
+                missing = _MISSING_RE.search(proc.stderr)
+                return {"error": tail[0], "missing": missing.group(1) if missing else None}
+            if i == 0:
+                continue  # warm-up: fills the bytecode cache
+            run = _parse(proc.stderr)
+            if best is None or run["total_ms"] < best["total_ms"]:
+                best = run
+        return best
+
+
+def _check(service: str, run: dict, args: argparse.Namespace) -> list[str]:
+    problems = []
+    if _is_lean(service):
+        eager = sorted({n.split(".")[0] for n in run["modules"]} & LAZY_ONLY)
+        if eager:
+            problems.append(f"imports {', '.join(eager)} at startup (must be lazy)")
+    total = run["total_ms"]
+    if args.budget_ms and total > args.budget_ms:
+        problems.append(f"import time {total:.0f} ms > budget {args.budget_ms:.0f} ms")
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    ap.add_argument("services", nargs="*", help="default: every app/tools/*/app/main.py")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--budget-ms", type=float, default=10000.0,
+                    help="fail above this total import time (0: no cap)")
+    ap.add_argument("--top", type=int, default=0, help="list the N slowest modules per service")
+    ap.add_argument("--record", type=Path, help="write per-module costs to this JSON file")
+    ap.add_argument("--allow-missing", action="store_true",
+                    help="skip services whose third-party deps are not installed")
+    args = ap.parse_args()
+
+    services = args.services or _services()
+    unknown = sorted(set(services) - set(_services()))
+    if unknown:
+        print(f"unknown service(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    failures: dict[str, list[str]] = {}
+    measured: dict[str, dict] = {}
+    for svc in services:
+        run = _measure(svc, max(args.repeat, 1))
+        if "error" in run:
+            missing = run.get("missing")
+            if args.allow_missing and missing and missing.split(".")[0] not in _OWN:
+                print(f"{svc:<30} skipped: {missing} not installed")
+                continue
+            failures[svc] = [f"import failed: {run['error']}"]
+            print(f"{svc:<30} FAILED to import: {run['error']}")
+            continue
+        measured[svc] = run
+        heavy = sorted(run["packages"].items(), key=lambda kv: -kv[1])[:5]
+        print(f"{svc:<30} {run['total_ms']:7.0f} ms   "
+              + ", ".join(f"{k} {v:.0f}" for k, v in heavy))
+        if args.top:
+            slow = sorted(run["modules"].items(), key=lambda kv: -kv[1][0])[:args.top]
+            for name, (self_ms, cum_ms) in slow:
+                print(f"    {self_ms:7.1f} ms self {cum_ms:8.1f} ms cum  {name}")
+        problems = _check(svc, run, args)
+        if problems:
+            failures[svc] = problems
+
+    if args.record:
+        args.record.write_text(json.dumps(
+            {svc: {"total_ms": r["total_ms"], "packages": r["packages"],
+                   "modules": {k: {"self_ms": s, "cumulative_ms": c} for k, (s, c) in r["modules"].items()}}
+             for svc, r in measured.items()}, indent=2, sort_keys=True) + "\n")
+
+    if not measured:
+        # every service skipped: nothing was checked, which must not pass
+        failures.setdefault("(all)", []).append("no service could be imported, nothing was measured")
+    if failures:
+        print("\nImport budget check FAILED:", file=sys.stderr)
+        for svc, problems in failures.items():
+            for p in problems:
+                print(f"  - {svc}: {p}", file=sys.stderr)
+        return 1
+    print(f"\nImport budget OK ({len(measured)} service(s) measured).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
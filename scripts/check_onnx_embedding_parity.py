@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Accuracy gate + CPU benchmark: quantised ONNX vs PyTorch embedding models.
+
+For every model in config.settings.BIOMEDICAL_MODELS that has an export from
+scripts/export_onnx_embedding_models.py, encode a sample of real concept
+values with both backends and check:
+
+  1. embedding agreement  — per-term cosine(torch, onnx); fails if the
+                            minimum drops below --min-cosine.
+  2. retrieval agreement  — top-k Qdrant hits through the production
+                            search_reference_terms_BATCH path (knee cutoff
+                            off, so the raw top-k is compared); fails if the
+                            mean overlap@k drops below --min-overlap.
+
+With --bench, also reports encode throughput (terms/s and terms/s/core) for
+each backend at the same thread count, so the CPU-node win is measured on
+the node itself rather than assumed.
+
+Run from repo root (needs sentence-transformers[onnx], qdrant_client; Qdrant
+reachable at $QDRANT_HOST/$QDRANT_PORT unless --skip-qdrant):
+    python scripts/check_onnx_embedding_parity.py --db ttd --field drug_name
+    python scripts/check_onnx_embedding_parity.py --db hcdt --field gene_symbol --bench --threads 4
+
+Exit code: 0 = pass, 1 = a gate failed, 2 = nothing to compare.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "app"))   # so `utils.*` resolves as in-container
+
+from config.settings import BIOMEDICAL_MODELS, EMBEDDING_MODELS, embedding_revision  # noqa: E402
+
+SEMANTIC_APP = REPO_ROOT / "app" / "tools" / "semantic_filter" / "app"
+
+
+def _load_similarity_module():
+    """similarity_filtered.py uses a relative import of .filter — load both as a package."""
+    import types
+
+    pkg_name = "semantic_filter_app"
+    pkg = types.ModuleType(pkg_name)
+    pkg.__path__ = [str(SEMANTIC_APP)]
+    sys.modules[pkg_name] = pkg
+    sub = importlib.util.spec_from_file_location(f"{pkg_name}.similarity_filtered",
+                                                 SEMANTIC_APP / "similarity_filtered.py")
+    mod = importlib.util.module_from_spec(sub)
+    sys.modules[sub.name] = mod
+    sub.loader.exec_module(mod)
+    return mod
+
+
+def sample_terms(db: str, field: str, n: int, seed: int) -> list[str]:
+    from utils.concept_values import get_db_concept_values
+
+    values = [str(v) for v in (get_db_concept_values(db).get(field) or []) if str(v).strip()]
+    random.Random(seed).shuffle(values)
+    return values[:n]
+
+
+def load_pair(model_name: str, sim, threads: int):
+    from sentence_transformers import SentenceTransformer
+
+    revision = embedding_revision(model_name)
+    export = sim.resolve_onnx_export(model_name)
+    if export is None:
+        return None, None
+    local_path = EMBEDDING_MODELS[model_name].get("local_path")
+    model_id = str(REPO_ROOT / local_path) if local_path else model_name
+    torch_model = SentenceTransformer(model_id, revision=revision, device="cpu")
+    kwargs = {"file_name": export["file_name"], "provider": "CPUExecutionProvider"}
+    if threads > 0:
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        kwargs["session_options"] = opts
+    onnx_model = SentenceTransformer(export["path"], revision=revision, backend="onnx",
+                                     model_kwargs=kwargs)
+    return torch_model, onnx_model
+
+
+def encode(model, terms: list[str], batch_size: int) -> np.ndarray:
+    return model.encode(terms, batch_size=batch_size, convert_to_numpy=True,
+                        normalize_embeddings=True, show_progress_bar=False)
+
+
+def topk_overlap(flt, client, terms, field, db, model_name, model, k) -> dict[str, set]:
+    df = flt.search_reference_terms_BATCH(
+        client, terms, field, {model_name: model},
+        limit_per_model=k, use_knee_cutoff=False, db_whitelist=[db],
+    )
+    hits: dict[str, set] = {t: set() for t in terms}
+    if df is not None and not df.empty:
+        for term, text in zip(df["reference_term"], df["text"]):
+            hits.setdefault(term, set()).add(str(text).lower())
+    return hits
+
+
+def bench(model, terms: list[str], batch_size: int, repeats: int) -> float:
+    encode(model, terms[:batch_size], batch_size)              # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        encode(model, terms, batch_size)
+    return (len(terms) * repeats) / (time.perf_counter() - t0)
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--field", required=True)
+    ap.add_argument("--n-terms", type=int, default=500)
+    ap.add_argument("--top-k", type=int, default=10)
+    ap.add_argument("--min-cosine", type=float, default=0.98)
+    ap.add_argument("--min-overlap", type=float, default=0.90)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--skip-qdrant", action="store_true")
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--threads", type=int, default=0,
+                    help="threads for BOTH backends (0 = library default, all cores)")
+    args = ap.parse_args(argv)
+
+    db = args.db.lower()
+    terms = sample_terms(db, args.field, args.n_terms, args.seed)
+    if not terms:
+        print(f"ERROR: no concept values for {db}.{args.field}", file=sys.stderr)
+        return 2
+
+    import torch
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    cores = args.threads or torch.get_num_threads() or (os.cpu_count() or 1)
+
+    sim = _load_similarity_module()
+    flt = sys.modules["semantic_filter_app.filter"]   # imported by similarity_filtered
+    client = None
+    if not args.skip_qdrant:
+        from qdrant_client import QdrantClient
+        client = QdrantClient(host=os.getenv("QDRANT_HOST", "localhost"),
+                              port=int(os.getenv("QDRANT_PORT", "6333")), timeout=300.0)
+
+    failures: list[str] = []
+    compared = 0
+    for model_name in BIOMEDICAL_MODELS:
+        torch_model, onnx_model = load_pair(model_name, sim, args.threads)
+        if torch_model is None:
+            print(f"  {model_name}: no ONNX export — skipped")
+            continue
+        compared += 1
+
+        a = encode(torch_model, terms, args.batch_size)
+        b = encode(onnx_model, terms, args.batch_size)
+        cos = np.sum(a * b, axis=1)
+        worst = terms[int(np.argmin(cos))]
+        print(f"  {model_name}\n"
+              f"    cosine  min={cos.min():.4f}  p01={np.quantile(cos, 0.01):.4f}  "
+              f"mean={cos.mean():.4f}  (worst: {worst!r})")
+        if cos.min() < args.min_cosine:
+            failures.append(f"{model_name}: min cosine {cos.min():.4f} < {args.min_cosine}")
+
+        if client is not None:
+            ref = topk_overlap(flt, client, terms, args.field, db, model_name, torch_model, args.top_k)
+            got = topk_overlap(flt, client, terms, args.field, db, model_name, onnx_model, args.top_k)
+            overlaps = [len(ref[t] & got.get(t, set())) / len(ref[t]) for t in terms if ref[t]]
+            mean_ov = float(np.mean(overlaps)) if overlaps else 1.0
+            print(f"    overlap@{args.top_k}  mean={mean_ov:.4f}  "
+                  f"min={min(overlaps) if overlaps else 1.0:.4f}  (terms with hits: {len(overlaps)})")
+            if mean_ov < args.min_overlap:
+                failures.append(f"{model_name}: mean overlap@{args.top_k} "
+                                f"{mean_ov:.4f} < {args.min_overlap}")
+
+        if args.bench:
+            tps_t = bench(torch_model, terms, args.batch_size, args.repeats)
+            tps_o = bench(onnx_model, terms, args.batch_size, args.repeats)
+            print(f"    throughput  torch={tps_t:,.1f}/s ({tps_t / cores:,.1f}/s/core)  "
+                  f"onnx-int8={tps_o:,.1f}/s ({tps_o / cores:,.1f}/s/core)  "
+                  f"speedup={tps_o / tps_t:.2f}x  cores={cores}")
+
+    if not compared:
+        print("ERROR: no model had an ONNX export to compare", file=sys.stderr)
+        return 2
+    if failures:
+        for f in failures:
+            print(f"FAIL: {f}", file=sys.stderr)
+        return 1
+    print("PASS: ONNX exports agree with the PyTorch path")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
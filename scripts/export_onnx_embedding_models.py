@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Export the semantic-filter embedding models to quantised ONNX.
+
+For every model in config.settings.BIOMEDICAL_MODELS (or --model), load the
+PINNED revision from config.settings.EMBEDDING_MODELS, export it to ONNX via
+sentence-transformers' optimum backend, apply dynamic int8 quantisation and
+write:
+
+  resources/models/onnx/<org>_<name>/<revision>/
+      onnx/model.onnx                        (fp32 export)
+      onnx/model_qint8_<config>.onnx         (dynamic int8 — what we serve)
+      tokenizer + sentence-transformers config (copied by save_pretrained)
+      export_manifest.json                   (model, revision, onnx_file, sha256)
+
+The semantic filter only serves an export whose manifest revision equals the
+current pin (SEMANTIC_EMBED_BACKEND=onnx), so re-pinning a model in
+config/settings.py requires re-running this script. Before flipping a
+deployment, run scripts/check_onnx_embedding_parity.py against the export.
+
+Run from repo root (needs `sentence-transformers[onnx]`):
+    python scripts/export_onnx_embedding_models.py
+    python scripts/export_onnx_embedding_models.py --quantization avx2
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from config.settings import (  # noqa: E402
+    BIOMEDICAL_MODELS,
+    EMBEDDING_MODELS,
+    ONNX_EXPORT_MANIFEST,
+    embedding_revision,
+    onnx_export_subdir,
+)
+
+# Dynamic-quantisation presets understood by optimum's AutoQuantizationConfig.
+# avx512_vnni is the right default for the Xeon CPU nodes; use avx2 on older
+# hosts and arm64 on Graviton.
+QUANTIZATION_CONFIGS = ("avx512_vnni", "avx512", "avx2", "arm64")
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "-C", str(REPO_ROOT), "rev-parse", "HEAD"],
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def export_one(model_name: str, quantization: str, force: bool) -> dict:
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    revision = embedding_revision(model_name)
+    if revision is None:
+        raise ValueError(f"{model_name} is not registered in config.settings.EMBEDDING_MODELS")
+    out_dir = REPO_ROOT / onnx_export_subdir(model_name)
+    manifest_path = out_dir / ONNX_EXPORT_MANIFEST
+    file_suffix = f"qint8_{quantization}"
+    onnx_file = f"onnx/model_{file_suffix}.onnx"
+
+    if manifest_path.is_file() and not force:
+        existing = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if existing.get("revision") == revision and existing.get("onnx_file") == onnx_file:
+            print(f"  {model_name}: export for {revision[:12]} already present (use --force)")
+            return existing
+
+    local_path = EMBEDDING_MODELS[model_name].get("local_path")
+    model_id = str(REPO_ROOT / local_path) if local_path else model_name
+    print(f"  {model_name}: exporting revision {revision[:12]} → {out_dir}")
+
+    # backend="onnx" converts the pinned PyTorch weights on load when the
+    # repo ships no ONNX file of its own.
+    model = SentenceTransformer(model_id, revision=revision, backend="onnx")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    model.save_pretrained(str(out_dir))
+    export_dynamic_quantized_onnx_model(
+        model,
+        quantization_config=quantization,
+        model_name_or_path=str(out_dir),
+        push_to_hub=False,
+        file_suffix=file_suffix,
+    )
+
+    quantised = out_dir / onnx_file
+    if not quantised.is_file():
+        raise RuntimeError(f"quantised export not found at {quantised}")
+
+    manifest = {
+        "model": model_name,
+        "revision": revision,
+        "onnx_file": onnx_file,
+        "onnx_sha256": sha256_file(quantised),
+        "quantization": f"dynamic-int8/{quantization}",
+        "embedding_dimension": model.get_sentence_embedding_dimension(),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "generator": "scripts/export_onnx_embedding_models.py",
+        "git_commit": git_commit(),
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return manifest
+
+
+def main(argv: list[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model", action="append",
+                    help="HF repo id to export (repeatable). Default: BIOMEDICAL_MODELS.")
+    ap.add_argument("--quantization", choices=QUANTIZATION_CONFIGS, default="avx512_vnni")
+    ap.add_argument("--force", action="store_true", help="re-export even if present")
+    args = ap.parse_args(argv)
+
+    models = args.model or list(BIOMEDICAL_MODELS)
+    failures = 0
+    for name in models:
+        try:
+            m = export_one(name, args.quantization, args.force)
+            print(f"  {name:<60s}  {m['onnx_file']}  sha256={m['onnx_sha256'][:12]}")
+        except Exception as e:
+            failures += 1
+            print(f"ERROR: {name}: {e}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))